@@ -0,0 +1,416 @@
+"""
+Opportunity alerts.
+
+Rules are matched against every analyzed opportunity (compare_odds.py
+--alerts CONFIG, or odds_daemon.py --alerts CONFIG) and matches are sent to
+pluggable sinks. A rule can require a minimum EV, a minimum edge in cents, a
+minimum Kalshi liquidity on the bet side and a window of minutes before the
+game starts.
+
+Per opportunity and rule:
+- debounce: a match must hold for debounce_cycles consecutive evaluations
+  before the first alert
+- suppression: after an alert the same opportunity stays quiet for
+  cooldown_minutes, unless its EV improved by renotify_ev_delta
+
+Rules are indexed by sport and sorted by min_ev, so each opportunity only
+checks the rules whose EV threshold it already clears (bisect), and the
+common case of an opportunity below every threshold costs one comparison.
+Debounce state is kept per sport, so an evaluation only visits its own
+sport's entries, and it is only written back when it changed. Alerts are
+handed to the sinks on a worker thread, so a slow webhook never holds up
+the evaluation (or the daemon's publish).
+
+Config file (JSON):
+    {
+      "rules": [{"name": "big-edge", "min_ev": 5, "min_edge_cents": 3,
+                 "min_liquidity": 500, "max_minutes_to_start": 180, "sports": ["ncaab"],
+                 "debounce_cycles": 2, "cooldown_minutes": 30, "renotify_ev_delta": 2}],
+      "sinks": [{"type": "console"}, {"type": "file", "path": "data/alerts.jsonl"},
+                {"type": "webhook", "url": "http://127.0.0.1:8766/alerts"},
+                {"type": "desktop"}]
+    }
+
+Run `python scripts/alerts.py --serve-webhook [PORT]` for a local webhook
+stand-in that prints what it receives.
+"""
+import atexit
+import bisect
+import json
+import os
+import queue
+import shutil
+import subprocess
+import sys
+import threading
+from datetime import datetime, timezone
+from http.server import BaseHTTPRequestHandler, HTTPServer
+from typing import Dict, List, Optional, Tuple
+
+import requests
+
+from json_io import load_json, write_json
+from opportunity_ledger import get_bet_price, get_edge_cents, opportunity_key, parse_timestamp
+
+# Get the project root directory (parent of scripts folder)
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+DATA_DIR = os.path.join(PROJECT_ROOT, "data")
+
+# Debounce/suppression state kept between one-shot compare_odds.py runs
+ALERT_STATE_FILE = os.path.join(DATA_DIR, "alert_state.json")
+
+DEFAULT_WEBHOOK_PORT = 8766
+
+def get_bet_liquidity(opp: Dict) -> Optional[float]:
+    """Kalshi liquidity (dollars) of the market the opportunity bets on."""
+    cents = opp.get("away_kalshi_liquidity") if opp.get("bet_team") == "away" else opp.get("home_kalshi_liquidity")
+    return cents / 100 if cents is not None else None
+
+def minutes_to_start(opp: Dict, now: datetime) -> Optional[float]:
+    commence_time = opp.get("commence_time")
+    if not commence_time:
+        return None
+    try:
+        return (parse_timestamp(commence_time) - now).total_seconds() / 60
+    except ValueError:
+        return None
+
+class AlertRule:
+    """One alert condition plus its debounce/suppression settings."""
+
+    def __init__(self, name: str, min_ev: float = 0.0, min_edge_cents: Optional[float] = None,
+                 min_liquidity: Optional[float] = None, max_minutes_to_start: Optional[float] = None,
+                 min_minutes_to_start: Optional[float] = None, sports: Optional[List[str]] = None,
+                 debounce_cycles: int = 1, cooldown_minutes: float = 30.0,
+                 renotify_ev_delta: Optional[float] = None):
+        self.name = name
+        self.min_ev = min_ev
+        self.min_edge_cents = min_edge_cents
+        self.min_liquidity = min_liquidity
+        self.max_minutes_to_start = max_minutes_to_start
+        self.min_minutes_to_start = min_minutes_to_start
+        self.sports = [s.lower() for s in sports] if sports else None
+        self.debounce_cycles = max(1, debounce_cycles)
+        self.cooldown_seconds = cooldown_minutes * 60
+        self.renotify_ev_delta = renotify_ev_delta
+
+    @classmethod
+    def from_config(cls, config: Dict) -> "AlertRule":
+        return cls(**config)
+
+    def matches(self, opp: Dict, now: datetime) -> bool:
+        """Check every condition except min_ev (already applied by the index)."""
+        if self.min_edge_cents is not None:
+            edge = get_edge_cents(opp)
+            if edge is None or edge < self.min_edge_cents:
+                return False
+        if self.min_liquidity is not None:
+            liquidity = get_bet_liquidity(opp)
+            if liquidity is None or liquidity < self.min_liquidity:
+                return False
+        if self.max_minutes_to_start is not None or self.min_minutes_to_start is not None:
+            minutes = minutes_to_start(opp, now)
+            if minutes is None:
+                return False
+            if self.max_minutes_to_start is not None and minutes > self.max_minutes_to_start:
+                return False
+            if self.min_minutes_to_start is not None and minutes < self.min_minutes_to_start:
+                return False
+        return True
+
+class RuleIndex:
+    """Rules bucketed by sport (None = every sport), each bucket sorted by min_ev."""
+
+    def __init__(self, rules: List[AlertRule]):
+        self.buckets: Dict[Optional[str], Tuple[List[float], List[AlertRule]]] = {}
+        grouped: Dict[Optional[str], List[AlertRule]] = {}
+        for rule in rules:
+            for sport in rule.sports or [None]:
+                grouped.setdefault(sport, []).append(rule)
+        for sport, bucket in grouped.items():
+            bucket.sort(key=lambda r: r.min_ev)
+            self.buckets[sport] = ([r.min_ev for r in bucket], bucket)
+
+    def candidates(self, sport: str, expected_value: float) -> List[AlertRule]:
+        """Rules for this sport whose EV threshold the opportunity meets."""
+        found = []
+        for key in (sport, None):
+            bucket = self.buckets.get(key)
+            if bucket:
+                thresholds, rules = bucket
+                found.extend(rules[:bisect.bisect_right(thresholds, expected_value)])
+        return found
+
+# ----------------------------------------------------------------------
+# Sinks
+# ----------------------------------------------------------------------
+
+class AlertSink:
+    """Base class: send() receives one alert dict."""
+
+    def send(self, alert: Dict):
+        raise NotImplementedError
+
+def format_alert(alert: Dict) -> str:
+    edge = alert["edge_cents"]
+    edge_text = f", edge {edge:+.1f}c" if edge is not None else ""
+    return (f"[{alert['rule']}] {alert['sport'].upper()} {alert['bet_team_name']} "
+            f"@ {alert['kalshi_price']}c: EV ${alert['expected_value']:.2f}{edge_text} ({alert['reason']})")
+
+class ConsoleSink(AlertSink):
+    def send(self, alert: Dict):
+        print(f"ALERT {format_alert(alert)}", flush=True)
+
+class FileSink(AlertSink):
+    """Appends one JSON line per alert."""
+
+    def __init__(self, path: str):
+        self.path = path if os.path.isabs(path) else os.path.join(PROJECT_ROOT, path)
+
+    def send(self, alert: Dict):
+        os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        with open(self.path, "a", encoding="utf-8") as f:
+            f.write(json.dumps(alert, ensure_ascii=False, separators=(",", ":")) + "\n")
+
+class WebhookSink(AlertSink):
+    """POSTs each alert as JSON."""
+
+    def __init__(self, url: str, timeout: float = 5.0):
+        self.url = url
+        self.timeout = timeout
+
+    def send(self, alert: Dict):
+        response = requests.post(self.url, json=alert, timeout=self.timeout)
+        response.raise_for_status()
+
+class DesktopSink(AlertSink):
+    """Desktop notification via notify-send (Linux) or osascript (macOS); prints otherwise."""
+
+    def send(self, alert: Dict):
+        title = f"EV ${alert['expected_value']:.2f}: {alert['bet_team_name']}"
+        body = format_alert(alert)
+        if shutil.which("notify-send"):
+            subprocess.run(["notify-send", title, body], check=False)
+        elif shutil.which("osascript"):
+            script = f"display notification {json.dumps(body)} with title {json.dumps(title)}"
+            subprocess.run(["osascript", "-e", script], check=False)
+        else:
+            print(f"ALERT {body}", flush=True)
+
+SINK_TYPES = {
+    "console": lambda config: ConsoleSink(),
+    "file": lambda config: FileSink(config.get("path", os.path.join(DATA_DIR, "alerts.jsonl"))),
+    "webhook": lambda config: WebhookSink(config["url"], config.get("timeout", 5.0)),
+    "desktop": lambda config: DesktopSink(),
+}
+
+# ----------------------------------------------------------------------
+# Engine
+# ----------------------------------------------------------------------
+
+class AlertEngine:
+    """
+    Evaluates rules against each sport's opportunities and dispatches alerts.
+
+    State per sport and (rule, opportunity key): consecutive matching cycles
+    (counted up to the rule's debounce_cycles), last alert time and the EV at
+    the last alert.
+    """
+
+    def __init__(self, rules: List[AlertRule], sinks: List[AlertSink], state_path: Optional[str] = None):
+        self.rules = {rule.name: rule for rule in rules}
+        self.index = RuleIndex(rules)
+        self.sinks = sinks
+        self.state_path = state_path
+        # sport -> "<rule>|<key>" -> {"sport", "streak", "alerted_at", "alerted_ev", "rearmed"}
+        self.state: Dict[str, Dict[str, Dict]] = {}
+        self._outbox: Optional[queue.Queue] = None
+        self._worker: Optional[threading.Thread] = None
+        if state_path and os.path.exists(state_path):
+            saved = load_json(state_path, use_cache=False)
+            self.state = saved.get("sports", {})
+            # Files written before state was kept per sport
+            for state_key, entry in saved.get("entries", {}).items():
+                self.state.setdefault(entry["sport"], {})[state_key] = entry
+
+    def evaluate(self, sport: str, opportunities: List[Dict], now: Optional[datetime] = None) -> List[Dict]:
+        """Evaluate one sport's current opportunities; returns (and queues for the sinks) new alerts."""
+        now = now or datetime.now(timezone.utc)
+        alerts = []
+        matched = set()
+        changed = False
+        sport_state = self.state.setdefault(sport, {})
+
+        for opp in opportunities:
+            for rule in self.index.candidates(sport, opp.get("expected_value", 0)):
+                if not rule.matches(opp, now):
+                    continue
+                state_key = f"{rule.name}|{opportunity_key(opp)}"
+                matched.add(state_key)
+                entry = sport_state.get(state_key)
+                if entry is None:
+                    entry = sport_state[state_key] = {"sport": sport, "streak": 0, "alerted_at": None,
+                                                      "alerted_ev": None, "rearmed": False}
+                if entry["streak"] < rule.debounce_cycles:
+                    entry["streak"] += 1
+                    changed = True
+                reason = self._alert_reason(rule, entry, opp, now)
+                if reason:
+                    entry["alerted_at"] = now.isoformat()
+                    entry["alerted_ev"] = opp["expected_value"]
+                    entry["rearmed"] = False
+                    changed = True
+                    alerts.append(self._build_alert(rule, sport, opp, reason, now))
+
+        # Opportunities that stopped matching restart their debounce; keep the
+        # last alert only while it still suppresses a re-alert
+        if len(matched) < len(sport_state):
+            for state_key, entry in list(sport_state.items()):
+                if state_key in matched:
+                    continue
+                rule = self.rules.get(state_key.split("|", 1)[0])
+                if (rule is None or entry["alerted_at"] is None
+                        or (now - parse_timestamp(entry["alerted_at"])).total_seconds() >= rule.cooldown_seconds):
+                    del sport_state[state_key]
+                    changed = True
+                elif entry["streak"] or not entry["rearmed"]:
+                    entry["streak"] = 0
+                    entry["rearmed"] = True
+                    changed = True
+
+        for alert in alerts:
+            self.enqueue(alert)
+        if self.state_path and changed:
+            self.save_state()
+        return alerts
+
+    def _alert_reason(self, rule: AlertRule, entry: Dict, opp: Dict, now: datetime) -> Optional[str]:
+        if entry["streak"] < rule.debounce_cycles:
+            return None
+        if entry["alerted_at"] is None:
+            return "new"
+        # Within the cooldown only a meaningful EV improvement breaks suppression
+        elapsed = (now - parse_timestamp(entry["alerted_at"])).total_seconds()
+        if (rule.renotify_ev_delta is not None
+                and opp["expected_value"] - entry["alerted_ev"] >= rule.renotify_ev_delta):
+            return "improved"
+        if entry.get("rearmed") and elapsed >= rule.cooldown_seconds:
+            # Went away during the cooldown and is back (debounced again) after it
+            return "reopened"
+        return None
+
+    def _build_alert(self, rule: AlertRule, sport: str, opp: Dict, reason: str, now: datetime) -> Dict:
+        minutes = minutes_to_start(opp, now)
+        return {
+            "rule": rule.name,
+            "reason": reason,
+            "alerted_at": now.isoformat(),
+            "sport": sport,
+            "key": opportunity_key(opp),
+            "event_ticker": opp.get("event_ticker"),
+            "bet_team_name": opp.get("bet_team_name"),
+            "commence_time": opp.get("commence_time"),
+            "minutes_to_start": round(minutes, 1) if minutes is not None else None,
+            "kalshi_price": get_bet_price(opp),
+            "edge_cents": get_edge_cents(opp),
+            "liquidity": get_bet_liquidity(opp),
+            "expected_value": opp.get("expected_value"),
+        }
+
+    def dispatch(self, alert: Dict):
+        """Send one alert to every sink (on the calling thread)."""
+        for sink in self.sinks:
+            try:
+                sink.send(alert)
+            except Exception as e:
+                print(f"Warning: alert sink {type(sink).__name__} failed: {e}")
+
+    def enqueue(self, alert: Dict):
+        """Hand an alert to the sink worker thread, starting it on first use."""
+        if self._worker is None:
+            self._outbox = queue.Queue()
+            self._worker = threading.Thread(target=self._run_sinks, name="alert-sinks", daemon=True)
+            self._worker.start()
+            # Alerts still queued when a one-shot run ends are sent before exit
+            atexit.register(self.close)
+        self._outbox.put(alert)
+
+    def _run_sinks(self):
+        while True:
+            alert = self._outbox.get()
+            try:
+                if alert is None:
+                    return
+                self.dispatch(alert)
+            finally:
+                self._outbox.task_done()
+
+    def close(self):
+        """Wait for queued alerts to be sent and stop the sink worker."""
+        if self._worker is None:
+            return
+        self._outbox.put(None)
+        self._worker.join()
+        self._worker = None
+
+    def on_publish(self, sport: str, result: Optional[Dict]):
+        """odds_daemon subscriber."""
+        self.evaluate(sport, result["opportunities"] if result else [])
+
+    def save_state(self):
+        write_json(self.state_path, {"sports": self.state})
+
+def load_alert_engine(config_path: str, persist_state: bool = True) -> AlertEngine:
+    """
+    Build an AlertEngine from a JSON config file (see module docstring).
+    persist_state keeps debounce/suppression state in data/alert_state.json
+    between runs (needed for one-shot compare_odds.py runs).
+    """
+    with open(config_path, "r", encoding="utf-8") as f:
+        config = json.load(f)
+    rules = [AlertRule.from_config(rule) for rule in config.get("rules", [])]
+    sinks = [SINK_TYPES[sink["type"]](sink) for sink in config.get("sinks", [{"type": "console"}])]
+    return AlertEngine(rules, sinks, ALERT_STATE_FILE if persist_state else None)
+
+# ----------------------------------------------------------------------
+# Local webhook stand-in
+# ----------------------------------------------------------------------
+
+class _WebhookHandler(BaseHTTPRequestHandler):
+    def do_POST(self):
+        body = self.rfile.read(int(self.headers.get("Content-Length", 0)))
+        try:
+            print(f"webhook: {format_alert(json.loads(body))}", flush=True)
+        except (ValueError, KeyError):
+            print(f"webhook: {body[:200]!r}", flush=True)
+        self.send_response(204)
+        self.end_headers()
+
+    def log_message(self, format, *args):
+        pass
+
+def serve_webhook(port: int = DEFAULT_WEBHOOK_PORT):
+    """Print alerts POSTed to http://127.0.0.1:<port>/ (stand-in for a real webhook)."""
+    server = HTTPServer(("127.0.0.1", port), _WebhookHandler)
+    print(f"Webhook stand-in listening on http://127.0.0.1:{port}/alerts")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+
+def main():
+    """
+    Command line arguments:
+        --serve-webhook [PORT] - Run the local webhook stand-in (default 8766)
+    """
+    if "--serve-webhook" in sys.argv:
+        idx = sys.argv.index("--serve-webhook")
+        port = int(sys.argv[idx + 1]) if idx + 1 < len(sys.argv) else DEFAULT_WEBHOOK_PORT
+        serve_webhook(port)
+        return
+    print("Usage: python alerts.py --serve-webhook [PORT]")
+    print("Alerts are evaluated by compare_odds.py / odds_daemon.py with --alerts CONFIG")
+    sys.exit(1)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,557 @@
+"""
+Historical backtest over the snapshot store.
+
+Replays every stored Kalshi snapshot at its original timestamp against the
+sportsbook odds known at that moment (each bookmaker's latest price at or
+before it), evaluates the unhedged Kalshi bets the same way analyze_game
+does, and settles them with Kalshi's market "result".
+
+Games are matched once (with compare_odds' matcher) rather than per
+snapshot. Everything after that is columnar numpy:
+    - quotes are joined as-of by sorted integer keys and np.searchsorted
+    - bookmaker averages are np.bincount sums
+    - devigging and EV are array expressions over all snapshots at once
+so months of minute-level snapshots replay in seconds.
+
+Devig methods ("multiplicative" is what analyze_game uses; all start from
+the average American odds across bookmakers):
+    multiplicative  p_i / (p_away + p_home)
+    additive        p_i - overround / 2
+    power           p_i ** k with k solved so the probabilities sum to 1
+
+Report, per sport and devig method:
+    - expected vs realized P&L of the bets taken at MIN_EV_THRESHOLD, with
+      the realized P&L's standard error under the model
+    - a threshold sweep
+    - a calibration table of closing model probabilities vs outcomes
+      (and its Brier score)
+
+Settle first (Kalshi's settled markets are written to the store):
+    python scripts/backtest.py nba ncaab --settle --start 2025-11-01
+"""
+import os
+import sys
+from datetime import datetime, timedelta, timezone
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+
+import compare_odds
+import fetch_kalshi_sports
+from json_io import write_json
+from opportunity_ledger import parse_timestamp
+from snapshot_store import DEFAULT_DB_PATH, SnapshotStore
+
+DEVIG_METHODS = ("multiplicative", "additive", "power")
+POLICIES = ("first", "every")
+DEFAULT_THRESHOLDS = (0.0, 1.0, 2.0, 3.0, 5.0, 7.5, 10.0)
+CALIBRATION_BINS = 10
+
+BET_AMOUNT = 100.0
+KALSHI_FEE_PERCENT = 1.0
+
+# (evaluation, bookmaker, side) rows joined per batch, to bound memory
+JOIN_BATCH_ROWS = 4_000_000
+
+POWER_ITERATIONS = 60
+
+def time_bound(value: Optional[str], end: bool = False) -> str:
+    """
+    A --start/--end bound as a UTC ISO 8601 string, the format observed_at
+    is stored in, so the store's string comparisons are chronological.
+    A date-only end covers the whole day; None is open-ended.
+    """
+    if not value:
+        return "9999" if end else "0000"
+    bound = parse_timestamp(value).astimezone(timezone.utc)
+    if end and len(value) == len("YYYY-MM-DD"):
+        bound += timedelta(days=1, microseconds=-1)
+    return bound.isoformat()
+
+def unix_time(value: Optional[str]) -> float:
+    if not value:
+        return float("nan")
+    try:
+        return parse_timestamp(value).timestamp()
+    except ValueError:
+        return float("nan")
+
+# ----------------------------------------------------------------------
+# Loading
+# ----------------------------------------------------------------------
+
+def match_pairs(store: SnapshotStore, sport: str, start: str, end: str) -> List[Dict]:
+    """
+    Match the games observed in the range to their Kalshi markets, once per
+    game: the odds games commencing on each day are matched (by
+    compare_odds.iter_match_candidates) against markets expiring that day or
+    the next.
+
+    Returns one dict per matched event: event_ticker, away/home team names
+    (odds spelling), away/home Kalshi tickers, odds game id, commence_time.
+    """
+    markets_by_day: Dict[str, List[Dict]] = {}
+    for row in store.kalshi_markets_seen(sport, start, end):
+        entry = {
+            "expiration_time": row["expiration_time"],
+            "ticker": row["ticker"],
+            "title": row["title"],
+            "event_ticker": row["event_ticker"],
+            "observed_at": row["observed_at"],
+            "market_data": {"ticker": row["ticker"], "event_ticker": row["event_ticker"],
+                            "title": row["title"], "yes_sub_title": row["yes_sub_title"]},
+        }
+        markets_by_day.setdefault((row["expiration_time"] or "")[:10], []).append(entry)
+
+    games_by_day: Dict[str, List[Dict]] = {}
+    for row in store.odds_games_seen(sport, start, end):
+        game = {"odds_data": {"id": row["game"], "away_team": row["away_team"], "home_team": row["home_team"],
+                              "commence_time": row["commence_time"], "bookmakers": []}}
+        games_by_day.setdefault((row["commence_time"] or "")[:10], []).append(game)
+
+    pairs = []
+    seen_events = set()
+    for day in sorted(games_by_day):
+        try:
+            next_day = (datetime.fromisoformat(day) + timedelta(days=1)).date().isoformat()
+        except ValueError:
+            next_day = ""
+        markets = markets_by_day.get(day, []) + markets_by_day.get(next_day, [])
+        if not markets:
+            continue
+        fetched = {"kalshi_data": {"markets": markets}, "odds_data": {"games": games_by_day[day]}}
+        for _, game, _ in compare_odds.iter_match_candidates(sport, fetched=fetched):
+            if game["event_ticker"] in seen_events:
+                continue
+            seen_events.add(game["event_ticker"])
+            pairs.append({
+                "event_ticker": game["event_ticker"],
+                "away_team": game["away_team"],
+                "home_team": game["home_team"],
+                "away_ticker": game["away_kalshi_market"]["ticker"],
+                "home_ticker": game["home_kalshi_market"]["ticker"],
+                "game": game["odds_data"]["id"],
+                "commence_time": game["commence_time"],
+            })
+    return pairs
+
+def away_outcomes(pairs: List[Dict], results: Dict[str, str]) -> np.ndarray:
+    """1 if the away team won, 0 if the home team won, -1 if not settled."""
+    outcomes = np.full(len(pairs), -1, dtype=np.int8)
+    for i, pair in enumerate(pairs):
+        away, home = results.get(pair["away_ticker"]), results.get(pair["home_ticker"])
+        if away == "yes" or home == "no":
+            outcomes[i] = 1
+        elif away == "no" or home == "yes":
+            outcomes[i] = 0
+    return outcomes
+
+def build_evaluations(store: SnapshotStore, sport: str, start: str, end: str,
+                      pairs: List[Dict]) -> Dict[str, np.ndarray]:
+    """
+    One evaluation per (matched game, Kalshi snapshot) with both markets
+    quoted, before the game starts: Kalshi asks plus the average odds of
+    every bookmaker's latest price at or before the snapshot.
+
+    Returns columns: pair, time, away_ask, home_ask, avg_away_odds,
+    avg_home_odds, away_books, home_books.
+    """
+    empty = {name: np.empty(0) for name in ("time", "away_ask", "home_ask", "avg_away_odds",
+                                             "avg_home_odds", "away_books", "home_books")}
+    empty["pair"] = np.empty(0, dtype=np.int64)
+    if not pairs:
+        return empty
+    n_pairs = len(pairs)
+
+    # Kalshi quotes -> (pair, side)
+    ticker_slot = {}
+    for i, pair in enumerate(pairs):
+        ticker_slot[pair["away_ticker"]] = (i, 0)
+        ticker_slot[pair["home_ticker"]] = (i, 1)
+    kalshi_rows = [row for row in store.kalshi_price_rows(sport, start, end)
+                   if row[0] in ticker_slot and row[2] is not None]
+    odds_rows = store.odds_price_rows(sport, start, end)
+    if not kalshi_rows or not odds_rows:
+        return empty
+
+    k_slot = np.array([ticker_slot[row[0]] for row in kalshi_rows], dtype=np.int64)
+    k_time = np.array([row[1] for row in kalshi_rows], dtype=np.float64)
+    k_ask = np.array([row[2] for row in kalshi_rows], dtype=np.float64)
+
+    # Odds quotes -> (pair, bookmaker, side)
+    outcome_slot = {}
+    for i, pair in enumerate(pairs):
+        outcome_slot[(pair["game"], pair["away_team"])] = (i, 0)
+        outcome_slot[(pair["game"], pair["home_team"])] = (i, 1)
+    odds_rows = [row for row in odds_rows if (row[0], row[3]) in outcome_slot]
+    if not odds_rows:
+        return empty
+    bookmakers: Dict[str, int] = {}
+    o_slot = np.array([outcome_slot[(row[0], row[3])] for row in odds_rows], dtype=np.int64)
+    o_pair, o_side = o_slot[:, 0], o_slot[:, 1]
+    o_book = np.array([bookmakers.setdefault(row[1], len(bookmakers)) for row in odds_rows], dtype=np.int64)
+    o_time = np.array([row[2] for row in odds_rows], dtype=np.float64)
+    o_price = np.array([row[4] for row in odds_rows], dtype=np.float64)
+    n_books = max(1, len(bookmakers))
+
+    # Shared integer time axis so as-of joins are exact integer comparisons
+    times, inverse = np.unique(np.concatenate([k_time, o_time]), return_inverse=True)
+    k_tidx, o_tidx = inverse[:len(k_time)], inverse[len(k_time):]
+    n_times = len(times)
+
+    # Snapshots where both of a game's markets were quoted
+    away = k_slot[:, 1] == 0
+    away_keys = k_slot[away, 0] * n_times + k_tidx[away]
+    home_keys = k_slot[~away, 0] * n_times + k_tidx[~away]
+    keys, away_idx, home_idx = np.intersect1d(away_keys, home_keys, return_indices=True)
+    e_pair = keys // n_times
+    e_tidx = keys % n_times
+    e_time = times[e_tidx]
+    e_away_ask = k_ask[away][away_idx]
+    e_home_ask = k_ask[~away][home_idx]
+
+    # Live games are excluded, as in compare_odds
+    commence = np.array([unix_time(pair["commence_time"]) for pair in pairs])
+    pregame = ~(e_time >= commence[e_pair])
+    e_pair, e_tidx, e_time = e_pair[pregame], e_tidx[pregame], e_time[pregame]
+    e_away_ask, e_home_ask = e_away_ask[pregame], e_home_ask[pregame]
+    n_evals = len(e_pair)
+
+    # Odds groups (pair, bookmaker, side), sorted by group then time
+    o_group = (o_pair * n_books + o_book) * 2 + o_side
+    order = np.lexsort((o_tidx, o_group))
+    o_group, o_key, o_price = o_group[order], o_group[order] * n_times + o_tidx[order], o_price[order]
+    groups = np.unique(o_group)
+    group_pair = groups // (2 * n_books)
+    group_count = np.bincount(group_pair, minlength=n_pairs)
+    group_start = np.cumsum(group_count) - group_count
+
+    sums = np.zeros((2, n_evals))
+    counts = np.zeros((2, n_evals))
+    per_eval = group_count[e_pair]
+    cumulative = np.cumsum(per_eval)
+    limits = np.arange(JOIN_BATCH_ROWS, cumulative[-1] if n_evals else 0, JOIN_BATCH_ROWS)
+    batch_starts = np.unique(np.concatenate([[0], np.searchsorted(cumulative, limits), [n_evals]]))
+
+    for lo, hi in zip(batch_starts[:-1], batch_starts[1:]):
+        repeat = per_eval[lo:hi]
+        q_eval = np.repeat(np.arange(lo, hi), repeat)
+        offsets = np.arange(len(q_eval)) - np.repeat(np.cumsum(repeat) - repeat, repeat)
+        q_group = groups[np.repeat(group_start[e_pair[lo:hi]], repeat) + offsets]
+        q_key = q_group * n_times + e_tidx[q_eval]
+        pos = np.searchsorted(o_key, q_key, side="right") - 1
+        found = pos >= 0
+        found[found] = o_group[pos[found]] == q_group[found]
+        side = q_group[found] % 2
+        np.add.at(sums, (side, q_eval[found]), o_price[pos[found]])
+        np.add.at(counts, (side, q_eval[found]), 1)
+
+    with np.errstate(invalid="ignore", divide="ignore"):
+        averages = sums / counts
+    priced = (counts[0] > 0) & (counts[1] > 0)
+    return {
+        "pair": e_pair[priced],
+        "time": e_time[priced],
+        "away_ask": e_away_ask[priced],
+        "home_ask": e_home_ask[priced],
+        "avg_away_odds": averages[0][priced],
+        "avg_home_odds": averages[1][priced],
+        "away_books": counts[0][priced],
+        "home_books": counts[1][priced],
+    }
+
+# ----------------------------------------------------------------------
+# Vectorized model (mirrors analyze_game)
+# ----------------------------------------------------------------------
+
+def american_to_probability(odds: np.ndarray) -> np.ndarray:
+    """Implied probability (0-1) of American odds; averages are truncated to int as in analyze_game."""
+    odds = np.trunc(odds)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        return np.where(odds < 0, np.abs(odds) / (np.abs(odds) + 100), 100 / (odds + 100))
+
+def devig(away_prob: np.ndarray, home_prob: np.ndarray, method: str) -> np.ndarray:
+    """Vig-free away win probability."""
+    total = away_prob + home_prob
+    with np.errstate(invalid="ignore", divide="ignore"):
+        multiplicative = np.where(total > 0, away_prob / total, 0.5)
+    if method == "multiplicative":
+        return multiplicative
+    if method == "additive":
+        return np.clip(away_prob - (total - 1) / 2, 0.0, 1.0)
+    if method == "power":
+        # Bisection on k: away ** k + home ** k is decreasing in k for probabilities in (0, 1)
+        valid = (away_prob > 0) & (away_prob < 1) & (home_prob > 0) & (home_prob < 1)
+        a = np.where(valid, away_prob, 0.5)
+        h = np.where(valid, home_prob, 0.5)
+        lo = np.full(a.shape, 1e-3)
+        hi = np.full(a.shape, 50.0)
+        for _ in range(POWER_ITERATIONS):
+            k = (lo + hi) / 2
+            over = a ** k + h ** k > 1
+            lo = np.where(over, k, lo)
+            hi = np.where(over, hi, k)
+        return np.where(valid, a ** ((lo + hi) / 2), multiplicative)
+    raise ValueError(f"Unknown devig method: {method}")
+
+def kalshi_profit_if_win(price_cents: np.ndarray) -> np.ndarray:
+    """calculate_kalshi_payout's profit_if_win for BET_AMOUNT, per price."""
+    with np.errstate(invalid="ignore", divide="ignore"):
+        profit = BET_AMOUNT / (price_cents / 100.0) * (1 - KALSHI_FEE_PERCENT / 100.0) - BET_AMOUNT
+    return np.where(price_cents > 0, np.round(profit, 2), 0.0)
+
+def evaluate(evals: Dict[str, np.ndarray], method: str) -> Dict[str, np.ndarray]:
+    """
+    Best unhedged Kalshi bet per evaluation.
+    Returns columns: away_prob, bet_home, bet_prob, profit_if_win, ev.
+    """
+    away_prob = devig(american_to_probability(evals["avg_away_odds"]),
+                      american_to_probability(evals["avg_home_odds"]), method)
+    away_profit = kalshi_profit_if_win(evals["away_ask"])
+    home_profit = kalshi_profit_if_win(evals["home_ask"])
+    away_ev = away_prob * away_profit - (1 - away_prob) * BET_AMOUNT
+    home_ev = (1 - away_prob) * home_profit - away_prob * BET_AMOUNT
+    # Ties go to the away side, like max() over analyze_game's strategy list
+    bet_home = home_ev > away_ev
+    return {
+        "away_prob": away_prob,
+        "bet_home": bet_home,
+        "bet_prob": np.where(bet_home, 1 - away_prob, away_prob),
+        "profit_if_win": np.where(bet_home, home_profit, away_profit),
+        "ev": np.where(bet_home, home_ev, away_ev),
+    }
+
+# ----------------------------------------------------------------------
+# Reporting
+# ----------------------------------------------------------------------
+
+def select_bets(pair: np.ndarray, ev: np.ndarray, threshold: float, policy: str) -> np.ndarray:
+    """
+    Indices of the evaluations bet on: positive EV whose rounded value
+    clears threshold (as find_opportunities), either every such snapshot or
+    only the first per game. Evaluations are ordered by (pair, time).
+    """
+    taken = np.flatnonzero((ev > 0) & (np.round(ev, 2) > threshold))
+    if policy == "first":
+        _, first = np.unique(pair[taken], return_index=True)
+        taken = taken[first]
+    return taken
+
+def summarize_bets(taken: np.ndarray, model: Dict[str, np.ndarray], won_away: np.ndarray) -> Dict:
+    """Expected vs realized P&L of the settled bets among taken."""
+    settled = taken[won_away[taken] >= 0]
+    bet_prob = model["bet_prob"][settled]
+    profit = model["profit_if_win"][settled]
+    bet_won = np.where(model["bet_home"][settled], won_away[settled] == 0, won_away[settled] == 1)
+    realized = np.where(bet_won, profit, -BET_AMOUNT)
+    expected = model["ev"][settled]
+    # Variance of one bet's P&L under the model: p (1 - p) (win - loss)^2
+    variance = bet_prob * (1 - bet_prob) * (profit + BET_AMOUNT) ** 2
+    n = len(settled)
+    std_error = float(np.sqrt(variance.sum())) if n else 0.0
+    realized_total = float(realized.sum())
+    expected_total = float(expected.sum())
+    return {
+        "bets": int(len(taken)),
+        "settled_bets": n,
+        "expected_pnl": round(expected_total, 2),
+        "realized_pnl": round(realized_total, 2),
+        "expected_roi": round(expected_total / (n * BET_AMOUNT), 4) if n else None,
+        "realized_roi": round(realized_total / (n * BET_AMOUNT), 4) if n else None,
+        "pnl_std_error": round(std_error, 2),
+        "z_score": round((realized_total - expected_total) / std_error, 2) if std_error else None,
+        "mean_bet_prob": round(float(bet_prob.mean()), 4) if n else None,
+        "win_rate": round(float(bet_won.mean()), 4) if n else None,
+    }
+
+def calibration(pair: np.ndarray, away_prob: np.ndarray, won_away: np.ndarray) -> Dict:
+    """
+    Closing (last pre-game snapshot) model probabilities of both teams of
+    every settled game, binned against how often those teams won.
+    """
+    if not len(pair):
+        return {"games": 0, "brier": None, "bins": []}
+    # Last evaluation per pair (evaluations are ordered by pair, time)
+    last = np.flatnonzero(np.append(pair[1:] != pair[:-1], True))
+    last = last[won_away[last] >= 0]
+    predicted = np.concatenate([away_prob[last], 1 - away_prob[last]])
+    observed = np.concatenate([won_away[last] == 1, won_away[last] == 0]).astype(np.float64)
+    if not len(predicted):
+        return {"games": 0, "brier": None, "bins": []}
+    index = np.clip((predicted * CALIBRATION_BINS).astype(np.int64), 0, CALIBRATION_BINS - 1)
+    n = np.bincount(index, minlength=CALIBRATION_BINS)
+    mean_predicted = np.bincount(index, weights=predicted, minlength=CALIBRATION_BINS)
+    win_rate = np.bincount(index, weights=observed, minlength=CALIBRATION_BINS)
+    bins = []
+    for b in np.flatnonzero(n):
+        bins.append({
+            "low": b / CALIBRATION_BINS,
+            "high": (b + 1) / CALIBRATION_BINS,
+            "n": int(n[b]),
+            "mean_predicted": round(float(mean_predicted[b] / n[b]), 4),
+            "win_rate": round(float(win_rate[b] / n[b]), 4),
+        })
+    return {
+        "games": int(len(last)),
+        "brier": round(float(np.mean((predicted - observed) ** 2)), 4),
+        "bins": bins,
+    }
+
+def backtest_sport(store: SnapshotStore, sport: str, start: str, end: str, methods: List[str],
+                   thresholds: List[float], policy: str) -> Dict:
+    pairs = match_pairs(store, sport, start, end)
+    evals = build_evaluations(store, sport, start, end, pairs)
+    outcomes = away_outcomes(pairs, store.settlement_results(sport))
+    won_away = outcomes[evals["pair"]]
+    result = {
+        "sport": sport,
+        "matched_games": len(pairs),
+        "evaluated_games": int(len(np.unique(evals["pair"]))),
+        "settled_games": int((outcomes >= 0).sum()),
+        "snapshots": int(len(evals["pair"])),
+        "methods": {},
+    }
+    for method in methods:
+        model = evaluate(evals, method)
+        taken = select_bets(evals["pair"], model["ev"], compare_odds.MIN_EV_THRESHOLD, policy)
+        result["methods"][method] = {
+            "bets": summarize_bets(taken, model, won_away),
+            "sweep": [
+                dict(threshold=threshold,
+                     **summarize_bets(select_bets(evals["pair"], model["ev"], threshold, policy), model, won_away))
+                for threshold in thresholds
+            ],
+            "calibration": calibration(evals["pair"], model["away_prob"], won_away),
+        }
+    return result
+
+def run_backtest(sports: List[str], db_path: str = DEFAULT_DB_PATH, start: Optional[str] = None,
+                 end: Optional[str] = None, methods: Tuple[str, ...] = DEVIG_METHODS,
+                 thresholds: Tuple[float, ...] = DEFAULT_THRESHOLDS, policy: str = "first") -> Dict:
+    """Backtest each sport over [start, end] (ISO 8601, see time_bound; open-ended when None)."""
+    start = time_bound(start)
+    end = time_bound(end, end=True)
+    with SnapshotStore(db_path) as store:
+        results = [backtest_sport(store, sport, start, end, list(methods), list(thresholds), policy)
+                   for sport in sports]
+    return {
+        "created_at": datetime.now(timezone.utc).isoformat(),
+        "config": {"db": db_path, "start": start, "end": end, "methods": list(methods),
+                   "thresholds": list(thresholds), "policy": policy,
+                   "min_ev_threshold": compare_odds.MIN_EV_THRESHOLD, "bet_amount": BET_AMOUNT},
+        "sports": results,
+    }
+
+def settle(sports: List[str], db_path: str, start: Optional[str]) -> Dict[str, int]:
+    """Fetch settled Kalshi markets (closing after start) into the store's settlements table."""
+    min_close_ts = int(parse_timestamp(start).timestamp()) if start else None
+    written = {}
+    with SnapshotStore(db_path) as store:
+        for sport in sports:
+            entries = fetch_kalshi_sports.fetch_settled_markets(sport, min_close_ts)
+            written[sport] = store.write_settlements(sport, entries)
+    return written
+
+def format_money(value: Optional[float]) -> str:
+    return "-" if value is None else f"{value:+.2f}"
+
+def format_ratio(value: Optional[float]) -> str:
+    return "-" if value is None else f"{value * 100:+.1f}%"
+
+def format_report(report: Dict) -> str:
+    config = report["config"]
+    lines = []
+    for sport in report["sports"]:
+        lines.append("=" * 80)
+        lines.append(f"{sport['sport'].upper()}: {sport['matched_games']} matched games, "
+                     f"{sport['settled_games']} settled, {sport['snapshots']} snapshots evaluated")
+        lines.append("=" * 80)
+        for method, data in sport["methods"].items():
+            bets = data["bets"]
+            lines.append(f"\n{method} (EV > {config['min_ev_threshold']}, {config['policy']} bet per game): "
+                         f"{bets['bets']} bets, {bets['settled_bets']} settled")
+            lines.append(f"  expected {format_money(bets['expected_pnl'])} ({format_ratio(bets['expected_roi'])})  "
+                         f"realized {format_money(bets['realized_pnl'])} ({format_ratio(bets['realized_roi'])})  "
+                         f"std error {bets['pnl_std_error']:.2f}  z {bets['z_score'] if bets['z_score'] is not None else '-'}")
+            lines.append(f"  {'threshold':>9} {'bets':>6} {'settled':>7} {'expected':>10} {'realized':>10} "
+                         f"{'exp ROI':>8} {'real ROI':>8}")
+            for row in data["sweep"]:
+                lines.append(f"  {row['threshold']:>9.1f} {row['bets']:>6} {row['settled_bets']:>7} "
+                             f"{format_money(row['expected_pnl']):>10} {format_money(row['realized_pnl']):>10} "
+                             f"{format_ratio(row['expected_roi']):>8} {format_ratio(row['realized_roi']):>8}")
+            cal = data["calibration"]
+            lines.append(f"  calibration ({cal['games']} games, Brier {cal['brier'] if cal['brier'] is not None else '-'}):")
+            for b in cal["bins"]:
+                lines.append(f"    {b['low']:.1f}-{b['high']:.1f}  n {b['n']:>5}  predicted {b['mean_predicted']:.3f}  "
+                             f"won {b['win_rate']:.3f}")
+        lines.append("")
+    return "\n".join(lines)
+
+def main():
+    """
+    Command line arguments:
+        <sport> ... - Sports to backtest (default: all)
+        --db PATH - Snapshot store (default data/snapshots.sqlite)
+        --start ISO, --end ISO - Snapshot time range (default: everything)
+        --methods LIST - Comma-separated devig methods (default multiplicative,additive,power)
+        --thresholds LIST - Comma-separated EV thresholds for the sweep
+        --policy first|every - Bet the first qualifying snapshot per game, or every one (default first)
+        --settle - First fetch settled Kalshi markets (closing after --start) into the store
+        --output FILE - Also write the report as JSON
+    """
+    options = {"--db": DEFAULT_DB_PATH, "--start": None, "--end": None, "--methods": ",".join(DEVIG_METHODS),
+               "--thresholds": ",".join(str(t) for t in DEFAULT_THRESHOLDS), "--policy": "first",
+               "--output": None}
+    for flag in list(options):
+        if flag in sys.argv:
+            idx = sys.argv.index(flag)
+            if idx + 1 >= len(sys.argv):
+                print(f"Error: {flag} requires a value")
+                sys.exit(1)
+            options[flag] = sys.argv[idx + 1]
+            del sys.argv[idx:idx + 2]
+    do_settle = "--settle" in sys.argv
+    if do_settle:
+        sys.argv.remove("--settle")
+
+    methods = [m.strip() for m in options["--methods"].split(",") if m.strip()]
+    unknown = [m for m in methods if m not in DEVIG_METHODS]
+    if unknown:
+        print(f"Error: Unknown devig method '{unknown[0]}' (supported: {', '.join(DEVIG_METHODS)})")
+        sys.exit(1)
+    if options["--policy"] not in POLICIES:
+        print(f"Error: --policy must be one of {', '.join(POLICIES)}")
+        sys.exit(1)
+    try:
+        thresholds = [float(t) for t in options["--thresholds"].split(",")]
+        for flag in ("--start", "--end"):
+            if options[flag]:
+                parse_timestamp(options[flag])
+    except ValueError as e:
+        print(f"Error: {e}")
+        sys.exit(1)
+
+    sports = [arg.lower() for arg in sys.argv[1:]] or list(compare_odds.SPORT_CONFIG.keys())
+    unsupported = [sport for sport in sports if sport not in compare_odds.SPORT_CONFIG]
+    if unsupported:
+        print(f"Error: Unsupported sport '{unsupported[0]}'")
+        print(f"Supported sports: {', '.join(compare_odds.SPORT_CONFIG.keys())}")
+        sys.exit(1)
+    if not os.path.exists(options["--db"]):
+        print(f"Error: Snapshot store not found: {options['--db']} (collect snapshots with --db)")
+        sys.exit(1)
+
+    if do_settle:
+        for sport, count in settle(sports, options["--db"], options["--start"]).items():
+            print(f"Stored {count} settled {sport.upper()} markets")
+
+    report = run_backtest(sports, options["--db"], options["--start"], options["--end"],
+                          tuple(methods), tuple(thresholds), options["--policy"])
+    print(format_report(report))
+
+    if options["--output"]:
+        write_json(options["--output"], report, pretty=True)
+        print(f"Report written to {options['--output']}")
+
+if __name__ == "__main__":
+    main()
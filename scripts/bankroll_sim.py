@@ -0,0 +1,267 @@
+"""
+Monte Carlo bankroll simulator for the current opportunity set.
+
+process_sport prices every bet on its own at a $100 stake; this simulates
+the whole slate at once. Each scenario draws one outcome per game (bets on
+the same event share it) from the devigged consensus probabilities, so the
+P&L distribution includes the correlation of bets that settle together.
+With --correlation RHO, games of the same sport also share a common shock
+(a one-factor Gaussian copula) on the outcome of the side we bet, a stress
+test for model error that moves every edge of a sport in the same direction.
+
+All scenarios are simulated together: games are walked in settlement
+order, each step a handful of vectorized operations over every scenario
+(uniforms are drawn as uint16, so each game costs one 16-bit draw per
+scenario). 100k scenarios over a few hundred games take a fraction of a
+second, so the simulation can run every refresh.
+
+Report:
+    - expected P&L (exact) and the simulated mean, standard deviation and
+      quantiles
+    - probability of a losing slate
+    - drawdown quantiles: bets settle in commence_time order, and the
+      drawdown is the deepest fall of cumulative P&L below its running peak
+
+Stakes are each opportunity's "stake" when present, else its
+total_investment ($100).
+
+    python scripts/bankroll_sim.py [SPORT ...] [--scenarios N] [--seed S]
+                                   [--correlation RHO] [--bankroll DOLLARS]
+"""
+import os
+import sys
+import time
+from statistics import NormalDist
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+
+from json_io import load_json
+from opportunity_ledger import parse_timestamp
+
+# Get the project root directory (parent of scripts folder)
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+DATA_DIR = os.path.join(PROJECT_ROOT, "data")
+
+DEFAULT_SCENARIOS = 100_000
+
+# Uniforms are drawn as uint16: probabilities resolve to 1/65536
+PROBABILITY_LEVELS = 1 << 16
+
+PNL_QUANTILES = (0.01, 0.05, 0.25, 0.5, 0.75, 0.95, 0.99)
+DRAWDOWN_QUANTILES = (0.5, 0.9, 0.95, 0.99)
+
+def slate_arrays(opportunities: List[Dict]) -> Dict[str, np.ndarray]:
+    """
+    Per-game arrays of a slate, games ordered by commence_time:
+        away_prob      devigged away win probability (0-1)
+        away_pnl       P&L of the game's bets if the away team wins
+        home_pnl       P&L of the game's bets if the home team wins
+        sport          sport index
+    plus per-bet "win_prob", "profit", "loss" and "stake".
+    """
+    ordered = sorted(opportunities, key=lambda opp: opp.get("commence_time") or "")
+    games: Dict[str, int] = {}
+    sports: Dict[str, int] = {}
+    away_prob, away_pnl, home_pnl, game_sport = [], [], [], []
+    win_prob, profit, loss, stake = [], [], [], []
+    for opp in ordered:
+        event = opp["event_ticker"]
+        if event not in games:
+            games[event] = len(games)
+            away_prob.append(opp["away_prob_normalized"] / 100.0)
+            away_pnl.append(0.0)
+            home_pnl.append(0.0)
+            game_sport.append(sports.setdefault(opp.get("sport", ""), len(sports)))
+        g = games[event]
+        bet = opp["bet_team"]
+        bet_stake = opp.get("stake", opp["total_investment"])
+        scale = bet_stake / opp["total_investment"]
+        away_pnl[g] += opp["net_if_away_wins"] * scale
+        home_pnl[g] += opp["net_if_home_wins"] * scale
+        win_prob.append(away_prob[g] if bet == "away" else 1 - away_prob[g])
+        profit.append(opp[f"net_if_{bet}_wins"] * scale)
+        loss.append(opp[f"net_if_{'home' if bet == 'away' else 'away'}_wins"] * scale)
+        stake.append(bet_stake)
+    return {
+        "away_prob": np.array(away_prob),
+        "away_pnl": np.array(away_pnl, dtype=np.float32),
+        "home_pnl": np.array(home_pnl, dtype=np.float32),
+        "sport": np.array(game_sport, dtype=np.int64),
+        "win_prob": np.array(win_prob),
+        "profit": np.array(profit),
+        "loss": np.array(loss),
+        "stake": np.array(stake),
+    }
+
+_normal_levels = None
+
+def normal_levels() -> np.ndarray:
+    """Standard normal quantile of each uint16 uniform level (built on first use)."""
+    global _normal_levels
+    if _normal_levels is None:
+        dist = NormalDist()
+        _normal_levels = np.array([dist.inv_cdf((i + 0.5) / PROBABILITY_LEVELS)
+                                   for i in range(PROBABILITY_LEVELS)], dtype=np.float32)
+    return _normal_levels
+
+def simulate_paths(slate: Dict[str, np.ndarray], scenarios: int, rng: np.random.Generator,
+                   correlation: float = 0.0) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Final P&L and maximum drawdown of every scenario.
+
+    Each game is drawn from the side its bets are on: the team whose win
+    pays the game's P&L more. Without correlation that side wins when its
+    uniform falls below its probability. With correlation RHO each sport
+    draws a common factor F and a game's latent sqrt(RHO) F + sqrt(1 - RHO) e
+    (e standard normal, read from normal_levels) must fall below the normal
+    quantile of that probability, so a shock moves every bet of the sport
+    the same way, whichever team each one backs.
+    """
+    run = np.zeros(scenarios, dtype=np.float32)
+    peak = np.zeros(scenarios, dtype=np.float32)
+    drawdown = np.zeros(scenarios, dtype=np.float32)
+    step = np.empty(scenarios, dtype=np.float32)
+    on_away = slate["away_pnl"] >= slate["home_pnl"]
+    side_prob = np.where(on_away, slate["away_prob"], 1 - slate["away_prob"])
+    lose_pnl = np.where(on_away, slate["home_pnl"], slate["away_pnl"])
+    swing = np.abs(slate["away_pnl"] - slate["home_pnl"])
+    if correlation > 0:
+        levels = normal_levels()
+        dist = NormalDist()
+        scale = np.float32(1 / np.sqrt(1 - correlation))
+        factor = rng.standard_normal((len(np.unique(slate["sport"])), scenarios), dtype=np.float32)
+        factor *= np.float32(np.sqrt(correlation)) * scale
+        limit = np.empty(scenarios, dtype=np.float32)
+    else:
+        thresholds = np.round(side_prob * PROBABILITY_LEVELS)
+    for g in range(len(swing)):
+        uniform = rng.integers(0, PROBABILITY_LEVELS, scenarios, dtype=np.uint16)
+        if correlation > 0:
+            p = min(max(float(side_prob[g]), 1e-9), 1 - 1e-9)
+            np.subtract(np.float32(dist.inv_cdf(p)) * scale, factor[slate["sport"][g]], out=limit)
+            np.less(levels[uniform], limit, out=step)
+        else:
+            # int comparison: thresholds reach 65536, past uint16
+            np.less(uniform, int(thresholds[g]), out=step)
+        step *= swing[g]
+        step += lose_pnl[g]
+        run += step
+        np.maximum(peak, run, out=peak)
+        np.subtract(peak, run, out=step)
+        np.maximum(drawdown, step, out=drawdown)
+    return run.astype(np.float64), drawdown.astype(np.float64)
+
+def simulate(opportunities: List[Dict], scenarios: int = DEFAULT_SCENARIOS, seed: Optional[int] = None,
+             correlation: float = 0.0, bankroll: Optional[float] = None) -> Dict:
+    """Simulate the slate; see the module docstring for the report."""
+    started = time.perf_counter()
+    if not opportunities:
+        return {"scenarios": scenarios, "bets": 0, "games": 0}
+    if not 0 <= correlation < 1:
+        raise ValueError("correlation must be in [0, 1)")
+    slate = slate_arrays(opportunities)
+    expected = float(np.sum(slate["win_prob"] * slate["profit"] + (1 - slate["win_prob"]) * slate["loss"]))
+    totals, drawdowns = simulate_paths(slate, scenarios, np.random.default_rng(seed), correlation)
+
+    pnl_q = np.quantile(totals, PNL_QUANTILES)
+    drawdown_q = np.quantile(drawdowns, DRAWDOWN_QUANTILES)
+    report = {
+        "scenarios": scenarios,
+        "bets": len(slate["stake"]),
+        "games": len(slate["away_prob"]),
+        "correlation": correlation,
+        "total_stake": round(float(slate["stake"].sum()), 2),
+        "expected_pnl": round(expected, 2),
+        "mean_pnl": round(float(totals.mean()), 2),
+        "std_pnl": round(float(totals.std()), 2),
+        "pnl_quantiles": {f"p{round(q * 100)}": round(float(v), 2) for q, v in zip(PNL_QUANTILES, pnl_q)},
+        "prob_loss": round(float((totals < 0).mean()), 4),
+        "worst_case_pnl": round(float(slate["loss"].sum()), 2),
+        "drawdown_quantiles": {f"p{round(q * 100)}": round(float(v), 2) for q, v in zip(DRAWDOWN_QUANTILES, drawdown_q)},
+    }
+    if bankroll:
+        report["bankroll"] = bankroll
+        report["prob_loss_over_10pct"] = round(float((totals < -0.1 * bankroll).mean()), 4)
+        report["drawdown_pct_quantiles"] = {k: round(v / bankroll * 100, 2)
+                                            for k, v in report["drawdown_quantiles"].items()}
+    report["elapsed_seconds"] = round(time.perf_counter() - started, 4)
+    return report
+
+def money(value: float, places: int = 2) -> str:
+    return f"{'-' if value < 0 else ''}${abs(value):,.{places}f}"
+
+def format_report(report: Dict) -> str:
+    if not report.get("bets"):
+        return "Bankroll simulation: no opportunities"
+    lines = [
+        f"Bankroll simulation: {report['bets']} bets on {report['games']} games, "
+        f"{report['scenarios']:,} scenarios ({report['elapsed_seconds'] * 1000:.0f} ms)",
+        f"  Stake {money(report['total_stake'])}   expected P&L {money(report['expected_pnl'])}   "
+        f"simulated {money(report['mean_pnl'])} +/- {money(report['std_pnl'])}",
+        f"  P(loss) {report['prob_loss']:.1%}   worst case {money(report['worst_case_pnl'])}",
+        "  P&L       " + "  ".join(f"{k} {money(v, 0)}" for k, v in report["pnl_quantiles"].items()),
+        "  Drawdown  " + "  ".join(f"{k} {money(v, 0)}" for k, v in report["drawdown_quantiles"].items()),
+    ]
+    if "drawdown_pct_quantiles" in report:
+        lines.append("            " + "  ".join(f"{k} {v:.1f}%" for k, v in report["drawdown_pct_quantiles"].items())
+                     + f"   P(lose >10% of bankroll) {report['prob_loss_over_10pct']:.1%}")
+    if report.get("correlation"):
+        lines[0] += f", within-sport correlation {report['correlation']:g}"
+    return "\n".join(lines)
+
+def load_opportunities(sports: List[str], include_started: bool = False) -> List[Dict]:
+    """Current opportunities from the odds_comparison_<sport>.json files."""
+    opportunities = []
+    for sport in sports:
+        path = os.path.join(DATA_DIR, f"odds_comparison_{sport}.json")
+        if not os.path.exists(path):
+            continue
+        for opp in load_json(path).get("opportunities", []):
+            opportunities.append(dict(opp, sport=sport))
+    if include_started:
+        return opportunities
+    # Games that have started can no longer be bet
+    now = time.time()
+    return [opp for opp in opportunities
+            if not opp.get("commence_time") or parse_timestamp(opp["commence_time"]).timestamp() > now]
+
+def main():
+    """
+    Command line arguments:
+        [SPORT ...] - Sports to include (default: every odds_comparison file)
+        --scenarios N - Number of scenarios (default 100000)
+        --seed S - Random seed
+        --correlation RHO - Within-sport outcome correlation (default 0)
+        --bankroll DOLLARS - Also report drawdowns as a share of bankroll
+        --all - Include games that have already started
+    """
+    include_started = "--all" in sys.argv
+    if include_started:
+        sys.argv.remove("--all")
+    options = {"--scenarios": DEFAULT_SCENARIOS, "--seed": None, "--correlation": 0.0, "--bankroll": None}
+    for flag, convert in (("--scenarios", int), ("--seed", int), ("--correlation", float), ("--bankroll", float)):
+        if flag in sys.argv:
+            idx = sys.argv.index(flag)
+            try:
+                options[flag] = convert(sys.argv[idx + 1])
+            except (IndexError, ValueError):
+                print(f"Error: {flag} requires a number")
+                sys.exit(1)
+            del sys.argv[idx:idx + 2]
+
+    sports = [arg.lower() for arg in sys.argv[1:]]
+    if not sports:
+        sports = sorted(name[len("odds_comparison_"):-len(".json")] for name in os.listdir(DATA_DIR)
+                        if name.startswith("odds_comparison_") and name.endswith(".json"))
+    opportunities = load_opportunities(sports, include_started)
+    try:
+        report = simulate(opportunities, options["--scenarios"], options["--seed"],
+                          options["--correlation"], options["--bankroll"])
+    except ValueError as e:
+        print(f"Error: {e}")
+        sys.exit(1)
+    print(format_report(report))
+
+if __name__ == "__main__":
+    main()
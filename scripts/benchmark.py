@@ -0,0 +1,214 @@
+"""
+Matching and analysis benchmark on synthetic slates (see synthetic_slate.py).
+
+For each slate size the generator writes Kalshi and Odds API files in the
+exact formats the fetchers produce, and these stages are timed:
+
+    kalshi_games        fetch_odds_api_sports.load_kalshi_games (streams the Kalshi file)
+    match_odds          fetch_odds_api_sports.match_games_with_odds against the raw API list
+    load_and_match      compare_odds.load_and_match_games (streams both files)
+    analyze             compare_odds.find_opportunities over the matched games
+
+Each stage runs --repeat times for wall time (min and median), then once
+more under tracemalloc for peak memory. Results are written as JSON
+(data/benchmarks/benchmark-<timestamp>.json by default); --compare OLD.json
+prints the change against an earlier run.
+
+load_and_match grows quadratically with the slate (each Odds API game is
+matched against every Kalshi game): about 1s at 500 markets and 7s at 1000,
+per run, before the tracemalloc run, which is several times slower. The
+defaults stay small enough to finish in well under a minute; pass larger
+--markets deliberately.
+
+    python scripts/benchmark.py --markets 200,500,1000 --bookmakers 8 --repeat 3
+"""
+import json
+import os
+import platform
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+from datetime import datetime, timezone
+from typing import Callable, Dict, List, Optional, Tuple
+
+import compare_odds
+import fetch_odds_api_sports
+import synthetic_slate
+
+# Get the project root directory (parent of scripts folder)
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+BENCHMARK_DIR = os.path.join(PROJECT_ROOT, "data", "benchmarks")
+
+BENCHMARK_SCHEMA_VERSION = 1
+DEFAULT_MARKETS = [200, 500]
+DEFAULT_BOOKMAKERS = 6
+DEFAULT_REPEAT = 3
+
+# Stages slower/faster than this ratio are flagged by --compare
+REGRESSION_RATIO = 1.10
+
+def git_commit() -> Optional[str]:
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=PROJECT_ROOT,
+                              capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+def measure(stage: Callable[[], object], repeat: int) -> Dict:
+    """Time a stage repeat times, then once more under tracemalloc for peak memory."""
+    timings = []
+    result = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = stage()
+        timings.append(time.perf_counter() - start)
+
+    tracemalloc.start()
+    stage()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    return {
+        "seconds_min": round(min(timings), 6),
+        "seconds_median": round(statistics.median(timings), 6),
+        "peak_kib": round(peak / 1024, 1),
+        "items": len(result) if hasattr(result, "__len__") else None,
+    }
+
+def bench_slate(sport: str, markets: int, bookmakers: int, repeat: int, seed: int, data_dir: str) -> List[Dict]:
+    """Generate one slate into data_dir and time every stage on it."""
+    kalshi_data, odds_data, raw_odds = synthetic_slate.generate_slate(sport, markets, bookmakers, seed)
+    synthetic_slate.write_slate(data_dir, sport, kalshi_data, odds_data)
+    kalshi_games = fetch_odds_api_sports.kalshi_games_from_markets(kalshi_data["markets"], sport)
+    fetch_odds_api_sports.fill_team_names(raw_odds)
+    matched_games, _ = compare_odds.load_and_match_games(sport)
+
+    stages: List[Tuple[str, Callable[[], object]]] = [
+        ("kalshi_games", lambda: fetch_odds_api_sports.load_kalshi_games(sport)),
+        ("match_odds", lambda: fetch_odds_api_sports.match_games_with_odds(kalshi_games, raw_odds)),
+        ("load_and_match", lambda: compare_odds.load_and_match_games(sport)[0]),
+        ("analyze", lambda: compare_odds.find_opportunities(matched_games)),
+    ]
+    rows = []
+    for name, stage in stages:
+        row = {
+            "sport": sport,
+            "markets": len(kalshi_data["markets"]),
+            "odds_games": len(raw_odds),
+            "bookmakers": bookmakers,
+            "stage": name,
+        }
+        row.update(measure(stage, repeat))
+        rows.append(row)
+        print(f"  {name:<16} min {row['seconds_min']:>9.4f}s  median {row['seconds_median']:>9.4f}s  "
+              f"peak {row['peak_kib'] / 1024:>8.1f} MiB  items {row['items']}", flush=True)
+    return rows
+
+def run_benchmarks(sport: str, market_counts: List[int], bookmakers: int, repeat: int, seed: int) -> Dict:
+    """Run every slate size against a temporary data directory; returns the results document."""
+    data_dir = tempfile.mkdtemp(prefix="arb-bench-")
+    saved = (compare_odds.DATA_DIR, fetch_odds_api_sports.DATA_DIR)
+    compare_odds.DATA_DIR = fetch_odds_api_sports.DATA_DIR = data_dir
+    # Synthetic games start in the future, but don't depend on the clock
+    is_game_live = compare_odds.is_game_live
+    compare_odds.is_game_live = lambda commence_time: False
+    rows = []
+    try:
+        for markets in market_counts:
+            print(f"{sport.upper()}: {markets} markets, {bookmakers} bookmakers")
+            rows.extend(bench_slate(sport, markets, bookmakers, repeat, seed, data_dir))
+    finally:
+        compare_odds.DATA_DIR, fetch_odds_api_sports.DATA_DIR = saved
+        compare_odds.is_game_live = is_game_live
+        shutil.rmtree(data_dir, ignore_errors=True)
+
+    return {
+        "schema_version": BENCHMARK_SCHEMA_VERSION,
+        "created_at": datetime.now(timezone.utc).isoformat(),
+        "git_commit": git_commit(),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "config": {"sport": sport, "markets": market_counts, "bookmakers": bookmakers,
+                   "repeat": repeat, "seed": seed},
+        "results": rows,
+    }
+
+def compare_results(old: Dict, new: Dict) -> List[str]:
+    """Lines comparing median time and peak memory per (markets, stage)."""
+    previous = {(row["markets"], row["stage"]): row for row in old.get("results", [])}
+    lines = [f"{'markets':>8} {'stage':<16} {'old s':>9} {'new s':>9} {'ratio':>7} {'peak MiB':>16}"]
+    for row in new["results"]:
+        before = previous.get((row["markets"], row["stage"]))
+        if not before:
+            continue
+        ratio = row["seconds_median"] / before["seconds_median"] if before["seconds_median"] else float("inf")
+        flag = ""
+        if ratio > REGRESSION_RATIO:
+            flag = "  slower"
+        elif ratio < 1 / REGRESSION_RATIO:
+            flag = "  faster"
+        memory = f"{before['peak_kib'] / 1024:.1f} -> {row['peak_kib'] / 1024:.1f}"
+        lines.append(f"{row['markets']:>8} {row['stage']:<16} {before['seconds_median']:>9.4f} "
+                     f"{row['seconds_median']:>9.4f} {ratio:>6.2f}x {memory:>16}{flag}")
+    return lines
+
+def main():
+    """
+    Command line arguments:
+        --markets N[,N...] - Slate sizes in Kalshi markets (default 200,500)
+        --bookmakers N - Bookmakers per sportsbook game (default 6)
+        --repeat N - Timed runs per stage (default 3)
+        --sport SPORT - ncaab (default), ncaabw or ncaaf
+        --seed N - Generator seed (default 0)
+        --output FILE - Results file (default data/benchmarks/benchmark-<timestamp>.json)
+        --compare FILE - Print the change against an earlier results file
+    """
+    options = {"--markets": None, "--bookmakers": str(DEFAULT_BOOKMAKERS), "--repeat": str(DEFAULT_REPEAT),
+               "--sport": "ncaab", "--seed": "0", "--output": None, "--compare": None}
+    for flag in list(options):
+        if flag in sys.argv:
+            idx = sys.argv.index(flag)
+            if idx + 1 >= len(sys.argv):
+                print(f"Error: {flag} requires a value")
+                sys.exit(1)
+            options[flag] = sys.argv[idx + 1]
+            del sys.argv[idx:idx + 2]
+
+    try:
+        market_counts = [int(n) for n in options["--markets"].split(",")] if options["--markets"] else DEFAULT_MARKETS
+        bookmakers = int(options["--bookmakers"])
+        repeat = max(1, int(options["--repeat"]))
+        seed = int(options["--seed"])
+    except ValueError:
+        print("Error: --markets, --bookmakers, --repeat and --seed take integers")
+        sys.exit(1)
+    sport = options["--sport"]
+    if sport not in synthetic_slate.SPORT_SERIES:
+        print(f"Error: Unsupported sport '{sport}' (supported: {', '.join(synthetic_slate.SPORT_SERIES)})")
+        sys.exit(1)
+
+    old = None
+    if options["--compare"]:
+        with open(options["--compare"], encoding="utf-8") as f:
+            old = json.load(f)
+
+    document = run_benchmarks(sport, market_counts, bookmakers, repeat, seed)
+
+    output = options["--output"]
+    if output is None:
+        os.makedirs(BENCHMARK_DIR, exist_ok=True)
+        output = os.path.join(BENCHMARK_DIR, f"benchmark-{datetime.now().strftime('%Y%m%d-%H%M%S')}.json")
+    with open(output, "w", encoding="utf-8") as f:
+        json.dump(document, f, indent=2)
+    print(f"\nResults written to {output}")
+
+    if old:
+        print()
+        print("\n".join(compare_results(old, document)))
+
+if __name__ == "__main__":
+    main()
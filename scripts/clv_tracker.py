@@ -0,0 +1,422 @@
+"""
+Closing-line value (CLV) tracker.
+
+Every opportunity emitted by process_sport (compare_odds.py --clv, or
+odds_daemon.py --clv) is tracked once, from the first time it is seen: its
+entry Kalshi price, devigged consensus probability and EV. Just before the
+game starts (CAPTURE_LEAD_SECONDS before commence_time) the game is
+re-fetched and the closing Kalshi price and consensus probability are
+recorded:
+
+    clv_cents       closing Kalshi price - entry price (positive: we bought
+                    cheaper than the close)
+    clv_fair_cents  closing consensus probability - entry price (the edge the
+                    entry still has against the closing sportsbook line)
+    closing_ev      EV of the entry ($100) priced with the closing line
+
+Captures are driven by a heap ordered by capture time: a background thread
+sleeps until the earliest capture is due (or a new opportunity is tracked),
+so nothing polls games that are hours from starting. Captures due within
+CAPTURE_BATCH_SECONDS of each other are fetched together (one Odds API
+request per sport).
+
+A capturing process (clv_tracker.py --run, or the daemon / --watch with
+--clv) keeps its pending captures in data/clv_pending.json, and captured lines
+are appended to data/clv_records.jsonl. One-shot compare_odds.py --clv runs
+never write the pending file: hand_off appends their entries to
+data/clv_intake.jsonl, which a capturing process consumes from the offset it
+reached (saved with its pending state), so no entry is lost to a concurrent
+rewrite. Run one capturing process at a time.
+
+    python scripts/clv_tracker.py --run        capture pending games as they start
+    python scripts/clv_tracker.py [SPORT]      CLV by sport, bookmaker set and EV bucket
+"""
+import heapq
+import json
+import os
+import statistics
+import sys
+import threading
+import time
+from datetime import datetime, timezone
+from typing import Callable, Dict, List, Optional, Tuple
+
+from json_io import load_json, write_json
+from opportunity_ledger import get_bet_price, opportunity_key, parse_timestamp
+
+# Get the project root directory (parent of scripts folder)
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+DATA_DIR = os.path.join(PROJECT_ROOT, "data")
+
+CLV_PENDING_FILE = os.path.join(DATA_DIR, "clv_pending.json")
+CLV_INTAKE_FILE = os.path.join(DATA_DIR, "clv_intake.jsonl")
+CLV_RECORDS_FILE = os.path.join(DATA_DIR, "clv_records.jsonl")
+
+# Capture this long before commence_time
+CAPTURE_LEAD_SECONDS = 60
+# Captures due within this window of the earliest one are fetched in the same batch
+CAPTURE_BATCH_SECONDS = 30
+# After commence_time + this, a capture that has not happened is recorded as missed
+CAPTURE_GRACE_SECONDS = 120
+
+# clv_tracker.py --run reads new intake entries this often
+RELOAD_SECONDS = 5
+# A fully consumed intake file larger than this is removed (producers start a new one)
+INTAKE_ROTATE_BYTES = 1024 * 1024
+
+# Lower bounds of the EV buckets used in reports
+EV_BUCKETS = (2, 3, 5, 10)
+
+def ev_bucket(ev: Optional[float]) -> str:
+    if ev is None:
+        return "unknown"
+    label = f"<{EV_BUCKETS[0]}"
+    for low, high in zip(EV_BUCKETS, EV_BUCKETS[1:] + (None,)):
+        if ev >= low:
+            label = f"{low}-{high}" if high is not None else f"{low}+"
+    return label
+
+def bookmaker_set(entry: Dict) -> str:
+    return ",".join(entry.get("bookmakers") or []) or "unknown"
+
+def entry_from_opportunity(sport: str, opp: Dict, now: datetime, lead_seconds: float) -> Optional[Dict]:
+    """Pending capture for an opportunity, or None if it cannot be tracked (no start time or ids)."""
+    if not opp.get("commence_time") or not opp.get("odds_event_id"):
+        return None
+    bet_team = opp["bet_team"]
+    fair_prob = opp.get(f"{bet_team}_prob_normalized")
+    commence = parse_timestamp(opp["commence_time"]).timestamp()
+    return {
+        "key": opportunity_key(opp),
+        "sport": sport,
+        "event_ticker": opp["event_ticker"],
+        "bet_team": bet_team,
+        "bet_team_name": opp.get("bet_team_name"),
+        "away_team": opp["away_team"],
+        "home_team": opp["home_team"],
+        "commence_time": opp["commence_time"],
+        "away_kalshi_ticker": opp.get("away_kalshi_ticker"),
+        "home_kalshi_ticker": opp.get("home_kalshi_ticker"),
+        "odds_event_id": opp["odds_event_id"],
+        "bookmakers": opp.get("bookmakers") or [],
+        "entry_at": now.isoformat(),
+        "entry_price": get_bet_price(opp),
+        "entry_fair_prob": round(fair_prob, 2) if fair_prob is not None else None,
+        "entry_ev": opp.get("expected_value"),
+        "capture_at": commence - lead_seconds,
+    }
+
+def hand_off(sport: str, opportunities: List[Dict], path: str = CLV_INTAKE_FILE,
+             now: Optional[datetime] = None, lead_seconds: float = CAPTURE_LEAD_SECONDS) -> int:
+    """
+    Append pending captures for a one-shot run's opportunities to the intake
+    file (in a single write), for a capturing process to pick up. Keys seen
+    before are dropped by the consumer. Returns how many entries were written.
+    """
+    now = now or datetime.now(timezone.utc)
+    entries = [entry_from_opportunity(sport, opp, now, lead_seconds) for opp in opportunities]
+    lines = "".join(json.dumps(entry, separators=(",", ":")) + "\n"
+                    for entry in entries if entry and entry["entry_price"] is not None)
+    if not lines:
+        return 0
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    with open(path, "a", encoding="utf-8") as f:
+        f.write(lines)
+    return lines.count("\n")
+
+def clv_record(entry: Dict, closing: Optional[Dict], now: datetime) -> Dict:
+    """Finished record for a pending entry; closing None means the capture was missed."""
+    record = {k: v for k, v in entry.items() if k != "capture_at"}
+    record["captured_at"] = now.isoformat()
+    if closing is None or closing.get("closing_price") is None:
+        record["status"] = "missed"
+        return record
+    record.update(closing)
+    record["status"] = "captured"
+    record["clv_cents"] = closing["closing_price"] - entry["entry_price"]
+    record["clv_fair_cents"] = round(closing["closing_fair_prob"] - entry["entry_price"], 2)
+    return record
+
+class ClvTracker:
+    """
+    Pending CLV captures in a heap of (capture_at, sequence, key); the entry
+    itself lives in self.pending. capture(sport, entries) returns one closing
+    line dict (or None) per entry; see compare_odds.capture_closing_lines.
+    """
+
+    def __init__(self, capture: Callable[[str, List[Dict]], List[Optional[Dict]]],
+                 state_path: Optional[str] = CLV_PENDING_FILE, records_path: str = CLV_RECORDS_FILE,
+                 lead_seconds: float = CAPTURE_LEAD_SECONDS, intake_path: Optional[str] = CLV_INTAKE_FILE):
+        self.capture = capture
+        self.state_path = state_path
+        self.records_path = records_path
+        self.intake_path = intake_path
+        self.lead_seconds = lead_seconds
+        self.pending: Dict[str, Dict] = {}
+        self.queue: List[Tuple[float, int, str]] = []
+        # Keys already captured, so a repeated intake entry cannot re-add them
+        self.finished = set()
+        self.intake_offset = 0
+        self._sequence = 0
+        self._cond = threading.Condition()
+        self._stopped = False
+        self._thread: Optional[threading.Thread] = None
+        if state_path and os.path.exists(state_path):
+            state = load_json(state_path, use_cache=False)
+            self.intake_offset = state.get("intake_offset", 0)
+            for entry in state.get("entries", {}).values():
+                self._push(entry)
+        self.reload()
+
+    def reload(self) -> int:
+        """
+        Pick up entries one-shot compare_odds.py --clv runs appended to the
+        intake file since the last call; returns how many were added.
+        """
+        if not self.intake_path or not os.path.exists(self.intake_path):
+            return 0
+        size = os.path.getsize(self.intake_path)
+        if size < self.intake_offset:
+            # Rotated by another consumer: start over on the new file
+            self.intake_offset = 0
+        if size == self.intake_offset:
+            self._rotate_intake(size)
+            return 0
+        added = 0
+        with self._cond:
+            with open(self.intake_path, "rb") as f:
+                f.seek(self.intake_offset)
+                for line in f:
+                    if not line.endswith(b"\n"):
+                        # A write still in progress: read it next time
+                        break
+                    self.intake_offset += len(line)
+                    try:
+                        entry = json.loads(line)
+                    except ValueError:
+                        continue
+                    if entry["key"] not in self.pending and entry["key"] not in self.finished:
+                        self._push(entry)
+                        added += 1
+            self._save()
+            if added:
+                self._cond.notify()
+        return added
+
+    def _rotate_intake(self, size: int):
+        """Remove a large, fully consumed intake file; producers start a new one."""
+        if size <= INTAKE_ROTATE_BYTES:
+            return
+        rotated = self.intake_path + ".consumed"
+        os.replace(self.intake_path, rotated)
+        # Lines appended between the size check and the rename are still in the rotated file
+        with open(rotated, "rb") as f:
+            f.seek(self.intake_offset)
+            tail = f.read()
+        os.remove(rotated)
+        with self._cond:
+            self.intake_offset = 0
+            self._save()
+        if tail:
+            with open(self.intake_path, "ab") as f:
+                f.write(tail)
+
+    def _push(self, entry: Dict):
+        self.pending[entry["key"]] = entry
+        self._sequence += 1
+        heapq.heappush(self.queue, (entry["capture_at"], self._sequence, entry["key"]))
+
+    def track(self, sport: str, opportunities: List[Dict], now: Optional[datetime] = None) -> int:
+        """Start tracking opportunities not seen before; returns how many were added."""
+        now = now or datetime.now(timezone.utc)
+        added = 0
+        with self._cond:
+            for opp in opportunities:
+                key = opportunity_key(opp)
+                if key in self.pending or key in self.finished:
+                    continue
+                entry = entry_from_opportunity(sport, opp, now, self.lead_seconds)
+                if entry is None or entry["entry_price"] is None:
+                    continue
+                self._push(entry)
+                added += 1
+            if added:
+                self._save()
+                self._cond.notify()
+        return added
+
+    def on_publish(self, sport: str, result: Optional[Dict]):
+        """odds_daemon subscriber."""
+        if result:
+            self.track(sport, result["opportunities"])
+
+    def seconds_until_next(self, now: Optional[float] = None) -> Optional[float]:
+        """Seconds until the earliest capture is due (None when nothing is pending)."""
+        if not self.queue:
+            return None
+        now = time.time() if now is None else now
+        return max(0.0, self.queue[0][0] - now)
+
+    def pop_due(self, now: Optional[float] = None) -> List[Dict]:
+        """Remove and return the entries due now (plus those due within the batch window)."""
+        now = time.time() if now is None else now
+        due = []
+        with self._cond:
+            while self.queue and self.queue[0][0] <= now + CAPTURE_BATCH_SECONDS:
+                capture_at, _, key = heapq.heappop(self.queue)
+                entry = self.pending.get(key)
+                # Skip heap items superseded by a later push of the same key
+                if entry is None or entry["capture_at"] != capture_at:
+                    continue
+                due.append(self.pending.pop(key))
+                self.finished.add(key)
+        return due
+
+    def run_due(self, now: Optional[float] = None) -> List[Dict]:
+        """Capture every due entry (batched per sport); returns the records written."""
+        due = self.pop_due(now)
+        if not due:
+            return []
+        current = datetime.now(timezone.utc)
+        records = []
+        by_sport: Dict[str, List[Dict]] = {}
+        for entry in due:
+            commence = parse_timestamp(entry["commence_time"]).timestamp()
+            if current.timestamp() > commence + CAPTURE_GRACE_SECONDS:
+                records.append(clv_record(entry, None, current))
+            else:
+                by_sport.setdefault(entry["sport"], []).append(entry)
+        for sport, entries in by_sport.items():
+            try:
+                closing = self.capture(sport, entries)
+            except Exception as e:
+                print(f"Warning: CLV capture failed for {sport.upper()}: {e}")
+                closing = [None] * len(entries)
+            records.extend(clv_record(entry, line, current) for entry, line in zip(entries, closing))
+
+        os.makedirs(os.path.dirname(os.path.abspath(self.records_path)), exist_ok=True)
+        with open(self.records_path, "a", encoding="utf-8") as f:
+            for record in records:
+                f.write(json.dumps(record, separators=(",", ":")) + "\n")
+        with self._cond:
+            self._save()
+        return records
+
+    def _save(self):
+        if self.state_path:
+            write_json(self.state_path, {"entries": self.pending, "intake_offset": self.intake_offset})
+
+    def start(self) -> threading.Thread:
+        """Run captures from a background thread as they come due."""
+        self._thread = threading.Thread(target=self._run, name="clv", daemon=True)
+        self._thread.start()
+        return self._thread
+
+    def stop(self):
+        with self._cond:
+            self._stopped = True
+            self._cond.notify()
+
+    def _run(self):
+        while True:
+            with self._cond:
+                while not self._stopped:
+                    delay = self.seconds_until_next()
+                    if delay == 0:
+                        break
+                    self._cond.wait(timeout=delay)
+                if self._stopped:
+                    return
+            self.run_due()
+
+def load_records(path: str = CLV_RECORDS_FILE, sport: Optional[str] = None) -> List[Dict]:
+    records = []
+    if not os.path.exists(path):
+        return records
+    with open(path, "r", encoding="utf-8") as f:
+        for line in f:
+            if not line.strip():
+                continue
+            record = json.loads(line)
+            if sport is None or record.get("sport") == sport:
+                records.append(record)
+    return records
+
+def summarize(records: List[Dict], group: Callable[[Dict], str]) -> List[Dict]:
+    """CLV statistics of captured records per group(record), largest groups first."""
+    groups: Dict[str, List[Dict]] = {}
+    missed: Dict[str, int] = {}
+    for record in records:
+        name = group(record)
+        if record.get("status") == "captured":
+            groups.setdefault(name, []).append(record)
+        else:
+            missed[name] = missed.get(name, 0) + 1
+    rows = []
+    for name in set(groups) | set(missed):
+        captured = groups.get(name, [])
+        clv = [r["clv_cents"] for r in captured]
+        rows.append({
+            "group": name,
+            "captured": len(captured),
+            "missed": missed.get(name, 0),
+            "mean_clv_cents": round(statistics.mean(clv), 2) if clv else None,
+            "beat_close": round(sum(1 for c in clv if c > 0) / len(clv), 3) if clv else None,
+            "mean_clv_fair_cents": round(statistics.mean(r["clv_fair_cents"] for r in captured), 2) if captured else None,
+            "mean_entry_ev": round(statistics.mean(r["entry_ev"] for r in captured), 2) if captured else None,
+            "mean_closing_ev": round(statistics.mean(r["closing_ev"] for r in captured), 2) if captured else None,
+        })
+    rows.sort(key=lambda row: (-row["captured"], row["group"]))
+    return rows
+
+REPORT_GROUPS = (
+    ("Sport", lambda r: r["sport"].upper()),
+    ("Bookmaker set", bookmaker_set),
+    ("EV bucket", lambda r: ev_bucket(r.get("entry_ev"))),
+)
+
+def format_summary(title: str, rows: List[Dict]) -> str:
+    def fmt(value, spec):
+        return "-" if value is None else format(value, spec)
+    lines = [f"\n{title}",
+             f"  {'group':<40} {'n':>5} {'missed':>6} {'CLV c':>7} {'beat':>6} {'vs fair c':>9} {'entry EV':>8} {'close EV':>8}"]
+    for row in rows:
+        lines.append(f"  {row['group'][:40]:<40} {row['captured']:>5} {row['missed']:>6} "
+                     f"{fmt(row['mean_clv_cents'], '+.2f'):>7} {fmt(row['beat_close'], '.1%'):>6} "
+                     f"{fmt(row['mean_clv_fair_cents'], '+.2f'):>9} {fmt(row['mean_entry_ev'], '.2f'):>8} "
+                     f"{fmt(row['mean_closing_ev'], '.2f'):>8}")
+    return "\n".join(lines)
+
+def main():
+    """
+    Command line arguments:
+        [SPORT] - Report CLV for one sport (default: all)
+        --run - Capture pending games as they start, until interrupted
+    """
+    if "--run" in sys.argv:
+        # Imported here: compare_odds imports this module for --clv
+        import compare_odds
+        tracker = ClvTracker(compare_odds.capture_closing_lines)
+        print(f"Tracking {len(tracker.pending)} pending CLV captures (Ctrl+C to stop)")
+        tracker.start()
+        try:
+            while True:
+                time.sleep(RELOAD_SECONDS)
+                added = tracker.reload()
+                if added:
+                    print(f"Tracking {added} new CLV captures")
+        except KeyboardInterrupt:
+            tracker.stop()
+        return
+
+    sport = sys.argv[1].lower() if len(sys.argv) > 1 else None
+    records = load_records(sport=sport)
+    if not records:
+        print("No CLV records yet (run compare_odds.py --clv, then clv_tracker.py --run)")
+        return
+    print(f"{len(records)} CLV records")
+    for title, group in REPORT_GROUPS:
+        print(format_summary(title, summarize(records, group)))
+
+if __name__ == "__main__":
+    main()
@@ -1,10 +1,30 @@
-import json
+import atexit
+import contextlib
+import io
 import math
 import os
-import subprocess
+import queue
 import sys
+import threading
+from concurrent.futures import Future, ProcessPoolExecutor
 from datetime import datetime, timezone
-from typing import Dict, List, Optional, Tuple
+from typing import Callable, Dict, Iterator, List, Optional, Tuple
+
+import alerts
+import bankroll_sim
+import clv_tracker
+import dashboard
+import ndjson_output
+import opportunity_ledger
+import stake_optimizer
+import fetch_kalshi_sports
+import fetch_odds_api_sports
+import json_stream
+import metrics
+import tracing
+from json_io import read_header, write_json
+from refresh_all_data import refresh_all
+from snapshot_store import DEFAULT_DB_PATH, SnapshotStore
 
 try:
     from colorama import init, Fore, Back, Style
@@ -89,6 +109,20 @@ SPORT_CONFIG = {
     },
 }
 
+# Minimum EV threshold: 2% of bet amount
+MIN_EV_THRESHOLD = 2.0  # 2% of $100 bet = $2.00
+
+# Sports whose slates are large enough to split across processes with --parallel
+SHARDED_SPORTS = ("ncaab", "ncaabw")
+DEFAULT_SHARDS = 4
+
+# --watch re-analysis interval: with a refresh each tick, or only watching files
+WATCH_REFRESH_SECONDS = 60
+WATCH_FILES_SECONDS = 5
+
+# What happens to an opportunity over the staleness budget (--max-age / --max-skew)
+STALE_ACTIONS = ("refresh", "drop")
+
 # Team name mapping from Kalshi format to full team names
 # Organized by sport to avoid conflicts (e.g., "Seattle" exists in NFL, MLB, NBA)
 KALSHI_TO_FULL_TEAM = {
@@ -457,44 +491,177 @@ def is_game_live(commence_time: Optional[str]) -> bool:
         # If parsing fails, assume not live (safer to include than exclude)
         return False
 
-def load_and_match_games(sport: str) -> Tuple[List[Dict], int]:
+def oldest_timestamp(*timestamps: Optional[str]) -> Optional[str]:
+    """The earliest of several ISO 8601 timestamps (None if none parse)."""
+    oldest = None
+    for ts in timestamps:
+        try:
+            parsed = opportunity_ledger.parse_timestamp(ts)
+        except (TypeError, ValueError, AttributeError):
+            continue
+        if oldest is None or parsed < oldest[0]:
+            oldest = (parsed, ts)
+    return oldest[1] if oldest else None
+
+def leg_timing(game: Dict, now: Optional[datetime] = None) -> Dict:
     """
-    Load data from both JSON files and match games.
-    Excludes live games (games that have already started).
+    When each leg's prices were observed, how old they are and how far apart.
     
     Returns:
-        Tuple of (matched_games, excluded_live_count)
+        {"kalshi_observed_at", "odds_observed_at", "kalshi_age_seconds",
+         "odds_age_seconds", "leg_skew_seconds"} (None where unknown)
+    """
+    now = now or datetime.now(timezone.utc)
+    timing = {
+        "kalshi_observed_at": game.get("kalshi_observed_at"),
+        "odds_observed_at": game.get("odds_observed_at"),
+        "kalshi_age_seconds": None,
+        "odds_age_seconds": None,
+        "leg_skew_seconds": None,
+    }
+    observed = {}
+    for leg in ("kalshi", "odds"):
+        try:
+            observed[leg] = opportunity_ledger.parse_timestamp(timing[f"{leg}_observed_at"])
+        except (TypeError, ValueError, AttributeError):
+            continue
+        timing[f"{leg}_age_seconds"] = round((now - observed[leg]).total_seconds(), 1)
+    if len(observed) == 2:
+        timing["leg_skew_seconds"] = round(abs((observed["kalshi"] - observed["odds"]).total_seconds()), 1)
+    return timing
+
+def open_sport_data(sport: str, file_key: str, snapshot_db: Optional[str] = None,
+                    data: Optional[Dict] = None) -> Tuple[Dict, Iterator[Dict]]:
+    """
+    Open a sport's Kalshi ("kalshi_file") or odds ("odds_file") data for streaming.
+    Uses data when given (output handed over in memory by the refresh);
+    otherwise reads the JSON file, and when it is missing and snapshot_db is
+    given, falls back to the latest snapshot in the SQLite store.
+    
+    Returns (header, records): the file's top-level scalar fields and an
+    iterator over its markets (projected to the fields analysis reads) or games.
+    
+    Raises FileNotFoundError if neither source has data.
     """
     config = SPORT_CONFIG[sport]
+    data_file = os.path.join(DATA_DIR, config[file_key])
+    
+    if data is not None:
+        array_key = "markets" if file_key == "kalshi_file" else "games"
+        header = {k: v for k, v in data.items() if k != array_key}
+        if file_key == "kalshi_file":
+            return header, (json_stream.project_kalshi_market(m) for m in data.get(array_key, []))
+        return header, iter(data.get(array_key, []))
+    
+    if os.path.exists(data_file):
+        with tracing.span("load.header"):
+            header = json_stream.read_scalars(data_file)
+        if file_key == "kalshi_file":
+            return header, json_stream.iter_kalshi_markets(data_file)
+        return header, json_stream.iter_odds_games(data_file)
+    
+    if snapshot_db and os.path.exists(snapshot_db):
+        with tracing.span("load.snapshot_store"), SnapshotStore(snapshot_db) as store:
+            if file_key == "kalshi_file":
+                data = store.latest_kalshi_data(sport)
+            else:
+                data = store.latest_odds_data(sport)
+        if data is not None:
+            records = data.pop("markets" if file_key == "kalshi_file" else "games")
+            return data, iter(records)
+    
+    label = "Kalshi" if file_key == "kalshi_file" else "Odds"
+    raise FileNotFoundError(f"{label} data file not found: {data_file}")
+
+def extract_team_names_for_count(odds_game: Dict) -> Tuple[Optional[str], Optional[str]]:
+    """Extract team names for counting purposes."""
+    home_team = odds_game.get("home_team")
+    away_team = odds_game.get("away_team")
+    if home_team and away_team:
+        return away_team, home_team
+    
+    # Try extracting from bookmaker outcomes
+    bookmakers = odds_game.get("bookmakers", [])
+    for bookmaker in bookmakers:
+        markets = bookmaker.get("markets", [])
+        for market in markets:
+            if market.get("key") == "h2h":
+                outcomes = market.get("outcomes", [])
+                team_names = [outcome.get("name") for outcome in outcomes if outcome.get("name")]
+                if len(team_names) >= 2:
+                    return team_names[0], team_names[1]
+    return None, None
+
+def odds_game_has_teams(game: Dict) -> bool:
+    """
+    Whether an odds file entry has team data.
+    Checks both the nested structure (saved format) and direct structure (if games are at top level).
+    """
+    odds_info = game.get("odds_data")
+    # Check nested structure (from saved file)
+    if odds_info:
+        away_team, home_team = extract_team_names_for_count(odds_info)
+        return bool(away_team and home_team)
+    # Also check if team names are at the game level directly
+    if game.get("away_team") and game.get("home_team"):
+        return True
+    # Try extracting from bookmaker outcomes
+    if game.get("bookmakers"):
+        away_team, home_team = extract_team_names_for_count(game)
+        return bool(away_team and home_team)
+    return False
+
+def iter_match_candidates(sport: str, snapshot_db: Optional[str] = None,
+                          stats: Optional[Dict] = None,
+                          fetched: Optional[Dict] = None,
+                          shard: Optional[Tuple[int, int]] = None) -> Iterator[Tuple[int, Dict, bool]]:
+    """
+    Load data from both JSON files and yield every Odds API game whose teams
+    match two Kalshi markets of the same event.
     
-    # Load Kalshi data
-    kalshi_file = os.path.join(DATA_DIR, config["kalshi_file"])
-    if not os.path.exists(kalshi_file):
-        raise FileNotFoundError(f"Kalshi data file not found: {kalshi_file}")
+    Both files are streamed: Kalshi markets are projected to the fields
+    matching needs, and Odds API games are matched one at a time.
+    
+    If stats is given it is filled with the file headers ("kalshi_header",
+    "odds_header") and the number of Odds API games with team data
+    ("odds_games_with_teams").
+    
+    fetched is a refresh_all_data.refresh_sport result; its in-memory
+    "kalshi_data"/"odds_data" are used instead of the files when present.
     
-    with open(kalshi_file, "r", encoding="utf-8") as f:
-        kalshi_data = json.load(f)
+    shard=(index, count) only matches the Odds API games at positions
+    index, index + count, ... so a large slate can be split across processes.
+    
+    Yields:
+        (odds_index, matched_game, is_live) where odds_index is the game's
+        position in the odds data. Candidates are not de-duplicated by event.
+    """
+    # Load Kalshi data
+    fetched = fetched or {}
+    kalshi_header, kalshi_markets = open_sport_data(sport, "kalshi_file", snapshot_db,
+                                                    fetched.get("kalshi_data"))
     
     # Load odds data
-    odds_file = os.path.join(DATA_DIR, config["odds_file"])
-    if not os.path.exists(odds_file):
-        raise FileNotFoundError(f"Odds data file not found: {odds_file}")
+    odds_header, odds_games = open_sport_data(sport, "odds_file", snapshot_db,
+                                              fetched.get("odds_data"))
     
-    with open(odds_file, "r", encoding="utf-8") as f:
-        odds_data = json.load(f)
+    if stats is None:
+        stats = {}
+    stats["kalshi_header"] = kalshi_header
+    stats["odds_header"] = odds_header
+    stats["odds_games_with_teams"] = 0
     
     # Group Kalshi markets by event_ticker
+    # (markets from files written before per-price timestamps get the file's query_time)
     kalshi_markets_by_event = {}
-    for market in kalshi_data.get("markets", []):
+    for market in kalshi_markets:
+        if not market.get("observed_at"):
+            market["observed_at"] = kalshi_header.get("query_time")
         event_ticker = market.get("event_ticker", "")
         if event_ticker not in kalshi_markets_by_event:
             kalshi_markets_by_event[event_ticker] = []
         kalshi_markets_by_event[event_ticker].append(market)
     
-    matched_games = []
-    matched_event_ticks = set()  # Track matched events to avoid duplicates
-    excluded_live_count = 0  # Count games excluded because they're live
-    
     # Get sport-specific team mapping
     sport_mapping = KALSHI_TO_FULL_TEAM.get(sport, {})
     # For college sports, UFC, NHL, MLS, use flexible matching
@@ -571,33 +738,41 @@ def load_and_match_games(sport: str) -> Tuple[List[Dict], int]:
         
         return False
     
-    # Collect all Odds API games (both matched and unmatched)
+    # Stream all Odds API games (both matched and unmatched)
     # The Odds API data can be in nested format (odds_data) or direct format
-    all_odds_games = []
-    for game in odds_data.get("games", []):
-        odds_info = game.get("odds_data")
-        
-        # Check nested structure first (from saved file format)
-        if odds_info:
-            # Try to extract team names (from direct fields or bookmaker outcomes)
-            away_team, home_team = extract_team_names(odds_info)
-            if away_team and home_team:
-                # Add team names if they weren't at top level
-                if not odds_info.get("away_team"):
-                    odds_info["away_team"] = away_team
-                if not odds_info.get("home_team"):
-                    odds_info["home_team"] = home_team
-                all_odds_games.append(odds_info)
-        # Also check if team names are at the game level directly
-        elif game.get("away_team") and game.get("home_team"):
-            all_odds_games.append(game)
-        # Try extracting from game level if it has bookmakers
-        elif game.get("bookmakers"):
-            away_team, home_team = extract_team_names(game)
-            if away_team and home_team:
-                game["away_team"] = away_team
-                game["home_team"] = home_team
-                all_odds_games.append(game)
+    def iter_all_odds_games():
+        for odds_index, game in enumerate(odds_games):
+            if shard and odds_index % shard[1] != shard[0]:
+                continue
+            odds_info = game.get("odds_data")
+            usable_game = None
+            
+            # Check nested structure first (from saved file format)
+            if odds_info:
+                # Try to extract team names (from direct fields or bookmaker outcomes)
+                away_team, home_team = extract_team_names(odds_info)
+                if away_team and home_team:
+                    # Add team names if they weren't at top level
+                    if not odds_info.get("away_team"):
+                        odds_info["away_team"] = away_team
+                    if not odds_info.get("home_team"):
+                        odds_info["home_team"] = home_team
+                    usable_game = odds_info
+            # Also check if team names are at the game level directly
+            elif game.get("away_team") and game.get("home_team"):
+                usable_game = game
+            # Try extracting from game level if it has bookmakers
+            elif game.get("bookmakers"):
+                away_team, home_team = extract_team_names(game)
+                if away_team and home_team:
+                    game["away_team"] = away_team
+                    game["home_team"] = home_team
+                    usable_game = game
+            
+            if odds_game_has_teams(game):
+                stats["odds_games_with_teams"] += 1
+            if usable_game is not None:
+                yield odds_index, usable_game
     
     # Get all Kalshi markets
     all_kalshi_markets = []
@@ -605,7 +780,7 @@ def load_and_match_games(sport: str) -> Tuple[List[Dict], int]:
         all_kalshi_markets.extend(markets_list)
     
     # Try to match each Odds API game with Kalshi markets
-    for odds_info in all_odds_games:
+    for odds_index, odds_info in iter_all_odds_games():
         away_team_odds = odds_info.get("away_team", "")
         home_team_odds = odds_info.get("home_team", "")
         
@@ -649,17 +824,9 @@ def load_and_match_games(sport: str) -> Tuple[List[Dict], int]:
             home_event = home_kalshi_market.get("event_ticker", "")
             
             # Both markets must be from the same event
-            if away_event == home_event and away_event and away_event not in matched_event_ticks:
-                matched_event_ticks.add(away_event)
-                
-                # Check if game is live (has started) - exclude it if so
+            if away_event == home_event and away_event:
                 commence_time = odds_info.get("commence_time")
-                if is_game_live(commence_time):
-                    # Skip live games - too risky
-                    excluded_live_count += 1
-                    continue
-                
-                matched_games.append({
+                yield odds_index, {
                     "event_ticker": away_event,
                     "away_team": away_team_odds,
                     "home_team": home_team_odds,
@@ -667,7 +834,39 @@ def load_and_match_games(sport: str) -> Tuple[List[Dict], int]:
                     "away_kalshi_market": away_kalshi_market,
                     "home_kalshi_market": home_kalshi_market,
                     "odds_data": odds_info,
-                })
+                    "kalshi_observed_at": oldest_timestamp(away_kalshi_market.get("observed_at"),
+                                                           home_kalshi_market.get("observed_at")),
+                    "odds_observed_at": odds_info.get("observed_at") or odds_header.get("query_time"),
+                }, is_game_live(commence_time)
+
+def load_and_match_games(sport: str, snapshot_db: Optional[str] = None,
+                         stats: Optional[Dict] = None,
+                         fetched: Optional[Dict] = None) -> Tuple[List[Dict], int]:
+    """
+    Load data from both JSON files and match games.
+    Excludes live games (games that have already started).
+    
+    Only matched games stay in memory; see iter_match_candidates for stats
+    and fetched.
+    
+    Returns:
+        Tuple of (matched_games, excluded_live_count)
+    """
+    matched_games = []
+    matched_event_ticks = set()  # Track matched events to avoid duplicates
+    excluded_live_count = 0  # Count games excluded because they're live
+    
+    for _, game, is_live in iter_match_candidates(sport, snapshot_db, stats, fetched):
+        if game["event_ticker"] in matched_event_ticks:
+            continue
+        matched_event_ticks.add(game["event_ticker"])
+        
+        # Skip live games (have started) - too risky
+        if is_live:
+            excluded_live_count += 1
+            continue
+        
+        matched_games.append(game)
     
     return matched_games, excluded_live_count
 
@@ -694,6 +893,21 @@ def get_average_sportsbook_odds(game: Dict, team_name: str) -> Tuple[Optional[fl
     avg_odds = sum(odds_list) / len(odds_list)
     return avg_odds, len(odds_list)
 
+def consensus_probabilities(game: Dict) -> Optional[Tuple[float, float]]:
+    """
+    Devigged (away, home) probabilities, in percent, from the average
+    sportsbook odds of a matched game, the way analyze_game computes them.
+    None if either team has no sportsbook odds.
+    """
+    avg_away_odds, _ = get_average_sportsbook_odds(game, game["away_team"])
+    avg_home_odds, _ = get_average_sportsbook_odds(game, game["home_team"])
+    if avg_away_odds is None or avg_home_odds is None:
+        return None
+    return normalize_probabilities(
+        convert_american_odds_to_probability(int(avg_away_odds)),
+        convert_american_odds_to_probability(int(avg_home_odds)),
+    )
+
 def analyze_game(game: Dict) -> Optional[Dict]:
     """
     Analyze a single game for positive EV opportunities on Kalshi.
@@ -808,6 +1022,8 @@ def analyze_game(game: Dict) -> Optional[Dict]:
         "home_platform_name": "Kalshi" if best_strategy["team"] == "home" else None,
         "away_kalshi_prob": away_kalshi_price,
         "home_kalshi_prob": home_kalshi_price,
+        "away_kalshi_liquidity": away_kalshi_data.get("liquidity"),
+        "home_kalshi_liquidity": home_kalshi_data.get("liquidity"),
         "away_sportsbook_prob": away_sportsbook_prob,
         "home_sportsbook_prob": home_sportsbook_prob,
         "away_prob_normalized": away_prob_normalized,
@@ -822,10 +1038,58 @@ def analyze_game(game: Dict) -> Optional[Dict]:
         "net_if_home_wins": best_strategy["net_if_home_wins"],
         "expected_value": round(best_strategy["ev"], 2),
         "total_investment": bet_amount,
+        "away_kalshi_ticker": game["away_kalshi_market"].get("ticker"),
+        "home_kalshi_ticker": game["home_kalshi_market"].get("ticker"),
+        "odds_event_id": game["odds_data"].get("id"),
+        "bookmakers": sorted(b.get("key") for b in game["odds_data"].get("bookmakers", []) if b.get("key")),
     }
+    result.update(leg_timing(game))
     
     return result
 
+def closing_line(game: Dict, bet_team: str, entry_price: float, bet_amount: float = 100.0) -> Optional[Dict]:
+    """
+    Kalshi price and devigged consensus probability of one side of a
+    (freshly fetched) matched game, and the EV an entry at entry_price has
+    against that line. None if the sportsbooks no longer price both teams.
+    """
+    probabilities = consensus_probabilities(game)
+    if probabilities is None:
+        return None
+    away_prob, home_prob = probabilities
+    _, away_bookmaker_count = get_average_sportsbook_odds(game, game["away_team"])
+    _, home_bookmaker_count = get_average_sportsbook_odds(game, game["home_team"])
+    bet_prob = away_prob if bet_team == "away" else home_prob
+    payout = calculate_kalshi_payout(bet_amount, int(entry_price))
+    closing_ev = calculate_expected_value(bet_prob, 100 - bet_prob, payout["profit_if_win"], payout["loss_if_lose"])
+    return {
+        "closing_price": game[f"{bet_team}_kalshi_market"]["market_data"].get("yes_ask"),
+        "closing_fair_prob": round(bet_prob, 2),
+        "closing_bookmaker_count": min(away_bookmaker_count, home_bookmaker_count),
+        "closing_ev": round(closing_ev, 2),
+        "closing_kalshi_observed_at": game.get("kalshi_observed_at"),
+        "closing_odds_observed_at": game.get("odds_observed_at"),
+    }
+
+def capture_closing_lines(sport: str, entries: List[Dict]) -> List[Optional[Dict]]:
+    """
+    clv_tracker capture function: re-fetch the games of tracked
+    opportunities (one Kalshi request per event, one Odds API request for
+    all of them) and return closing_line() of each bet, or None.
+    """
+    games = [{
+        "event_ticker": entry["event_ticker"],
+        "away_team": entry["away_team"],
+        "home_team": entry["home_team"],
+        "commence_time": entry["commence_time"],
+        "away_kalshi_market": {"ticker": entry["away_kalshi_ticker"]},
+        "home_kalshi_market": {"ticker": entry["home_kalshi_ticker"]},
+        "odds_data": {"id": entry["odds_event_id"]},
+    } for entry in entries]
+    refreshed = refresh_stale_legs(sport, [(game, ["kalshi", "odds"]) for game in games])
+    return [closing_line(game, entry["bet_team"], entry["entry_price"]) if game else None
+            for game, entry in zip(refreshed, entries)]
+
 def generate_opportunity_table(opp: Dict) -> str:
     """
     Generate a detailed, colorized summary for a Kalshi betting opportunity.
@@ -856,6 +1120,12 @@ def generate_opportunity_table(opp: Dict) -> str:
     strategy_text = f"{Fore.MAGENTA}Strategy:{Style.RESET_ALL} Bet ${100:.0f} on {Fore.GREEN}{bet_team_name}{Style.RESET_ALL} via {Fore.BLUE}Kalshi{Style.RESET_ALL} {Fore.RED}(NO HEDGE){Style.RESET_ALL}"
     lines.append(strategy_text)
     
+    # Portfolio size (with --bankroll, see stake_optimizer.py)
+    if opp.get("stake") is not None:
+        limit_text = f" {Fore.RED}({opp['stake_limit']} cap){Style.RESET_ALL}" if opp.get("stake_limit") else ""
+        stake_text = f"{Fore.CYAN}Kelly Stake:{Style.RESET_ALL} {Fore.YELLOW}${opp['stake']:,.2f}{Style.RESET_ALL} ({opp['contracts']} contracts), growth {opp['kelly_growth'] * 10_000:.2f} bp{limit_text}"
+        lines.append(stake_text)
+    
     # Calculate maximum Kalshi price that still yields EV >= $3
     bet_amount = opp.get('total_investment', 100.0)
     if bet_team == 'away':
@@ -934,168 +1204,616 @@ def generate_opportunity_table(opp: Dict) -> str:
     
     return "\n".join(lines)
 
-def process_sport(sport: str) -> Optional[Dict]:
+def stale_legs(opp: Dict, budget: Dict) -> List[str]:
     """
-    Process a single sport and return results.
-    Returns None if data files don't exist or no games found.
+    Legs ("kalshi", "odds") of an opportunity that break the staleness budget:
+    older than max_age_seconds, or, when the two were observed more than
+    max_skew_seconds apart, every leg older than max_skew_seconds (refreshing
+    only the older leg would leave the other one too far behind it).
+    A leg of unknown age counts as stale.
     """
-    if sport not in SPORT_CONFIG:
-        return None
+    stale = []
+    max_age = budget.get("max_age_seconds")
+    if max_age is not None:
+        for leg in ("kalshi", "odds"):
+            age = opp.get(f"{leg}_age_seconds")
+            if age is None or age > max_age:
+                stale.append(leg)
+    
+    max_skew = budget.get("max_skew_seconds")
+    if max_skew is not None:
+        skew = opp.get("leg_skew_seconds")
+        if skew is None:
+            older = [leg for leg in ("kalshi", "odds") if opp.get(f"{leg}_age_seconds") is None]
+        elif skew > max_skew:
+            older = [leg for leg in ("kalshi", "odds") if opp[f"{leg}_age_seconds"] > max_skew]
+        else:
+            older = []
+        stale.extend(leg for leg in older if leg not in stale)
+    return stale
+
+def refresh_stale_legs(sport: str, stale_games: List[Tuple[Dict, List[str]]]) -> List[Optional[Dict]]:
+    """
+    Re-fetch only the stale legs of matched games: one Kalshi request per
+    stale event and one Odds API request (eventIds) for every stale odds leg.
     
+    Returns an updated copy of each game, or None where its market or odds
+    could not be re-fetched (closed, delisted or the request failed).
+    """
+    kalshi_entries = {}
+    for game, legs in stale_games:
+        event_ticker = game["event_ticker"]
+        if "kalshi" in legs and event_ticker not in kalshi_entries:
+            try:
+                entries = fetch_kalshi_sports.fetch_event_markets(sport, event_ticker)
+            except Exception as e:
+                print(f"{Fore.YELLOW}Warning: could not refresh Kalshi prices for {event_ticker}: {e}{Style.RESET_ALL}")
+                entries = []
+            kalshi_entries[event_ticker] = {entry["ticker"]: entry for entry in entries}
+    
+    odds_ids = sorted({game["odds_data"].get("id") for game, legs in stale_games
+                       if "odds" in legs and game["odds_data"].get("id")})
+    odds_games = {}
+    if odds_ids:
+        try:
+            fresh = fetch_odds_api_sports.fetch_odds_api_sports(sport, fetch_odds_api_sports.ODDS_API_KEY,
+                                                                event_ids=odds_ids)
+            fetch_odds_api_sports.fill_team_names(fresh)
+            odds_games = {odds_game.get("id"): odds_game for odds_game in fresh}
+        except Exception as e:
+            print(f"{Fore.YELLOW}Warning: could not refresh {SPORT_CONFIG[sport]['sport_name']} sportsbook odds: {e}{Style.RESET_ALL}")
+    
+    refreshed = []
+    for game, legs in stale_games:
+        game = dict(game)
+        if "kalshi" in legs:
+            entries = kalshi_entries.get(game["event_ticker"], {})
+            away = entries.get(game["away_kalshi_market"].get("ticker"))
+            home = entries.get(game["home_kalshi_market"].get("ticker"))
+            if not away or not home:
+                refreshed.append(None)
+                continue
+            game["away_kalshi_market"] = json_stream.project_kalshi_market(away)
+            game["home_kalshi_market"] = json_stream.project_kalshi_market(home)
+            game["kalshi_observed_at"] = oldest_timestamp(away.get("observed_at"), home.get("observed_at"))
+        if "odds" in legs:
+            odds_game = odds_games.get(game["odds_data"].get("id"))
+            if not odds_game:
+                refreshed.append(None)
+                continue
+            game["odds_data"] = odds_game
+            game["odds_observed_at"] = odds_game.get("observed_at")
+        refreshed.append(game)
+    return refreshed
+
+def enforce_staleness_budget(sport: str, candidates: List[Tuple[Dict, Dict]], budget: Dict,
+                             stats: Optional[Dict] = None) -> List[Optional[Dict]]:
+    """
+    Apply a staleness budget to (matched_game, opportunity) pairs.
+    
+    budget is {"max_age_seconds", "max_skew_seconds", "action"} (either limit
+    may be None). Opportunities within budget are kept as-is. Those over it
+    are dropped, or with action "refresh" have just their stale legs
+    re-fetched and are re-analyzed; they survive only if they are still above
+    MIN_EV_THRESHOLD and within budget.
+    
+    Returns one opportunity (or None when dropped) per candidate, in order.
+    stats, when given, is incremented with "stale_refreshed" and "stale_dropped".
+    """
+    stats = stats if stats is not None else {}
+    stats.setdefault("stale_refreshed", 0)
+    stats.setdefault("stale_dropped", 0)
+    
+    kept: List[Optional[Dict]] = [opp for _, opp in candidates]
+    over_budget = []
+    for index, (game, opp) in enumerate(candidates):
+        legs = stale_legs(opp, budget)
+        if legs:
+            over_budget.append((index, game, legs))
+            kept[index] = None
+    if not over_budget:
+        return kept
+    
+    if budget.get("action", "refresh") == "refresh":
+        refreshed = refresh_stale_legs(sport, [(game, legs) for _, game, legs in over_budget])
+        for (index, _, _), game in zip(over_budget, refreshed):
+            opp = analyze_game(game) if game else None
+            if opp and opp["expected_value"] > MIN_EV_THRESHOLD and not stale_legs(opp, budget):
+                kept[index] = opp
+                stats["stale_refreshed"] += 1
+    
+    stats["stale_dropped"] += sum(1 for index, _, _ in over_budget if kept[index] is None)
+    return kept
+
+def find_opportunities(matched_games: List[Dict], sport: Optional[str] = None,
+                       budget: Optional[Dict] = None, stats: Optional[Dict] = None) -> List[Dict]:
+    """
+    Analyze matched games and keep those above MIN_EV_THRESHOLD, in input order.
+    With a staleness budget, over-budget opportunities are refreshed or dropped
+    (see enforce_staleness_budget).
+    """
+    candidates = []
+    with tracing.span("analyze"):
+        for game in matched_games:
+            opp = analyze_game(game)
+            if opp and opp["expected_value"] > MIN_EV_THRESHOLD:
+                candidates.append((game, opp))
+    if not budget:
+        return [opp for _, opp in candidates]
+    with tracing.span("staleness"):
+        kept = enforce_staleness_budget(sport, candidates, budget, stats)
+    return [opp for opp in kept if opp]
+
+def finalize_sport(sport: str, matched_count: int, excluded_live_count: int, load_stats: Dict,
+                   opportunities: List[Dict], snapshot_db: Optional[str] = None,
+                   pretty: bool = False, record: bool = True) -> Dict:
+    """
+    Rank a sport's opportunities, record them (see record_sport) and build
+    the process_sport result. With record=False nothing is written; the
+    caller records the result itself, e.g. after sizing it.
+    """
     config = SPORT_CONFIG[sport]
     
-    # Check if data files exist
-    kalshi_file = os.path.join(DATA_DIR, config["kalshi_file"])
-    odds_file = os.path.join(DATA_DIR, config["odds_file"])
+    # Show how many games The Odds API had
+    odds_header = load_stats["odds_header"]
+    total_odds_games = odds_header.get("total_games", 0)
     
-    if not os.path.exists(kalshi_file):
-        return None
+    # Show how many games Kalshi had
+    kalshi_header = load_stats["kalshi_header"]
+    total_kalshi_games = kalshi_header.get("total_markets_found", 0)
     
-    if not os.path.exists(odds_file):
-        return None
-    try:
-        matched_games, excluded_live_count = load_and_match_games(sport)
-        
-        # Load odds data to show how many games The Odds API had
-        odds_file = os.path.join(DATA_DIR, config["odds_file"])
-        with open(odds_file, "r", encoding="utf-8") as f:
-            odds_data = json.load(f)
-        total_odds_games = odds_data.get("total_games", 0)
-        matched_odds_games = odds_data.get("matched_games", 0)
-        
-        # Load Kalshi data to show how many games Kalshi had
-        kalshi_file = os.path.join(DATA_DIR, config["kalshi_file"])
-        with open(kalshi_file, "r", encoding="utf-8") as f:
-            kalshi_data = json.load(f)
-        total_kalshi_games = kalshi_data.get("total_markets_found", 0)
-        
-    except FileNotFoundError as e:
-        return None
-    except Exception as e:
-        return None
+    # Sort by expected value (highest first)
+    opportunities.sort(key=lambda x: x["expected_value"], reverse=True)
     
-    if len(matched_games) == 0:
-        return None
+    query_time = datetime.now(timezone.utc).isoformat()
     
-    opportunities = []
+    # Count how many Odds API games actually had team data
+    odds_games_with_teams = load_stats["odds_games_with_teams"]
     
-    # Minimum EV threshold: 2% of bet amount
-    min_ev_threshold = 2.0  # 2% of $100 bet = $2.00
+    result = {
+        "sport": sport,
+        "sport_name": config["sport_name"],
+        "query_time": query_time,
+        "kalshi_query_time": kalshi_header.get("query_time"),
+        "odds_query_time": odds_header.get("query_time"),
+        "matched_games": matched_count,
+        "total_kalshi_games": total_kalshi_games,
+        "total_odds_games": total_odds_games,
+        "odds_games_with_teams": odds_games_with_teams,
+        "excluded_live_games": excluded_live_count,
+        "stale_refreshed": load_stats.get("stale_refreshed", 0),
+        "stale_dropped": load_stats.get("stale_dropped", 0),
+        "opportunities": opportunities,
+        "total_opportunities": len(opportunities),
+    }
+    if record:
+        record_sport(sport, result, snapshot_db, pretty)
+    return result
+
+def record_sport(sport: str, result: Dict, snapshot_db: Optional[str] = None, pretty: bool = False):
+    """
+    Record a finalized sport: the opportunity ledger, the snapshot store
+    (when snapshot_db is given) and the sport's output file.
+    """
+    opportunities = result["opportunities"]
+    query_time = result["query_time"]
     
-    for game in matched_games:
-        opp = analyze_game(game)
-        if opp and opp["expected_value"] > min_ev_threshold:
-            opportunities.append(opp)
+    # Record first-seen/last-seen history (the output file below is overwritten each run)
+    with tracing.span("output.ledger"):
+        opportunity_ledger.get_ledger(sport).update(opportunities, query_time)
     
-    # Sort by expected value (highest first)
-    opportunities.sort(key=lambda x: x["expected_value"], reverse=True)
+    if snapshot_db:
+        with tracing.span("output.snapshot_store"), SnapshotStore(snapshot_db) as store:
+            store.write_opportunities(sport, opportunities, query_time)
     
     # Save to JSON
     output_data = {
         "source": "odds_comparison",
         "content_type": "positive_ev_opportunities",
         "sport": sport,
-        "query_time": datetime.now(timezone.utc).isoformat(),
+        "query_time": query_time,
         "total_opportunities": len(opportunities),
         "opportunities": opportunities,
     }
     
-    output_file = os.path.join(DATA_DIR, config["output_file"])
-    os.makedirs(DATA_DIR, exist_ok=True)
+    output_file = os.path.join(DATA_DIR, SPORT_CONFIG[sport]["output_file"])
+    with tracing.span("output.write_json"):
+        write_json(output_file, output_data, pretty=pretty)
+
+def process_sport(sport: str, snapshot_db: Optional[str] = None, pretty: bool = False,
+                  fetched: Optional[Dict] = None, budget: Optional[Dict] = None,
+                  record: bool = True) -> Optional[Dict]:
+    """
+    Process a single sport and return results.
+    Returns None if data files don't exist or no games found.
     
-    with open(output_file, "w", encoding="utf-8") as f:
-        json.dump(output_data, f, indent=2, ensure_ascii=False)
+    If snapshot_db is given, opportunities are also appended to the SQLite
+    snapshot store and it is used as the data source for missing JSON files.
+    pretty writes the output file indented instead of compact.
+    fetched is the sport's in-process refresh result (see iter_match_candidates).
+    budget is an optional staleness budget (see enforce_staleness_budget).
+    record=False leaves the recording to the caller (see finalize_sport).
+    """
+    if sport not in SPORT_CONFIG:
+        return None
     
-    # Count how many Odds API games actually had team data
-    # Check both the nested structure (saved format) and direct structure (if games are at top level)
-    def extract_team_names_for_count(odds_game: Dict) -> Tuple[Optional[str], Optional[str]]:
-        """Extract team names for counting purposes."""
-        home_team = odds_game.get("home_team")
-        away_team = odds_game.get("away_team")
-        if home_team and away_team:
-            return away_team, home_team
+    with tracing.span("process_sport", sport=sport):
+        return _process_sport(sport, snapshot_db, pretty, fetched, budget, record)
+
+def _process_sport(sport: str, snapshot_db: Optional[str], pretty: bool,
+                   fetched: Optional[Dict], budget: Optional[Dict], record: bool) -> Optional[Dict]:
+    config = SPORT_CONFIG[sport]
+    
+    try:
+        load_stats = {}
+        with tracing.span("load_and_match"):
+            matched_games, excluded_live_count = load_and_match_games(sport, snapshot_db, load_stats, fetched)
+    except FileNotFoundError as e:
+        return None
+    except Exception as e:
+        print(f"{Fore.YELLOW}Warning: skipping {config['sport_name']}, could not load data: {e}{Style.RESET_ALL}")
+        return None
+    
+    if len(matched_games) == 0:
+        return None
+    
+    opportunities = find_opportunities(matched_games, sport, budget, load_stats)
+    return finalize_sport(sport, len(matched_games), excluded_live_count, load_stats,
+                          opportunities, snapshot_db, pretty, record)
+
+def analyze_shard(sport: str, shard: Tuple[int, int], snapshot_db: Optional[str] = None,
+                  fetched: Optional[Dict] = None, budget: Optional[Dict] = None) -> Dict:
+    """
+    Match and analyze one shard of a sport's Odds API games (process pool worker).
+    
+    Returns a compact, picklable summary: the load stats and one
+    (odds_index, event_ticker, is_live, opportunity, stale) tuple per match
+    candidate, where stale is None, "refreshed" or "dropped" (staleness budget).
+    Nothing is written; merge_shards de-duplicates and process_sport_sharded
+    records the result.
+    """
+    load_stats = {}
+    candidates = []
+    analyzed = []  # (candidate index, game, opportunity) above the EV threshold
+    for odds_index, game, is_live in iter_match_candidates(sport, snapshot_db, load_stats, fetched, shard):
+        opp = None
+        if not is_live:
+            opp = analyze_game(game)
+            if opp and opp["expected_value"] <= MIN_EV_THRESHOLD:
+                opp = None
+            if opp:
+                analyzed.append((len(candidates), game, opp))
+        candidates.append((odds_index, game["event_ticker"], is_live, opp, None))
+    
+    if budget and analyzed:
+        kept = enforce_staleness_budget(sport, [(game, opp) for _, game, opp in analyzed], budget)
+        for (index, _, opp), new_opp in zip(analyzed, kept):
+            stale = None
+            if stale_legs(opp, budget):
+                stale = "refreshed" if new_opp else "dropped"
+            odds_index, event_ticker, is_live, _, _ = candidates[index]
+            candidates[index] = (odds_index, event_ticker, is_live, new_opp, stale)
+    return {"load_stats": load_stats, "candidates": candidates}
+
+def merge_shards(shard_results: List[Dict]) -> Tuple[int, int, Dict, List[Dict]]:
+    """
+    Combine analyze_shard results the way load_and_match_games would have:
+    the first Odds API game (by position) to match an event wins.
+    
+    Returns:
+        Tuple of (matched_count, excluded_live_count, load_stats, opportunities)
+    """
+    candidates = sorted(
+        (c for result in shard_results for c in result["candidates"]),
+        key=lambda c: c[0],
+    )
+    load_stats = dict(shard_results[0]["load_stats"])
+    load_stats["odds_games_with_teams"] = sum(
+        result["load_stats"]["odds_games_with_teams"] for result in shard_results
+    )
+    
+    matched_count = 0
+    excluded_live_count = 0
+    opportunities = []
+    seen_events = set()
+    for _, event_ticker, is_live, opp, stale in candidates:
+        if event_ticker in seen_events:
+            continue
+        seen_events.add(event_ticker)
+        if is_live:
+            excluded_live_count += 1
+            continue
+        matched_count += 1
+        if stale:
+            load_stats[f"stale_{stale}"] = load_stats.get(f"stale_{stale}", 0) + 1
+        if opp:
+            opportunities.append(opp)
+    return matched_count, excluded_live_count, load_stats, opportunities
+
+def process_sport_sharded(sport: str, shard_futures: List[Future], snapshot_db: Optional[str] = None,
+                          pretty: bool = False, record: bool = True) -> Optional[Dict]:
+    """
+    Same as process_sport, but for a sport whose matching and analysis were
+    submitted as analyze_shard jobs; ranking and output happen here.
+    """
+    if sport not in SPORT_CONFIG:
+        return None
+    
+    config = SPORT_CONFIG[sport]
+    try:
+        shard_results = [future.result() for future in shard_futures]
+    except FileNotFoundError as e:
+        return None
+    except Exception as e:
+        print(f"{Fore.YELLOW}Warning: skipping {config['sport_name']}, could not load data: {e}{Style.RESET_ALL}")
+        return None
+    
+    with tracing.span("merge_shards", sport=sport):
+        matched_count, excluded_live_count, load_stats, opportunities = merge_shards(shard_results)
+        if matched_count == 0:
+            return None
         
-        # Try extracting from bookmaker outcomes
-        bookmakers = odds_game.get("bookmakers", [])
-        for bookmaker in bookmakers:
-            markets = bookmaker.get("markets", [])
-            for market in markets:
-                if market.get("key") == "h2h":
-                    outcomes = market.get("outcomes", [])
-                    team_names = [outcome.get("name") for outcome in outcomes if outcome.get("name")]
-                    if len(team_names) >= 2:
-                        return team_names[0], team_names[1]
-        return None, None
+        return finalize_sport(sport, matched_count, excluded_live_count, load_stats,
+                              opportunities, snapshot_db, pretty, record)
+
+def process_sports_parallel(sports: List[str], snapshot_db: Optional[str] = None,
+                            pretty: bool = False, fetched: Optional[Dict[str, Dict]] = None,
+                            workers: Optional[int] = None,
+                            shards: int = DEFAULT_SHARDS,
+                            on_result: Optional[Callable[[str, Optional[Dict]], None]] = None,
+                            budget: Optional[Dict] = None) -> List[Optional[Dict]]:
+    """
+    Run process_sport for several sports on a process pool sized to the machine.
+    Sports in SHARDED_SPORTS (or the sport itself, when only one is given) are
+    split into `shards` chunks of Odds API games matched in parallel.
     
-    odds_games_with_teams = 0
-    for game in odds_data.get("games", []):
-        odds_info = game.get("odds_data")
-        # Check nested structure (from saved file)
-        if odds_info:
-            away_team, home_team = extract_team_names_for_count(odds_info)
-            if away_team and home_team:
-                odds_games_with_teams += 1
-        # Also check if team names are at the game level directly
-        elif game.get("away_team") and game.get("home_team"):
-            odds_games_with_teams += 1
-        # Try extracting from bookmaker outcomes
-        elif game.get("bookmakers"):
-            away_team, home_team = extract_team_names_for_count(game)
-            if away_team and home_team:
-                odds_games_with_teams += 1
+    Returns one result per sport, in the order given, so output is identical
+    to calling process_sport in a loop. on_result(sport, result) is called as
+    each result is collected.
+    """
+    fetched = fetched or {}
+    workers = workers or os.cpu_count() or 1
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        # Submit everything up front so shards of a big sport overlap with the others
+        pending = [(sport, submit_sport(executor, sport, len(sports) == 1, snapshot_db, pretty,
+                                        fetched.get(sport), shards, budget))
+                   for sport in sports]
+        
+        results = []
+        for sport, job in pending:
+            results.append(collect_sport(sport, job, snapshot_db, pretty))
+            if on_result:
+                on_result(sport, results[-1])
+        return results
+
+def submit_sport(executor: ProcessPoolExecutor, sport: str, only_sport: bool, snapshot_db: Optional[str],
+                 pretty: bool, fetched: Optional[Dict], shards: int, budget: Optional[Dict],
+                 record: bool = True):
+    """
+    Submit one sport to the pool: as `shards` analyze_shard jobs for large
+    slates (SHARDED_SPORTS, or any sport when it is the only one), else as
+    one process_sport job. collect_sport turns the job into the result.
+    """
+    if shards > 1 and (only_sport or sport in SHARDED_SPORTS):
+        return [executor.submit(analyze_shard, sport, (index, shards), snapshot_db, fetched, budget)
+                for index in range(shards)]
+    return executor.submit(process_sport, sport, snapshot_db, pretty, fetched, budget, record)
+
+def collect_sport(sport: str, job, snapshot_db: Optional[str], pretty: bool,
+                  record: bool = True) -> Optional[Dict]:
+    """Wait for a submit_sport job and return the sport's process_sport result."""
+    if isinstance(job, list):
+        return process_sport_sharded(sport, job, snapshot_db, pretty, record)
+    return job.result()
+
+def refresh_and_process(sports: List[str], skip_refresh: bool = False, snapshot_db: Optional[str] = None,
+                        pretty: bool = False, parallel: bool = False, shards: int = DEFAULT_SHARDS,
+                        budget: Optional[Dict] = None,
+                        on_result: Optional[Callable[[str, Optional[Dict]], None]] = None,
+                        record: bool = True) -> List[Optional[Dict]]:
+    """
+    Refresh sports in-process and analyze each one as soon as its own fetch
+    finishes, while the other sports are still being fetched.
+    
+    Without --parallel a sport is analyzed on the refresh's completion
+    callback; with it, the sport is submitted to a process pool (see
+    process_sports_parallel) and collected on a separate thread. Sports not
+    refreshed (--no-refresh, or a failed refresh) are analyzed from the data
+    files afterwards.
+    
+    Returns one result per sport, in the order given. on_result(sport,
+    result) is called as each result is ready, in completion order.
+    record=False leaves the recording to the caller (see finalize_sport).
+    """
+    results: Dict[str, Optional[Dict]] = {}
     
-    return {
-        "sport": sport,
-        "sport_name": config["sport_name"],
-        "matched_games": len(matched_games),
-        "total_kalshi_games": total_kalshi_games,
-        "total_odds_games": total_odds_games,
-        "odds_games_with_teams": odds_games_with_teams,
-        "excluded_live_games": excluded_live_count,
-        "opportunities": opportunities,
-        "total_opportunities": len(opportunities),
-    }
+    def finish(sport: str, result: Optional[Dict]):
+        results[sport] = result
+        if on_result:
+            on_result(sport, result)
+    
+    if not parallel:
+        def on_sport_done(refreshed: Dict):
+            sport = refreshed["sport"]
+            finish(sport, process_sport(sport, snapshot_db, pretty, refreshed, budget, record))
+        
+        refresh_all_data(skip_refresh=skip_refresh, write_db=snapshot_db is not None, pretty=pretty,
+                         sports=sports, on_sport_done=on_sport_done)
+        for sport in sports:
+            if sport not in results:
+                finish(sport, process_sport(sport, snapshot_db, pretty, None, budget, record))
+        return [results[sport] for sport in sports]
+    
+    jobs = queue.Queue()
+    errors = []
+    
+    def collect():
+        # Results are collected in submission order, i.e. fetch completion order
+        while True:
+            item = jobs.get()
+            if item is None:
+                return
+            sport, job = item
+            try:
+                finish(sport, collect_sport(sport, job, snapshot_db, pretty, record))
+            except BaseException as e:
+                errors.append(e)
+                return
+    
+    with ProcessPoolExecutor(max_workers=os.cpu_count() or 1) as executor:
+        # The pool forks its workers on first use: do that before the refresh
+        # threads exist, not from inside the callback
+        executor.submit(os.getpid).result()
+        submitted = set()
+        
+        def submit(sport: str, refreshed: Optional[Dict]):
+            submitted.add(sport)
+            jobs.put((sport, submit_sport(executor, sport, len(sports) == 1, snapshot_db, pretty,
+                                          refreshed, shards, budget, record)))
+        
+        collector = threading.Thread(target=collect, name="collect-sports", daemon=True)
+        collector.start()
+        try:
+            refresh_all_data(skip_refresh=skip_refresh, write_db=snapshot_db is not None, pretty=pretty,
+                             sports=sports, on_sport_done=lambda refreshed: submit(refreshed["sport"], refreshed))
+            for sport in sports:
+                if sport not in submitted:
+                    submit(sport, None)
+        finally:
+            jobs.put(None)
+            collector.join()
+    if errors:
+        raise errors[0]
+    return [results[sport] for sport in sports]
 
-def refresh_all_data(skip_refresh: bool = False) -> bool:
+def refresh_all_data(skip_refresh: bool = False, write_db: bool = False, pretty: bool = False,
+                     sports: Optional[List[str]] = None,
+                     on_sport_done: Optional[Callable[[Dict], None]] = None) -> Dict[str, Dict]:
     """
-    Refresh all data by running refresh_all_data.py.
+    Refresh data in-process with refresh_all_data.refresh_all.
     
     Args:
         skip_refresh: If True, skip the refresh step
+        write_db: If True, the fetchers also append to the SQLite snapshot store
+        pretty: If True, the fetchers write indented JSON
+        sports: Sports to refresh (default: every sport in SPORT_CONFIG)
+        on_sport_done: Called with each sport's refresh_sport result as soon
+                       as that sport finishes (errors it raises propagate)
     
     Returns:
-        True if refresh was successful or skipped, False if refresh failed
+        Dict of sport -> refresh_sport result, carrying the freshly fetched
+        data in memory (empty if the refresh was skipped). Sports whose fetch
+        failed fall back to the existing data files.
     """
     if skip_refresh:
         print(f"{Fore.YELLOW}Skipping data refresh (--no-refresh flag used).{Style.RESET_ALL}")
-        return True
+        return {}
     
     print(f"{Fore.CYAN}{Style.BRIGHT}Refreshing all data to ensure freshness...{Style.RESET_ALL}")
     print(f"{Fore.CYAN}{'='*80}{Style.RESET_ALL}\n")
     
-    refresh_script = os.path.join(SCRIPTS_DIR, "refresh_all_data.py")
+    callback_errors = []
+    
+    def sport_done(result: Dict):
+        try:
+            on_sport_done(result)
+        except BaseException as e:
+            callback_errors.append(e)
+            raise
     
     try:
-        # Explicitly pass environment variables to ensure API key is available
-        env = os.environ.copy()
-        result = subprocess.run(
-            [sys.executable, refresh_script],
-            cwd=PROJECT_ROOT,
-            env=env,
-            capture_output=False,  # Show output in real-time
-            text=True
-        )
-        
-        if result.returncode == 0:
-            print(f"\n{Fore.GREEN}✓ Data refresh completed successfully!{Style.RESET_ALL}\n")
-            return True
-        else:
-            print(f"\n{Fore.YELLOW}⚠ Data refresh completed with warnings. Continuing with existing data...{Style.RESET_ALL}\n")
-            return True  # Continue anyway - existing data might still be usable
+        results = refresh_all(sports or list(SPORT_CONFIG.keys()), write_db=write_db, pretty=pretty,
+                              on_sport_done=sport_done if on_sport_done else None)
     except Exception as e:
+        if e in callback_errors:
+            raise
         print(f"\n{Fore.RED}✗ Error refreshing data: {e}{Style.RESET_ALL}")
         print(f"{Fore.YELLOW}Continuing with existing data...{Style.RESET_ALL}\n")
-        return True  # Continue anyway - existing data might still be usable
+        return {}  # Continue anyway - existing data might still be usable
+    
+    if all(r["kalshi_ok"] and r["odds_ok"] for r in results.values()):
+        print(f"\n{Fore.GREEN}✓ Data refresh completed successfully!{Style.RESET_ALL}\n")
+    else:
+        print(f"\n{Fore.YELLOW}⚠ Data refresh completed with warnings. Continuing with existing data...{Style.RESET_ALL}\n")
+    return results
+
+def input_signature(sport: str) -> Tuple:
+    """Content hashes (or mtimes, for files without a header) of a sport's input files."""
+    config = SPORT_CONFIG[sport]
+    signature = []
+    for file_key in ("kalshi_file", "odds_file"):
+        path = os.path.join(DATA_DIR, config[file_key])
+        if not os.path.exists(path):
+            signature.append(None)
+            continue
+        header = read_header(path)
+        signature.append(header["content_hash"] if header else os.path.getmtime(path))
+    return tuple(signature)
+
+def make_watch_producer(sports: List[str], skip_refresh: bool, snapshot_db: Optional[str] = None,
+                        pretty: bool = False, alert_engine: Optional["alerts.AlertEngine"] = None,
+                        budget: Optional[Dict] = None, bankroll: Optional[float] = None):
+    """
+    Build the --watch dashboard's produce() callable.
+    Each call refreshes in-process and re-analyzes every sport; with
+    skip_refresh only sports whose input files changed are re-analyzed.
+    Console output is swallowed so it does not tear up the curses screen.
+    With bankroll, every sport's opportunities are sized together each
+    cycle before the re-analyzed sports are recorded.
+    Re-analyzed sports are evaluated by alert_engine when given.
+    """
+    last_inputs = {}
+    last_results = {}
+    
+    def produce() -> List[Optional[Dict]]:
+        with contextlib.redirect_stdout(io.StringIO()):
+            fetched = {}
+            if not skip_refresh:
+                fetched = refresh_all_data(write_db=snapshot_db is not None, pretty=pretty, sports=sports)
+            changed = []
+            for sport in sports:
+                signature = input_signature(sport)
+                if sport in fetched or signature != last_inputs.get(sport):
+                    last_results[sport] = process_sport(sport, snapshot_db, pretty, fetched.get(sport), budget,
+                                                        record=not bankroll)
+                    last_inputs[sport] = signature
+                    changed.append(sport)
+            if bankroll and changed:
+                size_opportunities([(sport, last_results.get(sport)) for sport in sports], bankroll)
+                for sport in changed:
+                    if last_results[sport]:
+                        record_sport(sport, last_results[sport], snapshot_db, pretty)
+            for sport in changed:
+                metrics.observe_sport(sport, last_results[sport])
+                if alert_engine:
+                    alert_engine.evaluate(sport, last_results[sport]["opportunities"] if last_results[sport] else [])
+        return [last_results.get(sport) for sport in sports]
+    
+    return produce
+
+def size_opportunities(results: List[Tuple[str, Optional[Dict]]], bankroll: float,
+                       max_total: float = stake_optimizer.MAX_TOTAL_EXPOSURE) -> Dict:
+    """
+    Size every opportunity of the (sport, result) pairs together (see
+    stake_optimizer.py), print the portfolio summary and return it.
+    
+    The results are sized in place before they are recorded (see
+    record_sport), so the stakes reach the ledger, the snapshot store and
+    the output files. max_total is the share of the bankroll still available.
+    """
+    positions = [(sport, opp) for sport, result in results if result for opp in result["opportunities"]]
+    with tracing.span("size"):
+        summary = stake_optimizer.optimize_stakes(positions, bankroll, max_total=max_total)
+    print(f"{Fore.CYAN}{stake_optimizer.format_summary(summary)}{Style.RESET_ALL}")
+    return summary
+
+def print_simulation(opportunities: List[Dict]):
+    """Print bankroll_sim's joint P&L and drawdown report for a slate."""
+    with tracing.span("simulate"):
+        report = bankroll_sim.simulate(opportunities)
+    print(f"\n{Fore.CYAN}{'='*80}{Style.RESET_ALL}")
+    print(bankroll_sim.format_report(report))
+    print(f"{Fore.CYAN}{'='*80}{Style.RESET_ALL}\n")
 
 def main():
     """
@@ -1105,14 +1823,248 @@ def main():
     Command line arguments:
         <sport> - Process only the specified sport
         --no-refresh - Skip automatic data refresh
+        --db - Append opportunities to the SQLite snapshot store (and read
+               from it when a JSON data file is missing)
+        --pretty - Write indented JSON for humans (default compact)
+        --parallel - Process sports on a process pool (one worker per CPU);
+                     large slates (SHARDED_SPORTS, or the single sport given)
+                     are split into event chunks
+        --shards N - Chunks per sharded sport with --parallel (default 4)
+        --watch [SECONDS] - Live dashboard instead of the printed report,
+                            re-analyzing every SECONDS (default 60, or 5
+                            with --no-refresh, when only changed files are
+                            re-analyzed)
+        --ndjson [TARGET] - Emit one JSON line per opportunity as each sport
+                            finishes, instead of the report. TARGET is "-"
+                            (stdout, default), a file/FIFO path,
+                            tcp://HOST:PORT or unix:PATH
+        --alerts CONFIG - Evaluate alert rules (see alerts.py) against the results
+        --bankroll DOLLARS - Size every opportunity together with fractional
+                             Kelly and exposure caps (see stake_optimizer.py)
+        --simulate - After the report, simulate the slate's joint P&L and
+                     drawdowns (see bankroll_sim.py)
+        --clv - Track closing-line value of every opportunity (see
+                clv_tracker.py): captured in-process with --watch, otherwise
+                appended to the intake file for clv_tracker.py --run
+        --metrics FILE - Write Prometheus metrics (see metrics.py) to FILE at
+                         exit (and after every --watch cycle)
+        --max-age SECONDS - Staleness budget: oldest Kalshi or sportsbook
+                            price an opportunity may be computed from
+        --max-skew SECONDS - Staleness budget: largest gap between when the
+                             two legs were observed
+        --stale-action refresh|drop - Over-budget opportunities have their
+                                      stale legs re-fetched (default) or are
+                                      dropped
+        --profile - Print per-stage and per-sport timings (see tracing.py) at exit
+        --profile-capture MODE - Also run cProfile ("cprofile"), tracemalloc
+                                 ("tracemalloc") or both ("both") and write
+                                 the reports to data/profiles/
     """
     # Check for --no-refresh flag
     skip_refresh = "--no-refresh" in sys.argv
     if skip_refresh:
         sys.argv.remove("--no-refresh")
     
-    # Refresh data before analysis (unless --no-refresh flag is used)
-    refresh_all_data(skip_refresh=skip_refresh)
+    # Check for --db flag
+    snapshot_db = DEFAULT_DB_PATH if "--db" in sys.argv else None
+    if snapshot_db:
+        sys.argv.remove("--db")
+    
+    # Check for --pretty flag
+    pretty = "--pretty" in sys.argv
+    if pretty:
+        sys.argv.remove("--pretty")
+    
+    # Check for --parallel / --shards N
+    parallel = "--parallel" in sys.argv
+    if parallel:
+        sys.argv.remove("--parallel")
+    shards = DEFAULT_SHARDS
+    if "--shards" in sys.argv:
+        idx = sys.argv.index("--shards")
+        try:
+            shards = int(sys.argv[idx + 1])
+        except (IndexError, ValueError):
+            print("Error: --shards requires a number")
+            sys.exit(1)
+        del sys.argv[idx:idx + 2]
+    
+    # Check for --watch [SECONDS]
+    watch_interval = None
+    if "--watch" in sys.argv:
+        idx = sys.argv.index("--watch")
+        watch_interval = WATCH_FILES_SECONDS if skip_refresh else WATCH_REFRESH_SECONDS
+        if idx + 1 < len(sys.argv) and sys.argv[idx + 1].replace(".", "", 1).isdigit():
+            watch_interval = float(sys.argv.pop(idx + 1))
+        sys.argv.pop(idx)
+    
+    # Check for --alerts CONFIG
+    alert_engine = None
+    if "--alerts" in sys.argv:
+        idx = sys.argv.index("--alerts")
+        if idx + 1 >= len(sys.argv):
+            print("Error: --alerts requires a config file")
+            sys.exit(1)
+        alert_engine = alerts.load_alert_engine(sys.argv[idx + 1])
+        del sys.argv[idx:idx + 2]
+    
+    # Check for --bankroll DOLLARS
+    bankroll = None
+    if "--bankroll" in sys.argv:
+        idx = sys.argv.index("--bankroll")
+        try:
+            bankroll = float(sys.argv[idx + 1])
+        except (IndexError, ValueError):
+            print("Error: --bankroll requires a dollar amount")
+            sys.exit(1)
+        del sys.argv[idx:idx + 2]
+    
+    # Check for --simulate flag
+    simulate = "--simulate" in sys.argv
+    if simulate:
+        sys.argv.remove("--simulate")
+    
+    # Check for --clv flag
+    clv = "--clv" in sys.argv
+    if clv:
+        sys.argv.remove("--clv")
+    
+    def record_result(sport: str, result: Optional[Dict]):
+        metrics.observe_sport(sport, result)
+        if alert_engine:
+            alert_engine.evaluate(sport, result["opportunities"] if result else [])
+        if clv and result:
+            clv_tracker.hand_off(sport, result["opportunities"])
+    
+    # Check for --metrics FILE
+    metrics_file = None
+    if "--metrics" in sys.argv:
+        idx = sys.argv.index("--metrics")
+        if idx + 1 >= len(sys.argv):
+            print("Error: --metrics requires a file path")
+            sys.exit(1)
+        metrics_file = sys.argv[idx + 1]
+        del sys.argv[idx:idx + 2]
+        atexit.register(metrics.write_textfile, metrics_file)
+    
+    # Check for --max-age / --max-skew / --stale-action (staleness budget)
+    budget = None
+    budget_values = {}
+    for flag in ("--max-age", "--max-skew", "--stale-action"):
+        if flag in sys.argv:
+            idx = sys.argv.index(flag)
+            if idx + 1 >= len(sys.argv):
+                print(f"Error: {flag} requires a value")
+                sys.exit(1)
+            budget_values[flag] = sys.argv[idx + 1]
+            del sys.argv[idx:idx + 2]
+    if "--max-age" in budget_values or "--max-skew" in budget_values:
+        try:
+            budget = {
+                "max_age_seconds": float(budget_values["--max-age"]) if "--max-age" in budget_values else None,
+                "max_skew_seconds": float(budget_values["--max-skew"]) if "--max-skew" in budget_values else None,
+                "action": budget_values.get("--stale-action", "refresh"),
+            }
+        except ValueError:
+            print("Error: --max-age and --max-skew require a number of seconds")
+            sys.exit(1)
+        if budget["action"] not in STALE_ACTIONS:
+            print(f"Error: --stale-action must be one of {', '.join(STALE_ACTIONS)}")
+            sys.exit(1)
+    
+    # Check for --profile / --profile-capture MODE
+    profile = "--profile" in sys.argv
+    if profile:
+        sys.argv.remove("--profile")
+    profile_capture = None
+    if "--profile-capture" in sys.argv:
+        idx = sys.argv.index("--profile-capture")
+        if idx + 1 >= len(sys.argv) or sys.argv[idx + 1] not in ("cprofile", "tracemalloc", "both"):
+            print("Error: --profile-capture requires cprofile, tracemalloc or both")
+            sys.exit(1)
+        profile_capture = sys.argv[idx + 1]
+        del sys.argv[idx:idx + 2]
+    
+    # Check for --ndjson [TARGET]
+    ndjson_target = None
+    if "--ndjson" in sys.argv:
+        idx = sys.argv.index("--ndjson")
+        ndjson_target = "-"
+        if idx + 1 < len(sys.argv) and (sys.argv[idx + 1] == "-" or sys.argv[idx + 1].lower() not in SPORT_CONFIG):
+            ndjson_target = sys.argv.pop(idx + 1)
+        sys.argv.pop(idx)
+    
+    # Reports are printed at exit so every mode (and early sys.exit) is covered;
+    # with --ndjson they go to stderr to keep the record stream clean
+    profile_stream = sys.stderr if ndjson_target is not None else sys.stdout
+    if profile:
+        tracing.enable()
+        atexit.register(lambda: print(f"\n{'='*80}\nPROFILE\n{'='*80}\n{tracing.report()}", file=profile_stream))
+    if profile_capture:
+        capture = contextlib.ExitStack()
+        capture.enter_context(tracing.capture(profile_capture, label="compare_odds", stream=profile_stream))
+        atexit.register(capture.close)
+    
+    if ndjson_target is not None:
+        sports = [arg.lower() for arg in sys.argv[1:2]] or list(SPORT_CONFIG.keys())
+        if sports[0] not in SPORT_CONFIG:
+            print(f"Error: Unsupported sport '{sports[0]}'", file=sys.stderr)
+            sys.exit(1)
+        writer = ndjson_output.NDJSONWriter(ndjson_target)
+        # Keep stdout clean for records: progress and warnings go to stderr
+        with contextlib.redirect_stdout(sys.stderr):
+            staked = {"total": 0.0}
+            
+            def on_result(sport: str, result: Optional[Dict]):
+                if bankroll and result:
+                    # Sports are sized as they finish, each within what the
+                    # earlier ones left of the total exposure cap
+                    remaining = max(0.0, stake_optimizer.MAX_TOTAL_EXPOSURE - staked["total"] / bankroll)
+                    staked["total"] += size_opportunities([(sport, result)], bankroll, remaining)["total_stake"]
+                    record_sport(sport, result, snapshot_db, pretty)
+                writer.emit_sport(sport, result)
+                record_result(sport, result)
+            
+            # A sport's records go out as soon as its own refresh and analysis finish
+            refresh_and_process(sports, skip_refresh, snapshot_db, pretty, parallel, shards, budget,
+                                on_result=on_result, record=not bankroll)
+        writer.close()
+        return
+    
+    if watch_interval is not None:
+        sports = [arg.lower() for arg in sys.argv[1:2]] or list(SPORT_CONFIG.keys())
+        if sports[0] not in SPORT_CONFIG:
+            print(f"Error: Unsupported sport '{sports[0]}'")
+            print(f"Supported sports: {', '.join(SPORT_CONFIG.keys())}")
+            sys.exit(1)
+        produce = make_watch_producer(sports, skip_refresh, snapshot_db, pretty, alert_engine, budget, bankroll)
+        if metrics_file:
+            watch_produce = produce
+            def produce() -> List[Optional[Dict]]:
+                results = watch_produce()
+                metrics.write_textfile(metrics_file)
+                return results
+        tracker = None
+        if clv:
+            # Captured in-process rather than handed off to clv_tracker.py --run
+            tracker = clv_tracker.ClvTracker(capture_closing_lines)
+            clv_produce = produce
+            def produce() -> List[Optional[Dict]]:
+                results = clv_produce()
+                for sport, result in zip(sports, results):
+                    if result:
+                        tracker.track(sport, result["opportunities"])
+                return results
+            tracker.start()
+        try:
+            dashboard.run_dashboard(produce, generate_opportunity_table, watch_interval)
+        except RuntimeError as e:
+            print(f"Error: {e}")
+            sys.exit(1)
+        finally:
+            if tracker:
+                tracker.stop()
+        return
     
     # If sport argument provided, process only that sport
     if len(sys.argv) >= 2:
@@ -1122,7 +2074,13 @@ def main():
             print(f"Supported sports: {', '.join(SPORT_CONFIG.keys())}")
             sys.exit(1)
         
-        result = process_sport(sport)
+        # Refresh data before analysis (unless --no-refresh flag is used)
+        result = refresh_and_process([sport], skip_refresh, snapshot_db, pretty, parallel, shards, budget,
+                                     record=not bankroll)[0]
+        if bankroll and result:
+            size_opportunities([(sport, result)], bankroll)
+            record_sport(sport, result, snapshot_db, pretty)
+        record_result(sport, result)
         if result is None:
             sys.exit(1)
         
@@ -1132,6 +2090,7 @@ def main():
         total_kalshi = result.get('total_kalshi_games', 0)
         total_odds = result.get('total_odds_games', 0)
         excluded_live = result.get('excluded_live_games', 0)
+        stale_dropped = result.get('stale_dropped', 0)
         
         summary_border = f"{Fore.CYAN}{'='*80}{Style.RESET_ALL}"
         print(f"\n{summary_border}")
@@ -1140,6 +2099,8 @@ def main():
         summary_text += f"\n  {Fore.YELLOW}Total Sportsbook games:{Style.RESET_ALL} {total_odds}"
         if excluded_live > 0:
             summary_text += f"\n  {Fore.RED}Excluded live games:{Style.RESET_ALL} {excluded_live} {Fore.CYAN}(games that have started){Style.RESET_ALL}"
+        if stale_dropped > 0:
+            summary_text += f"\n  {Fore.RED}Dropped stale opportunities:{Style.RESET_ALL} {stale_dropped} {Fore.CYAN}(over the staleness budget){Style.RESET_ALL}"
         summary_text += f"\n  {Fore.YELLOW}Matched & Analyzed:{Style.RESET_ALL} {total_games}"
         summary_text += f"\n  {Fore.GREEN}Positive EV opportunities:{Style.RESET_ALL} {total_opps}"
         if total_games > 0:
@@ -1154,19 +2115,29 @@ def main():
                 opp_header = f"{Fore.CYAN}{Style.BRIGHT}[{i}/{total_opps}]{Style.RESET_ALL} {Fore.MAGENTA}[{result['sport_name']}]{Style.RESET_ALL}"
                 print(opp_header)
                 print(f"{Fore.CYAN}{'-'*80}{Style.RESET_ALL}")
-                table = generate_opportunity_table(opp)
+                with tracing.span("render"):
+                    table = generate_opportunity_table(opp)
                 print(table)
                 if i < total_opps:
                     print(f"\n{Fore.CYAN}{'='*80}{Style.RESET_ALL}\n")
         else:
             print(f"{Fore.RED}No positive EV opportunities found for {result['sport_name']}.{Style.RESET_ALL}\n")
         
+        if simulate and total_opps > 0:
+            print_simulation(result['opportunities'])
         return
     
-    # No argument provided - process all sports
+    # No argument provided - process all sports, each as soon as its refresh finishes
+    sport_results = refresh_and_process(list(SPORT_CONFIG.keys()), skip_refresh, snapshot_db, pretty,
+                                        parallel, shards, budget, record=not bankroll)
+    if bankroll:
+        size_opportunities(list(zip(SPORT_CONFIG.keys(), sport_results)), bankroll)
+        for sport, result in zip(SPORT_CONFIG.keys(), sport_results):
+            if result:
+                record_sport(sport, result, snapshot_db, pretty)
     all_results = []
-    for sport in SPORT_CONFIG.keys():
-        result = process_sport(sport)
+    for sport, result in zip(SPORT_CONFIG.keys(), sport_results):
+        record_result(sport, result)
         if result:
             all_results.append(result)
     
@@ -1183,6 +2154,7 @@ def main():
     total_odds_games = sum(result.get('total_odds_games', 0) for result in all_results)
     total_odds_with_teams = sum(result.get('odds_games_with_teams', 0) for result in all_results)
     total_excluded_live = sum(result.get('excluded_live_games', 0) for result in all_results)
+    total_stale_dropped = sum(result.get('stale_dropped', 0) for result in all_results)
     
     # Collect all opportunities across all sports
     all_opps = []
@@ -1201,6 +2173,8 @@ def main():
         summary_text += f" ({Fore.CYAN}{total_odds_with_teams} with team data{Style.RESET_ALL})"
     if total_excluded_live > 0:
         summary_text += f"\n  {Fore.RED}Excluded live games:{Style.RESET_ALL} {total_excluded_live} {Fore.CYAN}(games that have started){Style.RESET_ALL}"
+    if total_stale_dropped > 0:
+        summary_text += f"\n  {Fore.RED}Dropped stale opportunities:{Style.RESET_ALL} {total_stale_dropped} {Fore.CYAN}(over the staleness budget){Style.RESET_ALL}"
     summary_text += f"\n  {Fore.YELLOW}Matched & Analyzed:{Style.RESET_ALL} {total_games_analyzed}"
     if total_odds_with_teams > 0:
         match_rate = (total_games_analyzed / total_odds_with_teams) * 100
@@ -1231,12 +2205,16 @@ def main():
             print(opp_header)
             print(f"{Fore.CYAN}{'-'*80}{Style.RESET_ALL}")
             
-            table = generate_opportunity_table(opp)
+            with tracing.span("render"):
+                table = generate_opportunity_table(opp)
             print(table)
             
             # Add separator between opportunities (except last one)
             if i < len(all_opps):
                 print(f"\n{Fore.CYAN}{'='*80}{Style.RESET_ALL}\n")
+        
+        if simulate:
+            print_simulation(all_opps)
     else:
         print(f"\n{Fore.RED}No positive EV opportunities found across all sports.{Style.RESET_ALL}")
 
@@ -0,0 +1,227 @@
+"""
+Live terminal dashboard (compare_odds.py --watch).
+
+A fixed-layout curses table with one row per opportunity instead of the
+multi-line report. Results come from a ResultFeed that recomputes them on a
+background thread; on every tick only the cells whose text changed are
+rewritten, and the detail pane (compare_odds.generate_opportunity_table) is
+rendered only for the selected row, and only when that row changes.
+
+Keys: up/down or j/k select, s toggles sort (EV / edge), q quits.
+"""
+import re
+import threading
+from datetime import datetime
+from typing import Callable, Dict, List, Optional, Tuple
+
+from opportunity_ledger import get_bet_price, get_edge_cents, opportunity_key
+
+try:
+    import curses
+    CURSES_AVAILABLE = True
+except ImportError:
+    # Windows needs the windows-curses package
+    curses = None
+    CURSES_AVAILABLE = False
+
+# Seconds between screen refresh ticks (key presses are handled immediately)
+TICK_SECONDS = 0.5
+
+SORT_KEYS = {
+    "ev": lambda opp: opp.get("expected_value") or 0,
+    "edge": lambda opp: get_edge_cents(opp) or 0,
+}
+
+ANSI_RE = re.compile(r"\x1b\[[0-9;]*m")
+
+def format_start(commence_time: Optional[str]) -> str:
+    if not commence_time:
+        return ""
+    try:
+        start = datetime.fromisoformat(commence_time.replace("Z", "+00:00"))
+    except ValueError:
+        return commence_time[:16]
+    return start.astimezone().strftime("%a %H:%M")
+
+# (title, width, cell text)
+COLUMNS: List[Tuple[str, int, Callable[[Dict], str]]] = [
+    ("Sport", 7, lambda opp: opp.get("sport", "")),
+    ("Game", 44, lambda opp: f"{opp.get('away_team', '')} @ {opp.get('home_team', '')}"),
+    ("Bet", 22, lambda opp: opp.get("bet_team_name", "")),
+    ("Kalshi", 7, lambda opp: f"{get_bet_price(opp) or 0:.0f}c"),
+    ("Edge", 7, lambda opp: f"{get_edge_cents(opp) or 0:+.1f}c"),
+    ("EV", 8, lambda opp: f"${opp.get('expected_value', 0):.2f}"),
+    ("Starts", 10, lambda opp: format_start(opp.get("commence_time"))),
+]
+
+class ResultFeed:
+    """
+    Recomputes results on a background thread.
+    produce() returns a list of process_sport results (None entries allowed);
+    it runs immediately and then every interval seconds.
+    """
+
+    def __init__(self, produce: Callable[[], List[Optional[Dict]]], interval: float):
+        self.produce = produce
+        self.interval = interval
+        self.results: List[Dict] = []
+        self.version = 0
+        self.updated_at: Optional[datetime] = None
+        self.error: Optional[str] = None
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="result-feed", daemon=True)
+
+    def start(self):
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+
+    def _run(self):
+        while not self._stop.is_set():
+            try:
+                results = [r for r in self.produce() if r]
+                self.results = results
+                self.error = None
+            except Exception as e:
+                self.error = str(e)
+            self.updated_at = datetime.now()
+            self.version += 1
+            self._stop.wait(self.interval)
+
+def flatten_opportunities(results: List[Dict]) -> List[Dict]:
+    """One dict per opportunity, tagged with its sport name."""
+    return [dict(opp, sport=result["sport_name"]) for result in results for opp in result["opportunities"]]
+
+class Dashboard:
+    """Curses screen state: what is drawn where, selection and sort order."""
+
+    def __init__(self, stdscr, feed: ResultFeed, render_detail: Callable[[Dict], str], sort_key: str = "ev"):
+        self.stdscr = stdscr
+        self.feed = feed
+        self.render_detail = render_detail
+        self.sort_key = sort_key
+        self.rows: List[Dict] = []
+        self.selected = 0
+        self.selected_key: Optional[str] = None
+        self.seen_version = -1
+        self.drawn: Dict[Tuple[int, int], Tuple[str, int]] = {}  # (y, x) -> (text, attr) on screen
+        self.detail_for: Optional[Tuple] = None
+        self.detail_lines: List[str] = []
+
+    def put(self, y: int, x: int, text: str, width: int, attr: int = 0):
+        """Write a cell only if its text or attribute changed."""
+        height, screen_width = self.stdscr.getmaxyx()
+        if y >= height or x >= screen_width:
+            return
+        width = min(width, screen_width - x - (1 if y == height - 1 else 0))
+        if width <= 0:
+            return
+        text = text[:width].ljust(width)
+        if self.drawn.get((y, x)) == (text, attr):
+            return
+        try:
+            self.stdscr.addstr(y, x, text, attr)
+        except curses.error:
+            return
+        self.drawn[(y, x)] = (text, attr)
+
+    def update_rows(self):
+        if self.feed.version == self.seen_version:
+            return
+        self.seen_version = self.feed.version
+        self.rows = sorted(flatten_opportunities(self.feed.results), key=SORT_KEYS[self.sort_key], reverse=True)
+        self.reselect()
+
+    def reselect(self):
+        """Keep the same opportunity selected across re-sorts and refreshes."""
+        keys = [opportunity_key(opp) for opp in self.rows]
+        if self.selected_key in keys:
+            self.selected = keys.index(self.selected_key)
+        self.selected = max(0, min(self.selected, len(self.rows) - 1))
+        self.selected_key = keys[self.selected] if keys else None
+
+    def draw(self):
+        height, width = self.stdscr.getmaxyx()
+        table_height = max(3, (height - 2) // 2)
+
+        status = f" {len(self.rows)} opportunities | sort: {self.sort_key} (s) | q: quit"
+        if self.feed.updated_at:
+            status += f" | updated {self.feed.updated_at.strftime('%H:%M:%S')}"
+        if self.feed.error:
+            status += f" | error: {self.feed.error}"
+        self.put(0, 0, status, width, curses.A_REVERSE)
+
+        x = 0
+        for title, col_width, _ in COLUMNS:
+            self.put(1, x, title, col_width + 1, curses.A_BOLD)
+            x += col_width + 1
+
+        # Scroll so the selection stays visible
+        visible = table_height - 2
+        top = max(0, self.selected - visible + 1)
+        for line in range(visible):
+            y = 2 + line
+            index = top + line
+            attr = curses.A_REVERSE if index == self.selected else 0
+            x = 0
+            for _, col_width, cell in COLUMNS:
+                text = cell(self.rows[index]) if index < len(self.rows) else ""
+                self.put(y, x, text, col_width + 1, attr)
+                x += col_width + 1
+
+        self.draw_detail(table_height, height, width)
+        self.stdscr.noutrefresh()
+        curses.doupdate()
+
+    def draw_detail(self, top: int, height: int, width: int):
+        opp = self.rows[self.selected] if self.rows else None
+        detail_key = (opportunity_key(opp), opp.get("expected_value"), get_bet_price(opp)) if opp else None
+        if detail_key != self.detail_for:
+            self.detail_for = detail_key
+            self.detail_lines = ANSI_RE.sub("", self.render_detail(opp)).splitlines() if opp else []
+        self.put(top, 0, "-" * width, width)
+        for line in range(height - top - 1):
+            text = self.detail_lines[line] if line < len(self.detail_lines) else ""
+            self.put(top + 1 + line, 0, text, width)
+
+    def handle_key(self, key: int) -> bool:
+        """Returns False when the dashboard should exit."""
+        if key in (ord("q"), ord("Q"), 27):
+            return False
+        if key in (curses.KEY_DOWN, ord("j")):
+            self.selected = min(self.selected + 1, len(self.rows) - 1)
+        elif key in (curses.KEY_UP, ord("k")):
+            self.selected = max(self.selected - 1, 0)
+        elif key in (ord("s"), ord("S")):
+            self.sort_key = "edge" if self.sort_key == "ev" else "ev"
+            self.rows.sort(key=SORT_KEYS[self.sort_key], reverse=True)
+        elif key == curses.KEY_RESIZE:
+            self.stdscr.erase()
+            self.drawn.clear()
+        if self.rows:
+            self.selected_key = opportunity_key(self.rows[max(0, self.selected)])
+        self.reselect()
+        return True
+
+    def run(self):
+        curses.curs_set(0)
+        self.stdscr.timeout(int(TICK_SECONDS * 1000))
+        while True:
+            self.update_rows()
+            self.draw()
+            key = self.stdscr.getch()
+            if key != -1 and not self.handle_key(key):
+                return
+
+def run_dashboard(produce: Callable[[], List[Optional[Dict]]], render_detail: Callable[[Dict], str],
+                  interval: float, sort_key: str = "ev"):
+    """Start a ResultFeed around produce() and show the dashboard until q is pressed."""
+    if not CURSES_AVAILABLE:
+        raise RuntimeError("curses is not available (on Windows: pip install windows-curses)")
+    feed = ResultFeed(produce, interval)
+    feed.start()
+    try:
+        curses.wrapper(lambda stdscr: Dashboard(stdscr, feed, render_detail, sort_key).run())
+    finally:
+        feed.stop()
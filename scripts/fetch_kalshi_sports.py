@@ -1,15 +1,24 @@
 import requests
-import json
 import time
 import os
 import sys
+import threading
 from datetime import datetime, timedelta, timezone
+from typing import Dict, List, Optional
+
+from json_io import write_json
+from market_records import MarketRecord
+from snapshot_store import DEFAULT_DB_PATH, SnapshotStore
+import metrics
+import tracing
+import upstream_replay
 
 # Get the project root directory (parent of scripts folder)
 PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
 DATA_DIR = os.path.join(PROJECT_ROOT, "data")
 
-BASE_URL = "https://api.elections.kalshi.com/trade-api/v2"
+# Override to point at a stand-in (see upstream_replay.py)
+BASE_URL = os.getenv("KALSHI_BASE_URL") or "https://api.elections.kalshi.com/trade-api/v2"
 
 # Sport configuration
 SPORT_CONFIG = {
@@ -69,6 +78,41 @@ SPORT_CONFIG = {
     },
 }
 
+# Sports series listing shared by all sports within one refresh
+SERIES_CACHE_SECONDS = 300
+_series_cache = {}
+_series_cache_lock = threading.Lock()
+
+# Rate-limited (429) and server-error responses are retried with exponential backoff
+MAX_RETRIES = 2
+RETRY_BACKOFF_SECONDS = 1.0
+RETRY_STATUSES = (429, 500, 502, 503, 504)
+
+def get_page(path, params):
+    """
+    GET one Kalshi page, retrying transient failures.
+    Every attempt is counted in the request metrics.
+    """
+    attempt = 0
+    while True:
+        start = time.perf_counter()
+        try:
+            r = requests.get(f"{BASE_URL}{path}", params=params, timeout=30)
+        except (requests.exceptions.ConnectionError, requests.exceptions.Timeout):
+            metrics.record_request("kalshi", path, "error", time.perf_counter() - start)
+            if attempt >= MAX_RETRIES:
+                raise
+        else:
+            metrics.record_request("kalshi", path, r.status_code, time.perf_counter() - start)
+            if r.status_code not in RETRY_STATUSES or attempt >= MAX_RETRIES:
+                r.raise_for_status()
+                data = r.json()
+                upstream_replay.record_exchange("kalshi", path, params, r.status_code, r.headers, data)
+                return data
+        metrics.record_retry("kalshi", path)
+        time.sleep(RETRY_BACKOFF_SECONDS * 2 ** attempt)
+        attempt += 1
+
 def get_paginated(path, params=None, list_key=None, limit=200):
     """
     Cursor-paginates Kalshi list endpoints.
@@ -83,9 +127,8 @@ def get_paginated(path, params=None, list_key=None, limit=200):
         if cursor:
             p["cursor"] = cursor
         try:
-            r = requests.get(f"{BASE_URL}{path}", params=p, timeout=30)
-            r.raise_for_status()
-            data = r.json()
+            with tracing.span("kalshi.page"):
+                data = get_page(path, p)
 
             items = data.get(list_key) or []
             if not isinstance(items, list):
@@ -110,6 +153,20 @@ def parse_iso8601(ts: str) -> datetime:
         ts = ts[:-1] + "+00:00"
     return datetime.fromisoformat(ts)
 
+def get_sports_series():
+    """
+    List every Sports series, cached for SERIES_CACHE_SECONDS so concurrent
+    per-sport fetches share one paginated listing.
+    """
+    with _series_cache_lock:
+        fetched_at = _series_cache.get("fetched_at")
+        if fetched_at is None or time.monotonic() - fetched_at > SERIES_CACHE_SECONDS:
+            series = get_paginated("/series", params={"category": "Sports"}, list_key="series", limit=200)
+            print(f"Found {len(series)} total Sports series")
+            _series_cache["series"] = series
+            _series_cache["fetched_at"] = time.monotonic()
+        return _series_cache["series"]
+
 def find_sport_series(sport: str):
     """
     Find the game series for the specified sport.
@@ -122,9 +179,7 @@ def find_sport_series(sport: str):
     keywords = config["keywords"]
     
     # Get all Sports series
-    series = get_paginated("/series", params={"category": "Sports"}, list_key="series", limit=200)
-    
-    print(f"Found {len(series)} total Sports series")
+    series = get_sports_series()
 
     # Filter to sport-specific series
     sport_series = []
@@ -161,6 +216,84 @@ def get_markets_for_series(series_ticker: str, status: str):
         print(f"  Warning: Failed to get {status} markets for {series_ticker}: {e}")
         return []
 
+def market_entry(expiration: datetime, market, keep_raw: bool = False,
+                 observed_at: Optional[str] = None) -> Dict:
+    """
+    Build one "markets" entry of the output file.
+    observed_at is when its price was fetched (ISO 8601).
+    """
+    return {
+        "expiration_time": expiration.isoformat(),
+        "ticker": market.get("ticker"),
+        "title": market.get("title"),
+        "event_ticker": market.get("event_ticker"),
+        "observed_at": observed_at,
+        "market_data": market if keep_raw else market.to_dict()
+    }
+
+def fetch_event_markets(sport: str, event_ticker: str) -> List[Dict]:
+    """
+    Fetch the current winner markets of a single event, as output file
+    entries. Used to re-poll one game without re-listing the whole sport.
+    """
+    entries = []
+    seen = set()
+    for status in ("open", "unopened"):
+        markets = get_paginated(
+            "/markets",
+            params={"event_ticker": event_ticker, "status": status},
+            list_key="markets",
+            limit=200,
+        )
+        observed_at = datetime.now(timezone.utc).isoformat()
+        for m in markets:
+            tkr = m.get("ticker")
+            if not tkr or tkr in seen:
+                continue
+            seen.add(tkr)
+            record = MarketRecord.from_api(m)
+            exp_time = record.get("expected_expiration_time") or record.get("expiration_time") or record.get("close_time")
+            if exp_time and is_winner_market(record, sport):
+                entries.append(market_entry(parse_iso8601(exp_time), record, observed_at=observed_at))
+    return entries
+
+def fetch_settled_markets(sport: str, min_close_ts: Optional[int] = None) -> List[Dict]:
+    """
+    Fetch the sport's settled winner markets (closing at or after
+    min_close_ts, Unix seconds), as output file entries whose market_data
+    carries the "result" ("yes"/"no"). Used to settle backtests.
+    """
+    params = {"series_ticker": SPORT_CONFIG[sport]["series_ticker"], "status": "settled"}
+    if min_close_ts:
+        params["min_close_ts"] = int(min_close_ts)
+    markets = get_paginated("/markets", params=params, list_key="markets", limit=200)
+    observed_at = datetime.now(timezone.utc).isoformat()
+    entries = []
+    for m in markets:
+        record = MarketRecord.from_api(m)
+        exp_time = record.get("expected_expiration_time") or record.get("expiration_time") or record.get("close_time")
+        if exp_time and is_winner_market(record, sport):
+            entries.append(market_entry(parse_iso8601(exp_time), record, observed_at=observed_at))
+    return entries
+
+def fetch_orderbook(ticker: str, depth: Optional[int] = None) -> Dict:
+    """
+    Fetch a market's orderbook: {"yes": [[price_cents, contracts], ...],
+    "no": [...]}, resting bids of each side in ascending price order.
+    A YES ask at P is a NO bid at 100 - P.
+    """
+    params = {"depth": depth} if depth else {}
+    with tracing.span("kalshi.orderbook"):
+        data = get_page(f"/markets/{ticker}/orderbook", params)
+    orderbook = data.get("orderbook") or {}
+    return {"yes": orderbook.get("yes") or [], "no": orderbook.get("no") or []}
+
+def fetch_market(ticker: str) -> Dict:
+    """Fetch one market whatever its status (its status and result once it settles)."""
+    with tracing.span("kalshi.market"):
+        data = get_page(f"/markets/{ticker}", {})
+    return data.get("market") or {}
+
 def has_upcoming_markets(series_ticker: str, now: datetime, week_end: datetime):
     """
     Quickly check if a series has any markets closing in the next week.
@@ -222,19 +355,29 @@ def is_winner_market(market, sport: str):
     
     return True
 
-def main():
-    # Get sport from command line argument
-    if len(sys.argv) < 2:
-        print("Usage: python fetch_kalshi_sports.py <sport>")
-        print(f"Supported sports: {', '.join(SPORT_CONFIG.keys())}")
-        sys.exit(1)
+def fetch_sport(
+    sport: str,
+    keep_raw: bool = False,
+    export_json: bool = True,
+    write_db: bool = False,
+    pretty: bool = False,
+    verbose: bool = True,
+) -> Optional[Dict]:
+    """
+    Fetch winner markets for a sport closing in the next 7 days.
     
-    sport = sys.argv[1].lower()
-    if sport not in SPORT_CONFIG:
-        print(f"Error: Unsupported sport '{sport}'")
-        print(f"Supported sports: {', '.join(SPORT_CONFIG.keys())}")
-        sys.exit(1)
+    Args:
+        sport: Sport key from SPORT_CONFIG
+        keep_raw: Keep the full Kalshi market payload instead of MarketRecord projections
+        export_json: Write data/kalshi_<sport>_winner_markets.json
+        write_db: Append the snapshot to the SQLite snapshot store
+        pretty: Write indented JSON
+        verbose: Print per-series progress (turn off when fetching sports concurrently)
     
+    Returns the output data dict (same layout as the JSON file), or None if
+    no series exist for the sport.
+    """
+    log = print if verbose else (lambda *args, **kwargs: None)
     config = SPORT_CONFIG[sport]
     
     now = datetime.now(timezone.utc)
@@ -244,10 +387,10 @@ def main():
     sport_series = find_sport_series(sport)
     if not sport_series:
         print(f"No {config['sport_name']} series found.")
-        return
+        return None
 
     # Filter to only series with upcoming markets in the next 7 days
-    print(f"\nFiltering {len(sport_series)} {config['sport_name']} series to those with games in the next 7 days...")
+    log(f"\nFiltering {len(sport_series)} {config['sport_name']} series to those with games in the next 7 days...")
     upcoming_series = []
     for idx, s in enumerate(sport_series, 1):
         st = s.get("ticker")
@@ -255,16 +398,16 @@ def main():
         if not st:
             continue
         
-        print(f"  [{idx}/{len(sport_series)}] Checking: {series_title[:50]}...", end=" ", flush=True)
+        log(f"  [{idx}/{len(sport_series)}] Checking: {series_title[:50]}...", end=" ", flush=True)
         if has_upcoming_markets(st, now, week_end):
             upcoming_series.append(s)
-            print("Has upcoming markets")
+            log("Has upcoming markets")
         else:
-            print("No upcoming markets")
+            log("No upcoming markets")
         
         time.sleep(0.1)
     
-    print(f"\nFound {len(upcoming_series)} {config['sport_name']} series with games in the next 7 days")
+    log(f"\nFound {len(upcoming_series)} {config['sport_name']} series with games in the next 7 days")
     
     if not upcoming_series:
         print(f"No {config['sport_name']} series found with games closing in the next 7 days.")
@@ -276,41 +419,44 @@ def main():
             "total_markets_found": 0,
             "markets": []
         }
-        output_file = os.path.join(DATA_DIR, f"kalshi_{config['content_type']}.json")
-        os.makedirs(DATA_DIR, exist_ok=True)
-        with open(output_file, "w", encoding="utf-8") as f:
-            json.dump(output_data, f, indent=2, ensure_ascii=False)
-        print(f"Empty output saved to {output_file}")
-        return
+        if export_json:
+            output_file = os.path.join(DATA_DIR, f"kalshi_{config['content_type']}.json")
+            write_json(output_file, output_data, pretty=pretty)
+            log(f"Empty output saved to {output_file}")
+        return output_data
 
     all_markets = []
     seen = set()
+    observed_at = {}  # ticker -> when its page was fetched
 
-    print(f"\nFetching markets for {len(upcoming_series)} relevant {config['sport_name']} series...")
+    log(f"\nFetching markets for {len(upcoming_series)} relevant {config['sport_name']} series...")
     for idx, s in enumerate(upcoming_series, 1):
         st = s.get("ticker")
         series_title = s.get("title", "Unknown")
         if not st:
             continue
         
-        print(f"  [{idx}/{len(upcoming_series)}] Processing: {series_title[:50]}...", end=" ", flush=True)
+        log(f"  [{idx}/{len(upcoming_series)}] Processing: {series_title[:50]}...", end=" ", flush=True)
         markets_count = 0
         
         for status in ("open", "unopened"):
             markets = get_markets_for_series(st, status=status)
             if not markets:
                 continue
+            fetched_at = datetime.now(timezone.utc).isoformat()
             for m in markets:
                 tkr = m.get("ticker")
                 if tkr and tkr not in seen:
                     seen.add(tkr)
-                    all_markets.append(m)
+                    observed_at[tkr] = fetched_at
+                    # Drop the ~50-field payload down to what analysis reads
+                    all_markets.append(m if keep_raw else MarketRecord.from_api(m))
                     markets_count += 1
         
-        print(f"Found {markets_count} new markets (total: {len(all_markets)})")
+        log(f"Found {markets_count} new markets (total: {len(all_markets)})")
         time.sleep(0.1)
     
-    print(f"\nTotal unique markets collected: {len(all_markets)}")
+    log(f"\nTotal unique markets collected: {len(all_markets)}")
 
     # Filter to markets expiring in next 7 days AND are winner markets only
     upcoming = []
@@ -328,9 +474,9 @@ def main():
 
     upcoming.sort(key=lambda x: x[0])
 
-    print(f"Found {len(upcoming)} {config['sport_name']} winner markets (team win/lose only) expiring between {now.isoformat()} and {week_end.isoformat()}:\n")
+    log(f"Found {len(upcoming)} {config['sport_name']} winner markets (team win/lose only) expiring between {now.isoformat()} and {week_end.isoformat()}:\n")
     for et, m in upcoming:
-        print(f"{et.isoformat()}  {m.get('ticker')}  |  {m.get('title')}")
+        log(f"{et.isoformat()}  {m.get('ticker')}  |  {m.get('title')}")
 
     # Prepare JSON output
     output_data = {
@@ -340,26 +486,60 @@ def main():
         "query_time": now.isoformat(),
         "query_window_end": week_end.isoformat(),
         "total_markets_found": len(upcoming),
-        "markets": [
-            {
-                "expiration_time": et.isoformat(),
-                "ticker": m.get("ticker"),
-                "title": m.get("title"),
-                "event_ticker": m.get("event_ticker"),
-                "market_data": m
-            }
-            for et, m in upcoming
-        ]
+        "markets": [market_entry(et, m, keep_raw, observed_at.get(m.get("ticker"))) for et, m in upcoming]
     }
 
+    # Append to the snapshot store
+    if write_db:
+        with SnapshotStore(DEFAULT_DB_PATH) as store:
+            rows = store.write_kalshi_snapshot(sport, output_data["markets"], output_data["query_time"])
+        log(f"\nStored {rows} market snapshots in {DEFAULT_DB_PATH}")
+    
     # Write to JSON file
-    output_file = os.path.join(DATA_DIR, f"kalshi_{config['content_type']}.json")
-    os.makedirs(DATA_DIR, exist_ok=True)
-    with open(output_file, "w", encoding="utf-8") as f:
-        json.dump(output_data, f, indent=2, ensure_ascii=False)
+    if export_json:
+        output_file = os.path.join(DATA_DIR, f"kalshi_{config['content_type']}.json")
+        write_json(output_file, output_data, pretty=pretty)
+        
+        log(f"\nOutput saved to {output_file}")
     
-    print(f"\nOutput saved to {output_file}")
+    return output_data
+
+def main():
+    """
+    Command line arguments:
+        <sport> - Sport to fetch
+        --db - Also append the snapshot to the SQLite snapshot store
+        --no-json - Skip the JSON file export (use with --db)
+        --raw - Keep the full Kalshi market payload instead of the compact
+                MarketRecord projection (debugging only; files get ~10x larger)
+        --pretty - Write indented JSON for humans (default compact)
+    """
+    write_db = "--db" in sys.argv
+    if write_db:
+        sys.argv.remove("--db")
+    export_json = "--no-json" not in sys.argv
+    if not export_json:
+        sys.argv.remove("--no-json")
+    keep_raw = "--raw" in sys.argv
+    if keep_raw:
+        sys.argv.remove("--raw")
+    pretty = "--pretty" in sys.argv
+    if pretty:
+        sys.argv.remove("--pretty")
+    
+    # Get sport from command line argument
+    if len(sys.argv) < 2:
+        print("Usage: python fetch_kalshi_sports.py <sport> [--db] [--no-json] [--raw] [--pretty]")
+        print(f"Supported sports: {', '.join(SPORT_CONFIG.keys())}")
+        sys.exit(1)
+    
+    sport = sys.argv[1].lower()
+    if sport not in SPORT_CONFIG:
+        print(f"Error: Unsupported sport '{sport}'")
+        print(f"Supported sports: {', '.join(SPORT_CONFIG.keys())}")
+        sys.exit(1)
+    
+    fetch_sport(sport, keep_raw=keep_raw, export_json=export_json, write_db=write_db, pretty=pretty)
 
 if __name__ == "__main__":
     main()
-
@@ -1,16 +1,23 @@
 import requests
-import json
 import os
 import sys
+import time
 from datetime import datetime, timezone
 from typing import Dict, List, Optional, Tuple
 
+from json_io import write_json
+from json_stream import iter_array
+from snapshot_store import DEFAULT_DB_PATH, SnapshotStore
+import metrics
+import tracing
+import upstream_replay
+
 # Get the project root directory (parent of scripts folder)
 PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
 DATA_DIR = os.path.join(PROJECT_ROOT, "data")
 
 # The Odds API configuration
-ODDS_API_BASE_URL = "https://api.the-odds-api.com/v4"
+ODDS_API_BASE_URL = os.getenv("ODDS_API_BASE_URL") or "https://api.the-odds-api.com/v4"
 # TODO: Remove hardcoded API key before production/deployment
 ODDS_API_KEY = os.getenv("ODDS_API_KEY") or "d77d2e63a1e5fb8832317d1058c996a1"
 
@@ -212,23 +219,13 @@ def parse_kalshi_team_name(title: str, sport: str = None) -> Tuple[Optional[str]
     
     return away_team, home_team
 
-def load_kalshi_games(sport: str) -> List[Dict]:
+def kalshi_games_from_markets(markets, sport: str) -> List[Dict]:
     """
-    Load Kalshi games from the JSON file.
+    Collapse Kalshi winner markets (file entries) into one game per event.
     """
-    config = SPORT_CONFIG[sport]
-    kalshi_file = os.path.join(DATA_DIR, config["kalshi_file"])
-    
-    if not os.path.exists(kalshi_file):
-        print(f"Warning: Kalshi data file not found at {kalshi_file}")
-        return []
-    
-    with open(kalshi_file, "r", encoding="utf-8") as f:
-        kalshi_data = json.load(f)
-    
     games = {}
     
-    for market in kalshi_data.get("markets", []):
+    for market in markets:
         title = market.get("title", "")
         expiration_time = market.get("expiration_time")
         event_ticker = market.get("event_ticker", "")
@@ -247,9 +244,33 @@ def load_kalshi_games(sport: str) -> List[Dict]:
     
     return list(games.values())
 
-def fetch_odds_api_sports(sport: str, api_key: str) -> List[Dict]:
+def load_kalshi_games(sport: str, snapshot_db: Optional[str] = None) -> List[Dict]:
+    """
+    Load Kalshi games from the JSON file.
+    Falls back to the latest snapshot in the SQLite store when the file is
+    missing and snapshot_db is given.
+    """
+    config = SPORT_CONFIG[sport]
+    kalshi_file = os.path.join(DATA_DIR, config["kalshi_file"])
+    
+    if os.path.exists(kalshi_file):
+        # Stream markets one at a time instead of loading the whole file
+        return kalshi_games_from_markets(iter_array(kalshi_file, "markets"), sport)
+    
+    kalshi_data = None
+    if snapshot_db and os.path.exists(snapshot_db):
+        with SnapshotStore(snapshot_db) as store:
+            kalshi_data = store.latest_kalshi_data(sport)
+    if kalshi_data is None:
+        print(f"Warning: Kalshi data file not found at {kalshi_file}")
+        return []
+    return kalshi_games_from_markets(kalshi_data["markets"], sport)
+
+def fetch_odds_api_sports(sport: str, api_key: str, event_ids: Optional[List[str]] = None) -> List[Dict]:
     """
     Fetch odds from The Odds API for the specified sport.
+    If event_ids is given, only those Odds API events are returned.
+    Each game is stamped with the time it was fetched ("observed_at").
     """
     if not api_key:
         raise ValueError("ODDS_API_KEY environment variable not set. Please set it before running.")
@@ -264,16 +285,35 @@ def fetch_odds_api_sports(sport: str, api_key: str) -> List[Dict]:
         "markets": "h2h",
         "oddsFormat": "american",
     }
+    if event_ids:
+        params["eventIds"] = ",".join(event_ids)
     
+    # Not retried: every request counts against the quota
+    response = None
+    start = time.perf_counter()
     try:
-        response = requests.get(url, params=params, timeout=30)
-        response.raise_for_status()
-        return response.json()
+        with tracing.span("odds_api.fetch"):
+            try:
+                response = requests.get(url, params=params, timeout=30)
+            except requests.exceptions.RequestException:
+                metrics.record_request("odds_api", "/sports/{sport}/odds", "error", time.perf_counter() - start)
+                raise
+            metrics.record_request("odds_api", "/sports/{sport}/odds", response.status_code, time.perf_counter() - start)
+            metrics.record_odds_api_quota(response.headers)
+            response.raise_for_status()
+            games = response.json()
+            upstream_replay.record_exchange("odds_api", f"/sports/{sport_key}/odds", params,
+                                            response.status_code, response.headers, games)
     except requests.exceptions.RequestException as e:
         print(f"Error fetching odds from The Odds API: {e}")
         if hasattr(response, 'text'):
             print(f"Response: {response.text}")
         raise
+    
+    observed_at = datetime.now(timezone.utc).isoformat()
+    for game in games:
+        game["observed_at"] = observed_at
+    return games
 
 def normalize_team_name(name: str) -> str:
     """Normalize team name for better matching (case-insensitive, remove common suffixes)."""
@@ -318,6 +358,23 @@ def extract_team_names_from_odds(odds_game: Dict) -> Tuple[Optional[str], Option
     
     return None, None
 
+def fill_team_names(odds_games: List[Dict]) -> int:
+    """
+    Extract team names for games that don't have them at top level.
+    Returns the number of games with team data.
+    """
+    games_with_teams = 0
+    for odds_game in odds_games:
+        away_team, home_team = extract_team_names_from_odds(odds_game)
+        if away_team and home_team:
+            # Add team names if they weren't at top level
+            if not odds_game.get("away_team"):
+                odds_game["away_team"] = away_team
+            if not odds_game.get("home_team"):
+                odds_game["home_team"] = home_team
+            games_with_teams += 1
+    return games_with_teams
+
 def match_games_with_odds(kalshi_games: List[Dict], odds_data: List[Dict]) -> List[Dict]:
     """
     Match Kalshi games with The Odds API data.
@@ -384,21 +441,30 @@ def match_games_with_odds(kalshi_games: List[Dict], odds_data: List[Dict]) -> Li
     
     return matched_games
 
-def main():
-    """
-    Main function to fetch sportsbook odds and match with Kalshi games.
+def fetch_sport(
+    sport: str,
+    kalshi_data: Optional[Dict] = None,
+    export_json: bool = True,
+    write_db: bool = False,
+    pretty: bool = False,
+    verbose: bool = True,
+) -> Optional[Dict]:
     """
-    if len(sys.argv) < 2:
-        print("Usage: python fetch_odds_api_sports.py <sport>")
-        print(f"Supported sports: {', '.join(SPORT_CONFIG.keys())}")
-        sys.exit(1)
-    
-    sport = sys.argv[1].lower()
-    if sport not in SPORT_CONFIG:
-        print(f"Error: Unsupported sport '{sport}'")
-        print(f"Supported sports: {', '.join(SPORT_CONFIG.keys())}")
-        sys.exit(1)
+    Fetch sportsbook odds for a sport and match them with Kalshi games.
     
+    Args:
+        sport: Sport key from SPORT_CONFIG
+        kalshi_data: Kalshi output from fetch_kalshi_sports.fetch_sport; when
+                     None the Kalshi games are loaded from disk
+        export_json: Write data/the_odds_api_<sport>_moneyline_odds.json
+        write_db: Append the snapshot to the SQLite snapshot store
+        pretty: Write indented JSON
+        verbose: Print progress and unmatched games
+    
+    Returns the output data dict (same layout as the JSON file), or None if
+    there was nothing to fetch. Raises if The Odds API request fails.
+    """
+    log = print if verbose else (lambda *args, **kwargs: None)
     config = SPORT_CONFIG[sport]
     
     if not ODDS_API_KEY:
@@ -408,44 +474,32 @@ def main():
         print("  Windows CMD: set ODDS_API_KEY=your_api_key_here")
         print("  Linux/Mac: export ODDS_API_KEY='your_api_key_here'")
         print("\nGet your API key from: https://the-odds-api.com/")
-        return
+        return None
     
-    print(f"Loading {config['sport_name']} games from Kalshi...")
-    kalshi_games = load_kalshi_games(sport)
-    print(f"Found {len(kalshi_games)} unique games from Kalshi data")
+    log(f"Loading {config['sport_name']} games from Kalshi...")
+    if kalshi_data is not None:
+        kalshi_games = kalshi_games_from_markets(kalshi_data.get("markets", []), sport)
+    else:
+        kalshi_games = load_kalshi_games(sport, snapshot_db=DEFAULT_DB_PATH if write_db else None)
+    log(f"Found {len(kalshi_games)} unique games from Kalshi data")
     
     if not kalshi_games:
-        print(f"No {config['sport_name']} games found. Please run fetch_kalshi_sports.py {sport} first.")
-        return
+        log(f"No {config['sport_name']} games found. Please run fetch_kalshi_sports.py {sport} first.")
+        return None
     
-    print(f"\nFetching {config['sport_name']} odds from The Odds API...")
-    try:
-        raw_odds_data = fetch_odds_api_sports(sport, ODDS_API_KEY)
-        print(f"Retrieved {len(raw_odds_data)} games from The Odds API")
-        
-        # Extract team names for games that don't have them at top level
-        games_with_teams = 0
-        for odds_game in raw_odds_data:
-            away_team, home_team = extract_team_names_from_odds(odds_game)
-            if away_team and home_team:
-                # Add team names if they weren't at top level
-                if not odds_game.get("away_team"):
-                    odds_game["away_team"] = away_team
-                if not odds_game.get("home_team"):
-                    odds_game["home_team"] = home_team
-                games_with_teams += 1
-        
-        print(f"Games with team data: {games_with_teams} out of {len(raw_odds_data)}")
-        odds_data = raw_odds_data
-    except Exception as e:
-        print(f"Failed to fetch odds: {e}")
-        return
+    log(f"\nFetching {config['sport_name']} odds from The Odds API...")
+    raw_odds_data = fetch_odds_api_sports(sport, ODDS_API_KEY)
+    log(f"Retrieved {len(raw_odds_data)} games from The Odds API")
     
-    print("\nMatching games...")
+    games_with_teams = fill_team_names(raw_odds_data)
+    log(f"Games with team data: {games_with_teams} out of {len(raw_odds_data)}")
+    odds_data = raw_odds_data
+    
+    log("\nMatching games...")
     matched_games = match_games_with_odds(kalshi_games, odds_data)
     
     matched_count = sum(1 for g in matched_games if g["matched"])
-    print(f"Matched {matched_count} out of {len(matched_games)} games")
+    log(f"Matched {matched_count} out of {len(matched_games)} games")
     
     # Prepare output data
     output_data = {
@@ -459,23 +513,64 @@ def main():
         "games": matched_games,
     }
     
-    # Write to JSON file
-    output_file = os.path.join(DATA_DIR, f"the_odds_api_{config['content_type']}.json")
-    os.makedirs(DATA_DIR, exist_ok=True)
-    
-    with open(output_file, "w", encoding="utf-8") as f:
-        json.dump(output_data, f, indent=2, ensure_ascii=False)
+    # Append every game The Odds API returned (matched or not) to the snapshot store
+    if write_db:
+        with SnapshotStore(DEFAULT_DB_PATH) as store:
+            rows = store.write_odds_snapshot(sport, odds_data, output_data["query_time"])
+        log(f"\nStored {rows} bookmaker prices in {DEFAULT_DB_PATH}")
     
-    print(f"\nOutput saved to {output_file}")
+    # Write to JSON file
+    if export_json:
+        output_file = os.path.join(DATA_DIR, f"the_odds_api_{config['content_type']}.json")
+        write_json(output_file, output_data, pretty=pretty)
+        
+        log(f"\nOutput saved to {output_file}")
     
     # Print summary
     if matched_count < len(matched_games):
-        print("\nUnmatched games:")
+        log("\nUnmatched games:")
         for game in matched_games:
             if not game["matched"]:
                 kalshi = game["kalshi_data"]
-                print(f"  {kalshi['away_team']} at {kalshi['home_team']}")
+                log(f"  {kalshi['away_team']} at {kalshi['home_team']}")
+    
+    return output_data
+
+def main():
+    """
+    Main function to fetch sportsbook odds and match with Kalshi games.
+    
+    Command line arguments:
+        <sport> - Sport to fetch
+        --db - Also append the snapshot to the SQLite snapshot store
+        --no-json - Skip the JSON file export (use with --db)
+        --pretty - Write indented JSON for humans (default compact)
+    """
+    write_db = "--db" in sys.argv
+    if write_db:
+        sys.argv.remove("--db")
+    export_json = "--no-json" not in sys.argv
+    if not export_json:
+        sys.argv.remove("--no-json")
+    pretty = "--pretty" in sys.argv
+    if pretty:
+        sys.argv.remove("--pretty")
+    
+    if len(sys.argv) < 2:
+        print("Usage: python fetch_odds_api_sports.py <sport> [--db] [--no-json] [--pretty]")
+        print(f"Supported sports: {', '.join(SPORT_CONFIG.keys())}")
+        sys.exit(1)
+    
+    sport = sys.argv[1].lower()
+    if sport not in SPORT_CONFIG:
+        print(f"Error: Unsupported sport '{sport}'")
+        print(f"Supported sports: {', '.join(SPORT_CONFIG.keys())}")
+        sys.exit(1)
+    
+    try:
+        fetch_sport(sport, export_json=export_json, write_db=write_db, pretty=pretty)
+    except Exception as e:
+        print(f"Failed to fetch {SPORT_CONFIG[sport]['sport_name']} odds: {e}")
 
 if __name__ == "__main__":
     main()
-
@@ -0,0 +1,140 @@
+"""
+Shared JSON file writer/reader for the data/ directory.
+
+Files are written compact by default (pretty=True keeps the indented layout
+for humans), to a temp file that is fsynced and atomically renamed over the
+destination, so a reader never sees a half-written file.
+
+Every file starts with a small header:
+    {"schema_version": 1, "content_hash": "<sha256 of the payload>", ...payload...}
+Readers can check the header without parsing the rest of the file and skip
+re-parsing a file whose content has not changed.
+"""
+import hashlib
+import json
+import os
+import re
+import tempfile
+from typing import Dict, Optional, Tuple
+
+SCHEMA_VERSION = 1
+HEADER_KEYS = ("schema_version", "content_hash")
+
+# Bytes read when sniffing a header; the header keys are always written first
+HEADER_SNIFF_BYTES = 512
+_HEADER_RE = re.compile(
+    rb'^\s*\{\s*"schema_version"\s*:\s*(\d+)\s*,\s*"content_hash"\s*:\s*"([0-9a-f]+)"'
+)
+
+# path -> (content_hash, parsed data), used by load_json to skip unchanged files
+_parse_cache: Dict[str, Tuple[str, Dict]] = {}
+
+# Process umask, read once (os.umask can only be read by setting it)
+_UMASK = os.umask(0)
+os.umask(_UMASK)
+
+def file_mode(path: str) -> int:
+    """Permission bits for a rewrite of path: its current mode, or the umask default for a new file."""
+    try:
+        return os.stat(path).st_mode & 0o7777
+    except FileNotFoundError:
+        return 0o666 & ~_UMASK
+
+def serialize(data: Dict, pretty: bool = False) -> Tuple[str, str]:
+    """
+    Serialize a payload with its header.
+    Returns (text, content_hash).
+    """
+    payload = {k: v for k, v in data.items() if k not in HEADER_KEYS}
+    body = json.dumps(payload, ensure_ascii=False, separators=(",", ":"))
+    content_hash = hashlib.sha256(body.encode("utf-8")).hexdigest()
+
+    if pretty:
+        document = {"schema_version": SCHEMA_VERSION, "content_hash": content_hash}
+        document.update(payload)
+        return json.dumps(document, indent=2, ensure_ascii=False), content_hash
+
+    # Splice the header onto the already-serialized compact body
+    header = f'{{"schema_version":{SCHEMA_VERSION},"content_hash":"{content_hash}"'
+    if body == "{}":
+        return header + "}", content_hash
+    return header + "," + body[1:], content_hash
+
+def write_json(path: str, data: Dict, pretty: bool = False) -> str:
+    """
+    Atomically write a JSON payload with a schema/content-hash header.
+    The file keeps its permissions (mkstemp alone would leave it 0600).
+
+    Args:
+        path: Destination file
+        data: Payload dict
+        pretty: Indent the output for humans (default compact)
+
+    Returns the content hash.
+    """
+    text, content_hash = serialize(data, pretty=pretty)
+    directory = os.path.dirname(os.path.abspath(path))
+    os.makedirs(directory, exist_ok=True)
+
+    mode = file_mode(path)
+    fd, tmp_path = tempfile.mkstemp(prefix=".tmp-", suffix=".json", dir=directory)
+    try:
+        with os.fdopen(fd, "w", encoding="utf-8") as f:
+            f.write(text)
+            f.flush()
+            os.fchmod(f.fileno(), mode)
+            os.fsync(f.fileno())
+        os.replace(tmp_path, path)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+
+    # Make the rename itself durable
+    if hasattr(os, "O_DIRECTORY"):
+        dir_fd = os.open(directory, os.O_RDONLY | os.O_DIRECTORY)
+        try:
+            os.fsync(dir_fd)
+        finally:
+            os.close(dir_fd)
+
+    return content_hash
+
+def read_header(path: str) -> Optional[Dict]:
+    """
+    Read just the header of a data file.
+    Returns {"schema_version": int, "content_hash": str}, or None for files
+    written before headers existed.
+    """
+    with open(path, "rb") as f:
+        prefix = f.read(HEADER_SNIFF_BYTES)
+    match = _HEADER_RE.match(prefix)
+    if not match:
+        return None
+    return {"schema_version": int(match.group(1)), "content_hash": match.group(2).decode("ascii")}
+
+def load_json(path: str, use_cache: bool = True) -> Dict:
+    """
+    Load a data file, returning the cached parse when the header's content
+    hash matches the last load of the same path.
+
+    Callers must treat a cached result as read-only.
+    """
+    abs_path = os.path.abspath(path)
+    header = read_header(abs_path) if use_cache else None
+    if header is not None:
+        if header["schema_version"] > SCHEMA_VERSION:
+            raise ValueError(
+                f"{path} has schema version {header['schema_version']}, "
+                f"newer than supported version {SCHEMA_VERSION}"
+            )
+        cached = _parse_cache.get(abs_path)
+        if cached and cached[0] == header["content_hash"]:
+            return cached[1]
+
+    with open(abs_path, "r", encoding="utf-8") as f:
+        data = json.load(f)
+
+    if header is not None:
+        _parse_cache[abs_path] = (header["content_hash"], data)
+    return data
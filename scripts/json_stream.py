@@ -0,0 +1,169 @@
+"""
+Streaming readers for the data/ snapshot files.
+
+json.load materializes an entire file before we can look at the first
+market. These readers walk the top-level object incrementally and decode the
+"markets" / "games" arrays one element at a time, projecting each element
+down to the fields analysis needs, so peak memory stays flat no matter how
+many markets a slate has.
+
+Works on every file layout the scripts write (compact or pretty, with or
+without the json_io header) using only the standard library.
+"""
+import json
+import types
+from typing import Dict, Iterator, Tuple
+
+from market_records import MarketRecord
+
+CHUNK_SIZE = 64 * 1024
+WHITESPACE = " \t\n\r"
+
+_decoder = json.JSONDecoder()
+
+class _Reader:
+    """Sliding text buffer over a file with raw_decode on top."""
+
+    def __init__(self, f):
+        self.f = f
+        self.buf = ""
+        self.pos = 0
+        self.eof = False
+
+    def _fill(self) -> bool:
+        if self.eof:
+            return False
+        chunk = self.f.read(CHUNK_SIZE)
+        if not chunk:
+            self.eof = True
+            return False
+        # Drop consumed text so the buffer only ever holds ~one element
+        self.buf = self.buf[self.pos:] + chunk
+        self.pos = 0
+        return True
+
+    def peek(self) -> str:
+        """Next non-whitespace character ('' at end of file)."""
+        while True:
+            while self.pos < len(self.buf) and self.buf[self.pos] in WHITESPACE:
+                self.pos += 1
+            if self.pos < len(self.buf):
+                return self.buf[self.pos]
+            if not self._fill():
+                return ""
+
+    def expect(self, char: str):
+        if self.peek() != char:
+            raise ValueError(f"Expected {char!r} at offset {self.pos}, found {self.peek()!r}")
+        self.pos += 1
+
+    def value(self):
+        """Decode the next complete JSON value."""
+        self.peek()
+        while True:
+            try:
+                value, end = _decoder.raw_decode(self.buf, self.pos)
+            except json.JSONDecodeError:
+                if not self._fill():
+                    raise
+                continue
+            # A number at the very end of the buffer may be cut off mid-digit
+            if end == len(self.buf) and not self.eof and not isinstance(value, (dict, list, str)):
+                if self._fill():
+                    continue
+            self.pos = end
+            return value
+
+def iter_top_level(f) -> Iterator[Tuple[str, object]]:
+    """
+    Iterate (key, value) pairs of a file's top-level object.
+    Array values are yielded as lazy iterators over their elements; the
+    caller must exhaust (or ignore) each before advancing to the next key.
+    """
+    reader = _Reader(f)
+    reader.expect("{")
+    if reader.peek() == "}":
+        return
+    while True:
+        key = reader.value()
+        reader.expect(":")
+        if reader.peek() == "[":
+            reader.expect("[")
+            elements = _iter_array(reader)
+            yield key, elements
+            # Drain anything the caller did not consume
+            for _ in elements:
+                pass
+        else:
+            yield key, reader.value()
+        if reader.peek() == ",":
+            reader.expect(",")
+            continue
+        reader.expect("}")
+        return
+
+def _iter_array(reader: _Reader) -> Iterator:
+    if reader.peek() == "]":
+        reader.expect("]")
+        return
+    while True:
+        yield reader.value()
+        if reader.peek() == ",":
+            reader.expect(",")
+            continue
+        reader.expect("]")
+        return
+
+def iter_array(path: str, array_key: str) -> Iterator:
+    """Iterate the elements of a top-level array without loading the file."""
+    with open(path, "r", encoding="utf-8") as f:
+        for key, value in iter_top_level(f):
+            if key == array_key and isinstance(value, types.GeneratorType):
+                yield from value
+                return
+
+def read_scalars(path: str) -> Dict:
+    """
+    Read a file's top-level fields up to the first array (query_time,
+    total_games, ...). Every layout we write puts its big array last, so this
+    only touches the first few hundred bytes.
+    """
+    out = {}
+    with open(path, "r", encoding="utf-8") as f:
+        for key, value in iter_top_level(f):
+            if isinstance(value, types.GeneratorType):
+                break
+            out[key] = value
+    return out
+
+# ----------------------------------------------------------------------
+# Projections for the two snapshot layouts
+# ----------------------------------------------------------------------
+
+def project_kalshi_market(market: Dict) -> Dict:
+    """Keep only what matching/analysis reads from a Kalshi file entry."""
+    market_data = market.get("market_data") or {}
+    return {
+        "expiration_time": market.get("expiration_time"),
+        "ticker": market.get("ticker"),
+        "title": market.get("title"),
+        "event_ticker": market.get("event_ticker"),
+        "observed_at": market.get("observed_at"),
+        "market_data": MarketRecord.from_api(market_data),
+    }
+
+def iter_kalshi_markets(path: str) -> Iterator[Dict]:
+    """Stream projected markets from a kalshi_<sport>_winner_markets.json file."""
+    for market in iter_array(path, "markets"):
+        yield project_kalshi_market(market)
+
+def iter_odds_games(path: str) -> Iterator[Dict]:
+    """
+    Stream game entries from a the_odds_api_<sport>_moneyline_odds.json file.
+    The nested kalshi_data block is dropped; odds_data is kept as-is since
+    analysis reads every bookmaker price.
+    """
+    for game in iter_array(path, "games"):
+        if "kalshi_data" in game:
+            game = {k: v for k, v in game.items() if k != "kalshi_data"}
+        yield game
@@ -0,0 +1,300 @@
+"""
+Maker-mode EV engine: resting limit orders inside the spread.
+
+compare_odds prices every bet as a taker, buying YES at yes_ask. A bid
+posted between yes_bid and yes_ask (yes_ask is 100 - no_bid) avoids paying
+the spread, at the price of maybe not being filled. For each side of every
+matched game this finds the YES limit price to post:
+
+    EV(q)       EV of a STAKE order filled at q cents, with the devigged
+                consensus probability p and Kalshi's maker fee
+                (MAKER_FEE_RATE * contracts * P * (1 - P), P = q / 100):
+                    STAKE * (p / P - 1) - MAKER_FEE_RATE * STAKE * (1 - P)
+    fill rate   contracts per hour expected to trade against the bid
+                (Avellaneda-Stoikov style): SELL_SHARE of volume_24h / 24,
+                decaying by FILL_DECAY per cent of distance below yes_ask,
+                and halved (QUEUE_FACTOR) when only joining yes_bid
+    EV / hour   EV per contract at q times the fill rate
+
+Prices from yes_bid up to yes_ask - 1 are considered; the quote is the one
+with the highest EV per hour among those whose EV reaches the target. Its
+max_price is the highest price that still reaches the target, and
+fill_probability is the chance the whole order fills before commence_time:
+with fills arriving as a Poisson process of fill_rate contracts per hour,
+P(Poisson(fill_rate * hours) >= contracts).
+
+QuoteBook keeps the latest quote per market and recomputes only markets
+whose inputs (bid, ask, volume, fair probability, start time) changed, so it
+can follow the daemon's per-game polls (odds_daemon.py --maker). The other
+quotes only have their fill_probability recomputed for the shorter time to
+start. A game's fair probabilities are only devigged again when a
+bookmaker's last_update changed.
+
+    python scripts/maker_quotes.py [SPORT ...] [--target-ev 2] [--stake 100] [--top 25]
+"""
+import math
+import sys
+import time
+from datetime import datetime
+from typing import Dict, List, Optional, Tuple
+
+import compare_odds
+from opportunity_ledger import parse_timestamp
+
+STAKE = 100.0
+TARGET_EV = compare_odds.MIN_EV_THRESHOLD
+
+# Kalshi maker fee: rate * contracts * P * (1 - P) dollars
+MAKER_FEE_RATE = 0.0175
+
+# Share of 24h volume that are sells able to hit a resting bid
+SELL_SHARE = 0.5
+# Fill rate decays by this factor per cent of distance below yes_ask
+FILL_DECAY = 0.3
+# Joining yes_bid puts the order behind the existing queue
+QUEUE_FACTOR = 0.5
+# Horizon for fill_probability when the start time is unknown or far out
+MAX_HORIZON_HOURS = 24.0
+
+def maker_ev(prob: float, price_cents: float, stake: float = STAKE) -> float:
+    """EV (dollars) of a stake filled as maker at price_cents, prob in percent."""
+    price = price_cents / 100
+    return stake * (prob / 100 / price - 1) - MAKER_FEE_RATE * stake * (1 - price)
+
+def taker_ev(prob: float, yes_ask: int, stake: float = STAKE) -> float:
+    """analyze_game's EV of buying the stake at yes_ask."""
+    payout = compare_odds.calculate_kalshi_payout(stake, int(yes_ask))
+    return compare_odds.calculate_expected_value(prob, 100 - prob, payout["profit_if_win"], payout["loss_if_lose"])
+
+def fill_rate(price_cents: int, yes_bid: int, yes_ask: int, volume_24h: float) -> float:
+    """Expected contracts per hour traded against a YES bid at price_cents."""
+    rate = SELL_SHARE * volume_24h / 24 * math.exp(-FILL_DECAY * (yes_ask - 1 - price_cents))
+    if price_cents <= yes_bid:
+        rate *= QUEUE_FACTOR
+    return rate
+
+def poisson_tail(mean: float, count: int) -> float:
+    """P(N >= count) for N ~ Poisson(mean)."""
+    if count <= 0:
+        return 1.0
+    if mean <= 0:
+        return 0.0
+    # 1 - P(N < count), each term built in log space so a large mean cannot underflow
+    cdf = 0.0
+    log_term = -mean
+    for i in range(count):
+        if i:
+            log_term += math.log(mean / i)
+        cdf += math.exp(log_term)
+    return max(0.0, 1.0 - cdf)
+
+def fill_probability(rate: float, contracts: float, hours_to_start: float) -> float:
+    """P(the whole order fills before the start), horizon capped at MAX_HORIZON_HOURS."""
+    horizon = min(max(hours_to_start, 0.0), MAX_HORIZON_HOURS)
+    return round(poisson_tail(rate * horizon, math.ceil(contracts)), 4)
+
+def hours_until(commence_time: Optional[str], now: float) -> float:
+    if not commence_time:
+        return MAX_HORIZON_HOURS
+    return (parse_timestamp(commence_time).timestamp() - now) / 3600
+
+def best_quote(prob: float, yes_bid: Optional[int], yes_ask: Optional[int], volume_24h: Optional[float],
+               hours_to_start: float, stake: float = STAKE, target_ev: float = TARGET_EV) -> Optional[Dict]:
+    """
+    Best YES limit price inside the spread for one market, or None if no
+    price from yes_bid to yes_ask - 1 reaches target_ev.
+    """
+    if not yes_ask or yes_ask <= 1:
+        return None
+    low = max(1, yes_bid or 1)
+    volume = volume_24h or 0
+    best = None
+    max_price = None
+    for price in range(low, yes_ask):
+        ev = maker_ev(prob, price, stake)
+        if ev < target_ev:
+            continue
+        max_price = price
+        contracts = stake / (price / 100)
+        rate = fill_rate(price, yes_bid or 0, yes_ask, volume)
+        ev_per_hour = ev / contracts * rate
+        if best is None or ev_per_hour > best["ev_per_hour"]:
+            best = {
+                "limit_price": price,
+                "ev": round(ev, 2),
+                "contracts": round(contracts, 2),
+                "fill_rate_per_hour": round(rate, 2),
+                "ev_per_hour": round(ev_per_hour, 4),
+            }
+            best_rate, best_contracts = rate, contracts
+    if best is not None:
+        best["max_price"] = max_price
+        best["fill_probability"] = fill_probability(best_rate, best_contracts, hours_to_start)
+    return best
+
+def market_inputs(game: Dict, side: str, fair: Tuple[float, float]) -> Tuple:
+    market_data = game[f"{side}_kalshi_market"]["market_data"]
+    return (market_data.get("yes_bid"), market_data.get("yes_ask"), market_data.get("volume_24h"),
+            round(fair[0 if side == "away" else 1], 4), game.get("commence_time"))
+
+class QuoteBook:
+    """
+    Latest maker quote per Kalshi market ticker. update() recomputes only
+    markets whose inputs changed since the last update of their sport.
+    """
+
+    def __init__(self, stake: float = STAKE, target_ev: float = TARGET_EV):
+        self.stake = stake
+        self.target_ev = target_ev
+        self.inputs: Dict[str, Tuple] = {}           # ticker -> market_inputs()
+        self.quotes: Dict[str, Optional[Dict]] = {}  # ticker -> quote (None: nothing reaches the target)
+        self.sport_tickers: Dict[str, set] = {}
+        # sport -> odds event id -> (bookmaker last_update signature, fair probabilities)
+        self.fair_cache: Dict[str, Dict[str, Tuple]] = {}
+
+    @staticmethod
+    def fair_probabilities(game: Dict, previous: Dict, cache: Dict) -> Optional[Tuple[float, float]]:
+        """A game's consensus probabilities, reused while no bookmaker has updated."""
+        odds = game.get("odds_data") or {}
+        event_id = odds.get("id")
+        signature = tuple((b.get("key"), b.get("last_update")) for b in odds.get("bookmakers", []))
+        cached = previous.get(event_id)
+        if cached is not None and cached[0] == signature:
+            fair = cached[1]
+        else:
+            fair = compare_odds.consensus_probabilities(game)
+        if event_id:
+            cache[event_id] = (signature, fair)
+        return fair
+
+    def update(self, sport: str, matched_games: List[Dict], now: Optional[float] = None) -> List[str]:
+        """Refresh a sport's quotes from its matched games; returns the tickers recomputed."""
+        now = time.time() if now is None else now
+        changed = []
+        seen = set()
+        previous = self.fair_cache.get(sport, {})
+        cache = self.fair_cache[sport] = {}
+        for game in matched_games:
+            fair = self.fair_probabilities(game, previous, cache)
+            if fair is None:
+                continue
+            for side in ("away", "home"):
+                ticker = game[f"{side}_kalshi_market"].get("ticker")
+                if not ticker:
+                    continue
+                seen.add(ticker)
+                inputs = market_inputs(game, side, fair)
+                if self.inputs.get(ticker) == inputs and ticker in self.quotes:
+                    if self.quotes[ticker]:
+                        self._refresh_fill_probability(self.quotes[ticker], game, side, now)
+                    continue
+                self.inputs[ticker] = inputs
+                self.quotes[ticker] = self._quote(sport, game, side, fair, now)
+                changed.append(ticker)
+        # Markets no longer matched (started, closed, delisted)
+        for ticker in self.sport_tickers.get(sport, set()) - seen:
+            self.inputs.pop(ticker, None)
+            self.quotes.pop(ticker, None)
+            changed.append(ticker)
+        self.sport_tickers[sport] = seen
+        return changed
+
+    def on_games(self, sport: str, matched_games: List[Dict]):
+        """odds_daemon game subscriber."""
+        changed = self.update(sport, matched_games)
+        if changed:
+            top = self.ranked(sport)[:1]
+            best = f", best {top[0]['team_name']} @ {top[0]['limit_price']}c (${top[0]['ev_per_hour']:.2f}/h)" if top else ""
+            stamp = datetime.now().strftime("%H:%M:%S")
+            print(f"[{stamp}] {sport.upper()} maker: {len(changed)} markets requoted, "
+                  f"{len(self.ranked(sport))} quotes{best}", flush=True)
+
+    def _refresh_fill_probability(self, quote: Dict, game: Dict, side: str, now: float):
+        """Recompute an unchanged quote's fill_probability for the time now left to the start."""
+        market_data = game[f"{side}_kalshi_market"]["market_data"]
+        price = quote["limit_price"]
+        rate = fill_rate(price, market_data.get("yes_bid") or 0, market_data.get("yes_ask"),
+                         market_data.get("volume_24h") or 0)
+        quote["fill_probability"] = fill_probability(rate, self.stake / (price / 100),
+                                                     hours_until(game.get("commence_time"), now))
+
+    def _quote(self, sport: str, game: Dict, side: str, fair: Tuple[float, float], now: float) -> Optional[Dict]:
+        market_data = game[f"{side}_kalshi_market"]["market_data"]
+        prob = fair[0 if side == "away" else 1]
+        quote = best_quote(prob, market_data.get("yes_bid"), market_data.get("yes_ask"),
+                           market_data.get("volume_24h"), hours_until(game.get("commence_time"), now),
+                           self.stake, self.target_ev)
+        if quote is None:
+            return None
+        yes_ask = market_data.get("yes_ask")
+        quote.update({
+            "sport": sport,
+            "event_ticker": game["event_ticker"],
+            "ticker": game[f"{side}_kalshi_market"].get("ticker"),
+            "side": side,
+            "team_name": game[f"{side}_team"],
+            "commence_time": game.get("commence_time"),
+            "fair_prob": round(prob, 2),
+            "yes_bid": market_data.get("yes_bid"),
+            "yes_ask": yes_ask,
+            "volume_24h": market_data.get("volume_24h"),
+            # What the same stake earns crossing the spread (compare_odds' taker EV)
+            "taker_ev": round(taker_ev(prob, yes_ask, self.stake), 2),
+        })
+        return quote
+
+    def ranked(self, sport: Optional[str] = None) -> List[Dict]:
+        """Current quotes, highest EV per hour first."""
+        quotes = [q for q in self.quotes.values() if q and (sport is None or q["sport"] == sport)]
+        return sorted(quotes, key=lambda q: q["ev_per_hour"], reverse=True)
+
+def format_quotes(quotes: List[Dict]) -> str:
+    lines = [f"  {'sport':<7} {'team':<30} {'bid':>4} {'ask':>4} {'post':>5} {'max':>4} {'fair':>6} "
+             f"{'EV':>7} {'taker':>7} {'fill/h':>8} {'P(fill)':>8} {'$/hour':>8}"]
+    for q in quotes:
+        lines.append(f"  {q['sport'].upper():<7} {q['team_name'][:30]:<30} {q['yes_bid'] or 0:>4} {q['yes_ask']:>4} "
+                     f"{q['limit_price']:>4}c {q['max_price']:>3}c {q['fair_prob']:>5.1f}% "
+                     f"{q['ev']:>7.2f} {q['taker_ev']:>7.2f} {q['fill_rate_per_hour']:>8.1f} "
+                     f"{q['fill_probability']:>8.1%} {q['ev_per_hour']:>8.2f}")
+    return "\n".join(lines)
+
+def main():
+    """
+    Command line arguments:
+        [SPORT ...] - Sports to quote (default: all)
+        --target-ev DOLLARS - Minimum maker EV per stake (default 2)
+        --stake DOLLARS - Order size (default 100)
+        --top N - Quotes to show (default 25)
+    """
+    options = {"--target-ev": TARGET_EV, "--stake": STAKE, "--top": 25}
+    for flag in list(options):
+        if flag in sys.argv:
+            idx = sys.argv.index(flag)
+            try:
+                options[flag] = type(options[flag])(sys.argv[idx + 1])
+            except (IndexError, ValueError):
+                print(f"Error: {flag} requires a number")
+                sys.exit(1)
+            del sys.argv[idx:idx + 2]
+
+    sports = [arg.lower() for arg in sys.argv[1:]] or list(compare_odds.SPORT_CONFIG.keys())
+    book = QuoteBook(options["--stake"], options["--target-ev"])
+    for sport in sports:
+        if sport not in compare_odds.SPORT_CONFIG:
+            print(f"Error: Unsupported sport '{sport}'")
+            sys.exit(1)
+        try:
+            matched_games, _ = compare_odds.load_and_match_games(sport)
+        except FileNotFoundError:
+            continue
+        book.update(sport, matched_games)
+    quotes = book.ranked()
+    if not quotes:
+        print(f"No maker quotes reach ${options['--target-ev']:.2f} EV")
+        return
+    print(f"{len(quotes)} maker quotes reaching ${options['--target-ev']:.2f} EV "
+          f"on ${options['--stake']:.0f}, by EV per hour:")
+    print(format_quotes(quotes[:options["--top"]]))
+
+if __name__ == "__main__":
+    main()
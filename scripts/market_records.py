@@ -0,0 +1,77 @@
+"""
+Compact Kalshi market records.
+The Kalshi API returns ~50 fields per market, but analysis only needs prices,
+team sub-titles, liquidity/volume and timestamps. MarketRecord keeps just
+those fields in __slots__ so fetched markets take a fraction of the memory
+and disk space of the raw payload.
+"""
+from typing import Dict
+
+# Fields kept from the Kalshi market object (everything analysis reads)
+MARKET_RECORD_FIELDS = (
+    "ticker",
+    "event_ticker",
+    "title",
+    "yes_sub_title",
+    "no_sub_title",
+    "yes_bid",
+    "yes_ask",
+    "no_bid",
+    "no_ask",
+    "last_price",
+    "liquidity",
+    "volume",
+    "volume_24h",
+    "open_interest",
+    "status",
+    "result",
+    "open_time",
+    "close_time",
+    "expected_expiration_time",
+    "expiration_time",
+)
+
+class MarketRecord:
+    """
+    Projection of a Kalshi market onto MARKET_RECORD_FIELDS.
+
+    Supports .get() and item access so code written against the raw
+    market dict keeps working unchanged.
+    """
+    __slots__ = MARKET_RECORD_FIELDS
+
+    def __init__(self, **fields):
+        for field in MARKET_RECORD_FIELDS:
+            setattr(self, field, fields.get(field))
+
+    @classmethod
+    def from_api(cls, market: Dict) -> "MarketRecord":
+        """Project a raw Kalshi API market object (or a stored market_data dict)."""
+        record = cls.__new__(cls)
+        for field in MARKET_RECORD_FIELDS:
+            setattr(record, field, market.get(field))
+        return record
+
+    def get(self, key: str, default=None):
+        value = getattr(self, key, None) if key in MARKET_RECORD_FIELDS else None
+        return default if value is None else value
+
+    def __getitem__(self, key: str):
+        if key not in MARKET_RECORD_FIELDS:
+            raise KeyError(key)
+        return getattr(self, key)
+
+    def __contains__(self, key: str) -> bool:
+        return key in MARKET_RECORD_FIELDS and getattr(self, key) is not None
+
+    def to_dict(self) -> Dict:
+        """Dict of the non-empty fields, for JSON output."""
+        out = {}
+        for field in MARKET_RECORD_FIELDS:
+            value = getattr(self, field)
+            if value is not None:
+                out[field] = value
+        return out
+
+    def __repr__(self) -> str:
+        return f"MarketRecord(ticker={self.ticker!r}, yes_bid={self.yes_bid!r}, yes_ask={self.yes_ask!r})"
@@ -0,0 +1,291 @@
+"""
+Operational metrics in Prometheus text format.
+
+Instrumented code only bumps in-memory counters, gauges and histograms
+(a dict update under a short lock); nothing is formatted until the registry
+is rendered. Rendering happens at export time on the exporter's own thread:
+
+    compare_odds.py --metrics FILE         write FILE at exit (textfile collector)
+    odds_daemon.py --metrics-port PORT     serve GET /metrics
+    opportunity_server.py                  GET /metrics next to the API
+
+Exported series:
+
+    arb_upstream_requests_total{upstream,endpoint,status}
+    arb_upstream_request_seconds{upstream,endpoint}           (histogram)
+    arb_upstream_retries_total{upstream,endpoint}
+    arb_odds_api_requests_remaining / arb_odds_api_requests_used
+    arb_games{sport,state="matched|unmatched|live_excluded"}
+    arb_source_games{sport,source="kalshi|odds_api"}
+    arb_opportunities{sport}
+    arb_opportunities_found_total{sport}
+    arb_opportunity_data_age_seconds{sport,leg="kalshi|odds"} (histogram)
+    arb_stale_opportunities_total{sport,outcome="refreshed|dropped"}
+    arb_data_observed_timestamp_seconds{sport,leg}
+    arb_orders_total{outcome}                                 (order_executor.py)
+    arb_order_ack_seconds                                     (histogram)
+"""
+import bisect
+import os
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, List, Optional, Sequence, Tuple
+
+from opportunity_ledger import parse_timestamp
+
+LATENCY_BUCKETS = (0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+DATA_AGE_BUCKETS = (5, 15, 30, 60, 120, 300, 600, 1800, 3600)
+ORDER_LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0)
+
+DEFAULT_METRICS_PORT = 9108
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+def format_labels(names: Sequence[str], values: Sequence[str]) -> str:
+    if not names:
+        return ""
+    pairs = []
+    for name, value in zip(names, values):
+        value = str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+        pairs.append(f'{name}="{value}"')
+    return "{" + ",".join(pairs) + "}"
+
+def format_value(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    if float(value).is_integer():
+        return str(int(value))
+    return repr(float(value))
+
+class Metric:
+    """A named family of labelled values."""
+    kind = "untyped"
+
+    def __init__(self, name: str, help_text: str, labels: Sequence[str] = ()):
+        self.name = name
+        self.help_text = help_text
+        self.labels = tuple(labels)
+        self._values: Dict[Tuple[str, ...], object] = {}
+        self._lock = threading.Lock()
+
+    def _key(self, labels: Dict[str, str]) -> Tuple[str, ...]:
+        return tuple(str(labels.get(name, "")) for name in self.labels)
+
+    def samples(self) -> List[str]:
+        with self._lock:
+            values = dict(self._values)
+        return [f"{self.name}{format_labels(self.labels, key)} {format_value(value)}"
+                for key, value in sorted(values.items())]
+
+    def render(self) -> str:
+        lines = [f"# HELP {self.name} {self.help_text}", f"# TYPE {self.name} {self.kind}"]
+        lines.extend(self.samples())
+        return "\n".join(lines)
+
+class Counter(Metric):
+    kind = "counter"
+
+    def inc(self, amount: float = 1, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+class Gauge(Metric):
+    kind = "gauge"
+
+    def set(self, value: float, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = value
+
+class Histogram(Metric):
+    kind = "histogram"
+
+    def __init__(self, name: str, help_text: str, labels: Sequence[str] = (),
+                 buckets: Sequence[float] = LATENCY_BUCKETS):
+        super().__init__(name, help_text, labels)
+        self.buckets = tuple(sorted(buckets))
+
+    def observe(self, value: float, **labels):
+        key = self._key(labels)
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            state = self._values.get(key)
+            if state is None:
+                # [per-bucket counts (last is +Inf), sum]
+                state = self._values[key] = [[0] * (len(self.buckets) + 1), 0.0]
+            state[0][index] += 1
+            state[1] += value
+
+    def samples(self) -> List[str]:
+        with self._lock:
+            values = {key: (list(counts), total) for key, (counts, total) in self._values.items()}
+        lines = []
+        for key, (counts, total) in sorted(values.items()):
+            cumulative = 0
+            for bound, count in zip(self.buckets + (float("inf"),), counts):
+                cumulative += count
+                labels = format_labels(self.labels + ("le",), key + (format_value(bound),))
+                lines.append(f"{self.name}_bucket{labels} {cumulative}")
+            labels = format_labels(self.labels, key)
+            lines.append(f"{self.name}_sum{labels} {format_value(total)}")
+            lines.append(f"{self.name}_count{labels} {cumulative}")
+        return lines
+
+class Registry:
+    def __init__(self):
+        self.metrics: List[Metric] = []
+
+    def register(self, metric: Metric) -> Metric:
+        self.metrics.append(metric)
+        return metric
+
+    def render(self) -> str:
+        return "\n".join(metric.render() for metric in self.metrics) + "\n"
+
+REGISTRY = Registry()
+
+UPSTREAM_REQUESTS = REGISTRY.register(Counter(
+    "arb_upstream_requests_total", "Upstream API requests by response status.",
+    ("upstream", "endpoint", "status")))
+UPSTREAM_LATENCY = REGISTRY.register(Histogram(
+    "arb_upstream_request_seconds", "Upstream API request latency.",
+    ("upstream", "endpoint"), LATENCY_BUCKETS))
+UPSTREAM_RETRIES = REGISTRY.register(Counter(
+    "arb_upstream_retries_total", "Upstream API requests retried after a transient failure.",
+    ("upstream", "endpoint")))
+ODDS_API_REMAINING = REGISTRY.register(Gauge(
+    "arb_odds_api_requests_remaining", "The Odds API quota remaining (x-requests-remaining)."))
+ODDS_API_USED = REGISTRY.register(Gauge(
+    "arb_odds_api_requests_used", "The Odds API quota used (x-requests-used)."))
+GAMES = REGISTRY.register(Gauge(
+    "arb_games", "Sportsbook games with team data by match state, last analysis.",
+    ("sport", "state")))
+SOURCE_GAMES = REGISTRY.register(Gauge(
+    "arb_source_games", "Games listed by each source, last analysis.", ("sport", "source")))
+OPPORTUNITIES = REGISTRY.register(Gauge(
+    "arb_opportunities", "Positive EV opportunities, last analysis.", ("sport",)))
+OPPORTUNITIES_FOUND = REGISTRY.register(Counter(
+    "arb_opportunities_found_total", "Positive EV opportunities found, summed over analyses.",
+    ("sport",)))
+OPPORTUNITY_DATA_AGE = REGISTRY.register(Histogram(
+    "arb_opportunity_data_age_seconds", "Age of each leg's data when an opportunity was computed.",
+    ("sport", "leg"), DATA_AGE_BUCKETS))
+STALE_OPPORTUNITIES = REGISTRY.register(Counter(
+    "arb_stale_opportunities_total", "Opportunities over the staleness budget, by outcome.",
+    ("sport", "outcome")))
+DATA_OBSERVED = REGISTRY.register(Gauge(
+    "arb_data_observed_timestamp_seconds", "Unix time each leg's data was fetched, last analysis.",
+    ("sport", "leg")))
+ORDERS = REGISTRY.register(Counter(
+    "arb_orders_total", "Orders sent by the execution engine, by outcome.", ("outcome",)))
+ORDER_ACK_LATENCY = REGISTRY.register(Histogram(
+    "arb_order_ack_seconds", "Decision-to-acknowledgement latency of placed orders.",
+    (), ORDER_LATENCY_BUCKETS))
+
+def record_request(upstream: str, endpoint: str, status, seconds: float):
+    """Count one upstream request (status is the HTTP code, or "error")."""
+    UPSTREAM_REQUESTS.inc(upstream=upstream, endpoint=endpoint, status=status)
+    UPSTREAM_LATENCY.observe(seconds, upstream=upstream, endpoint=endpoint)
+
+def record_retry(upstream: str, endpoint: str):
+    UPSTREAM_RETRIES.inc(upstream=upstream, endpoint=endpoint)
+
+def record_order(outcome: str, seconds: Optional[float] = None):
+    """Count one order by outcome (its status after the ack), with its latency if acknowledged."""
+    ORDERS.inc(outcome=outcome)
+    if seconds is not None:
+        ORDER_ACK_LATENCY.observe(seconds)
+
+def record_odds_api_quota(headers):
+    """Read The Odds API quota headers from a response."""
+    for header, gauge in (("x-requests-remaining", ODDS_API_REMAINING), ("x-requests-used", ODDS_API_USED)):
+        value = headers.get(header)
+        if value is None:
+            continue
+        try:
+            gauge.set(float(value))
+        except ValueError:
+            pass
+
+def unix_time(value: Optional[str]) -> Optional[float]:
+    if not value:
+        return None
+    try:
+        return parse_timestamp(value).timestamp()
+    except ValueError:
+        return None
+
+def observe_sport(sport: str, result: Optional[Dict]):
+    """
+    Record one sport's analysis (a process_sport result; None means no
+    matched games). Usable directly as an odds_daemon subscriber.
+    """
+    if result is None:
+        OPPORTUNITIES.set(0, sport=sport)
+        GAMES.set(0, sport=sport, state="matched")
+        return
+
+    matched = result.get("matched_games", 0)
+    live = result.get("excluded_live_games", 0)
+    with_teams = result.get("odds_games_with_teams", 0)
+    GAMES.set(matched, sport=sport, state="matched")
+    GAMES.set(live, sport=sport, state="live_excluded")
+    GAMES.set(max(0, with_teams - matched - live), sport=sport, state="unmatched")
+    SOURCE_GAMES.set(result.get("total_kalshi_games", 0), sport=sport, source="kalshi")
+    SOURCE_GAMES.set(result.get("total_odds_games", 0), sport=sport, source="odds_api")
+
+    opportunities = result.get("opportunities", [])
+    OPPORTUNITIES.set(len(opportunities), sport=sport)
+    OPPORTUNITIES_FOUND.inc(len(opportunities), sport=sport)
+
+    STALE_OPPORTUNITIES.inc(result.get("stale_refreshed", 0), sport=sport, outcome="refreshed")
+    STALE_OPPORTUNITIES.inc(result.get("stale_dropped", 0), sport=sport, outcome="dropped")
+
+    analyzed_at = unix_time(result.get("query_time")) or time.time()
+    for leg in ("kalshi", "odds"):
+        observed = unix_time(result.get(f"{leg}_query_time"))
+        if observed is not None:
+            DATA_OBSERVED.set(observed, sport=sport, leg=leg)
+        for opp in opportunities:
+            # Per-price age from analysis; the file's query_time for older results
+            age = opp.get(f"{leg}_age_seconds")
+            if age is None and observed is not None:
+                age = analyzed_at - observed
+            if age is not None:
+                OPPORTUNITY_DATA_AGE.observe(max(0.0, age), sport=sport, leg=leg)
+
+def render() -> str:
+    return REGISTRY.render()
+
+def write_textfile(path: str):
+    """Write the registry atomically (for node_exporter's textfile collector)."""
+    directory = os.path.dirname(os.path.abspath(path))
+    os.makedirs(directory, exist_ok=True)
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        f.write(render())
+    os.replace(tmp_path, path)
+
+class MetricsHandler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        if self.path.split("?", 1)[0] != "/metrics":
+            self.send_error(404)
+            return
+        body = render().encode("utf-8")
+        self.send_response(200)
+        self.send_header("Content-Type", CONTENT_TYPE)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+def serve(port: int = DEFAULT_METRICS_PORT, host: str = "127.0.0.1") -> ThreadingHTTPServer:
+    """Serve GET /metrics from a background thread; returns the server."""
+    server = ThreadingHTTPServer((host, port), MetricsHandler)
+    thread = threading.Thread(target=server.serve_forever, name="metrics", daemon=True)
+    thread.start()
+    return server
@@ -0,0 +1,377 @@
+"""
+Local stand-in for Kalshi's order endpoints, for developing and benchmarking
+order_executor.py without a real account.
+
+Serves the order subset of the Kalshi v2 API from an asyncio server
+(standard library only, HTTP/1.1 keep-alive):
+
+    POST   /portfolio/orders              place a buy limit order
+    GET    /portfolio/orders/<order_id>   order status (also by client_order_id)
+    DELETE /portfolio/orders/<order_id>   cancel the resting remainder
+    GET    /markets/<ticker>/orderbook    current book (fetch_orderbook format)
+
+Books are seeded from the kalshi_*_winner_markets.json files. Each side's
+asks start at the market's yes_ask / no_ask and step up one cent for
+BOOK_LEVELS levels. The top level holds --depth contracts, or else
+LIQUIDITY_DEPTH_SHARE of the market's liquidity (TOP_DEPTH when unknown),
+and each further level LEVEL_GROWTH times more. A buy order takes every
+level at or below its limit, filling at the level's price. The remainder
+rests, or is canceled with time_in_force "immediate_or_cancel". Taken
+depth does not come back, so repeated orders walk the book.
+
+Resting orders fill over time: every TICK_SECONDS, sellers hit up to --flow
+contracts per market side, oldest order first, at each order's limit
+(booked as maker_fill_cost). In-process callers can step the flow with
+tick().
+
+A client_order_id that was already used answers 409 with the existing
+order, which is what makes client retries idempotent. Fault injection:
+    --latency / --jitter   delay every response
+    --error-rate P         answer 503 without doing anything
+    --drop-rate P          place the order, then close the connection
+                           without answering (a lost acknowledgement)
+
+    python scripts/mock_exchange.py [--port 8790] [--depth N] [--flow N] [--latency MS] [--jitter MS] [--error-rate P] [--drop-rate P]
+"""
+import asyncio
+import glob
+import json
+import os
+import random
+import sys
+import time
+import uuid
+from datetime import datetime, timezone
+from typing import Dict, List, Optional, Tuple
+from urllib.parse import unquote, urlsplit
+
+from json_io import load_json
+from stake_optimizer import LIQUIDITY_DEPTH_SHARE
+
+# Get the project root directory (parent of scripts folder)
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+DATA_DIR = os.path.join(PROJECT_ROOT, "data")
+
+DEFAULT_HOST = "127.0.0.1"
+DEFAULT_PORT = 8790
+
+# Book shape: levels per side, contracts at the top level when neither --depth
+# nor liquidity is known, and growth of each level over the one before
+BOOK_LEVELS = 5
+TOP_DEPTH = 200
+LEVEL_GROWTH = 1.5
+
+# Sell flow into resting orders: contracts per market side per tick
+DEFAULT_FLOW = 0
+TICK_SECONDS = 1.0
+
+# Largest request accepted (head + body)
+MAX_REQUEST_BYTES = 64 * 1024
+
+STATUS_TEXT = {200: "OK", 201: "Created", 400: "Bad Request", 404: "Not Found",
+               405: "Method Not Allowed", 409: "Conflict", 503: "Service Unavailable"}
+
+def seed_levels(ask: Optional[int], liquidity: Optional[float], top_depth: Optional[int] = None) -> List[List[int]]:
+    """Ask levels [[price_cents, contracts], ...] in ascending price, starting at ask."""
+    if not ask or not 1 <= ask <= 99:
+        return []
+    if top_depth:
+        top = top_depth
+    elif liquidity:
+        top = int(liquidity / 100 * LIQUIDITY_DEPTH_SHARE / (ask / 100))
+    else:
+        top = TOP_DEPTH
+    levels = []
+    for i in range(BOOK_LEVELS):
+        if ask + i > 99:
+            break
+        levels.append([ask + i, max(1, int(top * LEVEL_GROWTH ** i))])
+    return levels
+
+def load_markets() -> Dict[str, Dict]:
+    """market_data of every market in the kalshi_*_winner_markets.json files, keyed by ticker."""
+    markets = {}
+    for path in sorted(glob.glob(os.path.join(DATA_DIR, "kalshi_*_winner_markets.json"))):
+        for market in load_json(path).get("markets", []):
+            if market.get("ticker"):
+                markets[market["ticker"]] = market.get("market_data") or {}
+    return markets
+
+def now_iso() -> str:
+    return datetime.now(timezone.utc).isoformat().replace("+00:00", "Z")
+
+class MockExchange:
+    """Books, orders and fault-injection settings. Runs on one event loop, so no locking."""
+
+    def __init__(self, markets: Dict[str, Dict], top_depth: Optional[int] = None, latency_ms: float = 0,
+                 jitter_ms: float = 0, error_rate: float = 0.0, drop_rate: float = 0.0, seed: int = 0,
+                 flow: int = DEFAULT_FLOW):
+        self.flow = flow
+        self.last_tick = time.monotonic()
+        self.latency_ms = latency_ms
+        self.jitter_ms = jitter_ms
+        self.error_rate = error_rate
+        self.drop_rate = drop_rate
+        self.random = random.Random(seed)
+        # ticker -> side ("yes"/"no") -> ask levels
+        self.books: Dict[str, Dict[str, List[List[int]]]] = {}
+        for ticker, market_data in markets.items():
+            liquidity = market_data.get("liquidity")
+            self.books[ticker] = {"yes": seed_levels(market_data.get("yes_ask"), liquidity, top_depth),
+                                  "no": seed_levels(market_data.get("no_ask"), liquidity, top_depth)}
+        self.orders: Dict[str, Dict] = {}
+        self.client_ids: Dict[str, str] = {}  # client_order_id -> order_id
+        self.requests = 0
+        self.statuses: Dict[int, int] = {}
+        self.dropped = 0
+
+    def delay(self) -> float:
+        return max(0.0, self.latency_ms + self.random.uniform(-self.jitter_ms, self.jitter_ms)) / 1000
+
+    def place(self, request: Dict) -> Tuple[int, Dict]:
+        """Match a buy order against the book; returns (status, body)."""
+        client_order_id = request.get("client_order_id")
+        if client_order_id and client_order_id in self.client_ids:
+            return 409, {"error": {"code": "order_already_exists"},
+                         "order": self.orders[self.client_ids[client_order_id]]}
+        ticker = request.get("ticker")
+        side = request.get("side")
+        if ticker not in self.books:
+            return 404, {"error": {"code": "market_not_found", "message": f"unknown market {ticker}"}}
+        if request.get("action", "buy") != "buy" or side not in ("yes", "no"):
+            return 400, {"error": {"code": "invalid_order", "message": "only buy orders on yes or no"}}
+        try:
+            count = int(request.get("count") or 0)
+            limit = int(request.get(f"{side}_price") or 0)
+        except (TypeError, ValueError):
+            count = limit = 0
+        if count < 1 or not 1 <= limit <= 99:
+            return 400, {"error": {"code": "invalid_order", "message": "count >= 1 and a price of 1-99 cents required"}}
+
+        filled = cost = 0
+        levels = self.books[ticker][side]
+        while levels and filled < count and levels[0][0] <= limit:
+            take = min(count - filled, levels[0][1])
+            filled += take
+            cost += take * levels[0][0]
+            levels[0][1] -= take
+            if levels[0][1] == 0:
+                levels.pop(0)
+
+        remaining = count - filled
+        if remaining and request.get("time_in_force") == "immediate_or_cancel":
+            status, remaining = "canceled", 0
+        else:
+            status = "resting" if remaining else "executed"
+        order = {
+            "order_id": str(uuid.uuid4()),
+            "client_order_id": client_order_id,
+            "ticker": ticker,
+            "side": side,
+            "action": "buy",
+            "type": "limit",
+            f"{side}_price": limit,
+            "status": status,
+            "initial_count": count,
+            "fill_count": filled,
+            "remaining_count": remaining,
+            "taker_fill_cost": cost,
+            "maker_fill_cost": 0,
+            "created_time": now_iso(),
+        }
+        self.orders[order["order_id"]] = order
+        if client_order_id:
+            self.client_ids[client_order_id] = order["order_id"]
+        return 201, {"order": order}
+
+    def tick(self):
+        """One tick of sell flow: up to `flow` contracts per market side fill resting orders, oldest first."""
+        left: Dict[Tuple[str, str], int] = {}
+        for order in self.orders.values():
+            if order["status"] != "resting":
+                continue
+            book = (order["ticker"], order["side"])
+            take = min(order["remaining_count"], left.setdefault(book, self.flow))
+            if take < 1:
+                continue
+            left[book] -= take
+            order["fill_count"] += take
+            order["remaining_count"] -= take
+            order["maker_fill_cost"] += take * order[f"{order['side']}_price"]
+            if order["remaining_count"] == 0:
+                order["status"] = "executed"
+
+    def advance(self, now: float):
+        """Run the ticks of sell flow due by now (time.monotonic())."""
+        if not self.flow:
+            return
+        ticks = int((now - self.last_tick) / TICK_SECONDS)
+        for _ in range(ticks):
+            self.tick()
+        self.last_tick += ticks * TICK_SECONDS
+
+    def cancel(self, order_id: str) -> Tuple[int, Dict]:
+        order = self.orders.get(order_id)
+        if order is None:
+            return 404, {"error": {"code": "not_found"}}
+        reduced = order["remaining_count"]
+        if order["status"] == "resting":
+            order["status"] = "canceled"
+            order["remaining_count"] = 0
+        return 200, {"order": order, "reduced_by": reduced}
+
+    def orderbook(self, ticker: str) -> Optional[Dict]:
+        """Kalshi orderbook format: bids per side, so YES asks appear as NO bids at 100 - P."""
+        book = self.books.get(ticker)
+        if book is None:
+            return None
+        return {"orderbook": {side: [[100 - price, qty] for price, qty in reversed(book[other])]
+                              for side, other in (("yes", "no"), ("no", "yes"))}}
+
+    def handle(self, method: str, path: str, payload) -> Tuple[int, Dict]:
+        self.advance(time.monotonic())
+        segments = [s for s in path.split("/") if s]
+        if segments == ["portfolio", "orders"]:
+            if method != "POST":
+                return 405, {"error": {"code": "method_not_allowed"}}
+            return self.place(payload if isinstance(payload, dict) else {})
+        if len(segments) == 3 and segments[:2] == ["portfolio", "orders"]:
+            if method == "DELETE":
+                return self.cancel(segments[2])
+            order = self.orders.get(segments[2]) or self.orders.get(self.client_ids.get(segments[2], ""))
+            return (200, {"order": order}) if order else (404, {"error": {"code": "not_found"}})
+        if len(segments) == 3 and segments[0] == "markets" and segments[2] == "orderbook":
+            book = self.orderbook(segments[1])
+            return (200, book) if book else (404, {"error": {"code": "market_not_found"}})
+        return 404, {"error": {"code": "not_found"}}
+
+    def summary(self) -> str:
+        statuses = ", ".join(f"{status}: {n}" for status, n in sorted(self.statuses.items()))
+        fills = sum(order["fill_count"] for order in self.orders.values())
+        return (f"{self.requests} requests ({statuses or 'none'}), {self.dropped} dropped, "
+                f"{len(self.orders)} orders, {fills} contracts filled")
+
+# ----------------------------------------------------------------------
+# HTTP
+# ----------------------------------------------------------------------
+
+async def read_request(reader: asyncio.StreamReader) -> Optional[Tuple[str, str, object, bool]]:
+    """Read one request; returns (method, path, JSON body or None, keep_alive), or None at EOF or if malformed."""
+    try:
+        head = await reader.readuntil(b"\r\n\r\n")
+    except (asyncio.IncompleteReadError, asyncio.LimitOverrunError):
+        return None
+    lines = head.decode("latin-1").split("\r\n")
+    parts = lines[0].split()
+    if len(parts) != 3:
+        return None
+    headers = {}
+    for line in lines[1:]:
+        if ":" in line:
+            name, value = line.split(":", 1)
+            headers[name.strip().lower()] = value.strip()
+    try:
+        length = int(headers.get("content-length") or 0)
+    except ValueError:
+        return None
+    if length + len(head) > MAX_REQUEST_BYTES:
+        return None
+    payload = None
+    if length:
+        try:
+            payload = json.loads(await reader.readexactly(length))
+        except (asyncio.IncompleteReadError, ValueError):
+            return None
+    keep_alive = headers.get("connection", "").lower() != "close"
+    return parts[0].upper(), unquote(urlsplit(parts[1]).path), payload, keep_alive
+
+def encode_response(status: int, payload, keep_alive: bool) -> bytes:
+    body = json.dumps(payload, separators=(",", ":")).encode("utf-8")
+    return (f"HTTP/1.1 {status} {STATUS_TEXT.get(status, 'Error')}\r\n"
+            "Content-Type: application/json\r\n"
+            f"Content-Length: {len(body)}\r\n"
+            f"Connection: {'keep-alive' if keep_alive else 'close'}\r\n\r\n").encode("latin-1") + body
+
+async def handle_connection(exchange: MockExchange, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+    try:
+        while True:
+            request = await read_request(reader)
+            if request is None:
+                break
+            method, path, payload, keep_alive = request
+            exchange.requests += 1
+            delay = exchange.delay()
+            if delay:
+                await asyncio.sleep(delay)
+
+            if exchange.error_rate and exchange.random.random() < exchange.error_rate:
+                status, body = 503, {"error": {"code": "service_unavailable", "message": "injected"}}
+            else:
+                status, body = exchange.handle(method, path, payload)
+                if method == "POST" and status == 201 and exchange.drop_rate \
+                        and exchange.random.random() < exchange.drop_rate:
+                    # The order stands, but its acknowledgement is lost
+                    exchange.dropped += 1
+                    break
+            exchange.statuses[status] = exchange.statuses.get(status, 0) + 1
+            writer.write(encode_response(status, body, keep_alive))
+            await writer.drain()
+            if not keep_alive:
+                break
+    except (ConnectionError, asyncio.CancelledError):
+        pass
+    finally:
+        writer.close()
+
+async def start(exchange: MockExchange, host: str = DEFAULT_HOST, port: int = DEFAULT_PORT) -> asyncio.AbstractServer:
+    """Start serving exchange on the running loop (port 0 picks a free port)."""
+    return await asyncio.start_server(lambda r, w: handle_connection(exchange, r, w), host, port)
+
+async def serve(exchange: MockExchange, host: str = DEFAULT_HOST, port: int = DEFAULT_PORT):
+    server = await start(exchange, host, port)
+    print(f"Mock exchange on http://{host}:{port} ({len(exchange.books)} markets)")
+    async with server:
+        await server.serve_forever()
+
+def main():
+    """
+    Command line arguments:
+        --host HOST - Interface to bind (default 127.0.0.1)
+        --port PORT - Port to listen on (default 8790)
+        --depth N - Contracts at each book's top level (default: from the market's liquidity)
+        --flow N - Contracts per market side sold into resting orders each second (default 0)
+        --latency MS - Added to every response (default 0)
+        --jitter MS - Uniform +/- variation of the latency (default 0)
+        --error-rate P - Answer this fraction of requests with 503
+        --drop-rate P - Place this fraction of orders without answering
+        --seed N - Seed for jitter and fault injection (default 0)
+    """
+    options = {"--host": DEFAULT_HOST, "--port": str(DEFAULT_PORT), "--depth": None, "--flow": str(DEFAULT_FLOW),
+               "--latency": "0", "--jitter": "0",
+               "--error-rate": "0", "--drop-rate": "0", "--seed": "0"}
+    for flag in list(options):
+        if flag in sys.argv:
+            idx = sys.argv.index(flag)
+            if idx + 1 >= len(sys.argv):
+                print(f"Error: {flag} requires a value")
+                sys.exit(1)
+            options[flag] = sys.argv[idx + 1]
+            del sys.argv[idx:idx + 2]
+
+    try:
+        exchange = MockExchange(load_markets(), top_depth=int(options["--depth"]) if options["--depth"] else None,
+                                latency_ms=float(options["--latency"]),
+                                jitter_ms=float(options["--jitter"]), error_rate=float(options["--error-rate"]),
+                                drop_rate=float(options["--drop-rate"]), seed=int(options["--seed"]),
+                                flow=int(options["--flow"]))
+        port = int(options["--port"])
+    except ValueError as e:
+        print(f"Error: {e}")
+        sys.exit(1)
+    try:
+        asyncio.run(serve(exchange, options["--host"], port))
+    except KeyboardInterrupt:
+        print(f"\nServed {exchange.summary()}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,115 @@
+"""
+NDJSON output for piping opportunities into downstream systems
+(compare_odds.py --ndjson [TARGET]).
+
+One compact JSON object per line, written and flushed as soon as each sport
+is analyzed. Every record carries schema_version, a per-run sequence number
+(seq) and a type:
+
+    {"schema_version": 1, "seq": 0, "type": "opportunity", "run_id": ..., "emitted_at": ...,
+     "sport": "ncaab", "rank": 1, "key": "<event_ticker>:<away|home>", "event_ticker": ...,
+     "commence_time": ..., "away_team": ..., "home_team": ..., "bet_team": ...,
+     "bet_team_name": ..., "kalshi_price": 13, "edge_cents": 2.3, "expected_value": 16.31,
+     "opportunity": {...full opportunity...}}
+    {"schema_version": 1, "seq": 5, "type": "sport_done", "sport": "ncaab", "matched_games": 26,
+     "total_opportunities": 5, ...}
+    {"schema_version": 1, "seq": 9, "type": "run_end", "sports": 4, "total_opportunities": 10, ...}
+
+TARGET is "-" (stdout, the default), a file or FIFO path, "tcp://HOST:PORT"
+or "unix:PATH".
+"""
+import json
+import socket
+import sys
+import uuid
+from datetime import datetime, timezone
+from typing import Dict, Optional
+
+from opportunity_ledger import get_bet_price, get_edge_cents, opportunity_key
+
+NDJSON_SCHEMA_VERSION = 1
+
+def open_target(target: str):
+    """Open an NDJSON target for writing text."""
+    if target in ("-", ""):
+        return sys.stdout
+    if target.startswith("tcp://"):
+        host, _, port = target[len("tcp://"):].rpartition(":")
+        sock = socket.create_connection((host or "127.0.0.1", int(port)))
+        return sock.makefile("w", encoding="utf-8", newline="\n")
+    if target.startswith("unix:"):
+        sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        sock.connect(target[len("unix:"):])
+        return sock.makefile("w", encoding="utf-8", newline="\n")
+    # Plain file or FIFO (opening a FIFO blocks until a reader attaches)
+    return open(target, "w", encoding="utf-8", newline="\n")
+
+class NDJSONWriter:
+    """Writes sequenced records to a target, one line each, flushed immediately."""
+
+    def __init__(self, target: str = "-"):
+        self.target = target
+        self.stream = open_target(target)
+        self.run_id = uuid.uuid4().hex
+        self.seq = 0
+        self.total_opportunities = 0
+        self.sports = 0
+        self.closed = False
+
+    def emit(self, record_type: str, fields: Dict):
+        if self.closed:
+            return
+        record = {
+            "schema_version": NDJSON_SCHEMA_VERSION,
+            "seq": self.seq,
+            "type": record_type,
+            "run_id": self.run_id,
+            "emitted_at": datetime.now(timezone.utc).isoformat(),
+        }
+        record.update(fields)
+        self.seq += 1
+        try:
+            self.stream.write(json.dumps(record, ensure_ascii=False, separators=(",", ":")) + "\n")
+            self.stream.flush()
+        except BrokenPipeError:
+            # Downstream reader went away; stop writing instead of failing the run
+            self.closed = True
+
+    def emit_sport(self, sport: str, result: Optional[Dict]):
+        """Emit a sport's opportunities (already ranked) followed by a sport_done record."""
+        opportunities = result["opportunities"] if result else []
+        for rank, opp in enumerate(opportunities, 1):
+            self.emit("opportunity", {
+                "sport": sport,
+                "rank": rank,
+                "key": opportunity_key(opp),
+                "event_ticker": opp.get("event_ticker"),
+                "commence_time": opp.get("commence_time"),
+                "away_team": opp.get("away_team"),
+                "home_team": opp.get("home_team"),
+                "bet_team": opp.get("bet_team"),
+                "bet_team_name": opp.get("bet_team_name"),
+                "kalshi_price": get_bet_price(opp),
+                "edge_cents": get_edge_cents(opp),
+                "expected_value": opp.get("expected_value"),
+                "opportunity": opp,
+            })
+        self.emit("sport_done", {
+            "sport": sport,
+            "matched_games": result["matched_games"] if result else 0,
+            "total_kalshi_games": result.get("total_kalshi_games", 0) if result else 0,
+            "total_odds_games": result.get("total_odds_games", 0) if result else 0,
+            "excluded_live_games": result.get("excluded_live_games", 0) if result else 0,
+            "total_opportunities": len(opportunities),
+        })
+        self.sports += 1
+        self.total_opportunities += len(opportunities)
+
+    def close(self):
+        self.emit("run_end", {"sports": self.sports, "total_opportunities": self.total_opportunities})
+        self.closed = True
+        if self.stream is not sys.stdout:
+            try:
+                self.stream.close()
+            except OSError:
+                pass
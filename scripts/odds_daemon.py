@@ -0,0 +1,545 @@
+"""
+Resident service mode.
+
+Instead of a cron loop re-running compare_odds.py (which re-reads every file
+and re-fetches every game each time), the daemon keeps each sport's matched
+games and their analysis in memory, keyed by event, and re-polls individual
+matched games on a priority schedule:
+
+- games close to commence_time are polled every few seconds, games days out
+  about once an hour (POLL_INTERVALS)
+- a game whose prices moved on its last poll is polled sooner (MOVING_FACTOR)
+- games that have started are dropped (live games are never bet)
+- each sport is fully re-listed every DISCOVERY_SECONDS to pick up new games,
+  on its own thread so a slow listing never delays a due poll
+
+A poll swaps the fetched legs into just the polled games (each stamped with
+its own observation time) and re-analyzes only those. The sport is then
+published from what is resident: the odds_comparison_<sport>.json file and
+the opportunity ledger are updated, and subscribe() callbacks are called with
+the result, whose "polled_events" lists the games that were re-analyzed.
+"""
+import heapq
+import sys
+import threading
+import time
+from datetime import datetime, timezone
+from typing import Callable, Dict, List, Optional, Tuple
+
+import alerts
+import clv_tracker
+import compare_odds
+import fetch_kalshi_sports
+import fetch_odds_api_sports
+import json_stream
+import maker_quotes
+import metrics
+import position_book
+from opportunity_ledger import parse_timestamp
+from refresh_all_data import refresh_all, refresh_sport
+from snapshot_store import DEFAULT_DB_PATH, SnapshotStore
+
+# (seconds until commence_time, poll interval in seconds), nearest first
+POLL_INTERVALS = [
+    (15 * 60, 20),
+    (60 * 60, 60),
+    (6 * 60 * 60, 5 * 60),
+    (24 * 60 * 60, 15 * 60),
+]
+FAR_POLL_SECONDS = 60 * 60
+
+# Poll interval multiplier for a game whose prices changed on its last poll
+MOVING_FACTOR = 0.5
+
+# Full re-listing of each sport (new games, changed schedules)
+DISCOVERY_SECONDS = 30 * 60
+
+# Games coming due within this window are fetched in the same Odds API request
+BATCH_WINDOW_SECONDS = 5
+
+# Longest the poll loop sleeps before re-checking the schedule
+RESCHEDULE_CHECK_SECONDS = 1.0
+
+def poll_interval(commence_time: Optional[str], moving: bool = False,
+                  now: Optional[float] = None) -> float:
+    """Seconds until a game should be polled again."""
+    now = time.time() if now is None else now
+    interval = FAR_POLL_SECONDS
+    if commence_time:
+        try:
+            seconds_out = parse_timestamp(commence_time).timestamp() - now
+        except ValueError:
+            seconds_out = None
+        if seconds_out is not None:
+            for horizon, seconds in POLL_INTERVALS:
+                if seconds_out <= horizon:
+                    interval = seconds
+                    break
+            # Never sleep past the start of the game
+            interval = max(1.0, min(interval, seconds_out))
+    return interval * MOVING_FACTOR if moving else interval
+
+def price_signature(kalshi_entries: List[Dict], odds_game: Optional[Dict]) -> Tuple:
+    """Hashable summary of every price of one game, used to detect movement."""
+    kalshi_prices = tuple(sorted(
+        (entry.get("ticker"), entry["market_data"].get("yes_bid"), entry["market_data"].get("yes_ask"),
+         entry["market_data"].get("no_bid"), entry["market_data"].get("no_ask"))
+        for entry in kalshi_entries
+    ))
+    odds_prices = []
+    for bookmaker in (odds_game or {}).get("bookmakers", []):
+        for market in bookmaker.get("markets", []):
+            if market.get("key") == "h2h":
+                for outcome in market.get("outcomes", []):
+                    odds_prices.append((bookmaker.get("key"), outcome.get("name"), outcome.get("price")))
+    return kalshi_prices, tuple(sorted(odds_prices))
+
+def game_signature(game: Dict) -> Tuple:
+    """price_signature of a matched game's two Kalshi markets and its odds."""
+    return price_signature([game["away_kalshi_market"], game["home_kalshi_market"]], game.get("odds_data"))
+
+def analyze(game: Dict) -> Optional[Dict]:
+    """A matched game's opportunity, if it clears compare_odds.MIN_EV_THRESHOLD."""
+    opportunities = compare_odds.find_opportunities([game])
+    return opportunities[0] if opportunities else None
+
+def refresh_game(game: Dict, kalshi_entries: Optional[List[Dict]], odds_game: Optional[Dict],
+                 observed_at: str) -> Optional[Dict]:
+    """
+    A copy of a matched game with freshly polled legs swapped in (None for a
+    leg whose request failed keeps it), each stamped with its own observation
+    time. Returns None if the game's Kalshi markets are gone.
+    """
+    game = dict(game)
+    if kalshi_entries is not None:
+        entries = {entry.get("ticker"): entry for entry in kalshi_entries}
+        away = entries.get(game["away_kalshi_market"].get("ticker"))
+        home = entries.get(game["home_kalshi_market"].get("ticker"))
+        if not away or not home:
+            return None
+        game["away_kalshi_market"] = json_stream.project_kalshi_market(away)
+        game["home_kalshi_market"] = json_stream.project_kalshi_market(home)
+        game["kalshi_observed_at"] = compare_odds.oldest_timestamp(away.get("observed_at") or observed_at,
+                                                                   home.get("observed_at") or observed_at)
+    if odds_game is not None:
+        game["odds_data"] = odds_game
+        game["commence_time"] = odds_game.get("commence_time") or game.get("commence_time")
+        game["odds_observed_at"] = odds_game.get("observed_at") or observed_at
+    return game
+
+class OddsDaemon:
+    """
+    In-memory state and poll scheduler for a set of sports.
+
+    Each sport keeps its matched games and their analysis resident, keyed by
+    event_ticker in match order, plus the load stats of its latest listing.
+    A full listing (refresh_all_data.refresh_sport) is matched once; a poll
+    only replaces and re-analyzes the games it fetched, and publishing
+    assembles the sport's result from what is resident, the way
+    compare_odds.process_sport would from the same data.
+    """
+
+    def __init__(self, sports: List[str], write_db: bool = False, export_json: bool = True,
+                 pretty: bool = False, workers: int = 4):
+        self.sports = list(sports)
+        self.write_db = write_db
+        self.export_json = export_json
+        self.pretty = pretty
+        self.workers = workers
+        self.snapshot_db = DEFAULT_DB_PATH if write_db else None
+
+        self.games: Dict[str, Dict[str, Dict]] = {}     # sport -> event_ticker -> matched game
+        self.analysis: Dict[str, Dict[str, Optional[Dict]]] = {}  # sport -> event_ticker -> opportunity or None
+        self.listings: Dict[str, Dict] = {}   # sport -> {"stats", "excluded_live"} of the latest listing
+        self.results: Dict[str, Optional[Dict]] = {}  # sport -> latest published result
+        self.events: Dict[Tuple[str, str], Dict] = {}  # (sport, event_ticker) -> schedule entry
+        self._schedule: List[Tuple[float, int, Tuple[str, str]]] = []
+        self._seq = 0
+        self._discovery_due: Dict[str, float] = {}
+        self._subscribers: List[Callable[[str, Optional[Dict]], None]] = []
+        self._game_subscribers: List[Callable[[str, List[Dict]], None]] = []
+        self._lock = threading.RLock()
+
+    # ------------------------------------------------------------------
+    # Publishing
+    # ------------------------------------------------------------------
+
+    def subscribe(self, callback: Callable[[str, Optional[Dict]], None]):
+        """
+        Call callback(sport, result) after every re-analysis of a sport. After
+        a poll, result["polled_events"] lists the event tickers re-analyzed.
+        """
+        with self._lock:
+            self._subscribers.append(callback)
+
+    def subscribe_games(self, callback: Callable[[str, List[Dict]], None]):
+        """
+        Call callback(sport, matched_games) after every re-analysis of a
+        sport, with every matched game that has not started (not only those
+        with an opportunity).
+        """
+        with self._lock:
+            self._game_subscribers.append(callback)
+
+    def publish(self, sport: str, polled_events: Optional[List[str]] = None):
+        """Assemble a sport's result from its resident games and notify subscribers."""
+        with self._lock:
+            result = None
+            games = self.games.get(sport) or {}
+            if games:
+                listing = self.listings[sport]
+                opportunities = [dict(opp) for opp in self.analysis[sport].values() if opp]
+                result = compare_odds.finalize_sport(sport, len(games), listing["excluded_live"], listing["stats"],
+                                                     opportunities, self.snapshot_db, self.pretty)
+                if polled_events is not None:
+                    result["polled_events"] = polled_events
+            self.results[sport] = result
+            matched_games = list(games.values()) if self._game_subscribers else []
+            subscribers = list(self._subscribers)
+            game_subscribers = list(self._game_subscribers)
+        for callback in subscribers:
+            try:
+                callback(sport, result)
+            except Exception as e:
+                print(f"Warning: subscriber failed for {sport.upper()}: {e}")
+        for callback in game_subscribers:
+            try:
+                callback(sport, matched_games)
+            except Exception as e:
+                print(f"Warning: game subscriber failed for {sport.upper()}: {e}")
+
+    # ------------------------------------------------------------------
+    # Scheduling
+    # ------------------------------------------------------------------
+
+    def _schedule_event(self, key: Tuple[str, str], now: float):
+        entry = self.events[key]
+        entry["next_poll"] = now + poll_interval(entry["commence_time"], entry["moving"], now)
+        self._seq += 1
+        heapq.heappush(self._schedule, (entry["next_poll"], self._seq, key))
+
+    def load_sport(self, sport: str, fetched: Dict, now: Optional[float] = None):
+        """
+        Match a sport's full refresh result, replace its resident games and
+        analysis, and (re)schedule every matched game.
+        """
+        now = time.time() if now is None else now
+        if fetched.get("kalshi_data") is None or fetched.get("odds_data") is None:
+            # Re-listing failed or found nothing to match: keep the previous state
+            with self._lock:
+                self._discovery_due[sport] = now + DISCOVERY_SECONDS
+            return
+        stats = {}
+        try:
+            matched_games, excluded_live = compare_odds.load_and_match_games(sport, self.snapshot_db, stats, fetched)
+        except Exception as e:
+            print(f"Warning: could not match {sport.upper()} listing: {e}")
+            with self._lock:
+                self._discovery_due[sport] = now + DISCOVERY_SECONDS
+            return
+        games = {game["event_ticker"]: game for game in matched_games}
+        analysis = {event_ticker: analyze(game) for event_ticker, game in games.items()}
+
+        with self._lock:
+            self.games[sport] = games
+            self.analysis[sport] = analysis
+            self.listings[sport] = {"stats": stats, "excluded_live": excluded_live}
+            for key in [k for k in self.events if k[0] == sport]:
+                del self.events[key]
+            for event_ticker, game in games.items():
+                key = (sport, event_ticker)
+                self.events[key] = {
+                    "odds_id": game["odds_data"].get("id"),
+                    "commence_time": game.get("commence_time"),
+                    "moving": False,
+                    "signature": game_signature(game),
+                    "next_poll": None,
+                }
+                self._schedule_event(key, now)
+            self._discovery_due[sport] = now + DISCOVERY_SECONDS
+
+    def discover(self, sport: str):
+        """Fully re-list one sport (both APIs) and publish it."""
+        fetched = refresh_sport(sport, write_db=self.write_db, export_json=self.export_json, pretty=self.pretty)
+        self.load_sport(sport, fetched)
+        self.publish(sport)
+
+    def _pop_due(self, now: float) -> Dict[str, List[Tuple[str, str]]]:
+        """Pop every game due within BATCH_WINDOW_SECONDS, grouped by sport."""
+        due: Dict[str, List[Tuple[str, str]]] = {}
+        while self._schedule and self._schedule[0][0] <= now + BATCH_WINDOW_SECONDS:
+            due_at, _, key = heapq.heappop(self._schedule)
+            entry = self.events.get(key)
+            # Skip stale heap entries (rescheduled or dropped since)
+            if entry is None or entry["next_poll"] != due_at:
+                continue
+            due.setdefault(key[0], []).append(key)
+        return due
+
+    # ------------------------------------------------------------------
+    # Targeted polls
+    # ------------------------------------------------------------------
+
+    def _drop_event(self, key: Tuple[str, str]):
+        sport, event_ticker = key
+        self.events.pop(key, None)
+        self.games.get(sport, {}).pop(event_ticker, None)
+        self.analysis.get(sport, {}).pop(event_ticker, None)
+
+    def poll_sport_events(self, sport: str, keys: List[Tuple[str, str]], now: Optional[float] = None) -> int:
+        """
+        Re-fetch the Kalshi markets and sportsbook odds of the given games
+        (one Kalshi request per game, one Odds API request for all of them),
+        re-analyze just those games, reschedule them and publish the sport.
+
+        Returns the number of games whose prices moved.
+        """
+        now = time.time() if now is None else now
+        moved = 0
+
+        # Games that have started are never bet; stop polling them
+        with self._lock:
+            keys = [key for key in keys if key in self.events]
+            live = [key for key in keys if compare_odds.is_game_live(self.events[key]["commence_time"])]
+            keys = [key for key in keys if key not in live]
+            for key in live:
+                if key[1] in self.games.get(sport, {}):
+                    self.listings[sport]["excluded_live"] += 1
+                self._drop_event(key)
+            odds_ids = [self.events[key]["odds_id"] for key in keys if self.events[key]["odds_id"]]
+        if not keys:
+            if live:
+                self.publish(sport, [event_ticker for _, event_ticker in live])
+            return 0
+
+        kalshi_updates = {}
+        for _, event_ticker in keys:
+            try:
+                kalshi_updates[event_ticker] = fetch_kalshi_sports.fetch_event_markets(sport, event_ticker)
+            except Exception as e:
+                print(f"Warning: Kalshi poll failed for {event_ticker}: {e}")
+
+        odds_updates = {}
+        if odds_ids:
+            try:
+                odds_games = fetch_odds_api_sports.fetch_odds_api_sports(
+                    sport, fetch_odds_api_sports.ODDS_API_KEY, event_ids=odds_ids
+                )
+                fetch_odds_api_sports.fill_team_names(odds_games)
+                odds_updates = {game.get("id"): game for game in odds_games}
+            except Exception as e:
+                print(f"Warning: Odds API poll failed for {sport.upper()}: {e}")
+
+        observed_at = datetime.now(timezone.utc).isoformat()
+        with self._lock:
+            games = self.games.get(sport, {})
+            for key in keys:
+                _, event_ticker = key
+                entry = self.events.get(key)
+                game = games.get(event_ticker)
+                if entry is None or game is None:
+                    # Re-listed (or dropped) while the poll was in flight
+                    continue
+                game = refresh_game(game, kalshi_updates.get(event_ticker), odds_updates.get(entry["odds_id"]),
+                                    observed_at)
+                if game is None:
+                    # Markets closed or delisted
+                    self._drop_event(key)
+                    continue
+                games[event_ticker] = game
+                self.analysis[sport][event_ticker] = analyze(game)
+                entry["commence_time"] = game.get("commence_time") or entry["commence_time"]
+
+                signature = game_signature(game)
+                entry["moving"] = signature != entry["signature"]
+                entry["signature"] = signature
+                moved += entry["moving"]
+                self._schedule_event(key, now)
+
+        if self.write_db:
+            with SnapshotStore(DEFAULT_DB_PATH) as store:
+                markets = [m for updates in kalshi_updates.values() for m in updates]
+                if markets:
+                    store.write_kalshi_snapshot(sport, markets, observed_at, listing=False)
+                if odds_updates:
+                    store.write_odds_snapshot(sport, list(odds_updates.values()), observed_at, listing=False)
+
+        self.publish(sport, [event_ticker for _, event_ticker in live + keys])
+        return moved
+
+    # ------------------------------------------------------------------
+    # Main loop
+    # ------------------------------------------------------------------
+
+    def start(self):
+        """Initial full refresh of every sport (concurrently), then publish."""
+        results = refresh_all(self.sports, max_workers=self.workers, write_db=self.write_db,
+                              export_json=self.export_json, pretty=self.pretty)
+        for sport in self.sports:
+            self.load_sport(sport, results.get(sport, {}))
+            self.publish(sport)
+
+    def discover_due(self, now: Optional[float] = None) -> float:
+        """
+        Re-list every sport whose DISCOVERY_SECONDS are up.
+        Returns the number of seconds until the next re-listing.
+        """
+        now = time.time() if now is None else now
+        for sport in self.sports:
+            with self._lock:
+                due = self._discovery_due.get(sport, 0) <= now
+            if due:
+                self.discover(sport)
+        with self._lock:
+            next_times = list(self._discovery_due.values())
+        return max(0.0, min(next_times) - time.time()) if next_times else DISCOVERY_SECONDS
+
+    def run_once(self, now: Optional[float] = None) -> float:
+        """
+        Poll whatever games are due.
+        Returns the number of seconds until the next scheduled poll.
+        """
+        now = time.time() if now is None else now
+        with self._lock:
+            due = self._pop_due(now)
+        for sport, keys in due.items():
+            self.poll_sport_events(sport, keys, now)
+
+        with self._lock:
+            next_poll = self._schedule[0][0] if self._schedule else None
+        return max(0.0, next_poll - time.time()) if next_poll is not None else DISCOVERY_SECONDS
+
+    def _run_discovery(self, stop_event: threading.Event):
+        while not stop_event.is_set():
+            try:
+                wait = self.discover_due()
+            except Exception as e:
+                print(f"Warning: daemon re-listing failed: {e}")
+                wait = BATCH_WINDOW_SECONDS
+            stop_event.wait(wait)
+
+    def run(self, stop_event: Optional[threading.Event] = None):
+        """
+        Run until stop_event is set (or forever). Re-listings run on their own
+        thread, so a slow listing never holds back a due game poll.
+        """
+        stop_event = stop_event or threading.Event()
+        self.start()
+        threading.Thread(target=self._run_discovery, args=(stop_event,), name="odds-discovery",
+                         daemon=True).start()
+        while not stop_event.is_set():
+            try:
+                wait = self.run_once()
+            except Exception as e:
+                print(f"Warning: daemon iteration failed: {e}")
+                wait = BATCH_WINDOW_SECONDS
+            # A re-listing on the other thread may schedule earlier polls meanwhile
+            stop_event.wait(min(wait, RESCHEDULE_CHECK_SECONDS))
+
+def print_update(sport: str, result: Optional[Dict]):
+    """Default subscriber: one line per published sport."""
+    stamp = datetime.now().strftime("%H:%M:%S")
+    if result is None:
+        print(f"[{stamp}] {sport.upper()}: no matched games")
+        return
+    best = result["opportunities"][0]["expected_value"] if result["opportunities"] else None
+    best_text = f", best EV ${best:.2f}" if best is not None else ""
+    print(f"[{stamp}] {result['sport_name']}: {result['matched_games']} games, "
+          f"{result['total_opportunities']} opportunities{best_text}", flush=True)
+
+def main():
+    """
+    Run the daemon until interrupted.
+
+    Command line arguments:
+        <sport> ... - Sports to watch (default: every sport in compare_odds.SPORT_CONFIG)
+        --db - Also append every poll to the SQLite snapshot store
+        --no-json - Skip the fetchers' JSON data file exports
+        --pretty - Write indented JSON for humans (default compact)
+        --alerts CONFIG - Evaluate alert rules (see alerts.py) on every publish
+        --metrics-port PORT - Serve Prometheus metrics (see metrics.py) on
+                              http://127.0.0.1:PORT/metrics
+        --clv - Track and capture the closing-line value of every
+                opportunity (see clv_tracker.py)
+        --maker - Keep maker (resting limit order) quotes for every matched
+                  market, requoting markets as their prices move (see
+                  maker_quotes.py)
+        --positions - Mark held positions to market on every poll and settle
+                      finished markets (see position_book.py)
+    """
+    alert_engine = None
+    if "--alerts" in sys.argv:
+        idx = sys.argv.index("--alerts")
+        if idx + 1 >= len(sys.argv):
+            print("Error: --alerts requires a config file")
+            sys.exit(1)
+        # State lives in memory for the life of the daemon
+        alert_engine = alerts.load_alert_engine(sys.argv[idx + 1], persist_state=False)
+        del sys.argv[idx:idx + 2]
+
+    metrics_port = None
+    if "--metrics-port" in sys.argv:
+        idx = sys.argv.index("--metrics-port")
+        try:
+            metrics_port = int(sys.argv[idx + 1])
+        except (IndexError, ValueError):
+            print("Error: --metrics-port requires a port number")
+            sys.exit(1)
+        del sys.argv[idx:idx + 2]
+
+    write_db = "--db" in sys.argv
+    if write_db:
+        sys.argv.remove("--db")
+    export_json = "--no-json" not in sys.argv
+    if not export_json:
+        sys.argv.remove("--no-json")
+    pretty = "--pretty" in sys.argv
+    if pretty:
+        sys.argv.remove("--pretty")
+    maker = "--maker" in sys.argv
+    if maker:
+        sys.argv.remove("--maker")
+    book = None
+    if "--positions" in sys.argv:
+        sys.argv.remove("--positions")
+        book = position_book.PositionBook()
+    clv = None
+    if "--clv" in sys.argv:
+        sys.argv.remove("--clv")
+        clv = clv_tracker.ClvTracker(compare_odds.capture_closing_lines)
+
+    sports = [arg.lower() for arg in sys.argv[1:]] or list(compare_odds.SPORT_CONFIG.keys())
+    unknown = [sport for sport in sports if sport not in compare_odds.SPORT_CONFIG]
+    if unknown:
+        print(f"Error: Unsupported sport '{unknown[0]}'")
+        print(f"Supported sports: {', '.join(compare_odds.SPORT_CONFIG.keys())}")
+        sys.exit(1)
+
+    daemon = OddsDaemon(sports, write_db=write_db, export_json=export_json, pretty=pretty)
+    daemon.subscribe(print_update)
+    daemon.subscribe(metrics.observe_sport)
+    if metrics_port:
+        metrics.serve(metrics_port)
+        print(f"Metrics on http://127.0.0.1:{metrics_port}/metrics")
+    if alert_engine:
+        daemon.subscribe(alert_engine.on_publish)
+    if clv:
+        daemon.subscribe(clv.on_publish)
+        clv.start()
+    if maker:
+        daemon.subscribe_games(maker_quotes.QuoteBook().on_games)
+    if book:
+        daemon.subscribe_games(book.on_games)
+    print(f"Watching {', '.join(s.upper() for s in sports)} (Ctrl+C to stop)")
+    try:
+        daemon.run()
+    except KeyboardInterrupt:
+        print("\nStopped.")
+    finally:
+        if clv:
+            clv.stop()
+        if book:
+            book.save()
+
+if __name__ == "__main__":
+    main()
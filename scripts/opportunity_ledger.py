@@ -0,0 +1,382 @@
+"""
+Opportunity ledger.
+Tracks every positive EV opportunity across runs so we can see how long an
+edge lasted and how fast it closed.
+
+The ledger is an append-only JSON Lines file per sport. Each run appends one
+record per opportunity that opened, changed price/EV or closed, so an update
+costs O(changed opportunities) rather than O(history). The time of the latest
+run (the last_seen of every open entry) is kept in a small state file next to
+the log instead of a line per run. Once the log has grown past
+COMPACT_MIN_BYTES and twice its size at the last compaction, it is rewritten
+as one snapshot record per entry.
+
+get_ledger keeps each sport's ledger in memory, so long-running callers (the
+daemon, --watch) replay the file once rather than on every run.
+"""
+import json
+import os
+import statistics
+import sys
+from datetime import datetime, timezone
+from typing import Dict, List, Optional
+
+from json_io import load_json, write_json
+
+# Get the project root directory (parent of scripts folder)
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+DATA_DIR = os.path.join(PROJECT_ROOT, "data")
+
+LEDGER_FILE_TEMPLATE = "opportunity_ledger_{sport}.jsonl"
+STATE_FILE_SUFFIX = ".state.json"
+
+# The log is compacted once it exceeds this and twice its compacted size
+COMPACT_MIN_BYTES = 1024 * 1024
+
+# Elapsed-time buckets (minutes since first seen) used for EV decay curves
+DECAY_BUCKETS_MINUTES = [0, 1, 2, 5, 10, 15, 30, 60, 120, 240]
+
+def parse_timestamp(ts: str) -> datetime:
+    """Parse an ISO 8601 timestamp, assuming UTC when no timezone is given."""
+    if ts.endswith("Z"):
+        ts = ts[:-1] + "+00:00"
+    parsed = datetime.fromisoformat(ts)
+    if parsed.tzinfo is None:
+        parsed = parsed.replace(tzinfo=timezone.utc)
+    return parsed
+
+def opportunity_key(opp: Dict) -> str:
+    """Ledger key for an opportunity: the event plus the side we would bet."""
+    return f"{opp['event_ticker']}:{opp['bet_team']}"
+
+def get_bet_price(opp: Dict) -> Optional[float]:
+    """Kalshi price (cents) of the side the opportunity bets on."""
+    if opp.get("bet_team") == "away":
+        return opp.get("away_kalshi_prob")
+    return opp.get("home_kalshi_prob")
+
+def get_edge_cents(opp: Dict) -> Optional[float]:
+    """
+    Edge of the bet side in cents: devigged sportsbook probability (%) minus
+    the Kalshi price (cents).
+    """
+    price = get_bet_price(opp)
+    prob = opp.get("away_prob_normalized") if opp.get("bet_team") == "away" else opp.get("home_prob_normalized")
+    if price is None or prob is None:
+        return None
+    return prob - price
+
+class OpportunityLedger:
+    """
+    In-memory view of a sport's ledger file.
+
+    Entries are dicts with first_seen, last_seen, closed_at, peak_ev, the
+    latest --bankroll stake (None when unsized) and a price path of [timestamp, kalshi_price, expected_value] points recorded
+    only when price or EV changed.
+    """
+
+    def __init__(self, sport: str, path: Optional[str] = None):
+        self.sport = sport
+        self.path = path or os.path.join(DATA_DIR, LEDGER_FILE_TEMPLATE.format(sport=sport))
+        self.state_path = self.path + STATE_FILE_SUFFIX
+        self.entries: Dict[str, Dict] = {}
+        self.open_keys = set()
+        self.last_run: Optional[str] = None
+        self.log_bytes = 0          # size of the log file as written by this object
+        self.compacted_bytes = 0    # size of the log right after the last compaction
+
+    def load(self) -> "OpportunityLedger":
+        """Replay the ledger file (and the last run from the state file) into memory."""
+        if not os.path.exists(self.path):
+            return self
+        with open(self.path, "rb") as f:
+            for line in f:
+                self.log_bytes += len(line)
+                line = line.strip()
+                if not line:
+                    continue
+                try:
+                    record = json.loads(line)
+                except ValueError:
+                    # A torn final line from an interrupted write - ignore it
+                    continue
+                self._apply(record)
+        if os.path.exists(self.state_path):
+            state = load_json(self.state_path, use_cache=False)
+            self.compacted_bytes = state.get("compacted_bytes", 0)
+            if state.get("last_run") and (self.last_run is None or state["last_run"] > self.last_run):
+                self._apply({"op": "run", "t": state["last_run"]})
+        return self
+
+    def _apply(self, record: Dict):
+        op = record.get("op")
+        if op == "run":
+            # Written after a run's open/tick/close records: every entry
+            # still open was seen on that run
+            for key in self.open_keys:
+                self.entries[key]["last_seen"] = record["t"]
+            self.last_run = record["t"]
+        elif op == "open":
+            entry = {
+                "key": record["key"],
+                "sport": self.sport,
+                "event_ticker": record["event_ticker"],
+                "bet_team": record["bet_team"],
+                "bet_team_name": record.get("bet_team_name"),
+                "commence_time": record.get("commence_time"),
+                "first_seen": record["t"],
+                "last_seen": record["t"],
+                "closed_at": None,
+                "first_ev": record["ev"],
+                "peak_ev": record["ev"],
+                "stake": record.get("stake"),
+                "path": [[record["t"], record["price"], record["ev"]]],
+            }
+            self.entries[record["key"]] = entry
+            self.open_keys.add(record["key"])
+        elif op == "tick":
+            entry = self.entries.get(record["key"])
+            if entry is None:
+                return
+            entry["path"].append([record["t"], record["price"], record["ev"]])
+            entry["peak_ev"] = max(entry["peak_ev"], record["ev"])
+            if record.get("stake") is not None:
+                entry["stake"] = record["stake"]
+        elif op == "close":
+            entry = self.entries.get(record["key"])
+            if entry is None:
+                return
+            entry["closed_at"] = record["t"]
+            if record.get("last_seen"):
+                entry["last_seen"] = record["last_seen"]
+            self.open_keys.discard(record["key"])
+        elif op == "entry":
+            # Compacted snapshot of a full entry
+            entry = record["entry"]
+            self.entries[entry["key"]] = entry
+            if entry.get("closed_at") is None:
+                self.open_keys.add(entry["key"])
+
+    def update(self, opportunities: List[Dict], observed_at: Optional[str] = None) -> Dict:
+        """
+        Record one run's opportunities.
+
+        Only opportunities that are new, changed price/EV, or disappeared since
+        the previous run produce ledger records.
+
+        Returns counts of opened, updated and closed entries.
+        """
+        if observed_at is None:
+            observed_at = datetime.now(timezone.utc).isoformat()
+
+        records = []
+        current_keys = set()
+        opened = updated = 0
+
+        for opp in opportunities:
+            key = opportunity_key(opp)
+            current_keys.add(key)
+            price = get_bet_price(opp)
+            ev = opp["expected_value"]
+
+            if key not in self.open_keys:
+                record = {
+                    "op": "open",
+                    "t": observed_at,
+                    "key": key,
+                    "event_ticker": opp["event_ticker"],
+                    "bet_team": opp["bet_team"],
+                    "bet_team_name": opp.get("bet_team_name"),
+                    "commence_time": opp.get("commence_time"),
+                    "price": price,
+                    "ev": ev,
+                }
+                if opp.get("stake") is not None:
+                    record["stake"] = opp["stake"]
+                records.append(record)
+                opened += 1
+                continue
+
+            _, last_price, last_ev = self.entries[key]["path"][-1]
+            if price != last_price or ev != last_ev:
+                record = {"op": "tick", "t": observed_at, "key": key, "price": price, "ev": ev}
+                if opp.get("stake") is not None:
+                    record["stake"] = opp["stake"]
+                records.append(record)
+                updated += 1
+
+        # Open entries that are no longer present have closed; they were
+        # last seen on the previous run
+        closed_keys = self.open_keys - current_keys
+        for key in closed_keys:
+            records.append({"op": "close", "t": observed_at, "key": key,
+                            "last_seen": self.entries[key]["last_seen"]})
+
+        for record in records:
+            self._apply(record)
+        self._apply({"op": "run", "t": observed_at})
+        if records:
+            self._append(records)
+        if self.log_bytes > max(COMPACT_MIN_BYTES, 2 * self.compacted_bytes):
+            self.compact()
+        else:
+            self._save_state()
+
+        return {"opened": opened, "updated": updated, "closed": len(closed_keys)}
+
+    def _append(self, records: List[Dict]):
+        os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        data = "".join(json.dumps(r, separators=(",", ":")) + "\n" for r in records).encode("utf-8")
+        with open(self.path, "ab") as f:
+            f.write(data)
+        self.log_bytes += len(data)
+
+    def _save_state(self):
+        write_json(self.state_path, {"last_run": self.last_run, "compacted_bytes": self.compacted_bytes})
+
+    def compact(self):
+        """Rewrite the ledger as one snapshot record per entry."""
+        os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        tmp_path = self.path + ".tmp"
+        records = [{"op": "entry", "entry": entry} for entry in self.entries.values()]
+        if self.last_run:
+            records.append({"op": "run", "t": self.last_run})
+        data = "".join(json.dumps(r, separators=(",", ":")) + "\n" for r in records).encode("utf-8")
+        with open(tmp_path, "wb") as f:
+            f.write(data)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, self.path)
+        self.log_bytes = self.compacted_bytes = len(data)
+        self._save_state()
+
+    def is_current(self) -> bool:
+        """Whether the log file is still exactly what this object wrote (no other writer)."""
+        size = os.path.getsize(self.path) if os.path.exists(self.path) else 0
+        return size == self.log_bytes
+
+def load_ledger(sport: str) -> OpportunityLedger:
+    """Load the ledger for a sport from the data directory."""
+    return OpportunityLedger(sport).load()
+
+# sport -> resident ledger (see get_ledger)
+_ledgers: Dict[str, OpportunityLedger] = {}
+
+def get_ledger(sport: str) -> OpportunityLedger:
+    """
+    The resident ledger for a sport, loaded on first use. It is reloaded
+    only when another process has written to the file since.
+    """
+    ledger = _ledgers.get(sport)
+    if ledger is None or not ledger.is_current():
+        ledger = _ledgers[sport] = load_ledger(sport)
+    return ledger
+
+def entry_lifetime_seconds(entry: Dict) -> float:
+    """Observed lifetime of an entry: first seen to last seen."""
+    return (parse_timestamp(entry["last_seen"]) - parse_timestamp(entry["first_seen"])).total_seconds()
+
+def ev_at_elapsed(entry: Dict, minutes: float) -> Optional[float]:
+    """
+    EV of an entry the given number of minutes after it was first seen,
+    or None if the entry was no longer observed at that point.
+    """
+    first_seen = parse_timestamp(entry["first_seen"])
+    if (parse_timestamp(entry["last_seen"]) - first_seen).total_seconds() < minutes * 60:
+        return None
+    ev = None
+    for t, _, point_ev in entry["path"]:
+        if (parse_timestamp(t) - first_seen).total_seconds() > minutes * 60:
+            break
+        ev = point_ev
+    return ev
+
+def compute_decay_curve(entries: List[Dict]) -> List[Dict]:
+    """
+    Average EV (relative to EV at first sighting) at each elapsed-time bucket.
+    Returns a list of {minutes, mean_ev_ratio, mean_ev, samples}.
+    """
+    curve = []
+    for minutes in DECAY_BUCKETS_MINUTES:
+        ratios = []
+        evs = []
+        for entry in entries:
+            ev = ev_at_elapsed(entry, minutes)
+            if ev is None:
+                continue
+            evs.append(ev)
+            if entry["first_ev"]:
+                ratios.append(ev / entry["first_ev"])
+        if not evs:
+            continue
+        curve.append({
+            "minutes": minutes,
+            "mean_ev_ratio": round(statistics.mean(ratios), 4) if ratios else None,
+            "mean_ev": round(statistics.mean(evs), 2),
+            "samples": len(evs),
+        })
+    return curve
+
+def compute_ledger_stats(ledger: OpportunityLedger) -> Dict:
+    """Aggregate lifetime and decay statistics for one sport's ledger."""
+    entries = list(ledger.entries.values())
+    closed = [e for e in entries if e.get("closed_at")]
+    lifetimes = [entry_lifetime_seconds(e) for e in closed]
+
+    return {
+        "sport": ledger.sport,
+        "total_entries": len(entries),
+        "open_entries": len(ledger.open_keys),
+        "closed_entries": len(closed),
+        "median_lifetime_seconds": statistics.median(lifetimes) if lifetimes else None,
+        "mean_peak_ev": round(statistics.mean(e["peak_ev"] for e in entries), 2) if entries else None,
+        "decay_curve": compute_decay_curve(closed),
+    }
+
+def format_duration(seconds: Optional[float]) -> str:
+    if seconds is None:
+        return "n/a"
+    minutes, secs = divmod(int(seconds), 60)
+    hours, minutes = divmod(minutes, 60)
+    if hours:
+        return f"{hours}h{minutes:02d}m"
+    return f"{minutes}m{secs:02d}s"
+
+def main():
+    """
+    Print ledger statistics.
+
+    Command line arguments:
+        <sport> - Only report the specified sport (default: every sport with a ledger)
+    """
+    if len(sys.argv) >= 2:
+        sports = [sys.argv[1].lower()]
+    else:
+        prefix, suffix = LEDGER_FILE_TEMPLATE.split("{sport}")
+        sports = sorted(
+            name[len(prefix):-len(suffix)]
+            for name in (os.listdir(DATA_DIR) if os.path.isdir(DATA_DIR) else [])
+            if name.startswith(prefix) and name.endswith(suffix)
+        )
+
+    if not sports:
+        print("No opportunity ledgers found. Run compare_odds.py to start recording.")
+        return
+
+    for sport in sports:
+        stats = compute_ledger_stats(load_ledger(sport))
+        print(f"{sport.upper()}: {stats['total_entries']} opportunities "
+              f"({stats['open_entries']} open, {stats['closed_entries']} closed)")
+        print(f"  Median edge lifetime: {format_duration(stats['median_lifetime_seconds'])}")
+        if stats["mean_peak_ev"] is not None:
+            print(f"  Mean peak EV: ${stats['mean_peak_ev']:.2f}")
+        if stats["decay_curve"]:
+            print("  EV decay (minutes since first seen -> mean EV / first EV):")
+            for point in stats["decay_curve"]:
+                ratio = point["mean_ev_ratio"]
+                ratio_text = f"{ratio:.2f}" if ratio is not None else "n/a"
+                print(f"    {point['minutes']:>4}m  {ratio_text}  (${point['mean_ev']:.2f}, n={point['samples']})")
+        print()
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,323 @@
+"""
+Local HTTP API for live opportunities.
+
+Runs the odds daemon (odds_daemon.py) in a background thread and serves its
+latest results from an asyncio server (standard library only):
+
+    GET /opportunities           every current opportunity, highest EV first
+    GET /sports                  per-sport summaries
+    GET /sports/<sport>          one sport's summary and opportunities
+    GET /events/<event_ticker>   opportunities for one event, with first-seen time
+    GET /stream                  server-sent events: "opened", "updated" and
+                                 "closed" opportunity deltas as they happen
+    GET /metrics                 Prometheus metrics (see metrics.py)
+
+The daemon thread only hands each published result to the event loop
+(call_soon_threadsafe); deltas are computed and fanned out on the loop, and
+every stream client has its own bounded queue. A client that falls
+CLIENT_QUEUE_SIZE messages behind is disconnected instead of slowing
+anyone else down.
+"""
+import asyncio
+import json
+import sys
+import threading
+from datetime import datetime, timezone
+from typing import Dict, List, Optional, Tuple
+from urllib.parse import unquote, urlsplit
+
+import metrics
+import odds_daemon
+from opportunity_ledger import get_bet_price, opportunity_key
+
+DEFAULT_HOST = "127.0.0.1"
+DEFAULT_PORT = 8765
+
+# Messages buffered per stream client before it is dropped
+CLIENT_QUEUE_SIZE = 256
+
+# Seconds between keep-alive comments on idle streams
+HEARTBEAT_SECONDS = 15
+
+# Largest request head accepted (request line + headers)
+MAX_REQUEST_BYTES = 16 * 1024
+
+STATUS_TEXT = {200: "OK", 400: "Bad Request", 404: "Not Found", 405: "Method Not Allowed"}
+
+def summarize_result(sport: str, result: Optional[Dict]) -> Dict:
+    """Per-sport summary (process_sport result without the opportunities)."""
+    if result is None:
+        return {"sport": sport, "matched_games": 0, "total_opportunities": 0}
+    return {k: v for k, v in result.items() if k != "opportunities"}
+
+def opportunity_changed(old: Dict, new: Dict) -> bool:
+    """Whether an open opportunity's EV or bet price moved."""
+    return (old.get("expected_value") != new.get("expected_value")
+            or get_bet_price(old) != get_bet_price(new))
+
+class StreamClient:
+    """One /stream connection: a bounded queue drained by its writer task."""
+
+    def __init__(self, queue_size: int = CLIENT_QUEUE_SIZE):
+        self.queue: asyncio.Queue = asyncio.Queue(maxsize=queue_size)
+        self.dropped = False
+
+class OpportunityHub:
+    """
+    Latest results per sport plus fan-out of opportunity deltas.
+    All methods except on_publish run on the event loop thread.
+    """
+
+    def __init__(self, loop: asyncio.AbstractEventLoop, queue_size: int = CLIENT_QUEUE_SIZE):
+        self.loop = loop
+        self.queue_size = queue_size
+        self.results: Dict[str, Optional[Dict]] = {}
+        self.opportunities: Dict[str, Dict[str, Dict]] = {}  # sport -> key -> opportunity
+        self.first_seen: Dict[str, str] = {}  # opportunity key -> ISO timestamp
+        self.clients: List[StreamClient] = []
+        self.seq = 0
+
+    def on_publish(self, sport: str, result: Optional[Dict]):
+        """odds_daemon subscriber; safe to call from any thread."""
+        self.loop.call_soon_threadsafe(self.apply, sport, result)
+
+    def apply(self, sport: str, result: Optional[Dict]):
+        """Store a sport's new result and broadcast what changed."""
+        observed_at = datetime.now(timezone.utc).isoformat()
+        previous = self.opportunities.get(sport, {})
+        current = {}
+        for opp in (result or {}).get("opportunities", []):
+            current[opportunity_key(opp)] = dict(opp, sport=sport)
+
+        self.results[sport] = result
+        self.opportunities[sport] = current
+
+        for key, opp in current.items():
+            if key not in previous:
+                self.first_seen[key] = observed_at
+                self.broadcast("opened", {"key": key, "observed_at": observed_at, "opportunity": opp})
+            elif opportunity_changed(previous[key], opp):
+                self.broadcast("updated", {"key": key, "observed_at": observed_at, "opportunity": opp})
+        for key, opp in previous.items():
+            if key not in current:
+                self.first_seen.pop(key, None)
+                self.broadcast("closed", {"key": key, "observed_at": observed_at, "opportunity": opp})
+
+        self.broadcast("summary", summarize_result(sport, result))
+
+    def broadcast(self, event: str, payload: Dict):
+        """Queue one server-sent event for every stream client (never blocks)."""
+        self.seq += 1
+        message = f"id: {self.seq}\nevent: {event}\ndata: {json.dumps(payload, separators=(',', ':'))}\n\n"
+        for client in list(self.clients):
+            try:
+                client.queue.put_nowait(message)
+            except asyncio.QueueFull:
+                # Slow consumer: drop it rather than buffer without bound
+                client.dropped = True
+                self.clients.remove(client)
+
+    def add_client(self) -> StreamClient:
+        client = StreamClient(self.queue_size)
+        self.clients.append(client)
+        return client
+
+    def remove_client(self, client: StreamClient):
+        if client in self.clients:
+            self.clients.remove(client)
+
+    # ------------------------------------------------------------------
+    # Views
+    # ------------------------------------------------------------------
+
+    def all_opportunities(self) -> List[Dict]:
+        opps = [opp for by_key in self.opportunities.values() for opp in by_key.values()]
+        opps.sort(key=lambda x: x["expected_value"], reverse=True)
+        return opps
+
+    def sport_summaries(self) -> List[Dict]:
+        return [summarize_result(sport, result) for sport, result in self.results.items()]
+
+    def sport_detail(self, sport: str) -> Optional[Dict]:
+        if sport not in self.results:
+            return None
+        detail = summarize_result(sport, self.results[sport])
+        detail["opportunities"] = sorted(
+            self.opportunities.get(sport, {}).values(), key=lambda x: x["expected_value"], reverse=True
+        )
+        return detail
+
+    def event_detail(self, event_ticker: str) -> Optional[Dict]:
+        opps = [
+            dict(opp, first_seen=self.first_seen.get(key))
+            for by_key in self.opportunities.values()
+            for key, opp in by_key.items()
+            if opp.get("event_ticker") == event_ticker
+        ]
+        if not opps:
+            return None
+        return {"event_ticker": event_ticker, "sport": opps[0]["sport"], "opportunities": opps}
+
+# ----------------------------------------------------------------------
+# HTTP
+# ----------------------------------------------------------------------
+
+async def read_request(reader: asyncio.StreamReader) -> Optional[Tuple[str, str]]:
+    """Read a request head; returns (method, path) or None if malformed."""
+    try:
+        head = await reader.readuntil(b"\r\n\r\n")
+    except (asyncio.IncompleteReadError, asyncio.LimitOverrunError):
+        return None
+    if len(head) > MAX_REQUEST_BYTES:
+        return None
+    parts = head.split(b"\r\n", 1)[0].decode("latin-1").split()
+    if len(parts) != 3:
+        return None
+    return parts[0].upper(), unquote(urlsplit(parts[1]).path)
+
+async def send_json(writer: asyncio.StreamWriter, status: int, payload):
+    body = json.dumps(payload, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+    writer.write(
+        f"HTTP/1.1 {status} {STATUS_TEXT[status]}\r\n"
+        "Content-Type: application/json; charset=utf-8\r\n"
+        f"Content-Length: {len(body)}\r\n"
+        "Access-Control-Allow-Origin: *\r\n"
+        "Connection: close\r\n\r\n".encode("latin-1") + body
+    )
+    await writer.drain()
+
+async def send_metrics(writer: asyncio.StreamWriter):
+    body = metrics.render().encode("utf-8")
+    writer.write(
+        "HTTP/1.1 200 OK\r\n"
+        f"Content-Type: {metrics.CONTENT_TYPE}\r\n"
+        f"Content-Length: {len(body)}\r\n"
+        "Connection: close\r\n\r\n".encode("latin-1") + body
+    )
+    await writer.drain()
+
+async def stream_events(hub: OpportunityHub, writer: asyncio.StreamWriter):
+    """Serve /stream: current opportunities first, then deltas as they arrive."""
+    writer.write(
+        b"HTTP/1.1 200 OK\r\n"
+        b"Content-Type: text/event-stream\r\n"
+        b"Cache-Control: no-cache\r\n"
+        b"Access-Control-Allow-Origin: *\r\n"
+        b"Connection: keep-alive\r\n\r\n"
+    )
+    client = hub.add_client()
+    try:
+        snapshot = {"opportunities": hub.all_opportunities(), "sports": hub.sport_summaries()}
+        writer.write(f"id: {hub.seq}\nevent: snapshot\ndata: {json.dumps(snapshot, separators=(',', ':'))}\n\n".encode("utf-8"))
+        await writer.drain()
+        while not client.dropped or not client.queue.empty():
+            try:
+                message = await asyncio.wait_for(client.queue.get(), HEARTBEAT_SECONDS)
+            except asyncio.TimeoutError:
+                message = ": keep-alive\n\n"
+            writer.write(message.encode("utf-8"))
+            await writer.drain()
+    finally:
+        hub.remove_client(client)
+
+async def handle_connection(hub: OpportunityHub, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+    try:
+        request = await read_request(reader)
+        if request is None:
+            await send_json(writer, 400, {"error": "bad request"})
+            return
+        method, path = request
+        if method != "GET":
+            await send_json(writer, 405, {"error": "only GET is supported"})
+            return
+
+        segments = [s for s in path.split("/") if s]
+        if segments == ["stream"]:
+            await stream_events(hub, writer)
+        elif segments == ["metrics"]:
+            await send_metrics(writer)
+        elif segments == ["opportunities"]:
+            await send_json(writer, 200, hub.all_opportunities())
+        elif segments == ["sports"]:
+            await send_json(writer, 200, hub.sport_summaries())
+        elif len(segments) == 2 and segments[0] == "sports":
+            detail = hub.sport_detail(segments[1].lower())
+            await send_json(writer, 200 if detail else 404, detail or {"error": f"unknown sport {segments[1]}"})
+        elif len(segments) == 2 and segments[0] == "events":
+            detail = hub.event_detail(segments[1])
+            await send_json(writer, 200 if detail else 404, detail or {"error": f"no opportunity for {segments[1]}"})
+        else:
+            await send_json(writer, 404, {"error": "not found"})
+    except (ConnectionError, asyncio.CancelledError):
+        pass
+    finally:
+        writer.close()
+
+async def serve(daemon: "odds_daemon.OddsDaemon", host: str = DEFAULT_HOST, port: int = DEFAULT_PORT):
+    """Start the daemon thread and serve until cancelled."""
+    hub = OpportunityHub(asyncio.get_running_loop())
+    daemon.subscribe(hub.on_publish)
+    daemon.subscribe(metrics.observe_sport)
+
+    stop_event = threading.Event()
+    thread = threading.Thread(target=daemon.run, args=(stop_event,), name="odds-daemon", daemon=True)
+    thread.start()
+
+    server = await asyncio.start_server(lambda r, w: handle_connection(hub, r, w), host, port)
+    print(f"Serving on http://{host}:{port} (/opportunities, /sports, /events/<ticker>, /stream, /metrics)")
+    try:
+        async with server:
+            await server.serve_forever()
+    finally:
+        stop_event.set()
+
+def main():
+    """
+    Run the daemon and the HTTP API until interrupted.
+
+    Command line arguments:
+        <sport> ... - Sports to watch (default: all)
+        --host HOST - Interface to bind (default 127.0.0.1)
+        --port PORT - Port to listen on (default 8765)
+        --db, --no-json, --pretty - Passed to the daemon (see odds_daemon.py)
+    """
+    host = DEFAULT_HOST
+    port = DEFAULT_PORT
+    for flag in ("--host", "--port"):
+        if flag in sys.argv:
+            idx = sys.argv.index(flag)
+            if idx + 1 >= len(sys.argv):
+                print(f"Error: {flag} requires a value")
+                sys.exit(1)
+            value = sys.argv[idx + 1]
+            del sys.argv[idx:idx + 2]
+            if flag == "--host":
+                host = value
+            else:
+                port = int(value)
+
+    write_db = "--db" in sys.argv
+    if write_db:
+        sys.argv.remove("--db")
+    export_json = "--no-json" not in sys.argv
+    if not export_json:
+        sys.argv.remove("--no-json")
+    pretty = "--pretty" in sys.argv
+    if pretty:
+        sys.argv.remove("--pretty")
+
+    sport_config = odds_daemon.compare_odds.SPORT_CONFIG
+    sports = [arg.lower() for arg in sys.argv[1:]] or list(sport_config.keys())
+    unknown = [sport for sport in sports if sport not in sport_config]
+    if unknown:
+        print(f"Error: Unsupported sport '{unknown[0]}'")
+        print(f"Supported sports: {', '.join(sport_config.keys())}")
+        sys.exit(1)
+    daemon = odds_daemon.OddsDaemon(sports, write_db=write_db, export_json=export_json, pretty=pretty)
+    try:
+        asyncio.run(serve(daemon, host, port))
+    except KeyboardInterrupt:
+        print("\nStopped.")
+
+if __name__ == "__main__":
+    main()
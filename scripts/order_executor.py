@@ -0,0 +1,672 @@
+"""
+Order execution: opportunities in, Kalshi limit orders out.
+
+ExecutionEngine turns each published result (an odds_daemon subscriber, or
+the odds_comparison files) into buy-YES limit orders on the bet team's
+market:
+
+    size    with a bankroll, every sport's latest opportunities are sized
+            together by stake_optimizer.optimize_stakes on each publish and
+            the opportunity's contracts are the target; without one, the
+            contracts from compare_odds --bankroll sizing when present, else
+            STAKE dollars at the current ask
+    limit   calculate_max_kalshi_price_for_ev for the stake, with a target of
+            LIMIT_EV dollars per $100: the highest price that still clears
+            the target, so any fill up to the limit is still worth taking.
+            Opportunities whose limit is below the current ask are skipped.
+
+Guards, checked before anything is sent:
+    - one target position per opportunity: only contracts not already filled
+      or working are ordered, so re-publishing an unchanged opportunity
+      sends nothing
+    - per-event exposure: filled cost plus working orders at their limit
+      stays within MAX_EVENT_EXPOSURE dollars
+    - cancel-on-stale: a resting or unknown order is canceled once its
+      opportunity disappears, its limit falls below the order's price, or it
+      has rested STALE_SECONDS. Until the cancel is acknowledged the order
+      still counts as working, so a replacement goes out on a later publish,
+      never alongside an order that might still fill.
+
+Before deciding, each publish polls the sport's resting and unknown orders
+(GET /portfolio/orders/<id>, unknown ones by client_order_id), so fills on
+resting orders are booked as they happen and an order whose acknowledgement
+was lost is picked up as it stands on the exchange.
+
+Every order gets its client_order_id when it is decided. Retries after a
+timeout, dropped connection, 429 or 5xx resend the same id, and the exchange
+answers a repeated id with the existing order (409), so a lost
+acknowledgement never doubles an order. An order still unanswered after
+MAX_RETRIES stays working as "unknown"; if the next publish's poll does not
+find it either, it is resent under the same id while the opportunity still
+wants it. Decision-to-ack latency (decision
+to the exchange's answer, queueing and retries included) is recorded per
+order and exported as arb_order_ack_seconds.
+
+ExchangeClient is an asyncio HTTP/1.1 client (standard library only) that
+keeps up to CONNECTIONS connections alive. It speaks the Kalshi v2 order
+paths but does not sign requests, so it is meant for the local mock
+(mock_exchange.py).
+
+    python scripts/order_executor.py bench [SPORT ...] [--rounds 20] [--depth N] [--flow N] [--latency MS] [--jitter MS] [--drop-rate P]
+    python scripts/order_executor.py run [SPORT ...] [--exchange URL] [--positions]
+"""
+import asyncio
+import json
+import math
+import os
+import sys
+import threading
+import time
+import uuid
+from datetime import datetime
+from typing import Dict, List, Optional, Tuple
+from urllib.parse import urlsplit
+
+import compare_odds
+import metrics
+import mock_exchange
+import odds_daemon
+import position_book
+import stake_optimizer
+from json_io import load_json
+from opportunity_ledger import get_bet_price, opportunity_key
+from stake_optimizer import DEFAULT_BANKROLL, MAX_EVENT_EXPOSURE as MAX_EVENT_SHARE
+
+# Get the project root directory (parent of scripts folder)
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+DATA_DIR = os.path.join(PROJECT_ROOT, "data")
+
+DEFAULT_EXCHANGE_URL = f"http://{mock_exchange.DEFAULT_HOST}:{mock_exchange.DEFAULT_PORT}"
+
+STAKE = 100.0
+# Limit price target, in dollars of EV per $100 staked
+LIMIT_EV = compare_odds.MIN_EV_THRESHOLD
+# Dollars per event, filled plus working
+MAX_EVENT_EXPOSURE = MAX_EVENT_SHARE * DEFAULT_BANKROLL
+# Resting orders older than this are canceled
+STALE_SECONDS = 60.0
+# Bench: contracts per market side sold into resting orders between publishes
+BENCH_FLOW = 100
+
+CONNECTIONS = 8
+REQUEST_TIMEOUT_SECONDS = 2.0
+MAX_RETRIES = 3
+RETRY_BACKOFF_SECONDS = 0.05
+RETRY_STATUSES = (429, 500, 502, 503, 504)
+
+# Statuses whose remaining contracts may still fill
+WORKING_STATUSES = ("pending", "resting", "canceling", "unknown")
+# Statuses polled on each publish, and canceled once stale
+OPEN_STATUSES = ("resting", "unknown")
+
+class ExchangeError(Exception):
+    """A definite (non-retryable) error answer from the exchange."""
+
+    def __init__(self, status: int, payload):
+        super().__init__(f"HTTP {status}: {payload}")
+        self.status = status
+        self.payload = payload
+
+async def read_response(reader: asyncio.StreamReader) -> Tuple[int, object, bool]:
+    """Read one response; returns (status, JSON body or None, keep_alive)."""
+    head = await reader.readuntil(b"\r\n\r\n")
+    lines = head.decode("latin-1").split("\r\n")
+    status = int(lines[0].split()[1])
+    length = 0
+    keep_alive = True
+    for line in lines[1:]:
+        name, _, value = line.partition(":")
+        name = name.strip().lower()
+        if name == "content-length":
+            length = int(value)
+        elif name == "connection":
+            keep_alive = value.strip().lower() != "close"
+    body = await reader.readexactly(length) if length else b""
+    return status, json.loads(body) if body else None, keep_alive
+
+class ExchangeClient:
+    """Async JSON client for the Kalshi order endpoints over pooled keep-alive connections."""
+
+    def __init__(self, base_url: str = DEFAULT_EXCHANGE_URL, connections: int = CONNECTIONS,
+                 timeout: float = REQUEST_TIMEOUT_SECONDS, retries: int = MAX_RETRIES):
+        url = urlsplit(base_url)
+        self.host = url.hostname or mock_exchange.DEFAULT_HOST
+        self.port = url.port or 80
+        self.prefix = url.path.rstrip("/")
+        self.timeout = timeout
+        self.retries = retries
+        self.retried = 0
+        self._slots = asyncio.Semaphore(connections)
+        self._idle: List[Tuple[asyncio.StreamReader, asyncio.StreamWriter]] = []
+
+    async def _exchange(self, method: str, path: str, payload) -> Tuple[int, object]:
+        body = json.dumps(payload, separators=(",", ":")).encode("utf-8") if payload is not None else b""
+        head = (f"{method} {self.prefix}{path} HTTP/1.1\r\n"
+                f"Host: {self.host}:{self.port}\r\n"
+                "Content-Type: application/json\r\n"
+                f"Content-Length: {len(body)}\r\n\r\n").encode("latin-1")
+        async with self._slots:
+            if self._idle:
+                reader, writer = self._idle.pop()
+            else:
+                reader, writer = await asyncio.open_connection(self.host, self.port)
+            try:
+                writer.write(head + body)
+                await writer.drain()
+                status, response, keep_alive = await read_response(reader)
+            except BaseException:
+                writer.close()
+                raise
+            if keep_alive:
+                self._idle.append((reader, writer))
+            else:
+                writer.close()
+        return status, response
+
+    async def request(self, method: str, path: str, payload=None) -> Tuple[int, object]:
+        """One request, retried with backoff on transport errors and RETRY_STATUSES."""
+        for attempt in range(self.retries + 1):
+            try:
+                status, response = await asyncio.wait_for(self._exchange(method, path, payload), self.timeout)
+            except (OSError, EOFError, ValueError, asyncio.TimeoutError) as e:
+                error = e
+            else:
+                if status not in RETRY_STATUSES:
+                    return status, response
+                error = ExchangeError(status, response)
+            if attempt < self.retries:
+                self.retried += 1
+                await asyncio.sleep(RETRY_BACKOFF_SECONDS * 2 ** attempt)
+        raise error
+
+    async def place_order(self, order: Dict) -> Dict:
+        """Place an order; a repeated client_order_id returns the order already placed."""
+        status, response = await self.request("POST", "/portfolio/orders", order)
+        if status in (200, 201, 409) and isinstance(response, dict) and response.get("order"):
+            return response["order"]
+        raise ExchangeError(status, response)
+
+    async def get_order(self, order_id: str) -> Optional[Dict]:
+        """An order by order_id or client_order_id; None if the exchange does not know it."""
+        status, response = await self.request("GET", f"/portfolio/orders/{order_id}")
+        if status == 404:
+            return None
+        if status == 200 and isinstance(response, dict) and response.get("order"):
+            return response["order"]
+        raise ExchangeError(status, response)
+
+    async def cancel_order(self, order_id: str) -> Optional[Dict]:
+        """Cancel an order's resting remainder; returns the order, or None if the exchange does not know it."""
+        status, response = await self.request("DELETE", f"/portfolio/orders/{order_id}")
+        if status == 404:
+            return None
+        if status == 200 and isinstance(response, dict) and response.get("order"):
+            return response["order"]
+        raise ExchangeError(status, response)
+
+    async def close(self):
+        while self._idle:
+            _, writer = self._idle.pop()
+            writer.close()
+
+def order_request(record: Dict) -> Dict:
+    return {
+        "ticker": record["ticker"],
+        "client_order_id": record["client_order_id"],
+        "side": "yes",
+        "action": "buy",
+        "type": "limit",
+        "count": record["count"],
+        "yes_price": record["limit_price"],
+    }
+
+def percentile(values: List[float], q: float) -> Optional[float]:
+    """Nearest-rank percentile of sorted values."""
+    if not values:
+        return None
+    return values[min(len(values) - 1, max(0, math.ceil(q * len(values)) - 1))]
+
+def latency_summary(latencies: List[float]) -> Dict:
+    """Latency percentiles in milliseconds."""
+    values = sorted(latencies)
+    summary = {"count": len(values)}
+    for name, q in (("p50", 0.5), ("p95", 0.95), ("p99", 0.99), ("max", 1.0)):
+        value = percentile(values, q)
+        summary[f"{name}_ms"] = round(value * 1000, 3) if value is not None else None
+    return summary
+
+class ExecutionEngine:
+    """
+    Order records keyed by client_order_id, decided per published result.
+    Runs on one event loop; on_publish hands results over from other threads.
+    """
+
+    def __init__(self, client: ExchangeClient, stake: float = STAKE, limit_ev: float = LIMIT_EV,
+                 max_event_exposure: float = MAX_EVENT_EXPOSURE, stale_seconds: float = STALE_SECONDS,
+                 loop: Optional[asyncio.AbstractEventLoop] = None, verbose: bool = False,
+                 book: Optional["position_book.PositionBook"] = None, bankroll: Optional[float] = None):
+        self.client = client
+        self.book = book
+        self.bankroll = bankroll
+        self.stake = stake
+        self.limit_ev = limit_ev
+        self.max_event_exposure = max_event_exposure
+        self.stale_seconds = stale_seconds
+        self.loop = loop
+        self.verbose = verbose
+        self.orders: Dict[str, Dict] = {}
+        self.by_key: Dict[str, List[Dict]] = {}
+        self.by_event: Dict[str, List[Dict]] = {}
+        self.latencies: List[float] = []
+        self.reconciled = 0
+        self.resting_fills = 0
+        # sport -> latest sized copies of its opportunities
+        self.sized: Dict[str, List[Dict]] = {}
+
+    def size(self, sport: str, opportunities: List[Dict]) -> List[Dict]:
+        """
+        Size the sport's opportunities together with every other sport's
+        latest ones (stake_optimizer.optimize_stakes against the bankroll).
+        Sizes go on copies, so the publisher's results are left as they are.
+        """
+        self.sized[sport] = [dict(opp) for opp in opportunities]
+        positions = [(s, opp) for s, opps in self.sized.items() for opp in opps]
+        stake_optimizer.optimize_stakes(positions, self.bankroll)
+        return self.sized[sport]
+
+    def limit_price(self, opp: Dict) -> Optional[int]:
+        """Highest price (cents) at which the opportunity still clears limit_ev per $100."""
+        bet = opp["bet_team"]
+        other = "home" if bet == "away" else "away"
+        prob = opp.get(f"{bet}_prob_normalized")
+        if prob is None or opp.get(f"{other}_prob_normalized") is None:
+            return None
+        stake = opp.get("stake") or self.stake
+        limit = compare_odds.calculate_max_kalshi_price_for_ev(
+            stake, prob, opp[f"{other}_prob_normalized"], min_ev=self.limit_ev * stake / 100)
+        return min(limit, 99) if limit is not None else None
+
+    def target_contracts(self, opp: Dict, ask: float) -> int:
+        if opp.get("contracts") is not None:
+            return int(opp["contracts"])
+        return int(self.stake / (ask / 100))
+
+    def held(self, key: str) -> int:
+        """Contracts filled or still working for an opportunity."""
+        return sum(r["fill_count"] + (r["remaining_count"] if r["status"] in WORKING_STATUSES else 0)
+                   for r in self.by_key.get(key, []))
+
+    def event_exposure(self, event_ticker: str) -> float:
+        """Dollars filled plus working (at the limit) on an event."""
+        return sum(r["fill_cost"] + (r["remaining_count"] * r["limit_price"] / 100
+                                     if r["status"] in WORKING_STATUSES else 0)
+                   for r in self.by_event.get(event_ticker, []))
+
+    def decide(self, sport: str, opportunities: List[Dict], now: float) -> Tuple[List[Dict], List[Dict]]:
+        """New order records to place and resting records to cancel for one sport's result."""
+        current = {opportunity_key(opp): opp for opp in opportunities}
+
+        cancels = []
+        for record in self.orders.values():
+            if record["sport"] != sport or record["status"] not in OPEN_STATUSES:
+                continue
+            opp = current.get(record["key"])
+            limit = self.limit_price(opp) if opp else None
+            if opp is None:
+                reason = "gone"
+            elif limit is None or limit < record["limit_price"]:
+                reason = "repriced"
+            elif now - record["decided_at_wall"] > self.stale_seconds:
+                reason = "stale"
+            else:
+                continue
+            record["status"] = "canceling"
+            record["cancel_reason"] = reason
+            cancels.append(record)
+
+        places = []
+        for key, opp in current.items():
+            bet = opp["bet_team"]
+            ticker = opp.get(f"{bet}_kalshi_ticker")
+            ask = get_bet_price(opp)
+            limit = self.limit_price(opp)
+            if not ticker or not ask or limit is None or limit < ask:
+                continue
+            # Unanswered orders go out again under their client_order_id
+            for record in self.by_key.get(key, []):
+                if record["status"] == "unknown" and limit >= record["limit_price"]:
+                    record["status"] = "pending"
+                    record["decided_at"] = time.perf_counter()
+                    places.append(record)
+            count = self.target_contracts(opp, ask) - self.held(key)
+            room = self.max_event_exposure - self.event_exposure(opp["event_ticker"])
+            count = min(count, int(room / (limit / 100)))
+            if count < 1:
+                continue
+            record = {
+                "client_order_id": str(uuid.uuid4()),
+                "order_id": None,
+                "key": key,
+                "sport": sport,
+                "event_ticker": opp["event_ticker"],
+                "ticker": ticker,
+                "team_name": opp.get("bet_team_name"),
+                "ask": ask,
+                "limit_price": limit,
+                "count": count,
+                "fill_count": 0,
+                "remaining_count": count,
+                "fill_cost": 0.0,
+                "status": "pending",
+                "decided_at": time.perf_counter(),
+                "decided_at_wall": now,
+            }
+            self.orders[record["client_order_id"]] = record
+            self.by_key.setdefault(key, []).append(record)
+            self.by_event.setdefault(record["event_ticker"], []).append(record)
+            places.append(record)
+        return places, cancels
+
+    def apply(self, record: Dict, order: Dict):
+        """Copy the exchange's view of an order into its record, booking any new fills."""
+        filled, cost = record["fill_count"], record["fill_cost"]
+        record["order_id"] = order.get("order_id")
+        record["status"] = order.get("status", record["status"])
+        record["fill_count"] = int(order.get("fill_count") or 0)
+        record["remaining_count"] = int(order.get("remaining_count") or 0)
+        record["fill_cost"] = ((order.get("taker_fill_cost") or 0) + (order.get("maker_fill_cost") or 0)) / 100
+        if self.book is not None and record["fill_count"] > filled:
+            self.book.record_fill(record["ticker"], "yes", record["fill_count"] - filled,
+                                  record["fill_cost"] - cost, event_ticker=record["event_ticker"],
+                                  sport=record["sport"], team_name=record["team_name"])
+
+    async def poll(self, record: Dict):
+        """Refresh an open order from the exchange; an unknown one is looked up by client_order_id."""
+        try:
+            order = await self.client.get_order(record["order_id"] or record["client_order_id"])
+        except (ExchangeError, OSError, EOFError, ValueError, asyncio.TimeoutError):
+            return
+        if order is None:
+            if record["status"] == "resting":
+                record["status"] = "canceled"
+                record["remaining_count"] = 0
+            # An unknown order the exchange never saw stays unknown and is resent
+            return
+        if record["status"] == "unknown":
+            self.reconciled += 1
+            record.pop("error", None)
+        elif order.get("fill_count"):
+            self.resting_fills += max(0, int(order["fill_count"]) - record["fill_count"])
+        self.apply(record, order)
+
+    async def place(self, record: Dict):
+        try:
+            order = await self.client.place_order(order_request(record))
+        except ExchangeError as e:
+            if e.status not in RETRY_STATUSES:
+                record["status"] = "rejected"
+                record["remaining_count"] = 0
+                record["error"] = str(e)
+                metrics.record_order("rejected")
+                return
+            record["status"] = "unknown"
+            record["error"] = str(e)
+            metrics.record_order("unknown")
+            return
+        except (OSError, EOFError, ValueError, asyncio.TimeoutError) as e:
+            # Retries exhausted: the order may or may not stand, so it stays working
+            record["status"] = "unknown"
+            record["error"] = str(e) or type(e).__name__
+            metrics.record_order("unknown")
+            return
+        latency = time.perf_counter() - record["decided_at"]
+        record["ack_seconds"] = latency
+        self.latencies.append(latency)
+        self.apply(record, order)
+        metrics.record_order(record["status"], latency)
+
+    async def cancel(self, record: Dict):
+        try:
+            order_id = record["order_id"]
+            if order_id is None:
+                # Unknown order: find it by client_order_id first
+                order = await self.client.get_order(record["client_order_id"])
+                order_id = order["order_id"] if order else None
+            order = await self.client.cancel_order(order_id) if order_id else None
+        except (ExchangeError, OSError, EOFError, ValueError, asyncio.TimeoutError):
+            # Still open as far as we know; the next publish tries again
+            record["status"] = "resting" if record["order_id"] else "unknown"
+            return
+        if order is None:
+            record["status"] = "canceled"
+            record["remaining_count"] = 0
+        else:
+            self.apply(record, order)
+
+    async def on_result(self, sport: str, result: Optional[Dict]) -> Tuple[List[Dict], List[Dict]]:
+        """Poll, then place and cancel for one sport's result; returns (placed, canceled) records."""
+        opportunities = (result or {}).get("opportunities") or []
+        if self.bankroll:
+            opportunities = self.size(sport, opportunities)
+        open_records = [r for r in self.orders.values() if r["sport"] == sport and r["status"] in OPEN_STATUSES]
+        if open_records:
+            await asyncio.gather(*(self.poll(r) for r in open_records))
+        places, cancels = self.decide(sport, opportunities, time.time())
+        if places or cancels:
+            await asyncio.gather(*(self.place(r) for r in places), *(self.cancel(r) for r in cancels))
+            if self.verbose:
+                print(f"[{datetime.now().strftime('%H:%M:%S')}] {sport.upper()} {format_round(places, cancels)}",
+                      flush=True)
+        return places, cancels
+
+    def on_publish(self, sport: str, result: Optional[Dict]):
+        """odds_daemon subscriber (daemon thread): hand the result to the engine's loop."""
+        asyncio.run_coroutine_threadsafe(self.on_result(sport, result), self.loop)
+
+    def summary(self) -> Dict:
+        records = list(self.orders.values())
+        statuses: Dict[str, int] = {}
+        for r in records:
+            statuses[r["status"]] = statuses.get(r["status"], 0) + 1
+        return {
+            "orders": len(records),
+            "statuses": statuses,
+            "contracts_ordered": sum(r["count"] for r in records),
+            "contracts_filled": sum(r["fill_count"] for r in records),
+            "partial_fills": sum(1 for r in records if 0 < r["fill_count"] < r["count"]),
+            "cost": round(sum(r["fill_cost"] for r in records), 2),
+            "retries": self.client.retried,
+            "reconciled": self.reconciled,
+            "resting_fills": self.resting_fills,
+            "ack_latency": latency_summary(self.latencies),
+        }
+
+def format_round(places: List[Dict], cancels: List[Dict]) -> str:
+    filled = sum(r["fill_count"] for r in places)
+    resting = sum(1 for r in places if r["status"] == "resting")
+    latency = latency_summary([r["ack_seconds"] for r in places if "ack_seconds" in r])
+    text = f"orders: {len(places)} placed ({filled} contracts filled, {resting} resting), {len(cancels)} canceled"
+    if latency["count"]:
+        text += f", ack p50 {latency['p50_ms']:.1f} ms"
+    return text
+
+def format_summary(summary: Dict) -> str:
+    latency = summary["ack_latency"]
+    statuses = ", ".join(f"{status} {n}" for status, n in sorted(summary["statuses"].items()))
+    lines = [
+        f"  orders:       {summary['orders']} ({statuses or 'none'})",
+        f"  contracts:    {summary['contracts_filled']:,} filled of {summary['contracts_ordered']:,} ordered, "
+        f"{summary['partial_fills']} partial fills, ${summary['cost']:,.2f}",
+        f"  retries:      {summary['retries']} ({summary['reconciled']} unknown orders reconciled)",
+        f"  polled:       {summary['resting_fills']:,} contracts filled while resting",
+    ]
+    if latency["count"]:
+        lines.append(f"  ack latency:  p50 {latency['p50_ms']:.2f} ms, p95 {latency['p95_ms']:.2f} ms, "
+                     f"p99 {latency['p99_ms']:.2f} ms, max {latency['max_ms']:.2f} ms ({latency['count']} acks)")
+    return "\n".join(lines)
+
+def load_results(sports: List[str]) -> Dict[str, Dict]:
+    """Latest results from the odds_comparison_<sport>.json files."""
+    results = {}
+    for sport in sports:
+        path = os.path.join(DATA_DIR, compare_odds.SPORT_CONFIG[sport]["output_file"])
+        if os.path.exists(path):
+            results[sport] = load_json(path)
+    return results
+
+async def bench(results: Dict[str, Dict], rounds: int, engine_options: Dict, exchange_options: Dict) -> Dict:
+    """
+    Each round starts a fresh mock exchange and engine, then:
+    publishes every result (orders), runs one tick of the exchange's sell
+    flow into resting orders, publishes them again (the poll books those
+    fills; must decide no new order; lost acknowledgements are reconciled,
+    and only orders the exchange never saw are resent), and publishes empty
+    results (cancels every open order).
+    """
+    markets = mock_exchange.load_markets()
+    engines = []
+    new_on_republish = resent = 0
+    elapsed = 0.0
+    for i in range(rounds):
+        exchange = mock_exchange.MockExchange(markets, seed=exchange_options.get("seed", 0) + i,
+                                              **{k: v for k, v in exchange_options.items() if k != "seed"})
+        server = await mock_exchange.start(exchange, port=0)
+        port = server.sockets[0].getsockname()[1]
+        client = ExchangeClient(f"http://{mock_exchange.DEFAULT_HOST}:{port}")
+        engine = ExecutionEngine(client, **engine_options)
+        try:
+            start = time.perf_counter()
+            await asyncio.gather(*(engine.on_result(sport, result) for sport, result in results.items()))
+            elapsed += time.perf_counter() - start
+            decided = set(engine.orders)
+            exchange.tick()
+            again = await asyncio.gather(*(engine.on_result(sport, result) for sport, result in results.items()))
+            new = len(set(engine.orders) - decided)
+            new_on_republish += new
+            resent += sum(len(places) for places, _ in again) - new
+            await asyncio.gather(*(engine.on_result(sport, None) for sport in results))
+        finally:
+            await client.close()
+            server.close()
+            await server.wait_closed()
+        engines.append(engine)
+
+    records = [r for engine in engines for r in engine.orders.values()]
+    combined = ExecutionEngine(ExchangeClient())
+    combined.orders = {r["client_order_id"]: r for r in records}
+    combined.latencies = [latency for engine in engines for latency in engine.latencies]
+    combined.client.retried = sum(engine.client.retried for engine in engines)
+    combined.reconciled = sum(engine.reconciled for engine in engines)
+    combined.resting_fills = sum(engine.resting_fills for engine in engines)
+    summary = combined.summary()
+    summary["new_on_republish"] = new_on_republish
+    summary["resent_unanswered"] = resent
+    summary["stale_cancels"] = sum(1 for r in records if r.get("cancel_reason"))
+    summary["orders_per_second"] = round(len(combined.latencies) / elapsed, 1) if elapsed else None
+    return summary
+
+async def run(daemon: "odds_daemon.OddsDaemon", exchange_url: str, engine_options: Dict,
+              book: Optional["position_book.PositionBook"] = None):
+    """
+    Run the daemon thread and execute its results until cancelled (booking
+    fills into book). Results are sized when engine_options has a bankroll.
+    """
+    client = ExchangeClient(exchange_url)
+    engine = ExecutionEngine(client, loop=asyncio.get_running_loop(), verbose=True, book=book, **engine_options)
+    daemon.subscribe(engine.on_publish)
+    if book is not None:
+        daemon.subscribe_games(book.on_games)
+
+    stop_event = threading.Event()
+    thread = threading.Thread(target=daemon.run, args=(stop_event,), name="odds-daemon", daemon=True)
+    thread.start()
+    print(f"Executing against {exchange_url}")
+    try:
+        await asyncio.Event().wait()
+    finally:
+        stop_event.set()
+        await client.close()
+        print(f"\nExecution summary:\n{format_summary(engine.summary())}")
+
+def main():
+    """
+    Command line arguments:
+        bench [SPORT ...] - Benchmark against an in-process mock exchange, using
+                            the latest odds_comparison files
+        run [SPORT ...] - Run the odds daemon and execute its results
+        --exchange URL - Exchange base URL for run (default: the mock exchange's default address)
+        --bankroll DOLLARS - Size every published result together with stake_optimizer
+                             (default 10000; 0 uses the results' own contracts, else --stake)
+        --stake DOLLARS - Stake per opportunity without sizing (default 100)
+        --limit-ev DOLLARS - Limit price EV target per $100 (default 2)
+        --max-event DOLLARS - Exposure cap per event (default 500)
+        --stale SECONDS - Cancel resting orders after this long (default 60)
+        --positions - With run, book fills into the position book and keep it marked
+                      (see position_book.py)
+        --rounds N - Bench rounds (default 20)
+        --depth N - Bench book depth at the top level (default: from each market's liquidity)
+        --flow N - Bench contracts per market side sold into resting orders between publishes (default 100)
+        --latency MS, --jitter MS, --error-rate P, --drop-rate P - Bench exchange faults
+    """
+    options = {"--exchange": DEFAULT_EXCHANGE_URL, "--bankroll": DEFAULT_BANKROLL, "--stake": STAKE,
+               "--limit-ev": LIMIT_EV, "--max-event": MAX_EVENT_EXPOSURE, "--stale": STALE_SECONDS, "--rounds": 20,
+               "--depth": 0, "--flow": BENCH_FLOW, "--latency": 0.0, "--jitter": 0.0, "--error-rate": 0.0,
+               "--drop-rate": 0.0}
+    for flag in list(options):
+        if flag in sys.argv:
+            idx = sys.argv.index(flag)
+            try:
+                value = sys.argv[idx + 1]
+                options[flag] = value if flag == "--exchange" else type(options[flag])(value)
+            except (IndexError, ValueError):
+                print(f"Error: {flag} requires a {'URL' if flag == '--exchange' else 'number'}")
+                sys.exit(1)
+            del sys.argv[idx:idx + 2]
+
+    positions = "--positions" in sys.argv
+    if positions:
+        sys.argv.remove("--positions")
+    if len(sys.argv) < 2 or sys.argv[1] not in ("bench", "run"):
+        print("Usage: python order_executor.py bench|run [SPORT ...] [--exchange URL] [--bankroll DOLLARS] "
+              "[--stake DOLLARS] [--limit-ev DOLLARS] [--max-event DOLLARS] [--stale SECONDS] [--positions] "
+              "[--rounds N] [--flow N] [--latency MS] [--jitter MS] [--error-rate P] [--drop-rate P]")
+        sys.exit(1)
+    mode = sys.argv[1]
+    sports = [arg.lower() for arg in sys.argv[2:]] or list(compare_odds.SPORT_CONFIG.keys())
+    unknown = [sport for sport in sports if sport not in compare_odds.SPORT_CONFIG]
+    if unknown:
+        print(f"Error: Unsupported sport '{unknown[0]}'")
+        sys.exit(1)
+    engine_options = {"bankroll": options["--bankroll"] or None, "stake": options["--stake"],
+                      "limit_ev": options["--limit-ev"], "max_event_exposure": options["--max-event"],
+                      "stale_seconds": options["--stale"]}
+
+    if mode == "run":
+        daemon = odds_daemon.OddsDaemon(sports)
+        book = position_book.PositionBook() if positions else None
+        try:
+            asyncio.run(run(daemon, options["--exchange"], engine_options, book))
+        except KeyboardInterrupt:
+            pass
+        return
+
+    results = load_results(sports)
+    if not any((result.get("opportunities") for result in results.values())):
+        print("No opportunities in the odds_comparison files (run compare_odds.py first)")
+        return
+    exchange_options = {"top_depth": options["--depth"] or None, "flow": options["--flow"], "latency_ms": options["--latency"], "jitter_ms": options["--jitter"],
+                        "error_rate": options["--error-rate"], "drop_rate": options["--drop-rate"]}
+    summary = asyncio.run(bench(results, max(1, options["--rounds"]), engine_options, exchange_options))
+    count = sum(len(result.get("opportunities") or []) for result in results.values())
+    print(f"{options['--rounds']} rounds of {count} opportunities ({', '.join(s.upper() for s in results)}), "
+          f"exchange latency {options['--latency']:g}±{options['--jitter']:g} ms, "
+          f"drop rate {options['--drop-rate']:g}, error rate {options['--error-rate']:g}\n")
+    print(format_summary(summary))
+    print(f"  republished:  {summary['new_on_republish']} new orders, "
+          f"{summary['resent_unanswered']} unanswered orders resent")
+    print(f"  stale:        {summary['stale_cancels']} resting orders canceled")
+    if summary["orders_per_second"]:
+        print(f"  throughput:   {summary['orders_per_second']:,} acks/s")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,218 @@
+"""
+Threshold and parameter sweep over one matched dataset.
+
+compare_odds hard-codes the analysis parameters: the minimum EV to report
+(MIN_EV_THRESHOLD, $2), the EV target behind the table's "Max Price" line
+($3), the $100 stake and Kalshi's 1% fee. This loads and matches each
+sport once, reduces every matched game to its two Kalshi prices and two
+devigged probabilities, and evaluates the whole grid
+    fee x stake x minimum EV x target EV
+in one numpy pass, the same way analyze_game and
+calculate_max_kalshi_price_for_ev do (payouts rounded to cents, the
+higher-EV side chosen per game, EV compared after rounding).
+
+Per grid point:
+    opportunities        games whose best side clears the minimum EV
+    total_ev, mean_ev    EV of those opportunities (dollars, at the stake)
+    within_target        opportunities whose price is at or below the max
+                         price for the target EV (still worth it at target)
+    mean_headroom_cents  mean (max price for target - current price)
+
+    python scripts/param_sweep.py [SPORT ...] --min-ev 0,1,2,3,5 --target-ev 3,5 \\
+                                  --stake 50,100 --fee 0,1,2 [--db] [--output FILE]
+"""
+import sys
+from typing import Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+import compare_odds
+from json_io import write_json
+from snapshot_store import DEFAULT_DB_PATH
+
+DEFAULT_MIN_EVS = (0.0, 1.0, 2.0, 3.0, 5.0, 7.5, 10.0)
+DEFAULT_TARGET_EVS = (2.0, 3.0, 5.0)
+DEFAULT_STAKES = (50.0, 100.0, 250.0)
+DEFAULT_FEES = (0.0, 1.0, 2.0)
+
+def game_columns(matched_games: List[Dict]) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    (prices, probs) of matched games, each shaped (games, 2) for (away, home):
+    Kalshi yes_ask in cents and devigged sportsbook probability in percent.
+    Games analyze_game would skip (a team without sportsbook odds) are left out.
+    """
+    prices, probs = [], []
+    for game in matched_games:
+        fair = compare_odds.consensus_probabilities(game)
+        if fair is None:
+            continue
+        probs.append(fair)
+        prices.append((int(game["away_kalshi_market"]["market_data"].get("yes_ask", 0)),
+                       int(game["home_kalshi_market"]["market_data"].get("yes_ask", 0))))
+    return np.array(prices, dtype=np.float64).reshape(-1, 2), np.array(probs, dtype=np.float64).reshape(-1, 2)
+
+def profit_if_win(stake: np.ndarray, price_cents: np.ndarray, fee: np.ndarray) -> np.ndarray:
+    """calculate_kalshi_payout's profit_if_win, broadcast (0 at a zero price)."""
+    with np.errstate(divide="ignore", invalid="ignore"):
+        profit = np.round(stake / (price_cents / 100.0) * (1 - fee / 100.0) - stake, 2)
+    return np.where(price_cents == 0, 0.0, profit)
+
+def max_price_for_ev(stake: np.ndarray, prob_win: np.ndarray, prob_lose: np.ndarray,
+                     fee: np.ndarray, target: np.ndarray) -> np.ndarray:
+    """calculate_max_kalshi_price_for_ev, broadcast; NaN where no price reaches the target."""
+    payout = 1 - fee / 100.0
+    price = np.clip(np.floor(prob_win / 100 * stake * 100 * payout / (target + stake)), 1, 100)
+
+    def ev_at(p):
+        return prob_win / 100 * profit_if_win(stake, p, fee) + prob_lose / 100 * -np.round(stake, 2)
+
+    # One cent lower if the floor still misses the target (at 1c the original keeps 1c)
+    short = (ev_at(price) < target) & (price > 1)
+    lower = np.where(short, price - 1, price)
+    return np.where(short & (ev_at(lower) < target), np.nan, lower)
+
+def sweep(prices: np.ndarray, probs: np.ndarray, min_evs: Sequence[float], target_evs: Sequence[float],
+          stakes: Sequence[float], fees: Sequence[float]) -> Dict[str, np.ndarray]:
+    """
+    Evaluate the grid over (games, 2) price and probability columns.
+    Returns counts and sums (so sports can be added up) shaped
+    (fees, stakes, min_evs, target_evs); "priced" counts the opportunities
+    with a max price for the target, "headroom_sum" adds up their headroom.
+    """
+    fee = np.asarray(fees, dtype=np.float64)[:, None, None, None]
+    stake = np.asarray(stakes, dtype=np.float64)[None, :, None, None]
+    price = prices[None, None, :, :]
+    prob = probs[None, None, :, :]
+    loss = -np.round(stake, 2)
+
+    # (fees, stakes, games, side): EV of each side, as calculate_expected_value
+    ev = prob / 100 * profit_if_win(stake, price, fee) + prob[..., ::-1] / 100 * loss
+    side = np.argmax(ev, axis=-1)[..., None]
+    best_ev = np.round(np.take_along_axis(ev, side, axis=-1)[..., 0], 2)
+    best_price = np.take_along_axis(np.broadcast_to(price, ev.shape), side, axis=-1)[..., 0]
+    prob_win = np.take_along_axis(np.broadcast_to(prob, ev.shape), side, axis=-1)[..., 0]
+
+    # (fees, stakes, targets, games)
+    target = np.asarray(target_evs, dtype=np.float64)[None, None, :, None]
+    max_price = max_price_for_ev(stake, prob_win[:, :, None, :], 100 - prob_win[:, :, None, :], fee, target)
+
+    # (fees, stakes, min_evs, targets, games)
+    headroom = (max_price - best_price[:, :, None, :])[:, :, None, :, :]
+    taken = (best_ev[:, :, None, :] > np.asarray(min_evs, dtype=np.float64)[None, None, :, None])[:, :, :, None, :]
+    shape = np.broadcast_shapes(taken.shape, headroom.shape)
+    taken, headroom = np.broadcast_to(taken, shape), np.broadcast_to(headroom, shape)
+    priced = taken & ~np.isnan(headroom)
+    return {
+        "opportunities": taken.sum(axis=-1),
+        "total_ev": np.where(taken, best_ev[:, :, None, None, :], 0.0).sum(axis=-1),
+        "within_target": (priced & (headroom >= 0)).sum(axis=-1),
+        "priced": priced.sum(axis=-1),
+        "headroom_sum": np.where(priced, headroom, 0.0).sum(axis=-1),
+    }
+
+def load_columns(sports: List[str], snapshot_db: Optional[str] = None) -> Dict[str, Tuple[np.ndarray, np.ndarray]]:
+    """Load and match each sport once; sports without data are skipped."""
+    columns = {}
+    for sport in sports:
+        try:
+            matched_games, _ = compare_odds.load_and_match_games(sport, snapshot_db)
+        except FileNotFoundError:
+            continue
+        prices, probs = game_columns(matched_games)
+        if len(prices):
+            columns[sport] = (prices, probs)
+    return columns
+
+def grid_rows(results: Dict[str, Dict[str, np.ndarray]], min_evs, target_evs, stakes, fees) -> List[Dict]:
+    """Flatten per-sport sweep results into one row per grid point, summed over sports."""
+    totals = {key: sum(r[key] for r in results.values()) for key in next(iter(results.values()))}
+    rows = []
+    for index in np.ndindex(totals["opportunities"].shape):
+        fi, si, mi, ti = index
+        count = int(totals["opportunities"][index])
+        total_ev = float(totals["total_ev"][index])
+        priced = int(totals["priced"][index])
+        rows.append({
+            "fee_percent": fees[fi],
+            "stake": stakes[si],
+            "min_ev": min_evs[mi],
+            "target_ev": target_evs[ti],
+            "opportunities": count,
+            "total_ev": round(total_ev, 2),
+            "mean_ev": round(total_ev / count, 2) if count else None,
+            "within_target": int(totals["within_target"][index]),
+            "mean_headroom_cents": round(float(totals["headroom_sum"][index]) / priced, 2) if priced else None,
+            "by_sport": {sport: int(r["opportunities"][index]) for sport, r in results.items()},
+        })
+    return rows
+
+def format_rows(rows: List[Dict]) -> str:
+    defaults = (1.0, 100.0, compare_odds.MIN_EV_THRESHOLD, 3.0)
+    lines = [f"{'fee %':>6} {'stake':>8} {'min EV':>7} {'target':>7} {'opps':>6} {'total EV':>10} "
+             f"{'mean EV':>8} {'@target':>8} {'headroom':>9}"]
+    for row in rows:
+        marker = "  <- current" if (row["fee_percent"], row["stake"], row["min_ev"], row["target_ev"]) == defaults else ""
+        mean_ev = f"{row['mean_ev']:.2f}" if row["mean_ev"] is not None else "-"
+        headroom = f"{row['mean_headroom_cents']:+.1f}c" if row["mean_headroom_cents"] is not None else "-"
+        lines.append(f"{row['fee_percent']:>6g} {row['stake']:>8g} {row['min_ev']:>7g} {row['target_ev']:>7g} "
+                     f"{row['opportunities']:>6} {row['total_ev']:>10.2f} {mean_ev:>8} "
+                     f"{row['within_target']:>8} {headroom:>9}{marker}")
+    return "\n".join(lines)
+
+def parse_list(value: str) -> Tuple[float, ...]:
+    return tuple(float(v) for v in value.split(",") if v.strip())
+
+def main():
+    """
+    Command line arguments:
+        [SPORT ...] - Sports to load (default: all)
+        --min-ev LIST - Minimum EVs to report, comma separated (dollars)
+        --target-ev LIST - Max-price EV targets (dollars)
+        --stake LIST - Stakes (dollars)
+        --fee LIST - Kalshi fee percents
+        --db - Read data from the SQLite snapshot store when a JSON file is missing
+        --output FILE - Also write the grid as JSON
+    """
+    snapshot_db = DEFAULT_DB_PATH if "--db" in sys.argv else None
+    if snapshot_db:
+        sys.argv.remove("--db")
+    options = {"--min-ev": DEFAULT_MIN_EVS, "--target-ev": DEFAULT_TARGET_EVS,
+               "--stake": DEFAULT_STAKES, "--fee": DEFAULT_FEES, "--output": None}
+    for flag in list(options):
+        if flag in sys.argv:
+            idx = sys.argv.index(flag)
+            if idx + 1 >= len(sys.argv):
+                print(f"Error: {flag} requires a value")
+                sys.exit(1)
+            value = sys.argv[idx + 1]
+            if flag != "--output":
+                try:
+                    value = parse_list(value)
+                except ValueError:
+                    print(f"Error: {flag} requires comma-separated numbers")
+                    sys.exit(1)
+            options[flag] = value
+            del sys.argv[idx:idx + 2]
+
+    sports = [arg.lower() for arg in sys.argv[1:]] or list(compare_odds.SPORT_CONFIG.keys())
+    unknown = [sport for sport in sports if sport not in compare_odds.SPORT_CONFIG]
+    if unknown:
+        print(f"Error: Unsupported sport '{unknown[0]}'")
+        sys.exit(1)
+
+    grid = (options["--min-ev"], options["--target-ev"], options["--stake"], options["--fee"])
+    columns = load_columns(sports, snapshot_db)
+    if not columns:
+        print("No matched games to sweep")
+        return
+    results = {sport: sweep(prices, probs, *grid) for sport, (prices, probs) in columns.items()}
+    rows = grid_rows(results, *grid)
+    games = sum(len(prices) for prices, _ in columns.values())
+    print(f"{games} matched games ({', '.join(s.upper() for s in columns)}), {len(rows)} grid points\n")
+    print(format_rows(rows))
+    if options["--output"]:
+        write_json(options["--output"], {"sports": list(columns), "games": games, "rows": rows}, pretty=True)
+        print(f"\nWrote {options['--output']}")
+
+if __name__ == "__main__":
+    main()
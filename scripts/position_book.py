@@ -0,0 +1,458 @@
+"""
+Position book: what we hold, marked to market, and what it settled for.
+
+Fills are recorded per Kalshi market ticker. order_executor.py records its
+own, and `position_book.py fill` records manual ones. A position is one side
+(yes/no) of a ticker with its contracts and cost. A fill on the other side
+nets against it, as on Kalshi. Each pair is sure to pay $1 less
+KALSHI_FEE_PERCENT (one side wins), so it realizes that less both prices,
+the same payout settlement and the marks use.
+
+Every refresh marks held tickers from the latest market data:
+
+    market_value    contracts * bid of the held side (what selling now pays)
+    unrealized_pnl  market_value - cost
+    expected_pnl    contracts * P(win) * payout - cost, with P(win) from the
+                    devigged consensus probabilities and a winning contract
+                    paying $1 less KALSHI_FEE_PERCENT
+    residual_ev     expected_pnl - unrealized_pnl: what holding to settlement
+                    is still expected to earn over selling at the bid
+
+Marking is incremental. A refresh looks up each matched market in the book
+and only re-marks held tickers whose bids or fair probability changed; the
+book's totals move by the difference. A game's fair probabilities are only
+devigged again when a bookmaker's last_update changed. A refresh costs a
+dict lookup per matched market plus work proportional to what moved,
+however many positions are held.
+
+Positions whose game has started drop out of the refreshes, so they are
+fetched from Kalshi instead, at most every SETTLEMENT_POLL_SECONDS (which
+also keeps them marked while the game is live, without a fair probability).
+Held tickers wait in a heap keyed by their next poll (the commence time,
+then every SETTLEMENT_POLL_SECONDS), so a refresh only pops what is due, and
+on_games hands the fetches to SETTLEMENT_WORKERS background threads rather
+than running them on the daemon thread. Once a market's status is final and
+its result is yes or no, the settled P&L is appended to
+data/settlements.jsonl and the position is closed.
+
+Positions are kept in data/positions.json.
+
+    python scripts/position_book.py [SPORT ...] [--settle]
+    python scripts/position_book.py fill TICKER yes|no COUNT PRICE_CENTS [--sport SPORT]
+    python scripts/odds_daemon.py --positions
+"""
+import heapq
+import json
+import os
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timezone
+from typing import Callable, Dict, List, Optional, Tuple
+
+import compare_odds
+import fetch_kalshi_sports
+from json_io import load_json, write_json
+from opportunity_ledger import parse_timestamp
+from stake_optimizer import KALSHI_FEE_PERCENT
+
+# Get the project root directory (parent of scripts folder)
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+DATA_DIR = os.path.join(PROJECT_ROOT, "data")
+
+POSITIONS_FILE = os.path.join(DATA_DIR, "positions.json")
+SETTLEMENTS_FILE = os.path.join(DATA_DIR, "settlements.jsonl")
+
+# Kalshi market statuses after which the result no longer changes
+FINAL_STATUSES = ("determined", "settled", "finalized")
+
+# Started games are fetched at most this often
+SETTLEMENT_POLL_SECONDS = 300
+SETTLEMENT_WORKERS = 8
+
+# Mark fields summed into the book's totals
+TOTAL_FIELDS = ("cost", "market_value", "unrealized_pnl", "expected_pnl", "residual_ev")
+
+def now_iso() -> str:
+    return datetime.now(timezone.utc).isoformat()
+
+def mark_values(position: Dict, yes_bid: Optional[float], no_bid: Optional[float],
+                fair_yes: Optional[float], fee_percent: float = KALSHI_FEE_PERCENT) -> Dict:
+    """Mark-to-market fields of a position (fair_yes: P(YES) in percent, or None)."""
+    contracts = position["contracts"]
+    cost = position["cost"]
+    bid = yes_bid if position["side"] == "yes" else no_bid
+    prob = None
+    if fair_yes is not None:
+        prob = fair_yes if position["side"] == "yes" else 100 - fair_yes
+    market_value = round(contracts * bid / 100, 2) if bid is not None else None
+    unrealized = round(market_value - cost, 2) if market_value is not None else None
+    expected = round(contracts * prob / 100 * (1 - fee_percent / 100) - cost, 2) if prob is not None else None
+    return {
+        "bid": bid,
+        "fair_prob": round(prob, 2) if prob is not None else None,
+        "market_value": market_value,
+        "unrealized_pnl": unrealized,
+        "expected_pnl": expected,
+        "residual_ev": round(expected - unrealized, 2) if expected is not None and unrealized is not None else None,
+    }
+
+class PositionBook:
+    """
+    Open positions keyed by ticker, with their latest marks and running
+    totals. Thread-safe: fills come from the executor's event loop, marks
+    from the daemon thread and settlement fetches from worker threads.
+    """
+
+    def __init__(self, path: Optional[str] = POSITIONS_FILE, ledger_path: str = SETTLEMENTS_FILE,
+                 fee_percent: float = KALSHI_FEE_PERCENT):
+        self.path = path
+        self.ledger_path = ledger_path
+        self.fee_percent = fee_percent
+        self.positions: Dict[str, Dict] = {}
+        self.inputs: Dict[str, Tuple] = {}       # ticker -> (yes_bid, no_bid, fair_yes) of the last mark
+        self.next_poll: Dict[str, float] = {}    # ticker -> next settlement poll
+        self.schedule: List[Tuple[float, str]] = []  # heap of (next poll, ticker); stale entries skipped
+        # sport -> odds event id -> (bookmaker last_update signature, fair probabilities)
+        self.fair_cache: Dict[str, Dict[str, Tuple]] = {}
+        # sport -> ticker -> (game, side index) from the latest refresh, to mark new positions at once
+        self.seen: Dict[str, Dict[str, Tuple[Dict, int]]] = {}
+        self.totals = {field: 0.0 for field in TOTAL_FIELDS}
+        self._lock = threading.RLock()
+        self._executor: Optional[ThreadPoolExecutor] = None
+        if path and os.path.exists(path):
+            for ticker, position in load_json(path, use_cache=False).get("positions", {}).items():
+                self.positions[ticker] = position
+                self._add_totals(position, 1)
+                self._schedule_start(ticker, position)
+
+    def _schedule(self, ticker: str, at: float):
+        self.next_poll[ticker] = at
+        heapq.heappush(self.schedule, (at, ticker))
+
+    def _schedule_start(self, ticker: str, position: Dict):
+        """First settlement poll at the commence time (at once while it is unknown)."""
+        commence = position.get("commence_time")
+        self._schedule(ticker, parse_timestamp(commence).timestamp() if commence else 0.0)
+
+    def _add_totals(self, position: Dict, sign: int):
+        for field in TOTAL_FIELDS:
+            if position.get(field) is not None:
+                self.totals[field] += sign * position[field]
+
+    def _remark(self, position: Dict, yes_bid, no_bid, fair_yes):
+        """Replace a position's mark, moving the totals by the difference."""
+        self._add_totals(position, -1)
+        position.update(mark_values(position, yes_bid, no_bid, fair_yes, self.fee_percent))
+        position["marked_at"] = now_iso()
+        self._add_totals(position, 1)
+
+    def record_fill(self, ticker: str, side: str, count: int, cost: float, event_ticker: Optional[str] = None,
+                    sport: Optional[str] = None, team_name: Optional[str] = None) -> Optional[Dict]:
+        """
+        Add a fill of count contracts of side costing cost dollars. Returns
+        the settlement record if the fill netted the position to zero.
+        """
+        if count < 1:
+            return None
+        with self._lock:
+            position = self.positions.get(ticker)
+            if position is None:
+                position = self.positions[ticker] = {
+                    "ticker": ticker, "event_ticker": event_ticker, "sport": sport, "team_name": team_name,
+                    "side": side, "contracts": 0, "cost": 0.0, "realized_pnl": 0.0,
+                    "opened_at": now_iso(), "fills": [],
+                }
+                self._schedule_start(ticker, position)
+            position["fills"].append({"time": now_iso(), "side": side, "count": count, "cost": round(cost, 2)})
+
+            self._add_totals(position, -1)
+            if position["contracts"] == 0 or position["side"] == side:
+                position["side"] = side
+                position["contracts"] += count
+                position["cost"] = round(position["cost"] + cost, 2)
+            else:
+                # Opposite sides net: each YES + NO pair pays $1 less the fee whatever the result
+                closed = min(count, position["contracts"])
+                held_cost = position["cost"] * closed / position["contracts"]
+                fill_cost = cost * closed / count
+                payout = closed * (1 - self.fee_percent / 100)
+                position["realized_pnl"] = round(position["realized_pnl"] + payout - held_cost - fill_cost, 2)
+                position["contracts"] -= closed
+                position["cost"] = round(position["cost"] - held_cost, 2)
+                if count > closed:
+                    position["side"] = side
+                    position["contracts"] = count - closed
+                    position["cost"] = round(cost - fill_cost, 2)
+            self._add_totals(position, 1)
+
+            if position["contracts"] == 0:
+                return self._settle(ticker, None)
+            seen = next(((sport, self.seen[sport][ticker]) for sport in self.seen if ticker in self.seen[sport]), None)
+            if ticker not in self.inputs and seen is not None:
+                sport, (game, index) = seen
+                self._observe_game(sport, ticker, game, index, compare_odds.consensus_probabilities(game) or (None, None))
+            else:
+                yes_bid, no_bid, fair_yes = self.inputs.get(ticker, (None, None, None))
+                self._remark(position, yes_bid, no_bid, fair_yes)
+            self.save()
+        return None
+
+    def observe(self, ticker: str, market_data: Dict, fair_yes: Optional[float]) -> bool:
+        """
+        Mark one held ticker from its market data if its inputs changed, and
+        settle it if the market is final. Returns whether anything changed.
+        """
+        with self._lock:
+            position = self.positions.get(ticker)
+            if position is None:
+                return False
+            result = market_data.get("result")
+            if market_data.get("status") in FINAL_STATUSES and result in ("yes", "no"):
+                self._settle(ticker, result)
+                return True
+            inputs = (market_data.get("yes_bid"), market_data.get("no_bid"),
+                      round(fair_yes, 4) if fair_yes is not None else None)
+            if self.inputs.get(ticker) == inputs and "marked_at" in position:
+                return False
+            self.inputs[ticker] = inputs
+            self._remark(position, *inputs)
+        return True
+
+    def fair_probabilities(self, game: Dict, previous: Dict, cache: Dict) -> Tuple:
+        """A game's consensus probabilities, reused while no bookmaker has updated."""
+        odds = game.get("odds_data") or {}
+        event_id = odds.get("id")
+        signature = tuple((b.get("key"), b.get("last_update")) for b in odds.get("bookmakers", []))
+        cached = previous.get(event_id)
+        if cached is not None and cached[0] == signature:
+            fair = cached[1]
+        else:
+            fair = compare_odds.consensus_probabilities(game) or (None, None)
+        if event_id:
+            cache[event_id] = (signature, fair)
+        return fair
+
+    def update(self, sport: str, matched_games: List[Dict]) -> List[str]:
+        """
+        Mark held tickers from a sport's matched games, saving the book if
+        any changed; returns the tickers that changed.
+        """
+        changed = []
+        with self._lock:
+            previous = self.fair_cache.get(sport, {})
+            cache = self.fair_cache[sport] = {}
+            seen = self.seen[sport] = {}
+            for game in matched_games:
+                fair = None
+                for index, side in enumerate(("away", "home")):
+                    ticker = game[f"{side}_kalshi_market"].get("ticker")
+                    seen[ticker] = (game, index)
+                    if ticker not in self.positions:
+                        continue
+                    if fair is None:
+                        fair = self.fair_probabilities(game, previous, cache)
+                    if self._observe_game(sport, ticker, game, index, fair):
+                        changed.append(ticker)
+            if changed:
+                self.save()
+        return changed
+
+    def _observe_game(self, sport: str, ticker: str, game: Dict, index: int, fair: Tuple) -> bool:
+        side = ("away", "home")[index]
+        position = self.positions[ticker]
+        if not position.get("commence_time"):
+            position["commence_time"] = game.get("commence_time")
+            position["team_name"] = position.get("team_name") or game.get(f"{side}_team")
+            position["sport"] = position.get("sport") or sport
+            position["event_ticker"] = position.get("event_ticker") or game.get("event_ticker")
+            if position["commence_time"]:
+                self._schedule_start(ticker, position)
+        return self.observe(ticker, game[f"{side}_kalshi_market"]["market_data"], fair[index])
+
+    def due_for_settlement(self, now: float, force: bool = False) -> List[str]:
+        """
+        Take the held tickers whose settlement poll is due off the schedule
+        (force: every held ticker). Each is scheduled again once polled.
+        """
+        with self._lock:
+            if force:
+                self.schedule, self.next_poll = [], {}
+                return list(self.positions)
+            due = []
+            while self.schedule and self.schedule[0][0] <= now:
+                at, ticker = heapq.heappop(self.schedule)
+                if self.next_poll.get(ticker) == at:
+                    del self.next_poll[ticker]
+                    due.append(ticker)
+        return due
+
+    def _pool(self) -> ThreadPoolExecutor:
+        with self._lock:
+            if self._executor is None:
+                self._executor = ThreadPoolExecutor(max_workers=SETTLEMENT_WORKERS, thread_name_prefix="settlement")
+        return self._executor
+
+    def poll_settlement(self, ticker: str, fetch: Callable[[str], Dict], now: float) -> Optional[str]:
+        """Fetch one started position's market; marks it (live) or settles it. Returns the result if settled."""
+        try:
+            market = fetch(ticker)
+        except Exception as e:
+            print(f"Warning: could not fetch market {ticker}: {e}")
+            market = None
+        with self._lock:
+            if market and self.observe(ticker, market, None) and ticker in self.positions:
+                self.save()
+            if ticker not in self.positions:
+                return market.get("result") if market else None
+            self._schedule(ticker, now + SETTLEMENT_POLL_SECONDS)
+        return None
+
+    def check_settlements(self, fetch: Callable[[str], Dict] = fetch_kalshi_sports.fetch_market,
+                          now: Optional[float] = None, force: bool = False) -> List[str]:
+        """Fetch due positions' markets and wait for them. Returns tickers fetched."""
+        now = time.time() if now is None else now
+        due = self.due_for_settlement(now, force)
+        if due:
+            list(self._pool().map(lambda ticker: self.poll_settlement(ticker, fetch, now), due))
+        return due
+
+    def _settle_in_background(self, ticker: str, fetch: Callable[[str], Dict], now: float):
+        result = self.poll_settlement(ticker, fetch, now)
+        if result is not None:
+            stamp = datetime.now().strftime("%H:%M:%S")
+            print(f"[{stamp}] positions: {ticker} settled {result.upper()}; "
+                  f"unrealized ${self.totals['unrealized_pnl']:,.2f}, residual EV ${self.totals['residual_ev']:,.2f}",
+                  flush=True)
+
+    def on_games(self, sport: str, matched_games: List[Dict],
+                 fetch: Callable[[str], Dict] = fetch_kalshi_sports.fetch_market):
+        """odds_daemon game subscriber: marks at once, and fetches due settlements on worker threads."""
+        changed = self.update(sport, matched_games)
+        now = time.time()
+        due = self.due_for_settlement(now)
+        for ticker in due:
+            self._pool().submit(self._settle_in_background, ticker, fetch, now)
+        if changed:
+            stamp = datetime.now().strftime("%H:%M:%S")
+            print(f"[{stamp}] positions: {len(changed)} re-marked, {len(due)} polling; "
+                  f"unrealized ${self.totals['unrealized_pnl']:,.2f}, residual EV ${self.totals['residual_ev']:,.2f}",
+                  flush=True)
+
+    def _settle(self, ticker: str, result: Optional[str]) -> Dict:
+        """Close a position at its result (None: netted flat) and append it to the ledger."""
+        position = self.positions.pop(ticker)
+        self.inputs.pop(ticker, None)
+        self.next_poll.pop(ticker, None)
+        self._add_totals(position, -1)
+        payout = 0.0
+        if result is not None and result == position["side"]:
+            payout = position["contracts"] * (1 - self.fee_percent / 100)
+        record = {
+            "settled_at": now_iso(),
+            "ticker": ticker,
+            "event_ticker": position.get("event_ticker"),
+            "sport": position.get("sport"),
+            "team_name": position.get("team_name"),
+            "side": position["side"],
+            "result": result,
+            "contracts": position["contracts"],
+            "cost": position["cost"],
+            "payout": round(payout, 2),
+            "realized_pnl": position["realized_pnl"],
+            "pnl": round(payout - position["cost"] + position["realized_pnl"], 2),
+            "last_bid": position.get("bid"),
+            "last_fair_prob": position.get("fair_prob"),
+            "fills": len(position.get("fills", [])),
+        }
+        os.makedirs(os.path.dirname(os.path.abspath(self.ledger_path)), exist_ok=True)
+        with open(self.ledger_path, "a", encoding="utf-8") as f:
+            f.write(json.dumps(record, separators=(",", ":")) + "\n")
+        self.save()
+        return record
+
+    def save(self):
+        if self.path:
+            with self._lock:
+                write_json(self.path, {"positions": self.positions})
+
+    def ranked(self) -> List[Dict]:
+        """Open positions, largest residual EV first."""
+        with self._lock:
+            positions = list(self.positions.values())
+        return sorted(positions, key=lambda p: (p.get("residual_ev") is None, -(p.get("residual_ev") or 0)))
+
+def format_positions(positions: List[Dict], totals: Dict) -> str:
+    def fmt(value, spec):
+        return format(value, spec) if value is not None else "-"
+
+    lines = [f"  {'ticker':<36} {'side':<4} {'qty':>6} {'cost':>9} {'bid':>4} {'value':>9} "
+             f"{'unreal.':>9} {'fair':>6} {'exp. P&L':>9} {'resid. EV':>9}"]
+    for p in positions:
+        lines.append(f"  {p['ticker'][:36]:<36} {p['side']:<4} {p['contracts']:>6} {p['cost']:>9.2f} "
+                     f"{fmt(p.get('bid'), '>4')} {fmt(p.get('market_value'), '>9.2f')} "
+                     f"{fmt(p.get('unrealized_pnl'), '>+9.2f')} {fmt(p.get('fair_prob'), '>5.1f')}% "
+                     f"{fmt(p.get('expected_pnl'), '>+9.2f')} {fmt(p.get('residual_ev'), '>+9.2f')}")
+    lines.append(f"  {'total':<36} {'':<4} {'':>6} {totals['cost']:>9.2f} {'':>4} {totals['market_value']:>9.2f} "
+                 f"{totals['unrealized_pnl']:>+9.2f} {'':>6} {totals['expected_pnl']:>+9.2f} "
+                 f"{totals['residual_ev']:>+9.2f}")
+    return "\n".join(lines)
+
+def main():
+    """
+    Command line arguments:
+        [SPORT ...] - Mark positions from these sports' latest data (default: all)
+        --settle - Also fetch started games' markets now and settle final ones
+        fill TICKER yes|no COUNT PRICE_CENTS - Record a fill
+        --sport SPORT - Sport of a recorded fill
+    """
+    book = PositionBook()
+    if len(sys.argv) > 1 and sys.argv[1] == "fill":
+        sport = None
+        if "--sport" in sys.argv:
+            idx = sys.argv.index("--sport")
+            sport = sys.argv[idx + 1].lower() if idx + 1 < len(sys.argv) else None
+            del sys.argv[idx:idx + 2]
+        try:
+            _, _, ticker, side, count, price = sys.argv
+            count, price = int(count), float(price)
+            if side not in ("yes", "no") or count < 1 or not 0 < price < 100:
+                raise ValueError
+        except ValueError:
+            print("Usage: python position_book.py fill TICKER yes|no COUNT PRICE_CENTS [--sport SPORT]")
+            sys.exit(1)
+        book.record_fill(ticker, side, count, count * price / 100, sport=sport)
+        position = book.positions.get(ticker)
+        if position:
+            print(f"{ticker}: {position['contracts']} {position['side'].upper()} for ${position['cost']:,.2f}")
+        else:
+            print(f"{ticker}: netted flat (see {SETTLEMENTS_FILE})")
+        return
+
+    settle = "--settle" in sys.argv
+    if settle:
+        sys.argv.remove("--settle")
+    sports = [arg.lower() for arg in sys.argv[1:]] or list(compare_odds.SPORT_CONFIG.keys())
+    for sport in sports:
+        if sport not in compare_odds.SPORT_CONFIG:
+            print(f"Error: Unsupported sport '{sport}'")
+            sys.exit(1)
+        try:
+            matched_games, _ = compare_odds.load_and_match_games(sport)
+        except FileNotFoundError:
+            continue
+        book.update(sport, matched_games)
+    if settle:
+        before = len(book.positions)
+        polled = book.check_settlements(force=True)
+        print(f"Fetched {len(polled)} started markets, settled {before - len(book.positions)}")
+    book.save()
+    if not book.positions:
+        print("No open positions")
+        return
+    print(f"{len(book.positions)} open positions, by residual EV:")
+    print(format_positions(book.ranked(), book.totals))
+
+if __name__ == "__main__":
+    main()
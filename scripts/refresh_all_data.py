@@ -1,10 +1,22 @@
 """
 Master script to refresh all data for all sports.
 Fetches Kalshi data and sportsbook odds for all configured sports.
+
+Everything runs in one process: sports are fetched concurrently on a thread
+pool, each sport's sportsbook odds fetch starts as soon as its own Kalshi
+fetch finishes, and the fetched data is handed over in memory (the JSON files
+and snapshot store are still written as a side effect).
 """
-import subprocess
-import sys
 import os
+import sys
+import threading
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from typing import Callable, Dict, Iterable, Optional
+
+import fetch_kalshi_sports
+import fetch_odds_api_sports
+import tracing
+import upstream_replay
 
 # Get the project root directory (parent of scripts folder)
 PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
@@ -13,39 +25,133 @@ SCRIPTS_DIR = os.path.join(PROJECT_ROOT, "scripts")
 # All supported sports
 SPORTS = ["nfl", "mlb", "nba", "ncaab", "ncaabw", "ncaaf", "ufc", "nhl", "mls"]
 
-def run_script(script_name: str, sport: str) -> bool:
+# Sports fetched at the same time (both APIs are I/O bound)
+DEFAULT_WORKERS = 4
+
+_print_lock = threading.Lock()
+
+def log_line(message: str):
+    """Print one line without interleaving with other worker threads."""
+    with _print_lock:
+        print(message, flush=True)
+
+def refresh_sport(sport: str, write_db: bool = False, export_json: bool = True,
+                  pretty: bool = False) -> Dict:
     """
-    Run a Python script with a sport argument.
-    Returns True if successful, False otherwise.
+    Fetch Kalshi markets and then sportsbook odds for one sport.
+    The odds fetch matches against the Kalshi data just fetched (in memory),
+    falling back to the Kalshi file on disk if the Kalshi fetch failed.
+
+    Returns:
+        {"sport", "kalshi_ok", "odds_ok", "kalshi_data", "odds_data"}
     """
-    script_path = os.path.join(SCRIPTS_DIR, script_name)
+    result = {"sport": sport, "kalshi_ok": False, "odds_ok": False,
+              "kalshi_data": None, "odds_data": None}
+
     try:
-        # Explicitly pass environment variables to ensure API key is available
-        env = os.environ.copy()
-        result = subprocess.run(
-            [sys.executable, script_path, sport],
-            cwd=PROJECT_ROOT,
-            env=env,  # Pass environment explicitly
-            capture_output=False,  # Show output in real-time
-            text=True
-        )
-        return result.returncode == 0
+        with tracing.span("refresh.kalshi", sport=sport):
+            result["kalshi_data"] = fetch_kalshi_sports.fetch_sport(
+                sport, export_json=export_json, write_db=write_db, pretty=pretty, verbose=False
+            )
+        result["kalshi_ok"] = True
+        markets = len(result["kalshi_data"]["markets"]) if result["kalshi_data"] else 0
+        log_line(f"   ✓ Kalshi data fetched successfully for {sport.upper()} ({markets} markets)")
     except Exception as e:
-        print(f"Error running {script_name} for {sport}: {e}")
-        return False
+        log_line(f"   ✗ Failed to fetch Kalshi data for {sport.upper()}: {e}")
+
+    # No series for this sport: nothing to match, don't fall back to a stale file
+    kalshi_data = result["kalshi_data"]
+    if result["kalshi_ok"] and kalshi_data is None:
+        kalshi_data = {"markets": []}
+
+    try:
+        with tracing.span("refresh.odds", sport=sport):
+            result["odds_data"] = fetch_odds_api_sports.fetch_sport(
+                sport, kalshi_data=kalshi_data, export_json=export_json,
+                write_db=write_db, pretty=pretty, verbose=False
+            )
+        result["odds_ok"] = True
+        if result["odds_data"]:
+            odds = result["odds_data"]
+            log_line(f"   ✓ Sportsbook odds fetched successfully for {sport.upper()} "
+                     f"({odds['matched_games']}/{odds['total_games']} games matched)")
+        else:
+            log_line(f"   - No sportsbook odds to fetch for {sport.upper()}")
+    except Exception as e:
+        log_line(f"   ✗ Failed to fetch sportsbook odds for {sport.upper()}: {e}")
+
+    return result
+
+def refresh_all(sports: Iterable[str] = SPORTS, max_workers: int = DEFAULT_WORKERS,
+                write_db: bool = False, export_json: bool = True, pretty: bool = False,
+                on_sport_done: Optional[Callable[[Dict], None]] = None) -> Dict[str, Dict]:
+    """
+    Refresh several sports concurrently.
+
+    Args:
+        sports: Sport keys to refresh
+        max_workers: Number of sports fetched at the same time
+        write_db: Also append snapshots to the SQLite snapshot store
+        export_json: Write the JSON data files
+        pretty: Write indented JSON
+        on_sport_done: Called with each refresh_sport result as soon as it finishes
+
+    Returns:
+        Dict of sport -> refresh_sport result
+    """
+    sports = list(sports)
+    results = {}
+    with ThreadPoolExecutor(max_workers=max(1, max_workers)) as executor:
+        futures = {
+            executor.submit(refresh_sport, sport, write_db, export_json, pretty): sport
+            for sport in sports
+        }
+        for future in as_completed(futures):
+            result = future.result()
+            results[result["sport"]] = result
+            if on_sport_done:
+                on_sport_done(result)
+    return results
 
 def main():
     """
     Refresh all data for all sports.
+
+    Command line arguments:
+        --db - Also append snapshots to the SQLite snapshot store
+        --no-json - Skip the JSON file exports (use with --db)
+        --pretty - Write indented JSON for humans (default compact)
+        --workers N - Number of sports fetched concurrently (default 4)
+        --profile - Print per-stage and per-sport timings at the end
+        --record FILE - Append every upstream request/response to FILE (see upstream_replay.py)
     """
+    write_db = "--db" in sys.argv
+    export_json = "--no-json" not in sys.argv
+    pretty = "--pretty" in sys.argv
+    if "--profile" in sys.argv:
+        tracing.enable()
+    if "--record" in sys.argv:
+        idx = sys.argv.index("--record")
+        if idx + 1 >= len(sys.argv):
+            print("Error: --record requires a file")
+            sys.exit(1)
+        upstream_replay.start_recording(sys.argv[idx + 1])
+        del sys.argv[idx:idx + 2]
+    max_workers = DEFAULT_WORKERS
+    if "--workers" in sys.argv:
+        idx = sys.argv.index("--workers")
+        try:
+            max_workers = int(sys.argv[idx + 1])
+        except (IndexError, ValueError):
+            print("Usage: python refresh_all_data.py [--db] [--no-json] [--pretty] [--workers N] [--profile] [--record FILE]")
+            sys.exit(1)
+
     print("=" * 80)
     print("REFRESHING ALL DATA FOR ALL SPORTS")
     print("=" * 80)
-    
+
     # Check if API key is set
-    # TODO: Remove hardcoded API key before production/deployment
-    api_key = os.getenv("ODDS_API_KEY") or "d77d2e63a1e5fb8832317d1058c996a1"
-    if not api_key:
+    if not fetch_odds_api_sports.ODDS_API_KEY:
         print("\n⚠ WARNING: ODDS_API_KEY environment variable is not set!")
         print("Sportsbook odds fetching will fail without the API key.")
         print("Please set it using:")
@@ -54,48 +160,40 @@ def main():
         print("\nContinuing with Kalshi data fetch only...\n")
     else:
         print()
-    
+
+    print(f"Fetching {len(SPORTS)} sports, {max_workers} at a time...\n")
+    results = refresh_all(SPORTS, max_workers=max_workers, write_db=write_db,
+                          export_json=export_json, pretty=pretty)
+    if upstream_replay.is_recording():
+        upstream_replay.stop_recording()
+
     total_sports = len(SPORTS)
-    successful_kalshi = 0
-    successful_odds = 0
-    
-    for idx, sport in enumerate(SPORTS, 1):
-        print(f"\n[{idx}/{total_sports}] Processing {sport.upper()}...")
-        print("-" * 80)
-        
-        # Step 1: Fetch Kalshi data
-        print(f"\n1. Fetching Kalshi data for {sport.upper()}...")
-        if run_script("fetch_kalshi_sports.py", sport):
-            successful_kalshi += 1
-            print(f"   ✓ Kalshi data fetched successfully for {sport.upper()}")
-        else:
-            print(f"   ✗ Failed to fetch Kalshi data for {sport.upper()}")
-        
-        # Step 2: Fetch sportsbook odds
-        print(f"\n2. Fetching sportsbook odds for {sport.upper()}...")
-        if run_script("fetch_odds_api_sports.py", sport):
-            successful_odds += 1
-            print(f"   ✓ Sportsbook odds fetched successfully for {sport.upper()}")
-        else:
-            print(f"   ✗ Failed to fetch sportsbook odds for {sport.upper()}")
-        
-        print()
-    
+    successful_kalshi = sum(1 for r in results.values() if r["kalshi_ok"])
+    successful_odds = sum(1 for r in results.values() if r["odds_ok"])
+
     # Summary
+    print()
     print("=" * 80)
     print("REFRESH SUMMARY")
     print("=" * 80)
     print(f"Kalshi data: {successful_kalshi}/{total_sports} sports successful")
     print(f"Sportsbook odds: {successful_odds}/{total_sports} sports successful")
     print()
-    
+
     if successful_kalshi == total_sports and successful_odds == total_sports:
         print("✓ All data refreshed successfully!")
     else:
         print("⚠ Some data refresh operations failed. Check the output above for details.")
-    
+
     print("\nTo analyze opportunities, run:")
     print("  python scripts/compare_odds.py")
 
+    if tracing.is_enabled():
+        print()
+        print("=" * 80)
+        print("PROFILE")
+        print("=" * 80)
+        print(tracing.report())
+
 if __name__ == "__main__":
     main()
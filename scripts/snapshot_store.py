@@ -0,0 +1,548 @@
+"""
+Time-series snapshot store.
+Append-only SQLite history of Kalshi market prices, per-bookmaker sportsbook
+odds and computed opportunities.
+
+Every refresh is written as one batched transaction stamped with a single
+observed_at timestamp, so nothing is overwritten and history can be queried
+by latest state or by time range. The JSON files in data/ remain available as
+an optional export.
+
+A full re-listing of a sport is also recorded in listing_runs. The "latest"
+reads only return markets and games present in the sport's most recent
+listing (with any later targeted poll of them), so markets that settled or
+were delisted since are not served as current.
+"""
+import json
+import os
+import sqlite3
+from datetime import datetime, timezone
+from typing import Dict, Iterable, List, Optional, Tuple
+
+# Get the project root directory (parent of scripts folder)
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+DATA_DIR = os.path.join(PROJECT_ROOT, "data")
+DEFAULT_DB_PATH = os.path.join(DATA_DIR, "snapshots.sqlite")
+
+# Kalshi market fields kept per snapshot row (subset of the API market object)
+KALSHI_MARKET_FIELDS = [
+    "title",
+    "yes_sub_title",
+    "no_sub_title",
+    "yes_bid",
+    "yes_ask",
+    "no_bid",
+    "no_ask",
+    "last_price",
+    "volume",
+    "volume_24h",
+    "liquidity",
+    "open_interest",
+    "status",
+    "result",
+    "close_time",
+    "expected_expiration_time",
+]
+
+# Kalshi market statuses that are no longer tradable
+CLOSED_MARKET_STATUSES = ("closed", "settled", "determined", "finalized")
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS kalshi_markets (
+    id INTEGER PRIMARY KEY,
+    sport TEXT NOT NULL,
+    event_ticker TEXT NOT NULL,
+    ticker TEXT NOT NULL,
+    observed_at TEXT NOT NULL,
+    expiration_time TEXT,
+    title TEXT,
+    yes_sub_title TEXT,
+    no_sub_title TEXT,
+    yes_bid INTEGER,
+    yes_ask INTEGER,
+    no_bid INTEGER,
+    no_ask INTEGER,
+    last_price INTEGER,
+    volume INTEGER,
+    volume_24h INTEGER,
+    liquidity INTEGER,
+    open_interest INTEGER,
+    status TEXT,
+    result TEXT,
+    close_time TEXT,
+    expected_expiration_time TEXT
+);
+CREATE INDEX IF NOT EXISTS idx_kalshi_sport_event_time
+    ON kalshi_markets (sport, event_ticker, observed_at);
+CREATE INDEX IF NOT EXISTS idx_kalshi_ticker_time
+    ON kalshi_markets (ticker, observed_at);
+
+CREATE TABLE IF NOT EXISTS odds_prices (
+    id INTEGER PRIMARY KEY,
+    sport TEXT NOT NULL,
+    game TEXT NOT NULL,
+    bookmaker TEXT NOT NULL,
+    observed_at TEXT NOT NULL,
+    sport_key TEXT,
+    away_team TEXT,
+    home_team TEXT,
+    commence_time TEXT,
+    bookmaker_title TEXT,
+    team TEXT,
+    price INTEGER,
+    last_update TEXT
+);
+CREATE INDEX IF NOT EXISTS idx_odds_bookmaker_game
+    ON odds_prices (bookmaker, game);
+CREATE INDEX IF NOT EXISTS idx_odds_sport_time
+    ON odds_prices (sport, observed_at);
+
+CREATE TABLE IF NOT EXISTS opportunities (
+    id INTEGER PRIMARY KEY,
+    sport TEXT NOT NULL,
+    event_ticker TEXT NOT NULL,
+    observed_at TEXT NOT NULL,
+    bet_team TEXT,
+    kalshi_price INTEGER,
+    expected_value REAL,
+    payload TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_opportunities_sport_event_time
+    ON opportunities (sport, event_ticker, observed_at);
+
+CREATE TABLE IF NOT EXISTS settlements (
+    ticker TEXT PRIMARY KEY,
+    sport TEXT NOT NULL,
+    event_ticker TEXT NOT NULL,
+    result TEXT NOT NULL,
+    observed_at TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_settlements_sport
+    ON settlements (sport);
+
+CREATE TABLE IF NOT EXISTS listing_runs (
+    sport TEXT NOT NULL,
+    source TEXT NOT NULL,
+    observed_at TEXT NOT NULL,
+    PRIMARY KEY (sport, source, observed_at)
+);
+
+CREATE TABLE IF NOT EXISTS comparison_runs (
+    sport TEXT NOT NULL,
+    observed_at TEXT NOT NULL,
+    total_opportunities INTEGER NOT NULL,
+    PRIMARY KEY (sport, observed_at)
+);
+"""
+
+# SQL expression converting an ISO 8601 column to Unix seconds
+UNIX_TIME = "(julianday({}) - 2440587.5) * 86400.0"
+
+def utc_now_iso() -> str:
+    return datetime.now(timezone.utc).isoformat()
+
+class SnapshotStore:
+    """
+    Thin wrapper around a SQLite connection holding the snapshot tables.
+
+    Usage:
+        with SnapshotStore() as store:
+            store.write_kalshi_snapshot("nba", markets, observed_at)
+            latest = store.latest_kalshi_markets("nba")
+    """
+
+    def __init__(self, path: str = DEFAULT_DB_PATH):
+        self.path = path
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self.conn = sqlite3.connect(path)
+        self.conn.row_factory = sqlite3.Row
+        # WAL lets compare_odds.py read while a refresh is writing
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        self.conn.executescript(SCHEMA)
+
+    def close(self):
+        self.conn.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+    # ------------------------------------------------------------------
+    # Writes (one transaction per refresh)
+    # ------------------------------------------------------------------
+
+    def write_kalshi_snapshot(self, sport: str, markets: Iterable[Dict], observed_at: Optional[str] = None,
+                              listing: bool = True) -> int:
+        """
+        Append one refresh worth of Kalshi markets.
+        Accepts either raw API market objects or file entries with a market_data dict.
+        listing=False marks a targeted poll of some markets rather than a full
+        re-listing of the sport.
+        Returns the number of rows written.
+        """
+        observed_at = observed_at or utc_now_iso()
+        rows = []
+        for market in markets:
+            data = market.get("market_data") or market
+            expiration_time = market.get("expiration_time") or data.get("expected_expiration_time")
+            rows.append(
+                (sport, data.get("event_ticker") or market.get("event_ticker"), data.get("ticker") or market.get("ticker"),
+                 observed_at, expiration_time)
+                + tuple(data.get(field) for field in KALSHI_MARKET_FIELDS)
+            )
+        columns = ["sport", "event_ticker", "ticker", "observed_at", "expiration_time"] + KALSHI_MARKET_FIELDS
+        with self.conn:
+            self.conn.executemany(
+                f"INSERT INTO kalshi_markets ({', '.join(columns)}) VALUES ({', '.join('?' * len(columns))})",
+                rows,
+            )
+            if listing:
+                self._record_listing(sport, "kalshi", observed_at)
+        return len(rows)
+
+    def write_odds_snapshot(self, sport: str, odds_games: Iterable[Dict], observed_at: Optional[str] = None,
+                            listing: bool = True) -> int:
+        """
+        Append one refresh worth of Odds API games, one row per bookmaker outcome.
+        listing=False marks a targeted poll of some games (see write_kalshi_snapshot).
+        Returns the number of rows written.
+        """
+        observed_at = observed_at or utc_now_iso()
+        rows = []
+        for game in odds_games:
+            game_id = game.get("id") or f"{game.get('away_team')}@{game.get('home_team')}"
+            if not game.get("bookmakers"):
+                # Keep the game itself on record even though nobody prices it yet
+                rows.append((
+                    sport, game_id, "", observed_at, game.get("sport_key"), game.get("away_team"),
+                    game.get("home_team"), game.get("commence_time"), None, None, None, None,
+                ))
+            for bookmaker in game.get("bookmakers", []):
+                for market in bookmaker.get("markets", []):
+                    if market.get("key") != "h2h":
+                        continue
+                    for outcome in market.get("outcomes", []):
+                        rows.append((
+                            sport, game_id, bookmaker.get("key"), observed_at,
+                            game.get("sport_key"), game.get("away_team"), game.get("home_team"),
+                            game.get("commence_time"), bookmaker.get("title"),
+                            outcome.get("name"), outcome.get("price"),
+                            market.get("last_update") or bookmaker.get("last_update"),
+                        ))
+        with self.conn:
+            self.conn.executemany(
+                "INSERT INTO odds_prices (sport, game, bookmaker, observed_at, sport_key, away_team, home_team, "
+                "commence_time, bookmaker_title, team, price, last_update) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                rows,
+            )
+            if listing:
+                self._record_listing(sport, "odds", observed_at)
+        return len(rows)
+
+    def _record_listing(self, sport: str, source: str, observed_at: str):
+        self.conn.execute(
+            "INSERT OR REPLACE INTO listing_runs (sport, source, observed_at) VALUES (?, ?, ?)",
+            (sport, source, observed_at),
+        )
+
+    def write_opportunities(self, sport: str, opportunities: Iterable[Dict], observed_at: Optional[str] = None) -> int:
+        """
+        Append one comparison run's opportunities.
+        Returns the number of rows written.
+        """
+        observed_at = observed_at or utc_now_iso()
+        rows = []
+        for opp in opportunities:
+            bet_team = opp.get("bet_team")
+            kalshi_price = opp.get("away_kalshi_prob") if bet_team == "away" else opp.get("home_kalshi_prob")
+            rows.append((
+                sport, opp["event_ticker"], observed_at, bet_team, kalshi_price,
+                opp.get("expected_value"), json.dumps(opp, separators=(",", ":")),
+            ))
+        with self.conn:
+            self.conn.executemany(
+                "INSERT INTO opportunities (sport, event_ticker, observed_at, bet_team, kalshi_price, "
+                "expected_value, payload) VALUES (?, ?, ?, ?, ?, ?, ?)",
+                rows,
+            )
+            # Record the run even when it found nothing, so "latest" really means latest
+            self.conn.execute(
+                "INSERT OR REPLACE INTO comparison_runs (sport, observed_at, total_opportunities) VALUES (?, ?, ?)",
+                (sport, observed_at, len(rows)),
+            )
+        return len(rows)
+
+    def write_settlements(self, sport: str, markets: Iterable[Dict], observed_at: Optional[str] = None) -> int:
+        """
+        Record the result ("yes"/"no") of settled Kalshi markets (raw API
+        objects or file entries). Markets without a result are skipped.
+        Returns the number of rows written.
+        """
+        observed_at = observed_at or utc_now_iso()
+        rows = []
+        for market in markets:
+            data = market.get("market_data") or market
+            result = data.get("result")
+            if result not in ("yes", "no"):
+                continue
+            rows.append((data.get("ticker") or market.get("ticker"), sport,
+                         data.get("event_ticker") or market.get("event_ticker"), result, observed_at))
+        with self.conn:
+            self.conn.executemany(
+                "INSERT OR REPLACE INTO settlements (ticker, sport, event_ticker, result, observed_at) "
+                "VALUES (?, ?, ?, ?, ?)",
+                rows,
+            )
+        return len(rows)
+
+    # ------------------------------------------------------------------
+    # Reads
+    # ------------------------------------------------------------------
+
+    def latest_listing(self, sport: str, source: str) -> Optional[str]:
+        """observed_at of the sport's most recent full listing from source ("kalshi" or "odds")."""
+        row = self.conn.execute(
+            "SELECT MAX(observed_at) FROM listing_runs WHERE sport = ? AND source = ?", (sport, source)
+        ).fetchone()
+        return row[0]
+
+    def latest_kalshi_markets(self, sport: str, event_ticker: Optional[str] = None) -> List[Dict]:
+        """
+        Most recent snapshot row of every market (optionally one event) for a
+        sport that was in its latest listing and is still open.
+        """
+        query = """
+            SELECT m.* FROM kalshi_markets m
+            JOIN (
+                SELECT ticker, MAX(observed_at) AS observed_at FROM kalshi_markets
+                WHERE sport = ? {event_filter} GROUP BY ticker
+                HAVING MAX(observed_at) >= ?
+            ) latest ON m.ticker = latest.ticker AND m.observed_at = latest.observed_at
+            WHERE m.sport = ? AND (m.status IS NULL OR m.status NOT IN ({closed}))
+            ORDER BY m.expiration_time, m.id
+        """
+        params = [sport]
+        event_filter = ""
+        if event_ticker:
+            event_filter = "AND event_ticker = ?"
+            params.append(event_ticker)
+        params.append(self.latest_listing(sport, "kalshi") or "")
+        params.append(sport)
+        params.extend(CLOSED_MARKET_STATUSES)
+        closed = ", ".join("?" * len(CLOSED_MARKET_STATUSES))
+        return self._fetch(query.format(event_filter=event_filter, closed=closed), params)
+
+    def kalshi_markets_between(self, sport: str, start: str, end: str, event_ticker: Optional[str] = None) -> List[Dict]:
+        """All Kalshi snapshot rows for a sport with start <= observed_at <= end."""
+        if event_ticker:
+            return self._fetch(
+                "SELECT * FROM kalshi_markets WHERE sport = ? AND event_ticker = ? "
+                "AND observed_at BETWEEN ? AND ? ORDER BY observed_at, id",
+                (sport, event_ticker, start, end),
+            )
+        return self._fetch(
+            "SELECT * FROM kalshi_markets WHERE sport = ? AND observed_at BETWEEN ? AND ? ORDER BY observed_at, id",
+            (sport, start, end),
+        )
+
+    def latest_odds(self, sport: str, bookmaker: Optional[str] = None) -> List[Dict]:
+        """
+        Most recent snapshot rows of every (game, bookmaker) pair for a sport
+        that was in its latest listing.
+        """
+        query = """
+            SELECT o.* FROM odds_prices o
+            JOIN (
+                SELECT game, bookmaker, MAX(observed_at) AS observed_at FROM odds_prices
+                WHERE sport = ? {bookmaker_filter} GROUP BY game, bookmaker
+                HAVING MAX(observed_at) >= ?
+            ) latest ON o.game = latest.game AND o.bookmaker = latest.bookmaker
+                AND o.observed_at = latest.observed_at
+            WHERE o.sport = ?
+            ORDER BY o.commence_time, o.id
+        """
+        params = [sport]
+        bookmaker_filter = ""
+        if bookmaker:
+            bookmaker_filter = "AND bookmaker = ?"
+            params.append(bookmaker)
+        params.append(self.latest_listing(sport, "odds") or "")
+        params.append(sport)
+        return self._fetch(query.format(bookmaker_filter=bookmaker_filter), params)
+
+    def odds_between(self, sport: str, start: str, end: str,
+                     bookmaker: Optional[str] = None, game: Optional[str] = None) -> List[Dict]:
+        """All odds rows for a sport with start <= observed_at <= end, optionally for one bookmaker/game."""
+        conditions = ["sport = ?", "observed_at BETWEEN ? AND ?"]
+        params = [sport, start, end]
+        if bookmaker:
+            conditions.append("bookmaker = ?")
+            params.append(bookmaker)
+        if game:
+            conditions.append("game = ?")
+            params.append(game)
+        return self._fetch(
+            f"SELECT * FROM odds_prices WHERE {' AND '.join(conditions)} ORDER BY observed_at, id",
+            params,
+        )
+
+    def latest_opportunities(self, sport: str) -> List[Dict]:
+        """Opportunities from the most recent comparison run for a sport."""
+        rows = self._fetch(
+            "SELECT payload FROM opportunities WHERE sport = ? AND observed_at = "
+            "(SELECT MAX(observed_at) FROM comparison_runs WHERE sport = ?) ORDER BY id",
+            (sport, sport),
+        )
+        return [json.loads(row["payload"]) for row in rows]
+
+    def opportunities_between(self, sport: str, start: str, end: str) -> List[Dict]:
+        """All opportunities for a sport with start <= observed_at <= end, each tagged with observed_at."""
+        rows = self._fetch(
+            "SELECT observed_at, payload FROM opportunities WHERE sport = ? AND observed_at BETWEEN ? AND ? "
+            "ORDER BY observed_at, id",
+            (sport, start, end),
+        )
+        opportunities = []
+        for row in rows:
+            opp = json.loads(row["payload"])
+            opp["observed_at"] = row["observed_at"]
+            opportunities.append(opp)
+        return opportunities
+
+    def settlement_results(self, sport: str) -> Dict[str, str]:
+        """ticker -> "yes"/"no" for every settled market of a sport (settlements table or snapshots)."""
+        results = {
+            row[0]: row[1] for row in self._fetch_tuples(
+                "SELECT ticker, result FROM kalshi_markets WHERE sport = ? AND result IN ('yes', 'no') "
+                "GROUP BY ticker",
+                (sport,),
+            )
+        }
+        results.update(self._fetch_tuples("SELECT ticker, result FROM settlements WHERE sport = ?", (sport,)))
+        return results
+
+    def _fetch(self, query: str, params) -> List[Dict]:
+        return [dict(row) for row in self.conn.execute(query, params)]
+
+    def _fetch_tuples(self, query: str, params) -> List[Tuple]:
+        cursor = self.conn.cursor()
+        cursor.row_factory = None
+        return cursor.execute(query, params).fetchall()
+
+    # ------------------------------------------------------------------
+    # Columnar reads (backtests replay whole time ranges; plain tuples,
+    # timestamps as Unix seconds)
+    # ------------------------------------------------------------------
+
+    def kalshi_price_rows(self, sport: str, start: str, end: str) -> List[Tuple]:
+        """(ticker, observed_at, yes_ask) of every Kalshi row with start <= observed_at <= end."""
+        return self._fetch_tuples(
+            f"SELECT ticker, {UNIX_TIME.format('observed_at')}, yes_ask FROM kalshi_markets "
+            "WHERE sport = ? AND observed_at BETWEEN ? AND ? ORDER BY observed_at, id",
+            (sport, start, end),
+        )
+
+    def odds_price_rows(self, sport: str, start: str, end: str) -> List[Tuple]:
+        """(game, bookmaker, observed_at, team, price) of every priced odds row with start <= observed_at <= end."""
+        return self._fetch_tuples(
+            f"SELECT game, bookmaker, {UNIX_TIME.format('observed_at')}, team, price FROM odds_prices "
+            "WHERE sport = ? AND observed_at BETWEEN ? AND ? AND bookmaker != '' AND price IS NOT NULL "
+            "ORDER BY observed_at, id",
+            (sport, start, end),
+        )
+
+    def kalshi_markets_seen(self, sport: str, start: str, end: str) -> List[Dict]:
+        """Latest row of every Kalshi market observed with start <= observed_at <= end."""
+        return self._fetch(
+            "SELECT ticker, event_ticker, title, yes_sub_title, expiration_time, MAX(observed_at) AS observed_at "
+            "FROM kalshi_markets WHERE sport = ? AND observed_at BETWEEN ? AND ? GROUP BY ticker",
+            (sport, start, end),
+        )
+
+    def odds_games_seen(self, sport: str, start: str, end: str) -> List[Dict]:
+        """Latest row of every odds game observed with start <= observed_at <= end."""
+        return self._fetch(
+            "SELECT game, away_team, home_team, commence_time, MAX(observed_at) AS observed_at "
+            "FROM odds_prices WHERE sport = ? AND observed_at BETWEEN ? AND ? GROUP BY game",
+            (sport, start, end),
+        )
+
+    # ------------------------------------------------------------------
+    # File-format views (so the JSON files can be optional)
+    # ------------------------------------------------------------------
+
+    def latest_kalshi_data(self, sport: str) -> Optional[Dict]:
+        """
+        Latest Kalshi markets in the kalshi_<sport>_winner_markets.json layout,
+        or None if nothing has been stored for the sport.
+        """
+        rows = self.latest_kalshi_markets(sport)
+        if not rows:
+            return None
+        markets = []
+        for row in rows:
+            market_data = {field: row[field] for field in KALSHI_MARKET_FIELDS}
+            market_data["ticker"] = row["ticker"]
+            market_data["event_ticker"] = row["event_ticker"]
+            markets.append({
+                "expiration_time": row["expiration_time"],
+                "ticker": row["ticker"],
+                "title": row["title"],
+                "event_ticker": row["event_ticker"],
+                "observed_at": row["observed_at"],
+                "market_data": market_data,
+            })
+        return {
+            "source": "kalshi",
+            "sport": sport,
+            "query_time": max(row["observed_at"] for row in rows),
+            "total_markets_found": len(markets),
+            "markets": markets,
+        }
+
+    def latest_odds_data(self, sport: str) -> Optional[Dict]:
+        """
+        Latest sportsbook odds in the the_odds_api_<sport>_moneyline_odds.json layout,
+        or None if nothing has been stored for the sport.
+        """
+        rows = self.latest_odds(sport)
+        if not rows:
+            return None
+        games = {}
+        for row in rows:
+            game = games.get(row["game"])
+            if game is None:
+                game = games[row["game"]] = {
+                    "id": row["game"],
+                    "sport_key": row["sport_key"],
+                    "commence_time": row["commence_time"],
+                    "home_team": row["home_team"],
+                    "away_team": row["away_team"],
+                    "observed_at": row["observed_at"],
+                    "bookmakers": {},
+                }
+            # Bookmakers can come from different polls; the game is as old as its oldest price
+            game["observed_at"] = min(game["observed_at"], row["observed_at"])
+            if not row["bookmaker"]:
+                continue
+            bookmaker = game["bookmakers"].get(row["bookmaker"])
+            if bookmaker is None:
+                bookmaker = game["bookmakers"][row["bookmaker"]] = {
+                    "key": row["bookmaker"],
+                    "title": row["bookmaker_title"],
+                    "last_update": row["last_update"],
+                    "markets": [{"key": "h2h", "last_update": row["last_update"], "outcomes": []}],
+                }
+            bookmaker["markets"][0]["outcomes"].append({"name": row["team"], "price": row["price"]})
+        for game in games.values():
+            game["bookmakers"] = list(game["bookmakers"].values())
+        return {
+            "source": "the_odds_api",
+            "sport": sport,
+            "query_time": max(row["observed_at"] for row in rows),
+            "total_games": len(games),
+            "games": [{"odds_data": game} for game in games.values()],
+        }
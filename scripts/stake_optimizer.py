@@ -0,0 +1,307 @@
+"""
+Portfolio stake optimizer (fractional Kelly with exposure caps).
+
+analyze_game prices every opportunity at a flat $100. This sizes all
+simultaneous opportunities (across sports) together, in whole Kalshi
+contracts, maximizing expected log growth of the bankroll:
+
+    growth = sum over games of  sum_o p_o * log(1 + pnl_o / (KELLY_FRACTION * bankroll))
+
+p_o are the devigged consensus probabilities of the game's two outcomes
+and pnl_o the P&L of every bet on that game in outcome o, with fee-adjusted
+payouts (a winning contract pays $1 less KALSHI_FEE_PERCENT). Dividing by
+a fraction of the bankroll makes the unconstrained optimum exactly that
+fraction of full Kelly. Games are treated as independent, which keeps the
+objective separable per game.
+
+Subject to, in dollars of cost:
+    - total exposure   <= MAX_TOTAL_EXPOSURE * bankroll
+    - per sport        <= MAX_SPORT_EXPOSURE * bankroll
+    - per event        <= MAX_EVENT_EXPOSURE * bankroll
+    - per market       contracts offered at or below the quoted ask (the
+                       orderbook with --orderbook, else LIQUIDITY_DEPTH_SHARE
+                       of the market's liquidity; no limit if neither is known)
+
+These caps nest (market in event in sport in total), so the feasible set is
+a polymatroid, and for a separable concave objective greedy marginal
+allocation is optimal: repeatedly buy the lot with the highest growth per
+dollar that still fits every cap. Each lot is about STEP_SHARE of the
+bankroll, so sizing hundreds of positions takes milliseconds.
+
+Each sized opportunity gains:
+    contracts, stake       size in contracts and dollars (0 = not worth a lot)
+    kelly_growth           its share of the expected log growth per slate,
+                           on the full bankroll
+    stake_limit            the cap that stopped it ("depth", "event",
+                           "sport", "total"), or None when Kelly did
+
+    python scripts/stake_optimizer.py [SPORT ...] --bankroll DOLLARS [--orderbook] [--write]
+"""
+import heapq
+import math
+import os
+import sys
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List, Optional, Tuple
+
+import fetch_kalshi_sports
+from json_io import load_json, write_json
+from opportunity_ledger import get_bet_price, opportunity_key
+
+# Get the project root directory (parent of scripts folder)
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+DATA_DIR = os.path.join(PROJECT_ROOT, "data")
+
+DEFAULT_BANKROLL = 10_000.0
+KELLY_FRACTION = 0.25
+KALSHI_FEE_PERCENT = 1.0
+
+# Exposure caps, as shares of the bankroll
+MAX_TOTAL_EXPOSURE = 0.5
+MAX_SPORT_EXPOSURE = 0.25
+MAX_EVENT_EXPOSURE = 0.05
+
+# Without an orderbook, assume this share of a market's liquidity is available at the ask
+LIQUIDITY_DEPTH_SHARE = 0.05
+
+# Greedy lot size, as a share of the bankroll (at least one contract)
+STEP_SHARE = 0.0001
+
+ORDERBOOK_WORKERS = 8
+
+def ask_depth(orderbook: Dict, max_price: float) -> int:
+    """Contracts of YES offered at or below max_price cents (from the NO bids)."""
+    return sum(int(quantity) for price, quantity in orderbook.get("no", []) if 100 - price <= max_price)
+
+def fetch_depths(opportunities: List[Dict]) -> Dict[str, Optional[int]]:
+    """Orderbook depth at the quoted ask of each opportunity's market, keyed by ticker."""
+    def depth(opp: Dict) -> Tuple[str, Optional[int]]:
+        ticker = opp.get(f"{opp['bet_team']}_kalshi_ticker")
+        try:
+            return ticker, ask_depth(fetch_kalshi_sports.fetch_orderbook(ticker), get_bet_price(opp))
+        except Exception as e:
+            print(f"Warning: could not fetch the orderbook of {ticker}: {e}")
+            return ticker, None
+
+    with_ticker = [opp for opp in opportunities if opp.get(f"{opp['bet_team']}_kalshi_ticker")]
+    with ThreadPoolExecutor(max_workers=ORDERBOOK_WORKERS) as executor:
+        return dict(executor.map(depth, with_ticker))
+
+def depth_limit(opp: Dict, depths: Optional[Dict[str, Optional[int]]] = None) -> Optional[int]:
+    """Contracts that can be bought at the quoted ask, or None if unknown."""
+    bet = opp["bet_team"]
+    if depths is not None:
+        depth = depths.get(opp.get(f"{bet}_kalshi_ticker"))
+        if depth is not None:
+            return depth
+    liquidity = opp.get(f"{bet}_kalshi_liquidity")
+    price = get_bet_price(opp)
+    if liquidity is None or not price:
+        return None
+    return int(liquidity / 100 * LIQUIDITY_DEPTH_SHARE / (price / 100))
+
+class _Game:
+    """One game's outcome probabilities and the P&L of its bets per outcome."""
+
+    def __init__(self, away_prob: float):
+        self.probs = (away_prob, 1 - away_prob)
+        self.pnl = [0.0, 0.0]
+
+    def growth(self, scale: float, extra: Tuple[float, float] = (0.0, 0.0)) -> float:
+        total = 0.0
+        for p, pnl, add in zip(self.probs, self.pnl, extra):
+            wealth = 1 + (pnl + add) / scale
+            if wealth <= 0:
+                return -math.inf
+            total += p * math.log(wealth)
+        return total
+
+def optimize_stakes(positions: List[Tuple[str, Dict]], bankroll: float = DEFAULT_BANKROLL,
+                    kelly_fraction: float = KELLY_FRACTION, max_total: float = MAX_TOTAL_EXPOSURE,
+                    max_sport: float = MAX_SPORT_EXPOSURE, max_event: float = MAX_EVENT_EXPOSURE,
+                    depths: Optional[Dict[str, Optional[int]]] = None,
+                    fee_percent: float = KALSHI_FEE_PERCENT) -> Dict:
+    """
+    Size (sport, opportunity) pairs in place (see the module docstring).
+    Returns a summary: bankroll, total stake, expected growth and profit.
+    """
+    scale = kelly_fraction * bankroll
+    payout = 1 - fee_percent / 100
+    games: Dict[str, _Game] = {}
+    bets = []
+    for sport, opp in positions:
+        price = (get_bet_price(opp) or 0) / 100
+        game = games.get(opp["event_ticker"])
+        if game is None:
+            game = games[opp["event_ticker"]] = _Game(opp["away_prob_normalized"] / 100)
+        outcome = 0 if opp["bet_team"] == "away" else 1
+        # Per-contract P&L in each outcome (away wins, home wins)
+        per_contract = [-price, -price]
+        per_contract[outcome] = payout - price
+        step = max(1, int(STEP_SHARE * bankroll / price)) if price > 0 else 0
+        bets.append({"sport": sport, "opp": opp, "game": game, "price": price, "step": step,
+                     "per_contract": per_contract, "contracts": 0, "depth": depth_limit(opp, depths),
+                     "limit": None})
+
+    room = {"total": max_total * bankroll}
+    for bet in bets:
+        room.setdefault(("sport", bet["sport"]), max_sport * bankroll)
+        room.setdefault(("event", bet["opp"]["event_ticker"]), max_event * bankroll)
+
+    def marginal(bet: Dict, contracts: int) -> float:
+        """Growth per dollar of buying `contracts` more of a bet."""
+        extra = (bet["per_contract"][0] * contracts, bet["per_contract"][1] * contracts)
+        gain = bet["game"].growth(scale, extra) - bet["game"].growth(scale)
+        return gain / (contracts * bet["price"])
+
+    def lot(bet: Dict) -> Tuple[int, Optional[str]]:
+        """Contracts in the next lot (fewer at a cap), and the cap that binds."""
+        caps = [("depth", (bet["depth"] - bet["contracts"]) if bet["depth"] is not None else None),
+                ("total", room["total"] / bet["price"]),
+                ("sport", room[("sport", bet["sport"])] / bet["price"]),
+                ("event", room[("event", bet["opp"]["event_ticker"])] / bet["price"])]
+        contracts, limit = bet["step"], None
+        for name, cap in caps:
+            if cap is not None and int(cap) < contracts:
+                contracts, limit = int(cap), name
+        return contracts, limit
+
+    # Max-heap of (growth per dollar of the next lot); a game's entries are
+    # re-evaluated when popped, since another bet on it changes their gain
+    heap = []
+    for i, bet in enumerate(bets):
+        if bet["step"] > 0:
+            gain = marginal(bet, bet["step"])
+            if gain > 0:
+                heap.append((-gain, i))
+    heapq.heapify(heap)
+    while heap:
+        neg_gain, i = heapq.heappop(heap)
+        bet = bets[i]
+        contracts, limit = lot(bet)
+        if contracts <= 0:
+            bet["limit"] = limit
+            continue
+        gain = marginal(bet, contracts)
+        if gain <= 0:
+            continue
+        if heap and gain < -heap[0][0]:
+            # Stale (the game's P&L or the lot changed): re-queue at its current gain
+            heapq.heappush(heap, (-gain, i))
+            continue
+        bet["contracts"] += contracts
+        for k in (0, 1):
+            bet["game"].pnl[k] += bet["per_contract"][k] * contracts
+        cost = contracts * bet["price"]
+        for key in ("total", ("sport", bet["sport"]), ("event", bet["opp"]["event_ticker"])):
+            room[key] -= cost
+        if limit is not None:
+            bet["limit"] = limit
+            continue
+        next_gain = marginal(bet, bet["step"])
+        if next_gain > 0:
+            heapq.heappush(heap, (-next_gain, i))
+
+    # Growth on the full bankroll, each game's split across its bets by stake
+    total_growth = 0.0
+    expected_profit = 0.0
+    for game in games.values():
+        game.actual_growth = game.growth(bankroll)
+        game.stake = 0.0
+        total_growth += game.actual_growth
+    for bet in bets:
+        bet["game"].stake += bet["contracts"] * bet["price"]
+    for bet in bets:
+        opp, game = bet["opp"], bet["game"]
+        stake = bet["contracts"] * bet["price"]
+        opp["contracts"] = bet["contracts"]
+        opp["stake"] = round(stake, 2)
+        opp["kelly_growth"] = round(game.actual_growth * stake / game.stake, 8) if game.stake else 0.0
+        opp["stake_limit"] = bet["limit"] if bet["contracts"] else None
+        expected_profit += sum(p * c * bet["contracts"] for p, c in zip(game.probs, bet["per_contract"]))
+    return {
+        "bankroll": bankroll,
+        "kelly_fraction": kelly_fraction,
+        "positions": sum(1 for bet in bets if bet["contracts"]),
+        "total_stake": round(sum(bet["contracts"] * bet["price"] for bet in bets), 2),
+        "expected_growth": total_growth,
+        "expected_profit": round(expected_profit, 2),
+    }
+
+def format_summary(summary: Dict) -> str:
+    return (f"Kelly sizing ({summary['kelly_fraction']:g}x, bankroll ${summary['bankroll']:,.2f}): "
+            f"{summary['positions']} positions, ${summary['total_stake']:,.2f} staked, "
+            f"expected profit ${summary['expected_profit']:,.2f}, "
+            f"growth {summary['expected_growth'] * 10_000:.1f} bp per slate")
+
+def write_stakes(sport: str, opportunities: List[Dict]):
+    """Rewrite a sport's odds_comparison file with the sized opportunities."""
+    path = os.path.join(DATA_DIR, f"odds_comparison_{sport}.json")
+    if not os.path.exists(path):
+        return
+    data = load_json(path, use_cache=False)
+    sized = {opportunity_key(opp): opp for opp in opportunities}
+    for opp in data.get("opportunities", []):
+        update = sized.get(opportunity_key(opp))
+        if update:
+            for key in ("contracts", "stake", "kelly_growth", "stake_limit"):
+                opp[key] = update[key]
+    write_json(path, data)
+
+def main():
+    """
+    Command line arguments:
+        [SPORT ...] - Sports to size together (default: every odds_comparison file)
+        --bankroll DOLLARS - Bankroll (default 10000)
+        --kelly-fraction F - Fraction of full Kelly (default 0.25)
+        --max-total / --max-sport / --max-event SHARE - Exposure caps as shares of the bankroll
+        --orderbook - Fetch each market's orderbook for the depth limit
+        --write - Write the stakes into the odds_comparison files
+    """
+    use_orderbook = "--orderbook" in sys.argv
+    if use_orderbook:
+        sys.argv.remove("--orderbook")
+    write = "--write" in sys.argv
+    if write:
+        sys.argv.remove("--write")
+    options = {"--bankroll": DEFAULT_BANKROLL, "--kelly-fraction": KELLY_FRACTION,
+               "--max-total": MAX_TOTAL_EXPOSURE, "--max-sport": MAX_SPORT_EXPOSURE,
+               "--max-event": MAX_EVENT_EXPOSURE}
+    for flag in list(options):
+        if flag in sys.argv:
+            idx = sys.argv.index(flag)
+            try:
+                options[flag] = float(sys.argv[idx + 1])
+            except (IndexError, ValueError):
+                print(f"Error: {flag} requires a number")
+                sys.exit(1)
+            del sys.argv[idx:idx + 2]
+
+    sports = [arg.lower() for arg in sys.argv[1:]]
+    if not sports:
+        sports = sorted(name[len("odds_comparison_"):-len(".json")] for name in os.listdir(DATA_DIR)
+                        if name.startswith("odds_comparison_") and name.endswith(".json"))
+    positions = []
+    for sport in sports:
+        path = os.path.join(DATA_DIR, f"odds_comparison_{sport}.json")
+        if os.path.exists(path):
+            positions.extend((sport, opp) for opp in load_json(path).get("opportunities", []))
+    if not positions:
+        print("No opportunities to size")
+        return
+
+    depths = fetch_depths([opp for _, opp in positions]) if use_orderbook else None
+    summary = optimize_stakes(positions, options["--bankroll"], options["--kelly-fraction"],
+                              options["--max-total"], options["--max-sport"], options["--max-event"], depths)
+    print(format_summary(summary))
+    for sport, opp in sorted(positions, key=lambda pair: -pair[1]["stake"]):
+        limit = f"  ({opp['stake_limit']} cap)" if opp["stake_limit"] else ""
+        print(f"  {sport.upper():<7} {opp['bet_team_name'][:32]:<32} {opp['contracts']:>6} @ {get_bet_price(opp):.0f}c "
+              f"${opp['stake']:>9,.2f}  EV/$100 {opp['expected_value']:>6.2f}  "
+              f"growth {opp['kelly_growth'] * 10_000:>6.2f} bp{limit}")
+    if write:
+        for sport in sports:
+            write_stakes(sport, [opp for s, opp in positions if s == sport])
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,265 @@
+"""
+Synthetic slates for benchmarking (see benchmark.py).
+
+Generates Kalshi winner markets and The Odds API games for a college-sized
+slate in the exact formats the fetchers write:
+
+    kalshi_<sport>_winner_markets.json       (fetch_kalshi_sports.fetch_sport)
+    the_odds_api_<sport>_moneyline_odds.json (fetch_odds_api_sports.fetch_sport)
+
+plus the raw Odds API response list that fetch_odds_api_sports matches
+against. Team names carry the same noise as real college data: Kalshi uses
+short school names ("Kansas St.", "St. Mary's"), the sportsbooks append
+mascots ("Kansas State Wildcats", "Saint Mary's Gaels"), and school names
+repeat across dates once the slate is bigger than the name pool.
+
+    python scripts/synthetic_slate.py OUT_DIR [--markets N] [--bookmakers N] [--seed N]
+"""
+import hashlib
+import os
+import random
+import sys
+from datetime import datetime, timedelta, timezone
+from typing import Dict, List, Tuple
+
+from json_io import write_json
+
+SPORT_SERIES = {
+    "ncaab": ("KXNCAAMBGAME", "basketball_ncaab", "NCAAB"),
+    "ncaabw": ("KXNCAAWBGAME", "basketball_wncaab", "NCAABW"),
+    "ncaaf": ("KXNCAAFGAME", "americanfootball_ncaaf", "NCAAF"),
+}
+
+PLACES = [
+    "Alabama", "Arizona", "Arkansas", "Auburn", "Baylor", "Boise", "Boston", "Bowling Green",
+    "Butler", "California", "Charleston", "Cincinnati", "Clemson", "Colorado", "Connecticut",
+    "Creighton", "Dayton", "Delaware", "Denver", "DePaul", "Drake", "Duke", "Duquesne", "Florida",
+    "Fordham", "Fresno", "Georgetown", "Georgia", "Gonzaga", "Hawaii", "Houston", "Idaho",
+    "Illinois", "Indiana", "Iowa", "Kansas", "Kent", "Kentucky", "Lehigh", "Louisville", "Marquette",
+    "Maryland", "Memphis", "Miami", "Michigan", "Minnesota", "Mississippi", "Missouri", "Montana",
+    "Nebraska", "Nevada", "New Mexico", "North Carolina", "North Dakota", "Ohio", "Oklahoma", "Oregon",
+    "Penn", "Pittsburgh", "Portland", "Providence", "Purdue", "Richmond", "Rutgers", "San Diego",
+    "San Jose", "Seattle", "Seton Hall", "South Carolina", "South Dakota", "Stanford", "Syracuse",
+    "Temple", "Tennessee", "Texas", "Toledo", "Tulsa", "Utah", "Vanderbilt", "Vermont", "Villanova",
+    "Virginia", "Wake Forest", "Washington", "Wichita", "Wisconsin", "Wyoming", "Xavier", "Youngstown",
+]
+# (Kalshi form, sportsbook form)
+QUALIFIERS = [("", ""), (" St.", " State"), (" Tech", " Tech"), (" A&M", " A&M"), (" Christian", " Christian")]
+PREFIXES = [("", ""), ("North ", "North "), ("South ", "South "), ("East ", "East "), ("West ", "West "),
+            ("Central ", "Central "), ("St. ", "Saint ")]
+MASCOTS = [
+    "Aggies", "Bears", "Bearcats", "Bobcats", "Broncos", "Bulldogs", "Cardinals", "Cougars", "Cowboys",
+    "Eagles", "Falcons", "Gaels", "Golden Eagles", "Grizzlies", "Hawks", "Hornets", "Huskies", "Lions",
+    "Mustangs", "Owls", "Panthers", "Pirates", "Rams", "Red Storm", "Seahawks", "Spartans", "Tigers",
+    "Wildcats", "Wolfpack", "Zips",
+]
+
+BOOKMAKERS = [
+    ("draftkings", "DraftKings"), ("fanduel", "FanDuel"), ("betmgm", "BetMGM"),
+    ("williamhill_us", "Caesars"), ("betrivers", "BetRivers"), ("bovada", "Bovada"),
+    ("betonlineag", "BetOnline.ag"), ("lowvig", "LowVig.ag"), ("mybookieag", "MyBookie.ag"),
+    ("fanatics", "Fanatics"), ("espnbet", "ESPN BET"), ("ballybet", "Bally Bet"),
+]
+
+def team_pool(rng: random.Random) -> List[Tuple[str, str, str]]:
+    """Every (kalshi_name, sportsbook_name, abbreviation) the generator can use, shuffled."""
+    pool = []
+    for place in PLACES:
+        for kalshi_prefix, book_prefix in PREFIXES:
+            for kalshi_qualifier, book_qualifier in QUALIFIERS:
+                kalshi_name = f"{kalshi_prefix}{place}{kalshi_qualifier}"
+                book_name = f"{book_prefix}{place}{book_qualifier} {rng.choice(MASCOTS)}"
+                abbreviation = "".join(word[0] for word in kalshi_name.replace(".", "").split()).upper()
+                pool.append((kalshi_name, book_name, (abbreviation + place[:3].upper())[:6]))
+    rng.shuffle(pool)
+    return pool
+
+def american_odds(probability: float) -> int:
+    probability = min(max(probability, 0.02), 0.98)
+    if probability >= 0.5:
+        return -int(round(100 * probability / (1 - probability)))
+    return int(round(100 * (1 - probability) / probability))
+
+def generate_slate(sport: str = "ncaab", markets: int = 1000, bookmakers: int = 6, seed: int = 0,
+                   unmatched_fraction: float = 0.2, extra_odds_fraction: float = 0.5,
+                   now: datetime = None) -> Tuple[Dict, Dict, List[Dict]]:
+    """
+    Build a slate of markets // 2 games.
+
+    unmatched_fraction of the Kalshi games get no sportsbook game, and
+    extra_odds_fraction (relative to the Kalshi games) sportsbook-only games
+    are added, like the real feeds.
+
+    Returns:
+        (kalshi_data, odds_file_data, raw_odds_games)
+    """
+    rng = random.Random(seed)
+    series_ticker, odds_sport_key, sport_title = SPORT_SERIES[sport]
+    now = now or datetime.now(timezone.utc)
+    query_time = now.isoformat()
+    pool = team_pool(rng)
+    book_list = BOOKMAKERS[:max(1, min(bookmakers, len(BOOKMAKERS)))]
+
+    kalshi_markets = []
+    odds_entries = []
+    raw_odds = []
+
+    def odds_game(away_book: str, home_book: str, commence: datetime, away_probability: float) -> Dict:
+        books = []
+        for key, title in book_list:
+            # Each book shades the consensus a little and adds ~4.5% vig
+            shaded = away_probability + rng.gauss(0, 0.015)
+            books.append({
+                "key": key,
+                "title": title,
+                "last_update": query_time.replace("+00:00", "Z"),
+                "markets": [{
+                    "key": "h2h",
+                    "last_update": query_time.replace("+00:00", "Z"),
+                    "outcomes": [
+                        {"name": home_book, "price": american_odds(1 - shaded + 0.0225)},
+                        {"name": away_book, "price": american_odds(shaded + 0.0225)},
+                    ],
+                }],
+            })
+        game_id = hashlib.md5(f"{seed}:{away_book}:{home_book}:{commence.isoformat()}".encode()).hexdigest()
+        return {
+            "id": game_id,
+            "sport_key": odds_sport_key,
+            "sport_title": sport_title,
+            "commence_time": commence.strftime("%Y-%m-%dT%H:%M:%SZ"),
+            "home_team": home_book,
+            "away_team": away_book,
+            "bookmakers": books,
+            "observed_at": query_time,
+        }
+
+    games = max(1, markets // 2)
+    for index in range(games):
+        away = pool[(2 * index) % len(pool)]
+        home = pool[(2 * index + 1) % len(pool)]
+        commence = now + timedelta(hours=2 + (index * 7 * 24) / games, minutes=rng.choice((0, 30)))
+        expiration = commence + timedelta(hours=2, minutes=30)
+        date_code = commence.strftime("%y%b%d").upper()
+        event_ticker = f"{series_ticker}-{date_code}{away[2]}{home[2]}{index:05d}"
+        title = f"{away[0]} at {home[0]} Winner?"
+        away_probability = min(max(rng.betavariate(4, 4), 0.05), 0.95)
+
+        for team, probability in ((away, away_probability), (home, 1 - away_probability)):
+            # Kalshi asks sit around fair value, sometimes a few cents under
+            ask = int(min(99, max(1, round(probability * 100 + rng.gauss(1.5, 3)))))
+            kalshi_markets.append({
+                "expiration_time": expiration.isoformat(),
+                "ticker": f"{event_ticker}-{team[2]}",
+                "title": title,
+                "event_ticker": event_ticker,
+                "observed_at": query_time,
+                "market_data": {
+                    "ticker": f"{event_ticker}-{team[2]}",
+                    "event_ticker": event_ticker,
+                    "title": title,
+                    "yes_sub_title": team[0],
+                    "no_sub_title": team[0],
+                    "yes_bid": max(0, ask - rng.randint(1, 3)),
+                    "yes_ask": ask,
+                    "no_bid": max(0, 100 - ask - rng.randint(0, 2)),
+                    "no_ask": min(100, 100 - ask + rng.randint(1, 3)),
+                    "last_price": ask,
+                    "liquidity": rng.randint(0, 500_000_000),
+                    "volume": rng.randint(0, 2_000_000),
+                    "volume_24h": rng.randint(0, 500_000),
+                    "open_interest": rng.randint(0, 1_500_000),
+                    "status": "active",
+                    "result": "",
+                    "open_time": (now - timedelta(days=2)).strftime("%Y-%m-%dT%H:%M:%SZ"),
+                    "close_time": (expiration + timedelta(days=14)).strftime("%Y-%m-%dT%H:%M:%SZ"),
+                    "expected_expiration_time": expiration.strftime("%Y-%m-%dT%H:%M:%SZ"),
+                    "expiration_time": (expiration + timedelta(days=14)).strftime("%Y-%m-%dT%H:%M:%SZ"),
+                },
+            })
+
+        kalshi_game = {
+            "away_team": away[0],
+            "home_team": home[0],
+            "kalshi_title": title,
+            "event_ticker": event_ticker,
+            "expiration_time": expiration.isoformat(),
+        }
+        if rng.random() < unmatched_fraction:
+            odds_entries.append({"kalshi_data": kalshi_game, "odds_data": None, "matched": False})
+            continue
+        game = odds_game(away[1], home[1], commence, away_probability)
+        raw_odds.append(game)
+        odds_entries.append({"kalshi_data": kalshi_game, "odds_data": game, "matched": True})
+
+    # Sportsbook-only games (no Kalshi market)
+    for index in range(int(games * extra_odds_fraction)):
+        away = pool[rng.randrange(len(pool))]
+        home = pool[rng.randrange(len(pool))]
+        commence = now + timedelta(hours=1 + rng.random() * 48)
+        raw_odds.append(odds_game(away[1], home[1], commence, rng.uniform(0.2, 0.8)))
+    rng.shuffle(raw_odds)
+
+    kalshi_data = {
+        "source": "kalshi",
+        "content_type": f"{sport}_winner_markets",
+        "sport": sport,
+        "query_time": query_time,
+        "query_window_end": (now + timedelta(days=7)).isoformat(),
+        "total_markets_found": len(kalshi_markets),
+        "markets": kalshi_markets,
+    }
+    odds_data = {
+        "source": "the_odds_api",
+        "content_type": f"{sport}_moneyline_odds",
+        "sport": sport,
+        "query_time": query_time,
+        "kalshi_query_window_end": kalshi_markets[0]["expiration_time"] if kalshi_markets else None,
+        "total_games": len(odds_entries),
+        "matched_games": sum(1 for entry in odds_entries if entry["matched"]),
+        "games": odds_entries,
+    }
+    return kalshi_data, odds_data, raw_odds
+
+def write_slate(out_dir: str, sport: str, kalshi_data: Dict, odds_data: Dict) -> Tuple[str, str]:
+    """Write a slate under the file names the pipeline reads; returns the two paths."""
+    os.makedirs(out_dir, exist_ok=True)
+    kalshi_file = os.path.join(out_dir, f"kalshi_{sport}_winner_markets.json")
+    odds_file = os.path.join(out_dir, f"the_odds_api_{sport}_moneyline_odds.json")
+    write_json(kalshi_file, kalshi_data)
+    write_json(odds_file, odds_data)
+    return kalshi_file, odds_file
+
+def main():
+    """
+    Command line arguments:
+        OUT_DIR - Directory to write the two data files to
+        --sport SPORT - ncaab (default), ncaabw or ncaaf
+        --markets N - Kalshi markets (two per game, default 1000)
+        --bookmakers N - Bookmakers per sportsbook game (default 6)
+        --seed N - Random seed (default 0)
+    """
+    options = {"--sport": "ncaab", "--markets": "1000", "--bookmakers": "6", "--seed": "0"}
+    for flag in list(options):
+        if flag in sys.argv:
+            idx = sys.argv.index(flag)
+            if idx + 1 >= len(sys.argv):
+                print(f"Error: {flag} requires a value")
+                sys.exit(1)
+            options[flag] = sys.argv[idx + 1]
+            del sys.argv[idx:idx + 2]
+    if len(sys.argv) != 2:
+        print("Usage: python synthetic_slate.py OUT_DIR [--sport S] [--markets N] [--bookmakers N] [--seed N]")
+        sys.exit(1)
+    sport = options["--sport"]
+    if sport not in SPORT_SERIES:
+        print(f"Error: Unsupported sport '{sport}' (supported: {', '.join(SPORT_SERIES)})")
+        sys.exit(1)
+
+    kalshi_data, odds_data, _ = generate_slate(sport, int(options["--markets"]), int(options["--bookmakers"]),
+                                               int(options["--seed"]))
+    for path in write_slate(sys.argv[1], sport, kalshi_data, odds_data):
+        print(f"Wrote {path}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,166 @@
+"""
+Lightweight stage timing.
+
+    with tracing.span("odds_api.fetch", sport="nba"):
+        ...
+
+Spans are no-ops until enable() is called (compare_odds.py / refresh_all_data.py
+--profile), so instrumented code pays one flag check when tracing is off.
+When on, each span adds its wall time to a per-(stage, sport) aggregate;
+nested spans inherit the sport of the enclosing span, per thread.
+report() prints the aggregates.
+
+capture() additionally runs cProfile and/or tracemalloc around a block and
+writes their reports under data/profiles/.
+
+Spans recorded inside --parallel worker processes are not collected.
+"""
+import contextlib
+import contextvars
+import cProfile
+import io
+import os
+import pstats
+import sys
+import threading
+import time
+import tracemalloc
+from datetime import datetime
+from typing import Dict, Optional, Tuple
+
+# Get the project root directory (parent of scripts folder)
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+PROFILE_DIR = os.path.join(PROJECT_ROOT, "data", "profiles")
+
+# Rows shown in the cProfile / tracemalloc reports
+REPORT_TOP_N = 40
+
+_enabled = False
+_lock = threading.Lock()
+# (stage, sport) -> [count, total_seconds, max_seconds]
+_stats: Dict[Tuple[str, Optional[str]], list] = {}
+_current_sport: contextvars.ContextVar = contextvars.ContextVar("tracing_sport", default=None)
+
+def enable():
+    global _enabled
+    _enabled = True
+
+def is_enabled() -> bool:
+    return _enabled
+
+def reset():
+    with _lock:
+        _stats.clear()
+
+class _Span:
+    __slots__ = ("name", "sport", "start", "token")
+
+    def __init__(self, name: str, sport: Optional[str]):
+        self.name = name
+        self.sport = sport
+
+    def __enter__(self):
+        if self.sport is None:
+            self.sport = _current_sport.get()
+            self.token = None
+        else:
+            self.token = _current_sport.set(self.sport)
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        elapsed = time.perf_counter() - self.start
+        if self.token is not None:
+            _current_sport.reset(self.token)
+        key = (self.name, self.sport)
+        with _lock:
+            entry = _stats.get(key)
+            if entry is None:
+                _stats[key] = [1, elapsed, elapsed]
+            else:
+                entry[0] += 1
+                entry[1] += elapsed
+                if elapsed > entry[2]:
+                    entry[2] = elapsed
+        return False
+
+_NULL_SPAN = contextlib.nullcontext()
+
+def span(name: str, sport: Optional[str] = None):
+    """Time a block as stage `name` (optionally tagged with a sport)."""
+    if not _enabled:
+        return _NULL_SPAN
+    return _Span(name, sport)
+
+def snapshot() -> Dict[Tuple[str, Optional[str]], Tuple[int, float, float]]:
+    """Copy of the aggregates: (stage, sport) -> (count, total_seconds, max_seconds)."""
+    with _lock:
+        return {key: tuple(value) for key, value in _stats.items()}
+
+def report() -> str:
+    """Per-stage and per-sport timing tables."""
+    stats = snapshot()
+    if not stats:
+        return "No spans recorded."
+
+    by_stage: Dict[str, list] = {}
+    for (stage, _), (count, total, longest) in stats.items():
+        entry = by_stage.setdefault(stage, [0, 0.0, 0.0])
+        entry[0] += count
+        entry[1] += total
+        entry[2] = max(entry[2], longest)
+
+    lines = ["Per stage:", f"  {'stage':<28} {'count':>7} {'total s':>9} {'mean ms':>9} {'max ms':>9}"]
+    for stage, (count, total, longest) in sorted(by_stage.items(), key=lambda x: -x[1][1]):
+        lines.append(f"  {stage:<28} {count:>7} {total:>9.3f} {total / count * 1000:>9.1f} {longest * 1000:>9.1f}")
+
+    sports = sorted({sport for _, sport in stats if sport})
+    if sports:
+        lines.append("")
+        lines.append("Per sport:")
+        for sport in sports:
+            lines.append(f"  {sport.upper()}")
+            rows = [(stage, value) for (stage, s), value in stats.items() if s == sport]
+            for stage, (count, total, longest) in sorted(rows, key=lambda x: -x[1][1]):
+                lines.append(f"    {stage:<26} {count:>7} {total:>9.3f} s")
+    return "\n".join(lines)
+
+@contextlib.contextmanager
+def capture(mode: str, label: str = "run", stream=None):
+    """
+    Run a block under cProfile ("cprofile"), tracemalloc ("tracemalloc") or
+    both ("both") and write the reports to data/profiles/<label>-<timestamp>.*.
+    The written paths are printed to stream (default stdout).
+    """
+    profiler = cProfile.Profile() if mode in ("cprofile", "both") else None
+    trace_memory = mode in ("tracemalloc", "both")
+    if trace_memory:
+        tracemalloc.start()
+    if profiler:
+        profiler.enable()
+    try:
+        yield
+    finally:
+        if profiler:
+            profiler.disable()
+        os.makedirs(PROFILE_DIR, exist_ok=True)
+        base = os.path.join(PROFILE_DIR, f"{label}-{datetime.now().strftime('%Y%m%d-%H%M%S')}")
+        written = []
+        if profiler:
+            profiler.dump_stats(base + ".prof")
+            text = io.StringIO()
+            pstats.Stats(profiler, stream=text).sort_stats("cumulative").print_stats(REPORT_TOP_N)
+            with open(base + ".cprofile.txt", "w", encoding="utf-8") as f:
+                f.write(text.getvalue())
+            written += [base + ".prof", base + ".cprofile.txt"]
+        if trace_memory:
+            memory_snapshot = tracemalloc.take_snapshot()
+            current, peak = tracemalloc.get_traced_memory()
+            tracemalloc.stop()
+            with open(base + ".tracemalloc.txt", "w", encoding="utf-8") as f:
+                f.write(f"current {current / 1024:.1f} KiB, peak {peak / 1024:.1f} KiB\n\n")
+                for stat in memory_snapshot.statistics("lineno")[:REPORT_TOP_N]:
+                    f.write(f"{stat}\n")
+            written.append(base + ".tracemalloc.txt")
+        for path in written:
+            print(f"Profile written to {path}", file=stream or sys.stdout)
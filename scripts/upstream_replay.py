@@ -0,0 +1,331 @@
+"""
+Record-and-replay stand-in for the Kalshi and Odds API upstreams.
+
+Recording: with recording started (refresh_all_data.py --record FILE), every
+successful Kalshi page fetched by get_page/get_paginated and every Odds API
+response from fetch_odds_api_sports is appended to FILE as one JSON line
+(the apiKey parameter is never written).
+
+Replay: serve a recording from a local HTTP server and point the fetchers at it
+
+    python scripts/upstream_replay.py serve FILE --latency 80 --jitter 40 --page-size 50
+    KALSHI_BASE_URL=http://127.0.0.1:8780/kalshi ODDS_API_BASE_URL=http://127.0.0.1:8780/odds \\
+        python scripts/refresh_all_data.py --profile
+
+Kalshi pages of one query are joined back into a single list when the fixture
+is loaded, so the server can re-paginate them at any page size (pagination
+depth). Odds API responses are filtered by eventIds, and the quota headers
+count down as they would upstream. Latency, jitter, rate-limit (429) and
+server-error (503) injection make fetch concurrency, caching and retry
+changes measurable without a network.
+"""
+import json
+import os
+import random
+import sys
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, List, Optional, Tuple
+from urllib.parse import parse_qsl, urlsplit
+
+DEFAULT_REPLAY_PORT = 8780
+DEFAULT_PAGE_SIZE = 200
+
+# URL prefix -> upstream name
+UPSTREAM_PREFIXES = {"/kalshi": "kalshi", "/odds": "odds_api"}
+
+# Item lists of the Kalshi endpoints the fetchers page through
+KALSHI_LIST_KEYS = ("markets", "events", "series")
+
+# Never recorded, and ignored when matching a request to a recording
+SECRET_PARAMS = ("apiKey",)
+QUOTA_HEADERS = ("x-requests-remaining", "x-requests-used")
+
+_recording = {"file": None}
+_recording_lock = threading.Lock()
+
+def start_recording(path: str):
+    """Append every upstream exchange to path until stop_recording()."""
+    directory = os.path.dirname(os.path.abspath(path))
+    os.makedirs(directory, exist_ok=True)
+    with _recording_lock:
+        if _recording["file"] is None:
+            _recording["file"] = open(path, "a", encoding="utf-8")
+
+def stop_recording():
+    with _recording_lock:
+        if _recording["file"] is not None:
+            _recording["file"].close()
+            _recording["file"] = None
+
+def is_recording() -> bool:
+    return _recording["file"] is not None
+
+def record_exchange(upstream: str, path: str, params: Dict, status: int, headers, body):
+    """Append one request/response pair to the recording (no-op when not recording)."""
+    if _recording["file"] is None:
+        return
+    line = json.dumps({
+        "upstream": upstream,
+        "path": path,
+        "params": {k: str(v) for k, v in params.items() if k not in SECRET_PARAMS},
+        "status": status,
+        "headers": {h: headers[h] for h in QUOTA_HEADERS if h in headers},
+        "body": body,
+    }, separators=(",", ":"))
+    with _recording_lock:
+        if _recording["file"] is not None:
+            _recording["file"].write(line + "\n")
+            _recording["file"].flush()
+
+def query_key(path: str, params: Dict, ignore: Tuple[str, ...] = ()) -> Tuple:
+    return (path, tuple(sorted((k, str(v)) for k, v in params.items()
+                               if k not in SECRET_PARAMS and k not in ignore)))
+
+def list_key(body: Dict) -> Optional[str]:
+    """The key of a Kalshi list response's item list ("markets", "events", "series")."""
+    for key in KALSHI_LIST_KEYS:
+        if isinstance(body.get(key), list):
+            return key
+    for key, value in body.items():
+        if isinstance(value, list):
+            return key
+    return None
+
+class Fixture:
+    """
+    A loaded recording, indexed for replay:
+        kalshi: query (without cursor/limit) -> (list key, all items, other body fields)
+        odds:   query (without eventIds) -> (games, quota headers)
+    """
+
+    def __init__(self, path: str):
+        self.kalshi: Dict[Tuple, Tuple[str, List, Dict]] = {}
+        self.odds: Dict[Tuple, Tuple[List, Dict]] = {}
+        runs: Dict[Tuple, Tuple[str, List, Dict]] = {}
+        with open(path, encoding="utf-8") as f:
+            for line in f:
+                if not line.strip():
+                    continue
+                exchange = json.loads(line)
+                if exchange.get("status") != 200:
+                    continue
+                params = exchange.get("params") or {}
+                body = exchange.get("body")
+                if exchange["upstream"] == "kalshi":
+                    key = query_key(exchange["path"], params, ignore=("cursor", "limit"))
+                    items_key = list_key(body)
+                    if items_key is None:
+                        continue
+                    # A page without a cursor starts a new pass over the query; keep the last one
+                    if not params.get("cursor") or key not in runs:
+                        extra = {k: v for k, v in body.items() if k not in (items_key, "cursor")}
+                        runs[key] = (items_key, [], extra)
+                    runs[key][1].extend(body[items_key])
+                else:
+                    key = query_key(exchange["path"], params, ignore=("eventIds",))
+                    games, _ = self.odds.get(key, ([], {}))
+                    if params.get("eventIds"):
+                        # Partial re-poll: update the games it returned
+                        by_id = {game.get("id"): game for game in games}
+                        by_id.update((game.get("id"), game) for game in body)
+                        games = list(by_id.values())
+                    else:
+                        games = body
+                    self.odds[key] = (games, exchange.get("headers") or {})
+        self.kalshi.update(runs)
+
+class ReplayState:
+    """Fixture plus the fault-injection settings and counters shared by handler threads."""
+
+    def __init__(self, fixture: Fixture, latency_ms: float = 0, jitter_ms: float = 0,
+                 page_size: Optional[int] = None, rate_limit_every: int = 0,
+                 error_rate: float = 0.0, seed: int = 0):
+        self.fixture = fixture
+        self.latency_ms = latency_ms
+        self.jitter_ms = jitter_ms
+        self.page_size = page_size
+        self.rate_limit_every = rate_limit_every
+        self.error_rate = error_rate
+        self.random = random.Random(seed)
+        self.lock = threading.Lock()
+        self.requests = 0
+        self.statuses: Dict[int, int] = {}
+        self.odds_used: Dict[Tuple, int] = {}
+
+    def next_request(self) -> Tuple[float, Optional[int]]:
+        """Delay in seconds and injected status (or None) for the next request."""
+        with self.lock:
+            self.requests += 1
+            delay = self.latency_ms + self.random.uniform(-self.jitter_ms, self.jitter_ms)
+            injected = None
+            if self.rate_limit_every and self.requests % self.rate_limit_every == 0:
+                injected = 429
+            elif self.error_rate and self.random.random() < self.error_rate:
+                injected = 503
+        return max(0.0, delay) / 1000, injected
+
+    def count(self, status: int):
+        with self.lock:
+            self.statuses[status] = self.statuses.get(status, 0) + 1
+
+    def kalshi_page(self, path: str, params: Dict) -> Optional[Dict]:
+        recorded = self.fixture.kalshi.get(query_key(path, params, ignore=("cursor", "limit")))
+        if recorded is None:
+            return None
+        items_key, items, extra = recorded
+        limit = self.page_size or int(params.get("limit") or DEFAULT_PAGE_SIZE)
+        offset = int(params.get("cursor") or 0)
+        end = offset + max(1, limit)
+        body = dict(extra)
+        body[items_key] = items[offset:end]
+        body["cursor"] = str(end) if end < len(items) else ""
+        return body
+
+    def odds_response(self, path: str, params: Dict) -> Optional[Tuple[List, Dict]]:
+        key = query_key(path, params, ignore=("eventIds",))
+        recorded = self.fixture.odds.get(key)
+        if recorded is None:
+            return None
+        games, headers = recorded
+        if params.get("eventIds"):
+            wanted = set(params["eventIds"].split(","))
+            games = [game for game in games if game.get("id") in wanted]
+
+        # Each replayed request costs one unit of the recorded quota
+        with self.lock:
+            self.odds_used[key] = self.odds_used.get(key, 0) + 1
+            used = self.odds_used[key]
+        quota = {}
+        if "x-requests-remaining" in headers:
+            quota["x-requests-remaining"] = str(max(0, int(float(headers["x-requests-remaining"])) - used))
+        if "x-requests-used" in headers:
+            quota["x-requests-used"] = str(int(float(headers["x-requests-used"])) + used)
+        return games, quota
+
+    def summary(self) -> str:
+        with self.lock:
+            statuses = ", ".join(f"{status}: {n}" for status, n in sorted(self.statuses.items()))
+            return f"{self.requests} requests ({statuses or 'none'})"
+
+class ReplayHandler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        state: ReplayState = self.server.replay
+        delay, injected = state.next_request()
+        if delay:
+            time.sleep(delay)
+
+        url = urlsplit(self.path)
+        params = dict(parse_qsl(url.query, keep_blank_values=True))
+        prefix = "/" + url.path.lstrip("/").split("/", 1)[0]
+        upstream = UPSTREAM_PREFIXES.get(prefix)
+        path = url.path[len(prefix):]
+
+        if injected == 429:
+            self.send_json(429, {"error": "rate limited (injected)"}, {"Retry-After": "1"})
+        elif injected:
+            self.send_json(injected, {"error": "server error (injected)"})
+        elif upstream == "kalshi":
+            body = state.kalshi_page(path, params)
+            if body is None:
+                self.send_json(404, {"error": f"no recording for {path}"})
+            else:
+                self.send_json(200, body)
+        elif upstream == "odds_api":
+            response = state.odds_response(path, params)
+            if response is None:
+                self.send_json(404, {"message": f"no recording for {path}"})
+            else:
+                games, quota = response
+                self.send_json(200, games, quota)
+        else:
+            self.send_json(404, {"error": "unknown upstream (use /kalshi/... or /odds/...)"})
+
+    def send_json(self, status: int, payload, headers: Optional[Dict] = None):
+        self.server.replay.count(status)
+        body = json.dumps(payload, separators=(",", ":")).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+def serve(state: ReplayState, port: int = DEFAULT_REPLAY_PORT, host: str = "127.0.0.1") -> ThreadingHTTPServer:
+    """Serve a fixture from a background thread; returns the server."""
+    server = ThreadingHTTPServer((host, port), ReplayHandler)
+    server.replay = state
+    thread = threading.Thread(target=server.serve_forever, name="upstream-replay", daemon=True)
+    thread.start()
+    return server
+
+def main():
+    """
+    Command line arguments:
+        serve FILE - Replay a recording
+        --host HOST - Interface to bind (default 127.0.0.1)
+        --port PORT - Port to listen on (default 8780)
+        --latency MS - Added to every response (default 0)
+        --jitter MS - Uniform +/- variation of the latency (default 0)
+        --page-size N - Kalshi items per page, overriding the request's limit
+        --rate-limit-every N - Answer every Nth request with 429
+        --error-rate P - Answer this fraction of requests with 503
+        --seed N - Seed for jitter and error injection (default 0)
+    """
+    options = {"--host": "127.0.0.1", "--port": str(DEFAULT_REPLAY_PORT), "--latency": "0",
+               "--jitter": "0", "--page-size": None, "--rate-limit-every": "0",
+               "--error-rate": "0", "--seed": "0"}
+    for flag in list(options):
+        if flag in sys.argv:
+            idx = sys.argv.index(flag)
+            if idx + 1 >= len(sys.argv):
+                print(f"Error: {flag} requires a value")
+                sys.exit(1)
+            options[flag] = sys.argv[idx + 1]
+            del sys.argv[idx:idx + 2]
+
+    if len(sys.argv) != 3 or sys.argv[1] != "serve":
+        print("Usage: python upstream_replay.py serve FILE [--port PORT] [--latency MS] [--jitter MS] "
+              "[--page-size N] [--rate-limit-every N] [--error-rate P] [--seed N]")
+        print("Record a fixture with: python refresh_all_data.py --record FILE")
+        sys.exit(1)
+
+    try:
+        state = ReplayState(
+            Fixture(sys.argv[2]),
+            latency_ms=float(options["--latency"]),
+            jitter_ms=float(options["--jitter"]),
+            page_size=int(options["--page-size"]) if options["--page-size"] else None,
+            rate_limit_every=int(options["--rate-limit-every"]),
+            error_rate=float(options["--error-rate"]),
+            seed=int(options["--seed"]),
+        )
+        port = int(options["--port"])
+    except ValueError as e:
+        print(f"Error: {e}")
+        sys.exit(1)
+    except OSError as e:
+        print(f"Error reading fixture: {e}")
+        sys.exit(1)
+
+    host = options["--host"]
+    server = serve(state, port, host)
+    print(f"Replaying {len(state.fixture.kalshi)} Kalshi queries and {len(state.fixture.odds)} Odds API queries")
+    print(f"  KALSHI_BASE_URL=http://{host}:{port}/kalshi")
+    print(f"  ODDS_API_BASE_URL=http://{host}:{port}/odds")
+    try:
+        while True:
+            time.sleep(1)
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.shutdown()
+        print(f"\nServed {state.summary()}")
+
+if __name__ == "__main__":
+    main()
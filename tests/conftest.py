@@ -0,0 +1,27 @@
+"""
+Shared setup: scripts/ on sys.path (the scripts import each other as
+top-level modules) and the stored data files in data/.
+
+The stored games have all commenced by now, so tests that match them
+treat every game as not yet started.
+"""
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "scripts"))
+
+import compare_odds  # noqa: E402
+
+# Sports with Kalshi and Odds API files in data/
+STORED_SPORTS = ("nba", "ncaab", "ncaaf", "nfl")
+
+@pytest.fixture
+def not_started(monkeypatch):
+    monkeypatch.setattr(compare_odds, "is_game_live", lambda commence_time: False)
+
+@pytest.fixture
+def matched_games(not_started):
+    """sport -> matched games from the stored data files."""
+    return {sport: compare_odds.load_and_match_games(sport)[0] for sport in STORED_SPORTS}
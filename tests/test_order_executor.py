@@ -0,0 +1,135 @@
+"""ExecutionEngine against an in-process MockExchange, with faults injected."""
+import asyncio
+
+import pytest
+
+import mock_exchange
+import order_executor
+
+EVENT = "KXNBAGAME-25DEC20DALPHI"
+AWAY = f"{EVENT}-DAL"
+HOME = f"{EVENT}-PHI"
+
+def opportunity(bet_team: str = "away", ask: int = 40) -> dict:
+    """An opportunity on AWAY (or HOME) at `ask` cents, fair at 60%."""
+    other = "home" if bet_team == "away" else "away"
+    return {
+        "event_ticker": EVENT,
+        "bet_team": bet_team,
+        "bet_team_name": "Dallas Mavericks" if bet_team == "away" else "Philadelphia 76ers",
+        "away_kalshi_ticker": AWAY,
+        "home_kalshi_ticker": HOME,
+        f"{bet_team}_kalshi_prob": ask,
+        f"{other}_kalshi_prob": 100 - ask,
+        f"{bet_team}_prob_normalized": 60.0,
+        f"{other}_prob_normalized": 40.0,
+        "expected_value": 10.0,
+    }
+
+def run(scenario, top_depth: int = 1000, retries: int = 0, **engine_options):
+    """Run scenario(exchange, engine) against a fresh exchange on a free port."""
+    async def main():
+        exchange = mock_exchange.MockExchange({AWAY: {"yes_ask": 40, "no_ask": 62},
+                                               HOME: {"yes_ask": 60, "no_ask": 42}}, top_depth=top_depth)
+        server = await mock_exchange.start(exchange, port=0)
+        client = order_executor.ExchangeClient(
+            f"http://{mock_exchange.DEFAULT_HOST}:{server.sockets[0].getsockname()[1]}", retries=retries)
+        try:
+            return await scenario(exchange, order_executor.ExecutionEngine(client, **engine_options))
+        finally:
+            await client.close()
+            server.close()
+            await server.wait_closed()
+    return asyncio.run(main())
+
+def test_retry_after_lost_ack_reuses_the_client_order_id():
+    async def scenario(exchange, engine):
+        # The order is placed but its acknowledgement dropped; the retry gets 409 and the order
+        exchange.drop_rate = 1.0
+        (record,), _ = await engine.on_result("nba", {"opportunities": [opportunity()]})
+        assert exchange.dropped == 1
+        assert len(exchange.orders) == 1
+        assert record["order_id"] in exchange.orders
+        assert record["status"] == "executed"
+        assert engine.client.retried == 1
+    run(scenario, retries=1)
+
+def test_unknown_order_is_reconciled_not_resent():
+    async def scenario(exchange, engine):
+        exchange.drop_rate = 1.0
+        (record,), _ = await engine.on_result("nba", {"opportunities": [opportunity()]})
+        assert record["status"] == "unknown"
+        exchange.drop_rate = 0.0
+        places, _ = await engine.on_result("nba", {"opportunities": [opportunity()]})
+        assert places == []
+        assert engine.reconciled == 1
+        assert len(exchange.orders) == 1
+        assert record["status"] == "executed" and record["fill_count"] == record["count"]
+    run(scenario)
+
+def test_order_the_exchange_never_saw_is_resent_under_its_id():
+    async def scenario(exchange, engine):
+        exchange.error_rate = 1.0
+        (record,), _ = await engine.on_result("nba", {"opportunities": [opportunity()]})
+        assert record["status"] == "unknown" and not exchange.orders
+        exchange.error_rate = 0.0
+        places, _ = await engine.on_result("nba", {"opportunities": [opportunity()]})
+        assert places == [record]
+        assert len(exchange.orders) == 1
+        assert exchange.client_ids == {record["client_order_id"]: record["order_id"]}
+    run(scenario)
+
+def test_resting_fills_are_booked_on_the_next_publish():
+    async def scenario(exchange, engine):
+        exchange.flow = 20
+        (record,), _ = await engine.on_result("nba", {"opportunities": [opportunity()]})
+        assert record["status"] == "resting"
+        filled = record["fill_count"]
+        exchange.tick()
+        places, _ = await engine.on_result("nba", {"opportunities": [opportunity()]})
+        assert places == []
+        assert record["fill_count"] == filled + 20
+        assert engine.resting_fills == 20
+    run(scenario, top_depth=10)
+
+@pytest.mark.parametrize("publish, reason", [
+    (lambda: {"opportunities": [opportunity()]}, "stale"),
+    (lambda: None, "gone"),
+])
+def test_resting_order_is_canceled(publish, reason):
+    async def scenario(exchange, engine):
+        (record,), _ = await engine.on_result("nba", {"opportunities": [opportunity()]})
+        assert record["status"] == "resting"
+        places, cancels = await engine.on_result("nba", publish())
+        # Nothing replaces the order while its cancel is in flight
+        assert places == []
+        assert cancels == [record]
+        assert record["cancel_reason"] == reason
+        assert record["status"] == "canceled" and record["remaining_count"] == 0
+        assert exchange.orders[record["order_id"]]["status"] == "canceled"
+    run(scenario, top_depth=10, stale_seconds=0.0 if reason == "stale" else 60.0)
+
+def test_event_exposure_cap_spans_both_sides():
+    async def scenario(exchange, engine):
+        exchange.flow = 5
+        (record,), _ = await engine.on_result("nba", {"opportunities": [opportunity()]})
+        assert record["count"] == int(50 / (record["limit_price"] / 100))
+        # Fills below the limit free room, which later publishes may use on either side
+        for _ in range(3):
+            exchange.tick()
+            await engine.on_result("nba", {"opportunities": [opportunity(), opportunity("home", 30)]})
+        assert engine.event_exposure(EVENT) <= 50
+        on_exchange = sum((order["taker_fill_cost"] + order["maker_fill_cost"]) / 100
+                          + order["remaining_count"] * order["yes_price"] / 100
+                          for order in exchange.orders.values())
+        assert on_exchange == pytest.approx(engine.event_exposure(EVENT))
+    run(scenario, top_depth=1, max_event_exposure=50.0)
+
+def test_bankroll_sizes_published_results_on_copies():
+    async def scenario(exchange, engine):
+        opp = opportunity()
+        (record,), _ = await engine.on_result("nba", {"opportunities": [opp]})
+        sized = engine.sized["nba"][0]
+        assert "contracts" not in opp
+        assert record["count"] == sized["contracts"] > 0
+    run(scenario, bankroll=10_000.0, max_event_exposure=10_000.0)
@@ -0,0 +1,24 @@
+"""param_sweep.sweep at the pipeline's own settings agrees with find_opportunities."""
+import pytest
+
+import compare_odds
+import param_sweep
+
+# find_opportunities on the stored data files
+EXPECTED_COUNTS = {"nba": 1, "ncaab": 5, "ncaaf": 4, "nfl": 0}
+
+def test_default_grid_point_matches_find_opportunities(matched_games):
+    for sport, games in matched_games.items():
+        opportunities = compare_odds.find_opportunities(games)
+        prices, probs = param_sweep.game_columns(games)
+        result = param_sweep.sweep(prices, probs, [compare_odds.MIN_EV_THRESHOLD], [compare_odds.MIN_EV_THRESHOLD],
+                                   [100.0], [1.0])
+
+        assert len(opportunities) == EXPECTED_COUNTS[sport]
+        assert result["opportunities"][0, 0, 0, 0] == len(opportunities), sport
+        assert result["total_ev"][0, 0, 0, 0] == pytest.approx(sum(o["expected_value"] for o in opportunities)), sport
+
+def test_stored_nba_opportunity(matched_games):
+    (opportunity,) = compare_odds.find_opportunities(matched_games["nba"])
+    assert opportunity["bet_team_name"] == "Dallas Mavericks"
+    assert opportunity["expected_value"] == pytest.approx(6.29)
@@ -0,0 +1,58 @@
+"""PositionBook.record_fill netting: opposite sides close pairs at $1 less the fee each."""
+import json
+
+import pytest
+
+import position_book
+
+TICKER = "KXNBAGAME-25DEC20DALPHI-DAL"
+
+@pytest.fixture
+def book(tmp_path):
+    return position_book.PositionBook(str(tmp_path / "positions.json"), str(tmp_path / "settlements.jsonl"))
+
+def test_same_side_fills_add_up(book):
+    book.record_fill(TICKER, "yes", 100, 45.0)
+    book.record_fill(TICKER, "yes", 50, 25.0)
+    position = book.positions[TICKER]
+    assert (position["side"], position["contracts"], position["cost"], position["realized_pnl"]) == ("yes", 150, 70.0, 0.0)
+    assert book.totals["cost"] == pytest.approx(70.0)
+
+def test_opposite_fill_nets_and_realizes(book):
+    book.record_fill(TICKER, "yes", 100, 45.0)
+    # 30 NO at 50c close 30 pairs: $29.70 back (after the 1% fee) for 30 * 45c held + $15 paid
+    assert book.record_fill(TICKER, "no", 30, 15.0) is None
+    position = book.positions[TICKER]
+    assert (position["side"], position["contracts"], position["cost"]) == ("yes", 70, 31.5)
+    assert position["realized_pnl"] == pytest.approx(1.2)
+    assert book.totals["cost"] == pytest.approx(31.5)
+
+def test_larger_opposite_fill_flips_side(book):
+    book.record_fill(TICKER, "yes", 70, 31.5)
+    # 100 NO at 50c: 70 close (69.3 - 31.5 - 35 = 2.8), 30 open as NO for the other $15
+    book.record_fill(TICKER, "no", 100, 50.0)
+    position = book.positions[TICKER]
+    assert (position["side"], position["contracts"], position["cost"]) == ("no", 30, 15.0)
+    assert position["realized_pnl"] == pytest.approx(2.8)
+
+def test_netting_flat_settles(book, tmp_path):
+    book.record_fill(TICKER, "yes", 100, 45.0, sport="nba")
+    record = book.record_fill(TICKER, "no", 100, 52.0)
+    assert TICKER not in book.positions
+    assert record["result"] is None
+    assert record["pnl"] == pytest.approx(99.0 - 45.0 - 52.0)
+    assert book.totals["cost"] == pytest.approx(0.0)
+    with open(tmp_path / "settlements.jsonl", encoding="utf-8") as f:
+        assert json.loads(f.readline())["ticker"] == TICKER
+    with open(tmp_path / "positions.json", encoding="utf-8") as f:
+        assert json.load(f)["positions"] == {}
+
+def test_changed_marks_are_saved(book, tmp_path):
+    book.record_fill(TICKER, "yes", 100, 45.0)
+    game = {"event_ticker": "KXNBAGAME-25DEC20DALPHI", "commence_time": "2025-12-21T00:10:00Z",
+            "away_team": "Dallas Mavericks", "home_team": "Philadelphia 76ers", "odds_data": {"bookmakers": []},
+            "away_kalshi_market": {"ticker": TICKER, "market_data": {"yes_bid": 48, "no_bid": 50}},
+            "home_kalshi_market": {"ticker": "KXNBAGAME-25DEC20DALPHI-PHI", "market_data": {}}}
+    assert book.update("nba", [game]) == [TICKER]
+    with open(tmp_path / "positions.json", encoding="utf-8") as f:
+        assert json.load(f)["positions"][TICKER]["market_value"] == pytest.approx(48.0)